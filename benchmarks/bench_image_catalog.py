@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the image catalog index.
+
+Builds catalogs of growing size, then measures a full index build, the
+time to reopen the memory-mapped index (which should not grow with the
+catalog) and the average lookup time for inflected requests.
+"""
+
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from image_catalog import ImageCatalog
+
+CATALOG_SIZES = [100, 1000, 10000]
+LOOKUPS = 2000
+NOUNS = ["kissa", "koira", "perhonen", "hevonen", "aurinko", "kukka", "lintu",
+         "kala", "puu", "talo", "auto", "juna", "laiva", "omena", "sieni"]
+ADJECTIVES = ["iso", "pieni", "sininen", "punainen", "keltainen", "iloinen"]
+REQUESTS = ["tulosta kuva perhosesta", "kuva kissasta", "hevosen kuva",
+            "tulosta iloinen koira", "kuva sinisestä laivasta"]
+
+
+def make_catalog(directory, size):
+    rng = random.Random(size)
+    for i in range(size):
+        folder = directory / f"sarja{i % 20}"
+        folder.mkdir(parents=True, exist_ok=True)
+        name = f"{rng.choice(ADJECTIVES)}_{rng.choice(NOUNS)}_{i}.png"
+        (folder / name).write_bytes(b"")
+        if i % 3 == 0:
+            (folder / name).with_suffix(".txt").write_text(
+                " ".join(rng.sample(NOUNS, 3)), encoding="utf-8")
+
+
+def main():
+    print(f"{'images':>8} {'build ms':>10} {'reopen ms':>10} {'index KiB':>10} "
+          f"{'lookup µs':>10}")
+    for size in CATALOG_SIZES:
+        with tempfile.TemporaryDirectory() as temp:
+            temp = Path(temp)
+            make_catalog(temp / "images", size)
+            index_path = temp / "image_index.bin"
+
+            catalog = ImageCatalog(temp / "images", index_path)
+            start = time.perf_counter()
+            catalog.refresh()
+            build = (time.perf_counter() - start) * 1000
+            catalog.close()
+
+            start = time.perf_counter()
+            catalog = ImageCatalog(temp / "images", index_path)
+            reopen = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for i in range(LOOKUPS):
+                assert catalog.find(REQUESTS[i % len(REQUESTS)]) is not None
+            lookup = (time.perf_counter() - start) / LOOKUPS * 1e6
+            catalog.close()
+
+            print(f"{size:>8} {build:>10.1f} {reopen:>10.2f} "
+                  f"{index_path.stat().st_size / 1024:>10.0f} {lookup:>10.1f}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
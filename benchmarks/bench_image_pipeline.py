@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the pre-spool image pipeline.
+
+Prepares a large generated PNG and a camera-sized JPEG for typical
+printer profiles and compares bytes sent to CUPS and pixels CUPS has to
+rasterize with forwarding the original file, plus preparation time on
+this machine and with a warm cache.
+"""
+
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from disk_cache import DiskCache
+from image_pipeline import ImagePipeline, PrinterProfile
+
+A4 = (8.27, 11.69)
+PROFILES = {
+    "mono laser 600 dpi": PrinterProfile(600, A4, False),
+    "mono 300 dpi": PrinterProfile(300, A4, False),
+    "color inkjet 300 dpi": PrinterProfile(300, A4, True),
+}
+SOURCE_SIZE = (4096, 4096)
+REPEATS = 3
+
+
+def make_source(size):
+    """Smooth shapes with a little noise, like a generated illustration."""
+    rng = np.random.default_rng(1)
+    height, width = size[1], size[0]
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    red = 128 + 100 * np.sin(x / 300.0)
+    green = 128 + 100 * np.cos(y / 250.0)
+    blue = 255 * ((x - width / 2) ** 2 + (y - height / 2) ** 2 < (width / 3) ** 2)
+    pixels = np.stack([red, green, blue], axis=-1)
+    pixels += rng.normal(0, 6, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def bench(name, path, pipeline):
+    original = path.stat().st_size
+    with Image.open(path) as image:
+        source_pixels = image.width * image.height
+    print(f"\n{name}: {original / 1024:.0f} KiB, {source_pixels / 1e6:.1f} MP")
+    print(f"{'profile':>22} {'KiB sent':>10} {'vs original':>12} {'MP':>6} {'prep ms':>9}")
+    for label, profile in PROFILES.items():
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            prepared = pipeline.prepare(path, profile)
+            timings.append(time.perf_counter() - start)
+        pixels = prepared.size[0] * prepared.size[1]
+        print(f"{label:>22} {len(prepared.data) / 1024:>10.0f} "
+              f"{len(prepared.data) / original:>11.1%} {pixels / 1e6:>6.1f} "
+              f"{min(timings) * 1000:>9.0f}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+        source = make_source(SOURCE_SIZE)
+        png_path = temp / "generated_image.png"
+        source.save(png_path)
+        jpeg_path = temp / "photo.jpg"
+        source.save(jpeg_path, quality=92)
+
+        pipeline = ImagePipeline()
+        bench("generated PNG", png_path, pipeline)
+        bench("camera JPEG", jpeg_path, pipeline)
+
+        cached = ImagePipeline(DiskCache(temp / "cache"))
+        profile = PROFILES["mono 300 dpi"]
+        cached.prepare(png_path, profile)
+        start = time.perf_counter()
+        cached.prepare(png_path, profile)
+        print(f"\nwarm cache (generated PNG, mono 300 dpi): "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the serial main loop versus the asyncio command pipeline.
+
+Stage durations are simulated with sleeps shaped like a Raspberry Pi run
+(speaking, cloud recognition, CUPS spooling, spoken feedback), scaled
+down so the benchmark finishes quickly. Reports the command-to-command
+interval: how long after one command starts the next one can be heard.
+"""
+
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src and project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from content_filter import ContentFilter
+from daily_limits import DailyLimitManager
+from pipeline import CommandPipeline, CommandProcessor, run_serial
+
+COMMANDS = 12
+SCALE = 0.1  # Seconds of benchmark time per simulated second
+CAPTURE_S = 2.0  # Child speaking
+RECOGNIZE_S = 1.2  # Speech-to-text round trip
+PRINT_S = 1.5  # Spooling to CUPS
+FEEDBACK_S = 2.0  # Spoken success message
+
+
+class SimulatedRecognizer:
+    def __init__(self):
+        self.capture_starts = []
+
+    def capture(self, timeout=5):
+        self.capture_starts.append(time.monotonic())
+        time.sleep(CAPTURE_S * SCALE)
+        return "tulosta kuva kissasta"
+
+    def recognize(self, audio, on_partial=None):
+        time.sleep(RECOGNIZE_S * SCALE)
+        return audio
+
+    def listen(self, timeout=5, on_partial=None):
+        return self.recognize(self.capture(timeout), on_partial)
+
+
+class SimulatedPrinter:
+    def print_content(self, content):
+        time.sleep(PRINT_S * SCALE)
+        return True
+
+
+class SimulatedFeedback:
+    def play_success_message(self):
+        time.sleep(FEEDBACK_S * SCALE)
+
+    def play_error_message(self):
+        time.sleep(FEEDBACK_S * SCALE)
+
+
+def interval(recognizer):
+    """Mean seconds between consecutive capture starts, in simulated time."""
+    starts = recognizer.capture_starts[:COMMANDS]
+    return (starts[-1] - starts[0]) / (len(starts) - 1) / SCALE
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp:
+        limits = DailyLimitManager(max_daily_prints=10 ** 6, config_dir=temp)
+        processor = CommandProcessor(ContentFilter(), limits)
+
+        serial = SimulatedRecognizer()
+        run_serial(serial, processor, SimulatedPrinter(), SimulatedFeedback(),
+                   max_commands=COMMANDS)
+
+        piped = SimulatedRecognizer()
+        pipeline = CommandPipeline(piped, processor, SimulatedPrinter(),
+                                   SimulatedFeedback())
+        asyncio.run(pipeline.run(max_commands=COMMANDS))
+        pipeline.shutdown()
+        limits.close()
+
+    serial_interval = interval(serial)
+    piped_interval = interval(piped)
+    print(f"stage seconds: capture {CAPTURE_S}, recognize {RECOGNIZE_S}, "
+          f"print {PRINT_S}, feedback {FEEDBACK_S}")
+    print(f"serial loop:      {serial_interval:5.2f} s command-to-command")
+    print(f"asyncio pipeline: {piped_interval:5.2f} s command-to-command "
+          f"({(1 - piped_interval / serial_interval) * 100:.0f}% lower)")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the print usage storage backends.
+
+Compares bytes written and time per recorded print for the JSON file and
+journal backends, the startup replay time of a long journal, and the
+throughput of the shared SQLite backend with N concurrent writer
+processes doing atomic check-and-increment, and per-child lookups with
+thousands of child profiles.
+"""
+
+import logging
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from usage_storage import JournalStorage, JsonFileStorage, SqliteUsageStorage
+from daily_limits import DailyLimitManager
+
+RECORDS = 2000
+DAY = "2024-05-01"
+WRITER_COUNTS = [1, 2, 4, 8]
+ATTEMPTS_PER_WRITER = 500
+PROFILE_COUNTS = [10, 1000, 10000]
+DEVICES = ["kiosk-1", "kiosk-2", "kiosk-3"]
+
+
+def bench_backend(name, storage, written_per_record):
+    """Record RECORDS prints and report cost per record."""
+    start = time.perf_counter()
+    for _ in range(RECORDS):
+        storage.increment(DAY)
+    storage.close()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {elapsed / RECORDS * 1e6:8.1f} µs/record, "
+          f"{written_per_record():.0f} bytes written/record")
+
+
+def contention_writer(path, attempts, limit, start_event, results):
+    """Worker process: reserve prints as fast as possible."""
+    storage = SqliteUsageStorage(path)
+    start_event.wait()
+    granted = 0
+    for _ in range(attempts):
+        if storage.try_increment(DAY, limit) is not None:
+            granted += 1
+    storage.close()
+    results.put(granted)
+
+
+def bench_contention(temp):
+    """Run N concurrent writers against one SQLite database."""
+    print(f"\n{'writers':>8} {'attempts/s':>12} {'granted':>8} {'limit':>6} {'ok':>4}")
+    for writers in WRITER_COUNTS:
+        path = str(temp / f"contention-{writers}.db")
+        SqliteUsageStorage(path).close()
+        attempts = writers * ATTEMPTS_PER_WRITER
+        limit = attempts * 3 // 4  # Some attempts must be refused
+
+        start_event = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=contention_writer,
+                args=(path, ATTEMPTS_PER_WRITER, limit, start_event, results))
+            for _ in range(writers)
+        ]
+        for process in processes:
+            process.start()
+
+        start = time.perf_counter()
+        start_event.set()
+        granted = sum(results.get() for _ in processes)
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+        stored = SqliteUsageStorage(path).get_count(DAY)
+        ok = "yes" if granted == stored == limit else "NO"
+        print(f"{writers:>8} {attempts / elapsed:>12,.0f} {granted:>8} {limit:>6} {ok:>4}")
+
+
+def bench_profiles(temp):
+    """Per-child limit checks and bulk statistics with many profiles."""
+    print(f"\n{'profiles':>8} {'check µs':>10} {'bulk stats ms':>14}")
+    for profiles in PROFILE_COUNTS:
+        storage = JournalStorage(temp / f"profiles-{profiles}.json",
+                                 compact_after=10 ** 9)
+        manager = DailyLimitManager(max_daily_prints=10 ** 6, config_dir=str(temp),
+                                    storage=storage)
+        children = [f"child-{i}" for i in range(profiles)]
+        for i, child in enumerate(children):
+            manager.record_print(child, DEVICES[i % len(DEVICES)])
+
+        rounds = 20000
+        start = time.perf_counter()
+        for i in range(rounds):
+            manager.can_print(children[i % profiles])
+        check = (time.perf_counter() - start) / rounds * 1e6
+
+        start = time.perf_counter()
+        stats = manager.get_all_usage_stats()
+        bulk = (time.perf_counter() - start) * 1000
+        assert len(stats) == profiles
+        manager.close()
+        print(f"{profiles:>8} {check:>10.1f} {bulk:>14.1f}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+
+        # More child profiles make every JSON rewrite larger
+        json_path = temp / "usage.json"
+        storage = JsonFileStorage(json_path)
+        storage.reset(DAY)
+        for i in range(100):
+            storage.increment(DAY, f"child-{i}")
+        bench_backend("json", storage, lambda: json_path.stat().st_size)
+
+        snapshot = temp / "daily_usage.json"
+        journal = temp / "daily_usage.journal"
+        storage = JournalStorage(snapshot, journal, compact_after=10 ** 9)
+        storage.reset(DAY)
+        bench_backend("journal", storage,
+                      lambda: journal.stat().st_size / RECORDS)
+
+        start = time.perf_counter()
+        replayed = JournalStorage(snapshot, journal)
+        elapsed = time.perf_counter() - start
+        print(f"journal replay of {RECORDS} records: {elapsed * 1000:.1f} ms "
+              f"(count {replayed.get_count(DAY)})")
+
+        bench_contention(temp)
+        bench_profiles(temp)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
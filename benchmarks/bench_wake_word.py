@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the wake word spotter.
+
+Measures how many commands are let through, how often other speech
+triggers the full recognizer, and the CPU time spent per hour of audio.
+
+Usage: bench_wake_word.py [recordings]
+
+``recordings`` is a directory with
+    templates/<wake word>/*.wav  recordings of just the wake word
+    commands/*.wav               commands, each starting with a wake word
+    other/*.wav                  anything else heard in the room
+all 16 kHz, 16-bit mono. Without it, crude synthetic speech is used; the
+CPU figures hold, but the accuracy figures say little about real voices.
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import settings
+from wake_word import SAMPLE_RATE, WakeWordSpotter, mfcc, read_wav, subsequence_distance
+
+SYNTHETIC_SPEAKERS = 8
+THRESHOLDS = [0.12, 0.14, 0.16, 0.18, 0.20, 0.22, 0.24]
+OTHER_WORDS = ["kissa", "koira", "aurinko", "mitä", "hei", "moikka", "leikitään", "äiti",
+               "uutiset", "sää", "talo", "tähti", "kuule", "tule", "tässä", "tuolla"]
+
+FORMANTS = {"a": (800, 1200), "e": (500, 1800), "i": (300, 2300), "o": (500, 900),
+            "u": (320, 800), "y": (300, 1700), "ä": (700, 1700), "ö": (450, 1500)}
+
+
+def say(word, rng, speed=1.0, pitch=220.0, noise=0.01):
+    """Crude synthetic speech: formant vowels, noise bursts for consonants."""
+    def voiced(first, second, seconds):
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        sound = sum((1 / (1 + ((h * pitch - first) / 120) ** 2)
+                     + 0.6 / (1 + ((h * pitch - second) / 150) ** 2))
+                    * np.sin(2 * np.pi * h * pitch * t + rng.uniform(0, 6))
+                    for h in range(1, int(4000 // pitch)))
+        return sound * np.minimum(1, np.minimum(t, seconds - t) / 0.02)
+
+    def hiss(seconds, center):
+        n = int(seconds * SAMPLE_RATE)
+        spectrum = np.fft.rfft(rng.normal(0, 1, n))
+        spectrum *= np.exp(-((np.fft.rfftfreq(n, 1 / SAMPLE_RATE) - center) / 1500) ** 2)
+        return np.fft.irfft(spectrum, n) * 0.5
+
+    parts = []
+    for letter in word:
+        if letter in FORMANTS:
+            parts.append(voiced(*FORMANTS[letter], 0.12 / speed))
+        elif letter in "sh":
+            parts.append(hiss(0.08 / speed, 5000 if letter == "s" else 2500))
+        elif letter in "tkp":
+            parts += [np.zeros(int(0.04 / speed * SAMPLE_RATE)), hiss(0.02 / speed, 3500)]
+        else:
+            parts.append(0.5 * voiced(300, 1000 + 100 * (ord(letter) % 7), 0.06 / speed))
+    signal = np.concatenate(parts)
+    signal = signal / np.abs(signal).max() * 8000
+    return (signal + rng.normal(0, noise * 8000, len(signal))).astype(np.int16)
+
+
+def utterance(words, rng):
+    """Words spoken by a random speaker, with room noise around them."""
+    speed, pitch = rng.uniform(0.8, 1.25), rng.uniform(180, 300)
+    speech = [say(word, rng, speed, pitch, noise=0.03) for word in words]
+    room = lambda seconds: rng.normal(0, 80, int(seconds * SAMPLE_RATE)).astype(np.int16)
+    return np.concatenate([room(0.3)] + speech + [room(0.5)])
+
+
+def synthetic_recordings():
+    rng = np.random.default_rng(1)
+    templates = {word: [say(word, rng, rng.uniform(0.9, 1.1), rng.uniform(200, 260))
+                        for _ in range(3)]
+                 for word in settings.WAKE_WORDS}
+    commands = [(word, utterance([word, "iso", "kissa"], rng))
+                for word in settings.WAKE_WORDS for _ in range(SYNTHETIC_SPEAKERS)]
+    other = [utterance([word, "ja", "koira"], rng)
+             for word in OTHER_WORDS for _ in range(SYNTHETIC_SPEAKERS // 2)]
+    return templates, commands, other
+
+
+def load_recordings(directory):
+    templates = {}
+    for word in settings.WAKE_WORDS:
+        templates[word] = [read_wav(path)[0]
+                           for path in sorted((directory / "templates" / word).glob("*.wav"))]
+    commands = []
+    for path in sorted((directory / "commands").glob("*.wav")):
+        word = next((w for w in settings.WAKE_WORDS if path.stem.startswith(w)), None)
+        commands.append((word, read_wav(path)[0]))
+    other = [read_wav(path)[0] for path in sorted((directory / "other").glob("*.wav"))]
+    return templates, commands, other
+
+
+def best_distances(spotter, samples):
+    """Closest distance to each wake word in the start of an utterance."""
+    features = mfcc(samples[:int(spotter.window * SAMPLE_RATE)])
+    return {word: min(subsequence_distance(template, features) for template in recordings)
+            for word, recordings in spotter.templates.items() if recordings}
+
+
+def bench(templates, commands, other):
+    spotter = WakeWordSpotter(settings.WAKE_WORDS, window=settings.WAKE_WORD_WINDOW,
+                              default_threshold=settings.WAKE_WORD_THRESHOLD)
+    for word, recordings in templates.items():
+        for samples in recordings:
+            spotter.enroll(word, samples)
+    template_count = sum(len(recordings) for recordings in templates.values())
+
+    command_distances = [(word, best_distances(spotter, samples)) for word, samples in commands]
+    other_distances = [best_distances(spotter, samples) for samples in other]
+
+    def found(word, distances, threshold):
+        best = min(distances, key=distances.get)
+        return best == word and distances[best] <= threshold
+
+    print(f"{'word':>10} {'templates':>10} {'found':>8}   (threshold {spotter.default_threshold:g})")
+    for word in settings.WAKE_WORDS:
+        spoken = [distances for w, distances in command_distances if w == word]
+        hits = sum(found(word, distances, spotter.default_threshold) for distances in spoken)
+        print(f"{word:>10} {len(templates[word]):10d} {hits:>4}/{len(spoken):<3}")
+
+    print(f"\n{'threshold':>10} {'commands found':>15} {'false triggers':>15}")
+    for threshold in THRESHOLDS:
+        hits = sum(found(word, distances, threshold) for word, distances in command_distances)
+        false = sum(min(distances.values()) <= threshold for distances in other_distances)
+        print(f"{threshold:10.2f} {hits / len(commands):15.0%} {false / len(other):15.0%}")
+
+    # Worst case: the room is never quiet and every window of audio is an
+    # utterance start that has to be checked
+    window = int(spotter.window * SAMPLE_RATE)
+    audio = np.concatenate(other)
+    pieces = [audio[start:start + window] for start in range(0, len(audio) - window + 1, window)]
+    cpu_before = spotter.cpu_seconds
+    wall_start = time.perf_counter()
+    for piece in pieces:
+        spotter.detect(piece)
+    wall = time.perf_counter() - wall_start
+    cpu = spotter.cpu_seconds - cpu_before
+    audio_seconds = len(pieces) * spotter.window
+    print(f"\nDetection with {template_count} templates: "
+          f"{wall / len(pieces) * 1000:.1f} ms per {spotter.window:g} s window")
+    print(f"CPU per hour of continuous speech: {cpu / audio_seconds * 3600:.1f} s "
+          f"({cpu / audio_seconds * 100:.2f} % of one core)")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    if len(sys.argv) > 1:
+        bench(*load_recordings(Path(sys.argv[1])))
+    else:
+        print("No recordings given: synthetic speech, accuracy is only indicative\n")
+        bench(*synthetic_recordings())
@@ -2,26 +2,91 @@
 
 # Daily print limits
 DAILY_PRINT_LIMIT = 10
+USAGE_STORAGE = "journal"  # "json", "journal" or "sqlite" (shared by processes)
+CHILD_PRINT_LIMITS = {}  # Per-child overrides, e.g. {"aino": 5}
+DEVICE_ID = None  # Name of this kiosk in usage statistics (None = hostname)
+
+# Short-term rate limit (token bucket) on top of the daily limit
+RATE_LIMIT_BURST = 3  # Prints allowed back to back
+RATE_LIMIT_REFILL_SECONDS = 60  # One more print allowed every N seconds
+RATE_LIMIT_MAX_DELAY = 5  # Wait up to N seconds for a print slot, else reject
 
 # Voice recognition settings
 VOICE_TIMEOUT = 5
 VOICE_PHRASE_TIME_LIMIT = 10
 VOICE_LANGUAGE = "fi-FI"
+CONTINUOUS_CAPTURE = True  # Keep the microphone open; speech is never missed between commands
+SPEECH_BACKEND = "google"  # "google" (online) or "vosk" (offline, streaming partial results)
+VOSK_MODEL_PATH = "models/vosk-model-small-fi"
 
 # Finnish wake words (commands that trigger printing)
 WAKE_WORDS = ["tulosta", "kirjoita", "piirtää", "kuva", "tee"]
+WAKE_WORD_GATE = False  # Only send utterances that start with a wake word to the recognizer
+WAKE_WORD_DIR = "assets/wake_words"  # Recordings: <dir>/<wake word>/*.wav
+WAKE_WORD_WINDOW = 2.0  # Seconds at the start of an utterance searched for a wake word
+WAKE_WORD_THRESHOLD = 0.18  # Larger accepts sloppier matches (and more false triggers)
+
+# Main loop: "serial" handles one command at a time, "pipeline" listens for
+# the next command while the previous one is printed and announced
+MAIN_LOOP = "serial"
+PIPELINE_QUEUE_SIZE = 2
 
 # Audio settings
 TTS_RATE = 150  # Words per minute (slower for children)
 TTS_VOLUME = 0.8
+SPEECH_CACHE_DIR = "cache/speech"  # Synthesized phrases, played instead of live speech
+SPEECH_CACHE_MAX_MB = 20
+TTS_SERVER = True  # Synthesize in a separate process that is restarted if it crashes or hangs
+# Stop talking when the child starts to speak. Needs a headset or an
+# echo-cancelling microphone, or the printer's own voice triggers it
+TTS_BARGE_IN = False
 
 # Content filtering
 MAX_CONTENT_LENGTH = 200
-ENABLE_EDUCATIONAL_BOOST = True
+ENABLE_EDUCATIONAL_BOOST = True  # Educational requests skip ahead in the print queue
+# Commands starting with this phrase are a parent's and print before the
+# children's queued requests, e.g. "aikuinen pyytää" (None = disabled)
+PARENT_PHRASE = None
 
 # Printer settings
 DEFAULT_PRINTER = None  # Use system default
-PRINT_TIMEOUT = 30
+PRINT_TIMEOUT = 30  # Seconds a job may print before it is cancelled and refunded
+PRINT_PENDING_TIMEOUT = 300  # Seconds a job may wait in CUPS without starting
+PRINTER_CACHE_TTL = 30  # Seconds the printer list is cached
+LOAD_BALANCE_PRINTERS = False  # Spread jobs over all healthy printers
+PRINTER_POOL = None  # Printers load balancing may use (None = all)
+PRINT_QUEUE_SIZE = 4  # Jobs waiting for the printer before requests are rejected
+PRINT_QUEUE_MAX_WAIT = 2  # Seconds to wait for queue space when it is full
+PRINT_MAX_OUTSTANDING = 1  # Jobs handed to CUPS at once; the rest wait in the priority queue
+PRINT_COALESCE_SECONDS = 10  # Identical requests within N seconds print once
+
+# Page rendering
+RENDER_PAGES = True  # Print requests as rendered PDF pages instead of plain text
+RENDER_CACHE_DIR = "cache/pages"
+RENDER_CACHE_MAX_MB = 50  # Least recently used pages are deleted beyond this
+PAGE_SIZE = "A4"  # "A4" or "letter"
+PAGE_FONT_SIZE = 36
+
+# Image catalog
+IMAGE_DIR = "assets/images"  # Pictures, optionally with a .txt file of extra tags each
+IMAGE_INDEX_FILE = "config/image_index.bin"
+IMAGE_INDEX_REFRESH_SECONDS = 60  # How often new or changed pictures are indexed
+
+# Coloring pages ("värityskuva" requests are drawn locally)
+COLORING_PAGES = True
+COLORING_WORKERS = None  # Drawing processes (None = one per CPU core)
+COLORING_WARM_PAGES = 1  # Pages of each template kept ready in advance
+
+# Image preparation
+PREPARE_IMAGES = True  # Resample images to the printer's resolution before spooling
+MONO_IMAGE_MODE = "1bit"  # "1bit" (dithered) or "gray" for printers without color
+IMAGE_CACHE_DIR = "cache/images"
+IMAGE_CACHE_MAX_MB = 100
+
+# Reprints of the same picture on one day
+DUPLICATE_IMAGE_POLICY = "warn"  # "warn" (print and log), "block" or "allow"
+DUPLICATE_IMAGE_INDEX = "config/printed_images.json"
+DUPLICATE_MAX_DISTANCE = 6  # Hash bits two copies may differ in (0-7)
 
 # Logging
 LOG_LEVEL = "INFO"
@@ -0,0 +1,469 @@
+"""
+Audio Capture Module
+
+Keeps one microphone stream open and cuts utterances out of it with a
+voice activity detector.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+# Floor for frame energies, so digital silence does not give -inf dB
+MIN_ENERGY_DB = -100.0
+
+
+class Utterance(NamedTuple):
+    """One stretch of speech cut from the microphone stream."""
+
+    pcm: bytes
+    sample_rate: int
+    started_at: float
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / SAMPLE_WIDTH / self.sample_rate
+
+
+class UtteranceStream:
+    """
+    An utterance handed out while it is still being spoken.
+
+    The capture thread appends audio as soon as it has been classified,
+    so a consumer can start recognizing before the child stops talking.
+    """
+
+    def __init__(self, sample_rate: int, started_at: float):
+        self.sample_rate = sample_rate
+        self.started_at = started_at
+        # time.monotonic() when the end of speech was detected
+        self.ended_at: Optional[float] = None
+        self._length: Optional[int] = None
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+
+    @property
+    def ended(self) -> bool:
+        return self.ended_at is not None
+
+    def _push(self, pcm: bytes) -> None:
+        self._chunks.put(pcm)
+
+    def _end(self, length: int) -> None:
+        self._length = length
+        self.ended_at = time.monotonic()
+        self._chunks.put(None)
+
+    def chunks(self) -> Iterator[bytes]:
+        """
+        Yield 16-bit PCM chunks until the utterance ends.
+
+        The last chunks may run past the end of speech by up to the
+        detector's hangover; ``collect`` trims them.
+        """
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def collect(self) -> Utterance:
+        """Wait for the end of the utterance and return all of it."""
+        pcm = b"".join(self.chunks())
+        return Utterance(pcm[:self._length * SAMPLE_WIDTH], self.sample_rate, self.started_at)
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer holding the most recent samples of a stream.
+
+    Samples are addressed by their absolute position in the stream, so
+    a reader can ask for a range it saw start earlier as long as it has
+    not been overwritten yet.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self.written = 0
+
+    @property
+    def oldest(self) -> int:
+        """Position of the oldest sample still held."""
+        return max(0, self.written - self.capacity)
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples, overwriting the oldest ones."""
+        samples = samples[-self.capacity:]
+        start = self.written % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+        self.written += len(samples)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """
+        Copy samples [start, end) of the stream.
+
+        Args:
+            start: First position; clamped to the oldest sample held
+            end: Position after the last sample; clamped to what was written
+
+        Returns:
+            The samples as int16
+        """
+        start = max(start, self.oldest)
+        end = min(end, self.written)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        begin = start % self.capacity
+        stop = begin + (end - start)
+        if stop <= self.capacity:
+            return self._data[begin:stop].copy()
+        return np.concatenate((self._data[begin:], self._data[:stop - self.capacity]))
+
+
+def frame_features(samples: np.ndarray, frame_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Energy and zero-crossing rate of consecutive frames.
+
+    Args:
+        samples: int16 samples; a trailing partial frame is ignored
+        frame_length: Samples per frame
+
+    Returns:
+        Energy in dBFS and zero crossings per sample, one value per frame
+    """
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32)
+    power = np.mean(frames * frames, axis=1) / (32768.0 * 32768.0)
+    energy_db = np.maximum(10.0 * np.log10(np.maximum(power, 1e-12)), MIN_ENERGY_DB)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """
+    Energy and zero-crossing voice activity detector.
+
+    A frame is speech when it is clearly louder than the background, or
+    somewhat louder and noisy the way fricatives ("s", "f") are. The
+    background level follows the quieter frames, so a fan or a radio in
+    the room is not taken for speech.
+    """
+
+    def __init__(self, speech_margin_db: float = 12.0, fricative_margin_db: float = 6.0,
+                 fricative_zcr: float = 0.25, noise_adaptation: float = 0.05,
+                 initial_noise_db: float = -60.0):
+        self.speech_margin_db = speech_margin_db
+        self.fricative_margin_db = fricative_margin_db
+        self.fricative_zcr = fricative_zcr
+        self.noise_adaptation = noise_adaptation
+        self.noise_db = initial_noise_db
+
+    def calibrate(self, energy_db: np.ndarray) -> None:
+        """Set the background level from frames known to be silence."""
+        if len(energy_db):
+            self.noise_db = float(np.median(energy_db))
+
+    def classify(self, energy_db: np.ndarray, zcr: np.ndarray) -> np.ndarray:
+        """
+        Decide which frames are speech.
+
+        Args:
+            energy_db: Frame energies from frame_features
+            zcr: Frame zero-crossing rates from frame_features
+
+        Returns:
+            Boolean array, True for speech frames
+        """
+        above = energy_db - self.noise_db
+        speech = (above > self.speech_margin_db) | (
+            (above > self.fricative_margin_db) & (zcr > self.fricative_zcr))
+
+        quiet = energy_db[~speech]
+        if len(quiet):
+            # Follow the background slowly; rising noise never counts as speech
+            self.noise_db += self.noise_adaptation * (float(np.mean(quiet)) - self.noise_db)
+        return speech
+
+
+class UtteranceSegmenter:
+    """
+    Turns per-frame speech decisions into utterance boundaries.
+
+    An utterance starts after ``start_frames`` speech frames in a row and
+    ends after ``hangover_frames`` frames without speech or when it
+    reaches ``max_frames``. Boundaries are frame numbers; the start
+    includes ``pre_roll_frames`` before the first speech frame so the
+    beginning of the first syllable is kept.
+    """
+
+    def __init__(self, start_frames: int = 3, hangover_frames: int = 27,
+                 pre_roll_frames: int = 10, tail_frames: int = 7, max_frames: int = 334):
+        self.start_frames = start_frames
+        self.hangover_frames = hangover_frames
+        self.pre_roll_frames = pre_roll_frames
+        self.tail_frames = tail_frames
+        self.max_frames = max_frames
+        self._frame = 0
+        self._run = 0
+        self._start: Optional[int] = None
+        self._last_speech = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return self._start is not None
+
+    @property
+    def start_frame(self) -> Optional[int]:
+        """First frame (with pre-roll) of the utterance in progress."""
+        return self._start
+
+    def feed(self, speech: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Process the next frame decisions.
+
+        Args:
+            speech: Boolean per frame, in stream order
+
+        Returns:
+            (first frame, end frame) of every utterance completed
+        """
+        completed = []
+        for is_speech in speech.tolist():
+            frame = self._frame
+            self._frame += 1
+            if is_speech:
+                self._run += 1
+                self._last_speech = frame
+            else:
+                self._run = 0
+
+            if self._start is None:
+                if self._run >= self.start_frames:
+                    first = frame - self.start_frames + 1
+                    self._start = max(0, first - self.pre_roll_frames)
+                continue
+
+            if (frame - self._last_speech >= self.hangover_frames
+                    or frame + 1 - self._start >= self.max_frames):
+                end = min(self._last_speech + 1 + self.tail_frames, frame + 1)
+                completed.append((self._start, end))
+                self._start = None
+                self._run = 0
+        return completed
+
+
+class AudioCapture:
+    """
+    Continuous microphone capture with voice activity detection.
+
+    A background thread keeps one input stream open and writes every
+    sample into a ring buffer. The voice activity detector runs over
+    each block of frames as it arrives. When speech starts, an
+    UtteranceStream is queued and fed from the ring buffer, pre-roll
+    first, until the detector decides the utterance is over. Speech that
+    starts while the rest of the program is busy (printing, talking) is
+    therefore kept instead of being lost between listen calls.
+    """
+
+    def __init__(self, open_stream: Callable[[int, int], Any], sample_rate: int = SAMPLE_RATE,
+                 frame_ms: int = 30, frames_per_read: int = 4, buffer_seconds: float = 30.0,
+                 pre_roll: float = 0.3, hangover: float = 0.8, max_utterance: float = 10.0,
+                 calibration: float = 1.0, max_pending: int = 4,
+                 detector: Optional[VoiceActivityDetector] = None,
+                 on_speech_start: Optional[Callable[[], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            open_stream: Called with (sample rate, samples per read); returns
+                a stream whose read(n) gives n 16-bit mono samples as bytes
+            frame_ms: VAD frame length
+            frames_per_read: Frames read from the stream at a time
+            buffer_seconds: Ring buffer length; longer than max_utterance
+            pre_roll: Seconds kept before detected speech
+            hangover: Seconds of silence that end an utterance
+            max_utterance: Longest utterance in seconds
+            calibration: Seconds of audio used to measure background noise
+            max_pending: Utterances queued before the oldest is dropped
+            on_speech_start: Called from the capture thread whenever an
+                utterance starts, e.g. to stop speech feedback (barge-in)
+        """
+        self.logger = logging.getLogger(__name__)
+        if buffer_seconds <= max_utterance + pre_roll:
+            raise ValueError("buffer_seconds must exceed max_utterance + pre_roll")
+        self.open_stream = open_stream
+        self.sample_rate = sample_rate
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.read_length = self.frame_length * frames_per_read
+        self.clock = clock
+        self.on_speech_start = on_speech_start
+
+        frames_per_second = 1000 / frame_ms
+        self.ring = RingBuffer(int(buffer_seconds * sample_rate))
+        self.detector = detector or VoiceActivityDetector()
+        self.segmenter = UtteranceSegmenter(
+            pre_roll_frames=round(pre_roll * frames_per_second),
+            hangover_frames=round(hangover * frames_per_second),
+            max_frames=round(max_utterance * frames_per_second),
+        )
+        self.calibration_frames = round(calibration * frames_per_second)
+
+        self._utterances: "queue.Queue[UtteranceStream]" = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stream = None
+        # Stream position up to which frames have been classified
+        self._analyzed = 0
+        self._calibration: List[np.ndarray] = []
+        self._calibrated = 0
+        # Utterance being spoken, its first sample and how far it was fed
+        self._current: Optional[UtteranceStream] = None
+        self._current_start = 0
+        self._pushed = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Open the stream and start capturing."""
+        if self._thread is not None:
+            return
+        self._stream = self.open_stream(self.sample_rate, self.read_length)
+        self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Continuous audio capture started at {self.sample_rate} Hz")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                data = self._stream.read(self.read_length)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.logger.error(f"Error reading microphone: {e}")
+                self._stop.wait(0.5)
+                continue
+            self.ring.write(np.frombuffer(data, dtype=np.int16))
+            self._analyze()
+
+    def _analyze(self) -> None:
+        """Run the detector over the whole frames written since the last call."""
+        end = self.ring.written - self.ring.written % self.frame_length
+        if end <= self._analyzed:
+            return
+        energy_db, zcr = frame_features(self.ring.read(self._analyzed, end), self.frame_length)
+        self._analyzed = end
+
+        if self._calibrated < self.calibration_frames:
+            self._calibration.append(energy_db)
+            self._calibrated += len(energy_db)
+            if self._calibrated >= self.calibration_frames:
+                self.detector.calibrate(np.concatenate(self._calibration))
+                self._calibration = []
+                self.logger.debug(f"Background noise {self.detector.noise_db:.1f} dBFS")
+            # Keep the segmenter's frame count in step with the stream
+            self.segmenter.feed(np.zeros(len(energy_db), dtype=bool))
+            return
+
+        speech = self.detector.classify(energy_db, zcr)
+        for first, end_frame in self.segmenter.feed(speech):
+            if self._current is None:
+                self._open(first)
+            self._push(end_frame * self.frame_length)
+            self._finish(end_frame * self.frame_length)
+
+        if self.segmenter.in_speech:
+            if self._current is None:
+                self._open(self.segmenter.start_frame)
+            self._push(self._analyzed)
+
+    def _open(self, first_frame: int) -> None:
+        """Queue a new utterance starting at a frame."""
+        start = max(first_frame * self.frame_length, self.ring.oldest)
+        lag = (self.ring.written - start) / self.sample_rate
+        self._current = UtteranceStream(self.sample_rate, self.clock() - lag)
+        self._current_start = self._pushed = start
+
+        while True:
+            try:
+                self._utterances.put_nowait(self._current)
+                break
+            except queue.Full:
+                try:
+                    self._utterances.get_nowait()
+                    self.dropped += 1
+                    self.logger.warning("Utterance queue full, dropped the oldest")
+                except queue.Empty:
+                    pass
+
+        if self.on_speech_start is not None:
+            try:
+                self.on_speech_start()
+            except Exception as e:
+                self.logger.error(f"Error in speech start callback: {e}")
+
+    def _push(self, end: int) -> None:
+        """Feed the current utterance up to a stream position."""
+        if end > self._pushed:
+            self._current._push(self.ring.read(self._pushed, end).tobytes())
+            self._pushed = end
+
+    def _finish(self, end: int) -> None:
+        """End the current utterance at a stream position."""
+        self._current._end(end - self._current_start)
+        self.logger.debug(
+            f"Utterance of {(end - self._current_start) / self.sample_rate:.2f} s captured"
+        )
+        self._current = None
+
+    def get_stream(self, timeout: Optional[float] = None) -> Optional[UtteranceStream]:
+        """
+        Wait for the next utterance to start.
+
+        Args:
+            timeout: Seconds to wait (None waits forever)
+
+        Returns:
+            The utterance, still growing while the child speaks, or None
+            if nobody started speaking in time
+        """
+        try:
+            return self._utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_utterance(self, timeout: Optional[float] = None) -> Optional[Utterance]:
+        """
+        Wait for the next complete utterance.
+
+        Args:
+            timeout: Seconds to wait for speech to start (None waits forever)
+
+        Returns:
+            The utterance, or None if nobody started speaking in time
+        """
+        stream = self.get_stream(timeout)
+        return stream.collect() if stream is not None else None
+
+    def close(self) -> None:
+        """Stop capturing and close the stream."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._current is not None:
+            self._finish(self._pushed)
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception as e:
+                self.logger.debug(f"Error closing microphone stream: {e}")
+            self._stream = None
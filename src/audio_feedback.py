@@ -5,159 +5,355 @@ Provides Finnish audio feedback for the child's automatic printer.
 """
 
 import logging
+import os
+import tempfile
+import threading
+import numpy as np
 import pygame
 import pyttsx3
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+from audio_player import LOW, NORMAL, URGENT, AudioPlayer, PlaybackFuture
+from disk_cache import DiskCache
+from number_announcer import CLIPS, NumberAnnouncer
+from tts_cache import SpeechCache
+from tts_server import SpeechServer, configure_engine
+
+# Message name -> (recording in the assets directory, text spoken if it is
+# missing, playback priority)
+MESSAGES = {
+    "welcome": ("welcome.wav", "Tervetuloa! Sano mitä haluat tulostaa.", LOW),
+    "success": ("success.wav", "Hienoa! Tulostus onnistui.", NORMAL),
+    "error": ("error.wav", "Pahoittelen, tapahtui virhe. Yritä uudelleen.", URGENT),
+    "limit_reached": ("limit_reached.wav",
+                      "Olet jo tulostanut tarpeeksi tänään. Yritä huomenna uudelleen.", URGENT),
+    "rate_limited": ("rate_limited.wav", "Odota hetki, tulostin tarvitsee pienen tauon.",
+                     URGENT),
+    "content_warning": ("content_warning.wav",
+                        "Tuo ei ole sopivaa. Voisimme tulostaa jotain mukavampaa?", URGENT),
+    "listening": ("listening.wav", "Kuuntelen...", NORMAL),
+    "duplicate_image": ("duplicate_image.wav", "Tämä kuva on jo tulostettu tänään.", NORMAL),
+}
+
+
+def remaining_prints_text(count: int) -> str:
+    """Sentence telling how many prints are left today."""
+    if count == 1:
+        return "Sinulla on vielä yksi tulostus jäljellä tänään."
+    elif count > 1:
+        return f"Sinulla on vielä {count} tulostusta jäljellä tänään."
+    return "Sinulla ei ole enää tulostuksia jäljellä tänään."
 
 
 class AudioFeedback:
     """Handles audio feedback in Finnish for user interactions."""
     
-    def __init__(self, assets_dir: str = "assets/audio"):
+    def __init__(self, assets_dir: str = "assets/audio",
+                 speech_cache: Optional[DiskCache] = None,
+                 tts_rate: int = 150, tts_volume: float = 0.8,
+                 speech_server: Optional[SpeechServer] = None):
+        """
+        Args:
+            assets_dir: Directory of recorded messages
+            speech_cache: Where synthesized phrases are kept; without it
+                every phrase is spoken live
+            tts_rate: Speech rate in words per minute
+            tts_volume: Speech volume (0.0-1.0)
+            speech_server: Synthesizes speech in a separate process; if
+                given, no TTS engine is started in this one
+        """
         self.logger = logging.getLogger(__name__)
         self.assets_dir = Path(assets_dir)
         self.assets_dir.mkdir(parents=True, exist_ok=True)
+        # pyttsx3 engines must not be driven from two threads at once
+        self._tts_lock = threading.Lock()
+        self.tts_voice: Optional[str] = None
+        self.tts_rate = tts_rate
+        self.tts_volume = tts_volume
+        self.speech_cache: Optional[SpeechCache] = None
+        self.number_announcer: Optional[NumberAnnouncer] = None
+        self.player: Optional[AudioPlayer] = None
+        self.speech_server = speech_server
+        # Bumped on barge-in so speech still being synthesized is not played
+        self._speech_generation = 0
         
         # Initialize pygame mixer for audio playback
         try:
             pygame.mixer.init()
             self.logger.info("Pygame mixer initialized")
+            # Recorded messages are decoded once and played without blocking
+            self.player = AudioPlayer()
+            self.player.preload(self.assets_dir)
+            # Announcements are stitched from clips at the mixer's own rate
+            self.number_announcer = NumberAnnouncer(sample_rate=pygame.mixer.get_init()[0])
+            self.number_announcer.load_recordings(self.assets_dir / "numbers")
         except Exception as e:
             self.logger.error(f"Failed to initialize pygame mixer: {e}")
         
-        # Initialize text-to-speech engine
-        try:
-            self.tts_engine = pyttsx3.init()
-            self._configure_tts()
-            self.logger.info("Text-to-speech engine initialized")
-        except Exception as e:
-            self.logger.error(f"Failed to initialize TTS: {e}")
-            self.tts_engine = None
+        # Initialize text-to-speech engine, unless the speech server runs it
+        self.tts_engine = None
+        if speech_server is not None:
+            self.tts_voice = speech_server.voice
+            synthesize = speech_server.synthesize_to
+            self.logger.info("Using the speech server for text-to-speech")
+        else:
+            try:
+                self.tts_engine = pyttsx3.init()
+                self._configure_tts()
+                self.logger.info("Text-to-speech engine initialized")
+            except Exception as e:
+                self.logger.error(f"Failed to initialize TTS: {e}")
+                self.tts_engine = None
+            synthesize = self._save_speech
+        
+        if (self.tts_engine or speech_server is not None) and speech_cache is not None:
+            self.speech_cache = SpeechCache(speech_cache, synthesize,
+                                            voice=self.tts_voice, rate=self.tts_rate,
+                                            volume=self.tts_volume)
     
     def _configure_tts(self) -> None:
         """Configure TTS engine for Finnish."""
         if not self.tts_engine:
             return
-        
-        # Set Finnish voice if available
-        voices = self.tts_engine.getProperty('voices')
-        finnish_voice = None
-        
-        for voice in voices:
-            if 'fi' in voice.id.lower() or 'finnish' in voice.name.lower():
-                finnish_voice = voice.id
-                break
-        
-        if finnish_voice:
-            self.tts_engine.setProperty('voice', finnish_voice)
-            self.logger.info(f"Set Finnish voice: {finnish_voice}")
-        else:
-            self.logger.warning("No Finnish voice found, using default")
-        
-        # Configure speech rate and volume
-        self.tts_engine.setProperty('rate', 150)  # Slower for children
-        self.tts_engine.setProperty('volume', 0.8)
+        self.tts_voice = configure_engine(self.tts_engine, self.tts_rate, self.tts_volume)
     
-    def play_audio_file(self, filename: str) -> bool:
+    def play_audio_file(self, filename: str,
+                        priority: str = NORMAL) -> Optional[PlaybackFuture]:
         """
-        Play an audio file from the assets directory.
+        Start playing an audio file from the assets directory.
+        
+        Returns immediately; the sound is queued behind (or interrupts)
+        other sounds according to its priority.
         
         Args:
             filename: Name of the audio file
+            priority: URGENT, NORMAL or LOW
             
         Returns:
-            True if playback was successful
+            Handle that resolves when playback ends, or None if the file
+            could not be played
         """
         audio_path = self.assets_dir / filename
         
         if not audio_path.exists():
             self.logger.warning(f"Audio file not found: {audio_path}")
-            return False
+            return None
+        if self.player is None:
+            self.logger.error("Audio playback not available")
+            return None
         
         try:
-            pygame.mixer.music.load(str(audio_path))
-            pygame.mixer.music.play()
-            
-            # Wait for playback to finish
-            while pygame.mixer.music.get_busy():
-                pygame.time.wait(100)
-            
-            self.logger.debug(f"Played audio file: {filename}")
-            return True
+            playback = self.player.play(filename, priority)
+            if playback is None:
+                # Added after startup
+                playback = self.player.play_file(audio_path, priority)
+            self.logger.debug(f"Queued audio file: {filename}")
+            return playback
             
         except Exception as e:
             self.logger.error(f"Error playing audio file {filename}: {e}")
-            return False
+            return None
     
-    def speak_text(self, text: str) -> bool:
+    def speak_text(self, text: str, priority: str = NORMAL) -> bool:
         """
         Convert text to speech in Finnish.
         
+        Phrases are played from the speech cache when there is one,
+        without waiting. Otherwise the speech server synthesizes the
+        text and it is played (and cached) once ready, so the next phrase
+        is synthesized while this one plays; without a server the text
+        is synthesized into the cache, or spoken live.
+        
         Args:
             text: Finnish text to speak
+            priority: Playback priority
             
         Returns:
-            True if speech was successful
+            True if speech was successful (or queued)
         """
-        if not self.tts_engine:
+        if not self.tts_engine and self.speech_server is None:
             self.logger.error("TTS engine not available")
             return False
         
+        if self.speech_cache is not None and self.player is not None:
+            if self.speech_server is not None:
+                # A miss is synthesized by the server without waiting
+                path = self.speech_cache.get(text)
+            else:
+                path = self.speech_cache.get_or_synthesize(text)
+            if path is not None:
+                try:
+                    self.player.play_file(path, priority)
+                    return True
+                except Exception as e:
+                    self.logger.error(f"Error playing cached speech: {e}")
+        
+        if self.speech_server is not None:
+            return self._speak_with_server(text, priority)
+        
         try:
             self.logger.debug(f"Speaking: {text}")
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            with self._tts_lock:
+                self.tts_engine.say(text)
+                self.tts_engine.runAndWait()
             return True
             
         except Exception as e:
             self.logger.error(f"Error in text-to-speech: {e}")
             return False
     
-    def play_welcome_message(self) -> None:
+    def _speak_with_server(self, text: str, priority: str) -> bool:
+        """Queue text in the speech server; play and cache it when synthesized."""
+        if self.player is None:
+            self.logger.error("Audio playback not available")
+            return False
+        
+        handle, path = tempfile.mkstemp(prefix="speech-", suffix=".wav")
+        os.close(handle)
+        generation = self._speech_generation
+        
+        def play(synthesis):
+            try:
+                if synthesis.cancelled() or synthesis.exception() is not None:
+                    return
+                cached = None
+                if self.speech_cache is not None:
+                    cached = self.speech_cache.put(text, Path(path))
+                if generation != self._speech_generation:
+                    return
+                if cached is not None:
+                    self.player.play_file(cached, priority)
+                else:
+                    self.player.play_sound(pygame.mixer.Sound(path), priority, "speech")
+            except Exception as e:
+                self.logger.error(f"Error playing synthesized speech: {e}")
+            finally:
+                Path(path).unlink(missing_ok=True)
+        
+        try:
+            self.logger.debug(f"Synthesizing: {text}")
+            self.speech_server.synthesize(text, path).add_done_callback(play)
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error queuing speech: {e}")
+            Path(path).unlink(missing_ok=True)
+            return False
+    
+    def barge_in(self) -> None:
+        """Stop all feedback at once, e.g. because the child started talking."""
+        self._speech_generation += 1
+        if self.player is not None:
+            self.player.stop_all()
+        if self.speech_server is not None:
+            self.speech_server.cancel_pending()
+    
+    def _save_speech(self, text: str, path: Path) -> None:
+        """Synthesize text to a WAV file (used by the speech cache)."""
+        with self._tts_lock:
+            self.tts_engine.save_to_file(text, str(path))
+            self.tts_engine.runAndWait()
+    
+    def warm_up_speech(self) -> None:
+        """
+        Synthesize the built-in phrases in the background.
+        
+        Covers the messages without a recording in the assets directory
+        and the announcement clips without one in ``numbers/``, which are
+        then loaded into the number announcer.
+        """
+        if self.speech_cache is None:
+            return
+        texts: List[str] = [text for filename, text, _ in MESSAGES.values()
+                            if not (self.assets_dir / filename).exists()]
+        announcer = self.number_announcer
+        if announcer is None:
+            self.speech_cache.warm_up(texts)
+            return
+        texts += [CLIPS[name] for name in announcer.missing]
+        self.speech_cache.warm_up(texts, then=lambda: announcer.load_speech(self.speech_cache))
+    
+    def play_message(self, name: str) -> Optional[PlaybackFuture]:
+        """
+        Play one of the built-in MESSAGES.
+        
+        Args:
+            name: Message name, e.g. "success"
+            
+        Returns:
+            Handle for the recording's playback, or None if the text was
+            spoken instead
+        """
+        filename, text, priority = MESSAGES[name]
+        playback = self.play_audio_file(filename, priority)
+        if playback is None:
+            self.speak_text(text, priority)
+        return playback
+    
+    def play_welcome_message(self) -> Optional[PlaybackFuture]:
         """Play welcome message."""
-        if not self.play_audio_file("welcome.wav"):
-            self.speak_text("Tervetuloa! Sano mitä haluat tulostaa.")
+        return self.play_message("welcome")
     
-    def play_success_message(self) -> None:
+    def play_success_message(self) -> Optional[PlaybackFuture]:
         """Play success message."""
-        if not self.play_audio_file("success.wav"):
-            self.speak_text("Hienoa! Tulostus onnistui.")
+        return self.play_message("success")
     
-    def play_error_message(self) -> None:
+    def play_error_message(self) -> Optional[PlaybackFuture]:
         """Play error message."""
-        if not self.play_audio_file("error.wav"):
-            self.speak_text("Pahoittelen, tapahtui virhe. Yritä uudelleen.")
+        return self.play_message("error")
     
-    def play_limit_reached_message(self) -> None:
+    def play_limit_reached_message(self) -> Optional[PlaybackFuture]:
         """Play daily limit reached message."""
-        if not self.play_audio_file("limit_reached.wav"):
-            self.speak_text("Olet jo tulostanut tarpeeksi tänään. Yritä huomenna uudelleen.")
+        return self.play_message("limit_reached")
+    
+    def play_rate_limited_message(self) -> Optional[PlaybackFuture]:
+        """Play message asking the child to wait before the next print."""
+        return self.play_message("rate_limited")
     
-    def play_content_warning(self) -> None:
+    def play_content_warning(self) -> Optional[PlaybackFuture]:
         """Play content not appropriate message."""
-        if not self.play_audio_file("content_warning.wav"):
-            self.speak_text("Tuo ei ole sopivaa. Voisimme tulostaa jotain mukavampaa?")
+        return self.play_message("content_warning")
     
-    def play_listening_prompt(self) -> None:
+    def play_duplicate_image_message(self) -> Optional[PlaybackFuture]:
+        """Play message that the picture was already printed today."""
+        return self.play_message("duplicate_image")
+    
+    def play_listening_prompt(self) -> Optional[PlaybackFuture]:
         """Play listening prompt."""
-        if not self.play_audio_file("listening.wav"):
-            self.speak_text("Kuuntelen...")
+        return self.play_message("listening")
     
-    def announce_remaining_prints(self, count: int) -> None:
+    def announce_remaining_prints(self, count: int) -> Optional[PlaybackFuture]:
         """Announce how many prints are remaining today."""
-        if count == 1:
-            message = "Sinulla on vielä yksi tulostus jäljellä tänään."
-        elif count > 1:
-            message = f"Sinulla on vielä {count} tulostusta jäljellä tänään."
-        else:
-            message = "Sinulla ei ole enää tulostuksia jäljellä tänään."
-        
-        self.speak_text(message)
+        if self.number_announcer is not None:
+            samples = self.number_announcer.compose(count)
+            if samples is not None:
+                playback = self._play_samples(samples)
+                if playback is not None:
+                    return playback
+        self.speak_text(remaining_prints_text(count))
+        return None
+    
+    def _play_samples(self, samples: np.ndarray) -> Optional[PlaybackFuture]:
+        """Queue int16 mono samples at the mixer's rate."""
+        if self.player is None:
+            return None
+        try:
+            channels = pygame.mixer.get_init()[2]
+            if channels > 1:
+                samples = np.repeat(samples[:, np.newaxis], channels, axis=1)
+            sound = pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+            return self.player.play_sound(sound, NORMAL, "announcement")
+            
+        except Exception as e:
+            self.logger.error(f"Error playing announcement: {e}")
+            return None
     
     def cleanup(self) -> None:
         """Clean up audio resources."""
         try:
+            if self.player is not None:
+                self.player.close()
             if pygame.mixer.get_init():
                 pygame.mixer.quit()
             if self.tts_engine:
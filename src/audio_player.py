@@ -0,0 +1,237 @@
+"""
+Audio Player Module
+
+Non-blocking playback of preloaded sounds on a mixer channel, with
+priorities so urgent messages interrupt less important ones.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import pygame
+except ImportError:  # Tests drive the player with fake sounds and channels
+    pygame = None
+
+# Priority classes
+URGENT = "urgent"
+NORMAL = "normal"
+LOW = "low"
+
+# Lower plays first; a sound interrupts the one playing if its rank is lower
+PRIORITY_RANKS = {URGENT: 0, NORMAL: 1, LOW: 2}
+
+AUDIO_SUFFIXES = (".wav", ".ogg")
+
+# Longest wait between checks of whether the channel is still playing
+POLL_INTERVAL = 0.02
+
+
+class PlaybackFuture(Future):
+    """
+    Handle for a queued sound.
+
+    Resolves to True if the sound played to the end and False if it was
+    interrupted or failed; cancelled if it never started.
+    """
+
+    def __init__(self, name: str, priority: str = NORMAL):
+        super().__init__()
+        self.name = name
+        self.priority = priority
+        self.interrupted = False
+
+
+class AudioPlayer:
+    """
+    Plays sounds one at a time on a dedicated mixer channel.
+
+    Sounds in ``assets_dir`` are decoded once at startup and kept in
+    memory. ``play`` returns immediately; a background thread starts the
+    next sound when the channel is free, highest priority first. A sound
+    of a higher priority than the one playing stops it at once.
+    """
+
+    def __init__(self, channel: Any = None,
+                 load_sound: Optional[Callable[[str], Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            channel: Mixer channel to play on (default: pygame channel 0,
+                reserved from automatic use)
+            load_sound: Decodes a file into a sound with ``play`` and
+                ``get_length`` (default: pygame.mixer.Sound)
+            clock: Monotonic clock
+        """
+        self.logger = logging.getLogger(__name__)
+        if channel is None:
+            pygame.mixer.set_reserved(1)
+            channel = pygame.mixer.Channel(0)
+        self.channel = channel
+        self.load_sound = load_sound or pygame.mixer.Sound
+        self.clock = clock
+        self.sounds: Dict[str, Any] = {}
+
+        self._heap: List[Tuple[int, int, PlaybackFuture, Any]] = []
+        self._sequence = itertools.count()
+        self._current: Optional[PlaybackFuture] = None
+        self._ends_at = 0.0
+        self._closed = False
+        self._lock = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="audio-player", daemon=True)
+        self._thread.start()
+
+    def preload(self, directory: Union[str, Path]) -> int:
+        """
+        Decode every sound file in a directory into memory.
+
+        Sounds are played by file name, e.g. ``play("success.wav")``.
+
+        Returns:
+            Number of sounds loaded
+        """
+        start = time.monotonic()
+        count = 0
+        for path in sorted(Path(directory).iterdir()):
+            if path.suffix.lower() not in AUDIO_SUFFIXES:
+                continue
+            try:
+                self.sounds[path.name] = self.load_sound(str(path))
+                count += 1
+            except Exception as e:
+                self.logger.error(f"Could not load sound {path}: {e}")
+        self.logger.info(
+            f"Preloaded {count} sounds from {directory} in {time.monotonic() - start:.2f} s"
+        )
+        return count
+
+    def play(self, name: str, priority: str = NORMAL) -> Optional[PlaybackFuture]:
+        """
+        Queue a preloaded sound.
+
+        Args:
+            name: File name of a preloaded sound
+            priority: URGENT, NORMAL or LOW
+
+        Returns:
+            Handle for the playback, or None if the sound is not loaded
+        """
+        sound = self.sounds.get(name)
+        if sound is None:
+            return None
+        return self.play_sound(sound, priority, name)
+
+    def play_file(self, path: Union[str, Path], priority: str = NORMAL) -> PlaybackFuture:
+        """Queue a sound file, decoding it on first use and keeping it."""
+        key = str(path)
+        if key not in self.sounds:
+            self.sounds[key] = self.load_sound(key)
+        return self.play_sound(self.sounds[key], priority, Path(path).name)
+
+    def play_sound(self, sound: Any, priority: str = NORMAL,
+                   name: str = "sound") -> PlaybackFuture:
+        """
+        Queue a sound object.
+
+        Args:
+            sound: Decoded sound (e.g. pygame.mixer.Sound)
+            priority: URGENT, NORMAL or LOW
+            name: Used in logs
+
+        Returns:
+            Handle for the playback
+        """
+        if priority not in PRIORITY_RANKS:
+            raise ValueError(f"Unknown playback priority: {priority}")
+        playback = PlaybackFuture(name, priority)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Audio player is closed")
+            rank = PRIORITY_RANKS[priority]
+            heapq.heappush(self._heap, (rank, next(self._sequence), playback, sound))
+            current = self._current
+            if current is not None and rank < PRIORITY_RANKS[current.priority]:
+                self.logger.debug(f"{name} interrupts {current.name}")
+                current.interrupted = True
+                self.channel.stop()
+            self._lock.notify()
+        return playback
+
+    async def play_async(self, name: str, priority: str = NORMAL) -> bool:
+        """
+        Play a preloaded sound and wait for it without blocking the loop.
+
+        Returns:
+            True if it played to the end
+        """
+        playback = self.play(name, priority)
+        if playback is None:
+            return False
+        return await asyncio.wrap_future(playback)
+
+    @property
+    def busy(self) -> bool:
+        """Whether a sound is playing or queued."""
+        with self._lock:
+            return self._current is not None or bool(self._heap)
+
+    def stop_all(self) -> None:
+        """Stop the current sound and drop everything queued."""
+        with self._lock:
+            dropped = [playback for _, _, playback, _ in self._heap]
+            self._heap.clear()
+            if self._current is not None:
+                self._current.interrupted = True
+                self.channel.stop()
+            self._lock.notify()
+        for playback in dropped:
+            playback.cancel()
+
+    def _run(self) -> None:
+        """Start queued sounds and resolve them when the channel is done."""
+        while True:
+            finished: Optional[PlaybackFuture] = None
+            with self._lock:
+                if self._current is not None:
+                    if self._current.interrupted or not self.channel.get_busy():
+                        finished, self._current = self._current, None
+                    else:
+                        # Sleep until the sound should end, then check often
+                        remaining = self._ends_at - self.clock()
+                        self._lock.wait(max(POLL_INTERVAL, remaining))
+                        continue
+                elif self._heap:
+                    _, _, playback, sound = heapq.heappop(self._heap)
+                    if playback.set_running_or_notify_cancel():
+                        try:
+                            self.channel.play(sound)
+                            self._current = playback
+                            self._ends_at = self.clock() + sound.get_length()
+                        except Exception as e:
+                            self.logger.error(f"Error playing {playback.name}: {e}")
+                            finished = playback
+                            playback.interrupted = True
+                elif self._closed:
+                    return
+                else:
+                    self._lock.wait()
+                    continue
+
+            if finished is not None:
+                # Outside the lock: callbacks may queue the next sound
+                finished.set_result(not finished.interrupted)
+
+    def close(self) -> None:
+        """Stop playback and the player thread."""
+        self.stop_all()
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        self._thread.join(timeout=5)
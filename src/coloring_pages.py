@@ -0,0 +1,321 @@
+"""
+Coloring Pages Module
+
+Generates printable line-art coloring pages locally, in worker processes.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from image_catalog import match_score, tokenize
+from page_renderer import PAGE_SIZES, build_pdf, text_operators
+
+# Outline width in points; thick lines are easy to color inside
+LINE_WIDTH = 4
+
+TITLE_FONT_SIZE = 28
+
+# Lower priority of the worker processes so the voice loop stays responsive
+WORKER_NICENESS = 10
+
+Point = Tuple[float, float]
+
+
+def _circle(cx: float, cy: float, r: float) -> str:
+    """Circle outline as four Bezier curves."""
+    k = 0.5523 * r
+    return (f"{cx + r:.1f} {cy:.1f} m "
+            f"{cx + r:.1f} {cy + k:.1f} {cx + k:.1f} {cy + r:.1f} {cx:.1f} {cy + r:.1f} c "
+            f"{cx - k:.1f} {cy + r:.1f} {cx - r:.1f} {cy + k:.1f} {cx - r:.1f} {cy:.1f} c "
+            f"{cx - r:.1f} {cy - k:.1f} {cx - k:.1f} {cy - r:.1f} {cx:.1f} {cy - r:.1f} c "
+            f"{cx + k:.1f} {cy - r:.1f} {cx + r:.1f} {cy - k:.1f} {cx + r:.1f} {cy:.1f} c S")
+
+
+def _ellipse(cx: float, cy: float, rx: float, ry: float, angle: float = 0.0) -> str:
+    """Rotated ellipse outline as a closed polyline."""
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    points = []
+    for step in range(48):
+        t = 2 * math.pi * step / 48
+        x, y = rx * math.cos(t), ry * math.sin(t)
+        points.append((cx + x * cos_a - y * sin_a, cy + x * sin_a + y * cos_a))
+    return _polygon(points)
+
+
+def _polygon(points: List[Point]) -> str:
+    """Closed outline through the points."""
+    first, rest = points[0], points[1:]
+    return (f"{first[0]:.1f} {first[1]:.1f} m "
+            + " ".join(f"{x:.1f} {y:.1f} l" for x, y in rest) + " h S")
+
+
+def _line(start: Point, end: Point) -> str:
+    return f"{start[0]:.1f} {start[1]:.1f} m {end[0]:.1f} {end[1]:.1f} l S"
+
+
+def _flower(rng: random.Random, cx: float, cy: float, size: float) -> List[str]:
+    petals = rng.randint(5, 9)
+    center = size * rng.uniform(0.18, 0.25)
+    ops = [_line((cx, cy - center), (cx, cy - size * 2.2))]
+    for leaf_side in (-1, 1):
+        ops.append(_ellipse(cx + leaf_side * size * 0.35, cy - size * 1.5,
+                            size * 0.35, size * 0.12, leaf_side * 0.5))
+    for petal in range(petals):
+        angle = 2 * math.pi * petal / petals
+        distance = center + size * 0.35
+        ops.append(_ellipse(cx + distance * math.cos(angle), cy + distance * math.sin(angle),
+                            size * 0.35, size * 0.16, angle))
+    ops.append(_circle(cx, cy, center))
+    return ops
+
+
+def _house(rng: random.Random, cx: float, cy: float, size: float) -> List[str]:
+    width, height = size * 1.6, size * rng.uniform(1.0, 1.4)
+    left, bottom = cx - width / 2, cy - height / 2
+    ops = [f"{left:.1f} {bottom:.1f} {width:.1f} {height:.1f} re S",
+           _polygon([(left - 10, bottom + height), (cx, bottom + height + size * 0.8),
+                     (left + width + 10, bottom + height)])]
+    door_width = width * 0.22
+    ops.append(f"{cx - door_width / 2:.1f} {bottom:.1f} {door_width:.1f} "
+               f"{height * 0.45:.1f} re S")
+    for window in range(rng.randint(1, 2)):
+        side = -1 if window == 0 else 1
+        wx = cx + side * width * 0.3 - width * 0.1
+        ops.append(f"{wx:.1f} {bottom + height * 0.55:.1f} {width * 0.2:.1f} "
+                   f"{width * 0.2:.1f} re S")
+    return ops
+
+
+def _fish(rng: random.Random, cx: float, cy: float, size: float) -> List[str]:
+    length, height = size * 1.4, size * rng.uniform(0.6, 0.9)
+    ops = [_ellipse(cx, cy, length / 2, height / 2),
+           _polygon([(cx + length / 2 - 5, cy), (cx + length / 2 + size * 0.5, cy + height / 2),
+                     (cx + length / 2 + size * 0.5, cy - height / 2)]),
+           _circle(cx - length * 0.3, cy + height * 0.1, size * 0.07)]
+    for stripe in range(rng.randint(2, 4)):
+        x = cx - length * 0.1 + stripe * length * 0.15
+        ops.append(_line((x, cy + height * 0.4), (x, cy - height * 0.4)))
+    for bubble in range(rng.randint(2, 4)):
+        ops.append(_circle(cx - length * 0.6 - bubble * 10,
+                           cy + height * 0.5 + bubble * size * 0.3, 6 + bubble * 4))
+    return ops
+
+
+def _sun(rng: random.Random, cx: float, cy: float, size: float) -> List[str]:
+    radius = size * 0.7
+    rays = rng.randint(8, 14)
+    ops = [_circle(cx, cy, radius)]
+    for ray in range(rays):
+        angle = 2 * math.pi * ray / rays
+        inner, outer = radius + 12, radius + size * rng.uniform(0.4, 0.7)
+        half = math.pi / rays * 0.5
+        ops.append(_polygon([(cx + inner * math.cos(angle - half), cy + inner * math.sin(angle - half)),
+                             (cx + outer * math.cos(angle), cy + outer * math.sin(angle)),
+                             (cx + inner * math.cos(angle + half), cy + inner * math.sin(angle + half))]))
+    ops.append(_circle(cx - radius * 0.35, cy + radius * 0.25, radius * 0.1))
+    ops.append(_circle(cx + radius * 0.35, cy + radius * 0.25, radius * 0.1))
+    ops.append(f"{cx - radius * 0.4:.1f} {cy - radius * 0.2:.1f} m "
+               f"{cx - radius * 0.15:.1f} {cy - radius * 0.5:.1f} "
+               f"{cx + radius * 0.15:.1f} {cy - radius * 0.5:.1f} "
+               f"{cx + radius * 0.4:.1f} {cy - radius * 0.2:.1f} c S")
+    return ops
+
+
+def _butterfly(rng: random.Random, cx: float, cy: float, size: float) -> List[str]:
+    ops = []
+    for side in (-1, 1):
+        ops.append(_ellipse(cx + side * size * 0.5, cy + size * 0.35, size * 0.55,
+                            size * 0.4, side * rng.uniform(0.2, 0.5)))
+        ops.append(_ellipse(cx + side * size * 0.4, cy - size * 0.35, size * 0.4,
+                            size * 0.3, -side * rng.uniform(0.2, 0.5)))
+        for spot in range(rng.randint(1, 3)):
+            ops.append(_circle(cx + side * size * (0.4 + 0.15 * spot),
+                               cy + size * (0.4 - 0.2 * spot), size * 0.08))
+        ops.append(_line((cx, cy + size * 0.55), (cx + side * size * 0.25, cy + size * 0.95)))
+    ops.append(_ellipse(cx, cy, size * 0.1, size * 0.6))
+    return ops
+
+
+def _mandala(rng: random.Random, cx: float, cy: float, size: float) -> List[str]:
+    ops = []
+    rings = rng.randint(3, 5)
+    for ring in range(1, rings + 1):
+        radius = size * 1.3 * ring / rings
+        ops.append(_circle(cx, cy, radius))
+        petals = 6 + 2 * ring
+        for petal in range(petals):
+            angle = 2 * math.pi * (petal + 0.5 * (ring % 2)) / petals
+            ops.append(_ellipse(cx + radius * 0.85 * math.cos(angle),
+                                cy + radius * 0.85 * math.sin(angle),
+                                size * 0.5 / rings, size * 0.22 / rings, angle))
+    return ops
+
+
+# Finnish name -> drawing function(rng, center x, center y, size)
+TEMPLATES: Dict[str, Callable[[random.Random, float, float, float], List[str]]] = {
+    "kukka": _flower,
+    "talo": _house,
+    "kala": _fish,
+    "aurinko": _sun,
+    "perhonen": _butterfly,
+    "mandala": _mandala,
+}
+
+
+def generate_page(template: str, seed: int, page_size: str = "A4") -> bytes:
+    """
+    Draw one coloring page.
+
+    Runs in a worker process; equal arguments give equal pages.
+
+    Args:
+        template: Name from TEMPLATES
+        seed: Random seed for the layout
+        page_size: Key of PAGE_SIZES
+
+    Returns:
+        PDF file content
+    """
+    rng = random.Random(seed)
+    width, height = PAGE_SIZES[page_size]
+    draw = TEMPLATES[template]
+
+    ops = [f"{LINE_WIDTH} w 1 J 1 j".encode("ascii")]
+    # One large motif and a few small ones around it
+    for op in draw(rng, width / 2, height * 0.5, width * 0.25):
+        ops.append(op.encode("ascii"))
+    for _ in range(rng.randint(1, 3)):
+        x = rng.uniform(width * 0.2, width * 0.8)
+        y = rng.choice([height * 0.15, height * 0.82])
+        for op in draw(rng, x, y, width * rng.uniform(0.06, 0.09)):
+            ops.append(op.encode("ascii"))
+
+    margin = 56
+    ops.append(f"{margin} {margin} {width - 2 * margin} {height - 2 * margin} re S"
+               .encode("ascii"))
+    ops.append(text_operators([f"Värityskuva: {template}"], margin + 10,
+                              height - margin + 12, TITLE_FONT_SIZE))
+    return build_pdf(b"\n".join(ops), (width, height))
+
+
+def _lower_priority() -> None:
+    """Worker process initializer."""
+    try:
+        os.nice(WORKER_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class ColoringPageGenerator:
+    """
+    Serves coloring pages from a pool of pages generated ahead of time.
+
+    Pages are drawn by a process pool, so all CPU cores are used and the
+    main process only hands out finished PDFs. After ``start`` the pool
+    keeps ``warm_per_template`` pages of every template ready; a request
+    takes one instantly and a replacement is generated in the background.
+    """
+
+    def __init__(self, warm_per_template: int = 1, workers: Optional[int] = None,
+                 page_size: str = "A4", seed: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        if page_size not in PAGE_SIZES:
+            raise ValueError(f"Unknown page size: {page_size}")
+        self.warm_per_template = warm_per_template
+        self.workers = workers or os.cpu_count() or 4
+        self.page_size = page_size
+        self._rng = random.Random(seed)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pool: Dict[str, Deque[Future]] = {name: deque() for name in TEMPLATES}
+        self._lock = threading.Lock()
+        self.served_warm = 0
+        self.served_cold = 0
+
+    def start(self) -> None:
+        """Start the worker processes and fill the warm pool."""
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: other threads (catalog watcher, job
+                # monitor, ...) may hold locks a forked child would inherit
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_lower_priority,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            for name in TEMPLATES:
+                self._refill(name)
+        self.logger.info(
+            f"Coloring page generator started ({self.workers} workers, "
+            f"{self.warm_per_template * len(TEMPLATES)} warm pages)"
+        )
+
+    def _submit(self, template: str) -> Future:
+        return self._executor.submit(generate_page, template,
+                                     self._rng.getrandbits(32), self.page_size)
+
+    def _refill(self, template: str) -> None:
+        pool = self._pool[template]
+        while len(pool) < self.warm_per_template:
+            pool.append(self._submit(template))
+
+    def match_template(self, text: str) -> Optional[str]:
+        """Template named in a request ("värityskuva kalasta" -> "kala")."""
+        best, best_score = None, 0
+        for token in tokenize(text):
+            for name in TEMPLATES:
+                score = match_score(token, name)
+                if score > best_score:
+                    best, best_score = name, score
+        return best
+
+    def get_page(self, text: str = "", timeout: Optional[float] = 30.0) -> bytes:
+        """
+        Get a coloring page for a request.
+
+        Args:
+            text: Request; a named template is honored, otherwise any
+                ready template is used
+            timeout: Longest wait for a page that is still being drawn
+
+        Returns:
+            PDF file content
+        """
+        template = self.match_template(text)
+
+        with self._lock:
+            if self._executor is None:
+                raise RuntimeError("Coloring page generator is not started")
+
+            if template is None:
+                ready = [name for name, pool in self._pool.items() if pool and pool[0].done()]
+                template = self._rng.choice(ready or list(TEMPLATES))
+
+            pool = self._pool[template]
+            future = pool.popleft() if pool else self._submit(template)
+            warm = future.done()
+            self._refill(template)
+
+        if warm:
+            self.served_warm += 1
+        else:
+            self.served_cold += 1
+            self.logger.debug(f"No warm {template} page ready, waiting for one")
+        return future.result(timeout=timeout)
+
+    def close(self) -> None:
+        """Stop the worker processes; pages not started are dropped."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            for pool in self._pool.values():
+                for future in pool:
+                    future.cancel()
+                pool.clear()
+        if executor is not None:
+            executor.shutdown(wait=True)
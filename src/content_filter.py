@@ -5,8 +5,27 @@ Ensures all content is appropriate for children.
 """
 
 import logging
-import re
-from typing import List, Set
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from config import settings
+from keyword_matcher import KeywordMatcher
+
+BLOCKED = "blocked"
+SAFE = "safe"
+EDUCATIONAL = "educational"
+
+# Longest allowed run of one repeated character ("aaaaaa" is spam)
+MAX_REPEATED_CHARS = 5
+
+
+class FilterResult(NamedTuple):
+    """Combined moderation verdict for one text."""
+    
+    text: str
+    is_safe: bool
+    blocked_term: Optional[str]
+    is_educational: bool
+    reason: Optional[str]  # "empty", "blocked", "too_long" or "repeated"
 
 
 class ContentFilter:
@@ -28,41 +47,108 @@ class ContentFilter:
             "eläin", "kala", "perhonen", "sieni", "puu", "lehti"
         }
         
+        # Keywords that mark content as educational
+        self.educational_keywords: Set[str] = {
+            "oppi", "laske", "kirjain", "numero", "väri", "muoto",
+            "historia", "tiede", "luonto", "matematiikka", "lukeminen"
+        }
+        
+        # All word lists compiled into one automaton, scanned in one pass
+        self.matcher = KeywordMatcher()
+        self.matcher.add_many(self.blocked_words, BLOCKED)
+        self.matcher.add_many(self.safe_words, SAFE)
+        self.matcher.add_many(self.educational_keywords, EDUCATIONAL)
+        
         self.logger.info("Content filter initialized")
     
-    def is_safe(self, text: str) -> bool:
+    def classify(self, text: str) -> FilterResult:
         """
-        Check if text content is safe for children.
+        Run every content check on a text with a single scan.
         
         Args:
             text: Text to check
             
         Returns:
-            True if content is safe for children
+            Safety verdict, offending blocked term and educational flag
         """
         if not text:
-            return False
+            return FilterResult(text, False, None, False, "empty")
         
-        text_lower = text.lower()
+        matches, longest_run = self.matcher.scan(text, fold_case=True)
+        educational = any(match.kind == EDUCATIONAL for match in matches)
         
         # Check for blocked words
-        for word in self.blocked_words:
-            if word in text_lower:
-                self.logger.warning(f"Blocked inappropriate content: {word}")
-                return False
+        blocked = next((match for match in matches if match.kind == BLOCKED), None)
+        if blocked:
+            return FilterResult(text, False, blocked.keyword, educational, "blocked")
         
         # Check for excessive length (prevent spam)
-        if len(text) > 200:
-            self.logger.warning("Content too long, potentially spam")
-            return False
+        if len(text) > settings.MAX_CONTENT_LENGTH:
+            return FilterResult(text, False, None, educational, "too_long")
         
         # Check for repeated characters (prevent spam patterns)
-        if re.search(r'(.)\1{5,}', text):
+        if longest_run > MAX_REPEATED_CHARS:
+            return FilterResult(text, False, None, educational, "repeated")
+        
+        return FilterResult(text, True, None, educational, None)
+    
+    def is_safe(self, text: str) -> bool:
+        """
+        Check if text content is safe for children.
+        
+        Args:
+            text: Text to check
+            
+        Returns:
+            True if content is safe for children
+        """
+        result = self.classify(text)
+        
+        if result.reason == "blocked":
+            self.logger.warning(f"Blocked inappropriate content: {result.blocked_term}")
+        elif result.reason == "too_long":
+            self.logger.warning("Content too long, potentially spam")
+        elif result.reason == "repeated":
             self.logger.warning("Detected repeated character pattern")
-            return False
+        elif result.is_safe:
+            self.logger.debug(f"Content approved: {text[:50]}...")
+        
+        return result.is_safe
+    
+    def filter_stream(self, texts: Iterable[str]) -> Iterator[FilterResult]:
+        """
+        Classify texts lazily, one at a time.
+        
+        Only the current text is held in memory, so arbitrarily large
+        transcripts or story corpora can be moderated line by line.
+        
+        Args:
+            texts: Any iterable of texts, e.g. an open file
+            
+        Yields:
+            One FilterResult per input text, in order
+        """
+        total = blocked = 0
+        for text in texts:
+            result = self.classify(text)
+            total += 1
+            if not result.is_safe:
+                blocked += 1
+            yield result
         
-        self.logger.debug(f"Content approved: {text[:50]}...")
-        return True
+        self.logger.debug(f"Filtered {total} texts, {blocked} rejected")
+    
+    def is_safe_many(self, texts: Iterable[str]) -> List[FilterResult]:
+        """
+        Classify a batch of texts.
+        
+        Args:
+            texts: Texts to check
+            
+        Returns:
+            One FilterResult per input text, in order
+        """
+        return list(self.filter_stream(texts))
     
     def suggest_alternatives(self, blocked_text: str) -> List[str]:
         """
@@ -86,19 +172,19 @@ class ContentFilter:
     def add_safe_word(self, word: str) -> None:
         """Add a word to the safe words list."""
         self.safe_words.add(word.lower())
+        self.matcher.add(word.lower(), SAFE)
         self.logger.info(f"Added safe word: {word}")
     
     def add_blocked_word(self, word: str) -> None:
         """Add a word to the blocked words list."""
         self.blocked_words.add(word.lower())
+        self.matcher.add(word.lower(), BLOCKED)
         self.logger.info(f"Added blocked word: {word}")
     
     def is_educational_content(self, text: str) -> bool:
         """Check if content has educational value."""
-        educational_keywords = {
-            "oppi", "laske", "kirjain", "numero", "väri", "muoto",
-            "historia", "tiede", "luonto", "matematiikka", "lukeminen"
-        }
+        if not text:
+            return False
         
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in educational_keywords)
+        matches, _ = self.matcher.scan(text, fold_case=True)
+        return any(match.kind == EDUCATIONAL for match in matches)
@@ -0,0 +1,226 @@
+"""
+CUPS Connection Module
+
+Long-lived CUPS connection with automatic reconnect and cached printer data.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import cups
+
+# IPP "successful-ok*" status codes are all below this value
+IPP_ERROR_THRESHOLD = 0x0100
+
+
+class CupsConnection:
+    """
+    Managed connection to the CUPS server.
+
+    The underlying ``cups.Connection`` is opened once and reused; calls
+    from several threads are serialized on it. When a call fails at the
+    transport level the connection is dropped and reopened on the next
+    call, with exponential backoff between attempts. The printer list and
+    the default printer are cached for ``cache_ttl`` seconds and
+    invalidated whenever a call fails, so a normal job submission costs a
+    single IPP request.
+    """
+
+    def __init__(self, cache_ttl: float = 30.0, min_backoff: float = 1.0,
+                 max_backoff: float = 60.0,
+                 connect: Optional[Callable[[], Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.cache_ttl = cache_ttl
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self._connect = connect or cups.Connection
+        self.clock = clock
+
+        self._conn = None
+        self._backoff = min_backoff
+        self._retry_at = 0.0
+        self._lock = threading.RLock()
+
+        self._printers: Optional[Dict[str, Dict[str, Any]]] = None
+        self._default: Optional[str] = None
+        self._cache_expires = 0.0
+        self._known_names: List[str] = []
+
+    @property
+    def is_connected(self) -> bool:
+        """True if a connection is currently open."""
+        return self._conn is not None
+
+    def connect(self) -> bool:
+        """
+        Open the connection unless it is open or still backing off.
+
+        Returns:
+            True if a connection is available
+        """
+        with self._lock:
+            if self._conn is not None:
+                return True
+
+            now = self.clock()
+            if now < self._retry_at:
+                return False
+
+            try:
+                self._conn = self._connect()
+                self._backoff = self.min_backoff
+                self.logger.info("Connected to CUPS printing system")
+                return True
+            except Exception as e:
+                self._retry_at = now + self._backoff
+                self.logger.error(
+                    f"Failed to connect to printer system: {e} "
+                    f"(retrying in {self._backoff:g} s)"
+                )
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+                return False
+
+    def _drop(self) -> None:
+        """Forget the connection and cached printer data after a failure."""
+        self._conn = None
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Discard the cached printer list and default printer."""
+        with self._lock:
+            self._printers = None
+            self._default = None
+            self._cache_expires = 0.0
+
+    def call(self, method: str, *args, idempotent: bool = True, **kwargs) -> Any:
+        """
+        Call a ``cups.Connection`` method.
+
+        Transport errors drop the connection. Idempotent calls are retried
+        once on a fresh connection; submissions (``idempotent=False``) are
+        not, because the server may already have accepted the job.
+
+        Args:
+            method: Name of the cups.Connection method
+            idempotent: Whether the call is safe to repeat
+
+        Returns:
+            Whatever the method returns
+
+        Raises:
+            ConnectionError: No connection could be opened
+            cups.IPPError: The server rejected the request
+        """
+        attempts = 2 if idempotent else 1
+        for attempt in range(attempts):
+            # A cups.Connection is not thread-safe; calls are serialized
+            with self._lock:
+                if not self.connect():
+                    raise ConnectionError("No connection to CUPS")
+
+                try:
+                    return getattr(self._conn, method)(*args, **kwargs)
+                except cups.IPPError:
+                    # The server answered; the printer data may be stale
+                    self.invalidate()
+                    raise
+                except Exception as e:
+                    self.logger.warning(f"CUPS connection lost during {method}: {e}")
+                    self._drop()
+                    if attempt + 1 >= attempts:
+                        raise
+
+    def _refresh(self) -> None:
+        """Reload the printer list and default printer if the cache expired."""
+        if self._printers is not None and self.clock() < self._cache_expires:
+            return
+
+        printers = self.call("getPrinters")
+        try:
+            default = self.call("getDefault")
+        except cups.IPPError:
+            default = None
+
+        with self._lock:
+            if list(printers) != self._known_names:
+                self._known_names = list(printers)
+                self.logger.info(f"Available printers: {self._known_names}")
+            self._printers = printers
+            self._default = default
+            self._cache_expires = self.clock() + self.cache_ttl
+
+    def get_printers(self) -> Dict[str, Dict[str, Any]]:
+        """Get printer attributes by name (cached)."""
+        with self._lock:
+            self._refresh()
+            return dict(self._printers)
+
+    def get_printer_names(self) -> List[str]:
+        """Get printer names (cached)."""
+        return list(self.get_printers())
+
+    def get_default_printer(self) -> Optional[str]:
+        """
+        Get the printer jobs go to when none is named (cached).
+
+        Returns:
+            The CUPS default printer, else the first printer, else None
+        """
+        with self._lock:
+            self._refresh()
+            if self._default in self._printers:
+                return self._default
+            return next(iter(self._printers), None)
+
+    def submit_stream(self, printer: str, title: str, chunks: Iterable[bytes],
+                      doc_format: str = "application/octet-stream",
+                      options: Optional[Dict[str, str]] = None) -> int:
+        """
+        Submit a job by streaming its document bytes.
+
+        The connection stays locked from createJob to finishDocument, so
+        concurrent submissions cannot interleave their request data. If
+        anything fails after the job was created, the job is cancelled.
+
+        Args:
+            printer: Destination printer
+            title: Job title
+            chunks: Document data, consumed lazily
+            doc_format: MIME type of the document
+            options: IPP job options
+
+        Returns:
+            The CUPS job id
+
+        Raises:
+            IOError: The server refused the document data
+        """
+        with self._lock:
+            job_id = self.call("createJob", printer, title, options or {},
+                               idempotent=False)
+            try:
+                status = self.call("startDocument", printer, job_id, title,
+                                   doc_format, 1, idempotent=False)
+                if status != cups.HTTP_CONTINUE:
+                    raise IOError(f"startDocument failed with HTTP status {status}")
+
+                for chunk in chunks:
+                    status = self.call("writeRequestData", chunk, len(chunk),
+                                       idempotent=False)
+                    if status != cups.HTTP_CONTINUE:
+                        raise IOError(f"writeRequestData failed with HTTP status {status}")
+
+                status = self.call("finishDocument", printer, idempotent=False)
+                if status >= IPP_ERROR_THRESHOLD:
+                    raise IOError(f"finishDocument failed with IPP status {status:#06x}")
+            except Exception:
+                try:
+                    self.call("cancelJob", job_id)
+                except Exception as e:
+                    self.logger.warning(f"Could not cancel job {job_id}: {e}")
+                raise
+
+            return job_id
@@ -5,47 +5,40 @@ Manages daily printing limits to prevent excessive usage.
 """
 
 import logging
-import json
-from datetime import datetime, date
+from datetime import date
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from usage_storage import DEFAULT_CHILD, DEFAULT_DEVICE, UsageStorage, create_storage
 
 
 class DailyLimitManager:
-    """Manages daily printing limits for children."""
+    """
+    Manages daily printing limits for children.
+    
+    Prints are counted per child and device. Each child has a daily limit
+    (``max_daily_prints`` unless overridden per child) that applies to the
+    child's prints on all devices together. Calls without a child use a
+    shared default profile, which behaves like the original global counter.
+    """
     
-    def __init__(self, max_daily_prints: int = 10, config_dir: str = "config"):
+    def __init__(self, max_daily_prints: int = 10, config_dir: str = "config",
+                 backend: str = "json", storage: Optional[UsageStorage] = None,
+                 child_limits: Optional[Dict[str, int]] = None):
         self.logger = logging.getLogger(__name__)
         self.max_daily_prints = max_daily_prints
+        self.child_limits: Dict[str, int] = dict(child_limits or {})
         self.config_dir = Path(config_dir)
         self.config_dir.mkdir(exist_ok=True)
         self.usage_file = self.config_dir / "daily_usage.json"
         
-        self.usage_data = self._load_usage_data()
+        self.storage = storage or create_storage(backend, self.config_dir)
         self.logger.info(f"Daily limit manager initialized (max: {max_daily_prints} prints/day)")
     
-    def _load_usage_data(self) -> Dict[str, Any]:
-        """Load usage data from file."""
-        if self.usage_file.exists():
-            try:
-                with open(self.usage_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                self.logger.debug("Loaded existing usage data")
-                return data
-            except Exception as e:
-                self.logger.error(f"Error loading usage data: {e}")
-        
-        # Return empty data structure
-        return {"daily_counts": {}, "last_reset": str(date.today())}
-    
-    def _save_usage_data(self) -> None:
-        """Save usage data to file."""
-        try:
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(self.usage_data, f, ensure_ascii=False, indent=2)
-            self.logger.debug("Saved usage data")
-        except Exception as e:
-            self.logger.error(f"Error saving usage data: {e}")
+    @property
+    def usage_data(self) -> Dict[str, Any]:
+        """Usage data held by the storage backend."""
+        return self.storage.usage_data
     
     def _get_today_key(self) -> str:
         """Get today's date as a string key."""
@@ -54,50 +47,84 @@ class DailyLimitManager:
     def _reset_if_new_day(self) -> None:
         """Reset counters if it's a new day."""
         today = self._get_today_key()
-        last_reset = self.usage_data.get("last_reset", "")
+        last_reset = self.storage.last_reset
         
         if today != last_reset:
             self.logger.info(f"New day detected, resetting counters (was: {last_reset}, now: {today})")
-            self.usage_data["daily_counts"] = {}
-            self.usage_data["last_reset"] = today
-            self._save_usage_data()
+            self.storage.reset(today)
     
-    def get_today_count(self) -> int:
-        """Get today's print count."""
+    def get_limit(self, child: str = DEFAULT_CHILD) -> int:
+        """Get the daily print limit of a child."""
+        return self.child_limits.get(child, self.max_daily_prints)
+    
+    def get_today_count(self, child: str = DEFAULT_CHILD,
+                        device: Optional[str] = None) -> int:
+        """Get today's print count of a child (on one device, or all)."""
         self._reset_if_new_day()
-        today = self._get_today_key()
-        return self.usage_data["daily_counts"].get(today, 0)
+        return self.storage.get_count(self._get_today_key(), child, device)
     
-    def can_print(self) -> bool:
+    def can_print(self, child: str = DEFAULT_CHILD) -> bool:
         """
         Check if printing is allowed based on daily limits.
         
+        Args:
+            child: Child profile to check
+        
         Returns:
             True if printing is allowed
         """
-        current_count = self.get_today_count()
-        can_print = current_count < self.max_daily_prints
+        current_count = self.get_today_count(child)
+        limit = self.get_limit(child)
+        can_print = current_count < limit
         
-        self.logger.debug(f"Print check: {current_count}/{self.max_daily_prints} - {'ALLOWED' if can_print else 'BLOCKED'}")
+        self.logger.debug(f"Print check ({child}): {current_count}/{limit} - {'ALLOWED' if can_print else 'BLOCKED'}")
         return can_print
     
-    def record_print(self) -> None:
+    def record_print(self, child: str = DEFAULT_CHILD,
+                     device: str = DEFAULT_DEVICE) -> None:
         """Record a print operation."""
         self._reset_if_new_day()
-        today = self._get_today_key()
+        new_count = self.storage.increment(self._get_today_key(), child, device)
+        self.logger.info(f"Print recorded ({child}@{device}). Today's count: {new_count}/{self.get_limit(child)}")
+    
+    def try_record_print(self, child: str = DEFAULT_CHILD,
+                         device: str = DEFAULT_DEVICE) -> bool:
+        """
+        Atomically check the daily limit and record a print.
         
-        current_count = self.usage_data["daily_counts"].get(today, 0)
-        self.usage_data["daily_counts"][today] = current_count + 1
+        Combines can_print() and record_print() into one step so that
+        several threads or processes sharing the storage cannot together
+        exceed the limit.
         
-        self._save_usage_data()
+        Args:
+            child: Child profile the print is charged to
+            device: Device the print came from
         
-        new_count = self.usage_data["daily_counts"][today]
-        self.logger.info(f"Print recorded. Today's count: {new_count}/{self.max_daily_prints}")
+        Returns:
+            True if the print was recorded, False if the limit is reached
+        """
+        self._reset_if_new_day()
+        limit = self.get_limit(child)
+        new_count = self.storage.try_increment(self._get_today_key(), limit, child, device)
+        
+        if new_count is None:
+            self.logger.debug(f"Print check ({child}): {limit}/{limit} - BLOCKED")
+            return False
+        
+        self.logger.info(f"Print recorded ({child}@{device}). Today's count: {new_count}/{limit}")
+        return True
     
-    def get_remaining_prints(self) -> int:
+    def refund_print(self, child: str = DEFAULT_CHILD,
+                     device: str = DEFAULT_DEVICE) -> None:
+        """Give back a print recorded with try_record_print() that failed."""
+        self._reset_if_new_day()
+        new_count = self.storage.decrement(self._get_today_key(), child, device)
+        self.logger.info(f"Print refunded ({child}@{device}). Today's count: {new_count}/{self.get_limit(child)}")
+    
+    def get_remaining_prints(self, child: str = DEFAULT_CHILD) -> int:
         """Get number of remaining prints for today."""
-        current_count = self.get_today_count()
-        remaining = max(0, self.max_daily_prints - current_count)
+        current_count = self.get_today_count(child)
+        remaining = max(0, self.get_limit(child) - current_count)
         return remaining
     
     def set_daily_limit(self, new_limit: int) -> None:
@@ -110,13 +137,63 @@ class DailyLimitManager:
         self.max_daily_prints = new_limit
         self.logger.info(f"Daily limit updated: {old_limit} -> {new_limit}")
     
-    def get_usage_stats(self) -> Dict[str, Any]:
-        """Get usage statistics."""
+    def set_child_limit(self, child: str, new_limit: Optional[int]) -> None:
+        """Override the daily limit of one child (None restores the default)."""
+        if new_limit is None:
+            self.child_limits.pop(child, None)
+            self.logger.info(f"Daily limit override removed for {child}")
+            return
+        
+        if new_limit <= 0:
+            self.logger.warning("Daily limit must be positive")
+            return
+        
+        self.child_limits[child] = new_limit
+        self.logger.info(f"Daily limit for {child} set to {new_limit}")
+    
+    def _child_stats(self, child: str, devices: Dict[str, int],
+                     storage_stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the statistics of one child from its per-device counts."""
+        count = sum(devices.values())
+        limit = self.get_limit(child)
+        return dict({
+            "today_count": count,
+            "daily_limit": limit,
+            "remaining": max(0, limit - count),
+            "can_print": count < limit,
+            "devices": devices
+        }, **storage_stats)
+    
+    def _storage_stats(self) -> Dict[str, Any]:
+        """Statistics shared by all children."""
         return {
-            "today_count": self.get_today_count(),
-            "daily_limit": self.max_daily_prints,
-            "remaining": self.get_remaining_prints(),
-            "can_print": self.can_print(),
-            "last_reset": self.usage_data.get("last_reset", ""),
-            "total_days": len(self.usage_data.get("daily_counts", {}))
+            "last_reset": self.storage.last_reset,
+            "total_days": self.storage.total_days()
         }
+    
+    def get_usage_stats(self, child: str = DEFAULT_CHILD) -> Dict[str, Any]:
+        """Get usage statistics."""
+        self._reset_if_new_day()
+        devices = self.storage.get_device_counts(self._get_today_key(), child)
+        return self._child_stats(child, devices, self._storage_stats())
+    
+    def get_all_usage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get usage statistics of every child in one call.
+        
+        Children with a limit override are included even if they have not
+        printed today.
+        
+        Returns:
+            Mapping of child to the same statistics as get_usage_stats()
+        """
+        self._reset_if_new_day()
+        day_counts = self.storage.get_day_counts(self._get_today_key())
+        children = set(day_counts) | set(self.child_limits)
+        storage_stats = self._storage_stats()
+        return {child: self._child_stats(child, day_counts.get(child, {}), storage_stats)
+                for child in sorted(children)}
+    
+    def close(self) -> None:
+        """Flush pending usage records and release the storage."""
+        self.storage.close()
@@ -0,0 +1,203 @@
+"""
+Disk Cache Module
+
+Content-addressed on-disk cache with a size budget and LRU eviction.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+from file_utils import atomic_write_bytes
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Build a cache key from the inputs that determine an entry.
+
+    Args:
+        parts: Content and settings; each is converted with ``repr``
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part if isinstance(part, bytes) else repr(part).encode("utf-8")
+        # Length prefix keeps ("ab", "c") and ("a", "bc") apart
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Files named by the hash of their inputs, kept under a byte budget.
+
+    Recency lives in memory and in file modification times, so the LRU
+    order survives restarts. When a write would exceed ``max_bytes`` the
+    least recently used entries are deleted first.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 50 * 1024 * 1024,
+                 suffix: str = ""):
+        self.logger = logging.getLogger(__name__)
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # key -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._scan()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _scan(self) -> None:
+        """Index the entries left by a previous run, oldest first."""
+        found = []
+        for path in self.directory.iterdir():
+            if path.name.startswith(".") or not path.name.endswith(self.suffix):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            key = path.name[:len(path.name) - len(self.suffix)] if self.suffix else path.name
+            found.append((stat.st_mtime, key, stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+        self._evict(0)
+        if found:
+            self.logger.info(
+                f"Disk cache {self.directory}: {len(self._entries)} entries, "
+                f"{self._size / 1024:.0f} KiB"
+            )
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Path of the cached file, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+            path = self._path(key)
+            try:
+                os.utime(path)
+            except OSError:
+                # Deleted behind our back
+                self._size -= self._entries.pop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        """
+        Store an entry, evicting old entries to stay within the budget.
+
+        Args:
+            key: Cache key from make_key
+            data: File content
+
+        Returns:
+            Path of the cached file
+        """
+        path = self._path(key)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self._evict(len(data))
+            atomic_write_bytes(path, data)
+            self._entries[key] = len(data)
+            self._size += len(data)
+        return path
+
+    def get_or_create(self, key: str, create: Callable[[], bytes]) -> Path:
+        """
+        Return a cached entry, creating it on a miss.
+
+        Args:
+            key: Cache key from make_key
+            create: Produces the content on a miss
+
+        Returns:
+            Path of the cached file
+        """
+        path = self.get(key)
+        if path is not None:
+            return path
+        return self.put(key, create())
+
+    def _evict(self, incoming: int) -> None:
+        """Delete least recently used entries until ``incoming`` bytes fit."""
+        while self._entries and self._size + incoming > self.max_bytes:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError as e:
+                self.logger.warning(f"Could not delete cache entry {key}: {e}")
+
+    @property
+    def size(self) -> int:
+        """Bytes currently stored."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that were hits (0.0 before the first lookup)."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate,
+            }
+
+    def clear(self) -> None:
+        """Delete every entry."""
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._size = 0
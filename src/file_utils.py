@@ -0,0 +1,63 @@
+"""
+File Utilities Module
+
+Crash-safe file writing helpers for state kept on the Raspberry Pi SD card.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional, Union
+
+
+def fsync_directory(directory: Union[str, Path]) -> None:
+    """Flush a directory entry so a completed rename survives power loss."""
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform (e.g. Windows)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes) -> None:
+    """
+    Replace a file atomically.
+    
+    The data is written to a temporary file in the same directory, flushed
+    to disk and renamed over the target, so readers see either the old or
+    the new content but never a torn write.
+    
+    Args:
+        path: Destination file
+        data: New file content
+    """
+    path = Path(path)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, str(path))
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+    fsync_directory(path.parent)
+
+
+def atomic_write_json(path: Union[str, Path], data: Any,
+                      indent: Optional[int] = None) -> None:
+    """Atomically replace a file with the JSON encoding of ``data``."""
+    separators = None if indent else (",", ":")
+    encoded = json.dumps(data, ensure_ascii=False, indent=indent,
+                         separators=separators)
+    atomic_write_bytes(path, encoded.encode("utf-8"))
@@ -0,0 +1,436 @@
+"""
+Image Catalog Module
+
+Finds pictures in assets/images for a spoken request through a persistent,
+memory-mapped inverted keyword index.
+"""
+
+import heapq
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from file_utils import atomic_write_bytes
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif"}
+
+# Sidecar with extra tags for "kissa.png" is "kissa.txt"
+TAG_EXTENSION = ".txt"
+
+# Words of the request that never name the picture
+STOPWORDS = {
+    "tulosta", "tulostaa", "tulostatko", "kuva", "kuvan", "kuvaa", "kuvia",
+    "kuvasta", "piirros", "piirroksen", "piirrä", "haluan", "haluaisin",
+    "minulle", "voisitko", "voitko", "yksi", "yhden", "jossa", "missä",
+    "ja", "on", "se", "tai", "iso", "pieni",
+}
+
+# Keywords are bucketed by this many leading letters; shorter keywords by all
+PREFIX_LENGTH = 4
+
+# An inflected form may differ from the keyword in this many trailing letters
+# ("perhonen" -> "perhosesta", "hevonen" -> "hevosen")
+MAX_SUFFIX_CHANGE = 3
+
+MAGIC = b"KPIX"
+VERSION = 1
+# magic, version, file count, bucket count, files offset, buckets offset
+_HEADER = struct.Struct("<4sIIIQQ")
+_FILE_OFFSET = struct.Struct("<Q")
+# signature, path length
+_FILE_RECORD = struct.Struct("<qH")
+_KEYWORDS_LENGTH = struct.Struct("<I")
+# entries offset, entry count
+_BUCKET = struct.Struct("<QI")
+# keyword length, then file id count
+_ENTRY_KEYWORD = struct.Struct("<B")
+_ENTRY_IDS = struct.Struct("<H")
+_FILE_ID = struct.Struct("<I")
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Posting lists can be viewed in place when the CPU matches the file format
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == "little" and struct.calcsize("I") == 4
+
+
+class FileRecord(NamedTuple):
+    """One catalog image as stored in the index."""
+
+    path: str  # Relative to the image directory, "/"-separated
+    signature: int  # Newest mtime (ns) of the image and its sidecar
+    keywords: Tuple[str, ...]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words (letters only)."""
+    return _WORD.findall(text.lower())
+
+
+def _bucket_key(word: str) -> str:
+    return word[:PREFIX_LENGTH]
+
+
+def _bucket_of(key: str, bucket_count: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % bucket_count
+
+
+def match_score(token: str, keyword: str) -> int:
+    """
+    Score how well a request word matches a keyword.
+
+    Finnish inflects nouns by changing their ending, so a word matches
+    when it shares a long enough prefix with the keyword.
+
+    Returns:
+        0 for no match, otherwise the shared prefix length (+2 if exact)
+    """
+    if token == keyword:
+        return len(keyword) + 2
+
+    common = 0
+    for a, b in zip(token, keyword):
+        if a != b:
+            break
+        common += 1
+
+    if common < min(PREFIX_LENGTH, len(keyword)):
+        return 0
+    if common < len(keyword) - MAX_SUFFIX_CHANGE:
+        return 0
+    return common
+
+
+def build_index(records: List[FileRecord]) -> bytes:
+    """
+    Serialize catalog records into the binary index format.
+
+    Layout: header, a table of file record offsets, the file records,
+    a hash table of (offset, count) buckets keyed by keyword prefix, and
+    the bucket entries (keyword plus the ids of the files it tags).
+    """
+    postings: Dict[str, List[int]] = {}
+    for file_id, record in enumerate(records):
+        for keyword in record.keywords:
+            ids = postings.setdefault(keyword, [])
+            if not ids or ids[-1] != file_id:
+                ids.append(file_id)
+
+    prefixes = {_bucket_key(keyword) for keyword in postings}
+    bucket_count = max(1, 2 * len(prefixes))
+    buckets: List[List[str]] = [[] for _ in range(bucket_count)]
+    for keyword in sorted(postings):
+        buckets[_bucket_of(_bucket_key(keyword), bucket_count)].append(keyword)
+
+    out = bytearray(_HEADER.size)
+
+    files_offset = len(out)
+    out += bytes(_FILE_OFFSET.size * len(records))
+    for file_id, record in enumerate(records):
+        _FILE_OFFSET.pack_into(out, files_offset + file_id * _FILE_OFFSET.size, len(out))
+        path = record.path.encode("utf-8")
+        keywords = "\n".join(record.keywords).encode("utf-8")
+        out += _FILE_RECORD.pack(record.signature, len(path)) + path
+        out += _KEYWORDS_LENGTH.pack(len(keywords)) + keywords
+
+    buckets_offset = len(out)
+    out += bytes(_BUCKET.size * bucket_count)
+    for index, keywords in enumerate(buckets):
+        _BUCKET.pack_into(out, buckets_offset + index * _BUCKET.size, len(out), len(keywords))
+        for keyword in keywords:
+            encoded = keyword.encode("utf-8")[:255]
+            ids = postings[keyword][:65535]
+            out += _ENTRY_KEYWORD.pack(len(encoded)) + encoded
+            out += _ENTRY_IDS.pack(len(ids))
+            out += b"".join(_FILE_ID.pack(file_id) for file_id in ids)
+
+    _HEADER.pack_into(out, 0, MAGIC, VERSION, len(records), bucket_count,
+                      files_offset, buckets_offset)
+    return bytes(out)
+
+
+class _MappedIndex:
+    """Read-only view of an index file; only the pages touched are loaded."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        try:
+            (magic, version, self.file_count, self.bucket_count,
+             self._files_offset, self._buckets_offset) = _HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            self.close()
+            raise ValueError("Truncated image index")
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not an image index of this version")
+
+    def entries(self, key: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        """Keywords (with file ids) stored in the bucket of a prefix."""
+        bucket = _bucket_of(key, self.bucket_count)
+        offset, count = _BUCKET.unpack_from(self._map,
+                                            self._buckets_offset + bucket * _BUCKET.size)
+        data = self._map
+        for _ in range(count):
+            length = data[offset]
+            offset += _ENTRY_KEYWORD.size
+            keyword = data[offset:offset + length].decode("utf-8")
+            offset += length
+            (id_count,) = _ENTRY_IDS.unpack_from(data, offset)
+            offset += _ENTRY_IDS.size
+            end = offset + id_count * _FILE_ID.size
+            if _NATIVE_LITTLE_ENDIAN:
+                # Zero-copy view of the posting list
+                yield keyword, self._view[offset:end].cast("I")
+            else:
+                yield keyword, struct.unpack_from(f"<{id_count}I", data, offset)
+            offset = end
+
+    def record(self, file_id: int) -> FileRecord:
+        """Read one file record."""
+        (offset,) = _FILE_OFFSET.unpack_from(self._map,
+                                             self._files_offset + file_id * _FILE_OFFSET.size)
+        signature, path_length = _FILE_RECORD.unpack_from(self._map, offset)
+        offset += _FILE_RECORD.size
+        path = self._map[offset:offset + path_length].decode("utf-8")
+        offset += path_length
+        (keywords_length,) = _KEYWORDS_LENGTH.unpack_from(self._map, offset)
+        offset += _KEYWORDS_LENGTH.size
+        keywords = self._map[offset:offset + keywords_length].decode("utf-8")
+        return FileRecord(path, signature, tuple(keywords.split("\n")) if keywords else ())
+
+    def records(self) -> Iterator[FileRecord]:
+        for file_id in range(self.file_count):
+            yield self.record(file_id)
+
+    def close(self) -> None:
+        self._view.release()
+        self._map.close()
+
+
+class ImageCatalog:
+    """
+    Maps Finnish request words to pictures in an image directory.
+
+    Keywords come from each image's file name, its sub-directory names and
+    an optional sidecar text file with extra tags ("perhonen.png" may have
+    "perhonen.txt" containing "hyönteinen, kesä"). The index is stored as a
+    binary file and memory-mapped when the catalog opens, so opening costs
+    the same for ten pictures or ten thousand. ``refresh`` re-reads only
+    images whose modification time changed and rewrites the index.
+    """
+
+    def __init__(self, image_dir: Union[str, Path], index_path: Union[str, Path]):
+        self.logger = logging.getLogger(__name__)
+        self.image_dir = Path(image_dir)
+        self.index_path = Path(index_path)
+
+        self._lock = threading.Lock()
+        self._index: Optional[_MappedIndex] = None
+        self._stop = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
+
+        if self.index_path.exists():
+            try:
+                self._index = _MappedIndex(self.index_path)
+                self.logger.info(f"Image index opened ({self._index.file_count} images)")
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Ignoring unreadable image index: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._index.file_count if self._index else 0
+
+    def search(self, text: str, limit: int = 5) -> List[Tuple[Path, int]]:
+        """
+        Rank catalog images for a request.
+
+        Args:
+            text: Recognized request, e.g. "tulosta kuva perhosesta"
+            limit: Most results to return
+
+        Returns:
+            (image path, score) pairs, best first
+        """
+        tokens = [token for token in tokenize(text) if token not in STOPWORDS]
+        if not tokens:
+            return []
+
+        with self._lock:
+            index = self._index
+            if index is None or index.file_count == 0:
+                return []
+
+            scores: Dict[int, int] = {}
+            for token in tokens:
+                keys = {_bucket_key(token)}
+                if len(token) > PREFIX_LENGTH - 1:
+                    # Keywords shorter than PREFIX_LENGTH live under their own key
+                    keys.update(token[:n] for n in range(3, PREFIX_LENGTH))
+
+                # Best score of this token per file; posting lists are
+                # merged with dict operations implemented in C
+                best: Dict[int, int] = {}
+                for score, ids in self._matches(index, token, keys):
+                    best.update(dict.fromkeys(ids, score))
+
+                if not scores:
+                    scores = best
+                else:
+                    for file_id, score in best.items():
+                        scores[file_id] = scores.get(file_id, 0) + score
+
+            ranked = heapq.nsmallest(limit, scores.items(),
+                                     key=lambda item: (-item[1], item[0]))
+            return [(self.image_dir / index.record(file_id).path, score)
+                    for file_id, score in ranked]
+
+    @staticmethod
+    def _matches(index: _MappedIndex, token: str,
+                 keys: Iterable[str]) -> List[Tuple[int, Tuple[int, ...]]]:
+        """
+        Posting lists of the keywords a token matches, lowest score first.
+
+        The ids are copied out of the map, so no view into it is left
+        once the caller releases the lock and ``refresh`` can unmap it.
+        """
+        matches = []
+        for key in keys:
+            for keyword, ids in index.entries(key):
+                score = match_score(token, keyword)
+                if score:
+                    matches.append((score, tuple(ids)))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def find(self, text: str) -> Optional[Path]:
+        """
+        Pick the best matching image for a request.
+
+        Args:
+            text: Recognized request
+
+        Returns:
+            Path of the image, or None if nothing matches
+        """
+        for path, _ in self.search(text):
+            # The index may lag behind a picture that was just deleted
+            if path.exists():
+                return path
+        return None
+
+    def _scan(self) -> Dict[str, Tuple[Path, int]]:
+        """Current images with their signatures, by relative path."""
+        found: Dict[str, Tuple[Path, int]] = {}
+        if not self.image_dir.is_dir():
+            return found
+
+        for root, _, files in os.walk(self.image_dir):
+            names = set(files)
+            for name in files:
+                path = Path(root) / name
+                if path.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                try:
+                    signature = path.stat().st_mtime_ns
+                    sidecar = path.stem + TAG_EXTENSION
+                    if sidecar in names:
+                        signature = max(signature,
+                                        (Path(root) / sidecar).stat().st_mtime_ns)
+                except OSError:
+                    continue
+                found[path.relative_to(self.image_dir).as_posix()] = (path, signature)
+        return found
+
+    def _keywords(self, relative: str, path: Path) -> Tuple[str, ...]:
+        """Keywords of one image: directory names, file name and sidecar tags."""
+        words: List[str] = []
+        for part in Path(relative).parent.parts:
+            words.extend(tokenize(part))
+        words.extend(tokenize(path.stem))
+
+        sidecar = path.with_name(path.stem + TAG_EXTENSION)
+        if sidecar.exists():
+            try:
+                words.extend(tokenize(sidecar.read_text(encoding="utf-8")))
+            except (OSError, UnicodeDecodeError) as e:
+                self.logger.warning(f"Could not read tags {sidecar}: {e}")
+
+        seen: Set[str] = set()
+        keywords = []
+        for word in words:
+            if len(word) >= 3 and word not in STOPWORDS and word not in seen:
+                seen.add(word)
+                keywords.append(word)
+        return tuple(keywords)
+
+    def refresh(self) -> int:
+        """
+        Bring the index up to date with the image directory.
+
+        Returns:
+            Number of images added, changed or removed
+        """
+        current = self._scan()
+        with self._lock:
+            known = {record.path: record for record in self._index.records()} \
+                if self._index else {}
+
+        records: List[FileRecord] = []
+        changed = 0
+        for relative in sorted(current):
+            path, signature = current[relative]
+            record = known.get(relative)
+            if record is None or record.signature != signature:
+                record = FileRecord(relative, signature, self._keywords(relative, path))
+                changed += 1
+            records.append(record)
+        changed += len(set(known) - set(current))
+
+        if changed == 0 and self._index is not None:
+            return 0
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(self.index_path, build_index(records))
+        new_index = _MappedIndex(self.index_path)
+        with self._lock:
+            old_index, self._index = self._index, new_index
+        if old_index is not None:
+            old_index.close()
+
+        self.logger.info(f"Image index updated: {len(records)} images, {changed} changed")
+        return changed
+
+    def start_watching(self, interval: float = 60.0) -> None:
+        """Refresh in a background thread now and then every ``interval`` seconds."""
+        if self._watch_thread is not None:
+            return
+
+        def watch() -> None:
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.logger.error(f"Error refreshing image index: {e}")
+                if self._stop.wait(interval):
+                    return
+
+        self._watch_thread = threading.Thread(target=watch, name="image-catalog", daemon=True)
+        self._watch_thread.start()
+
+    def close(self) -> None:
+        """Stop watching and unmap the index."""
+        self._stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=5)
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
@@ -0,0 +1,306 @@
+"""
+Image Dedup Module
+
+Notices when a picture printed earlier the same day is printed again.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from file_utils import atomic_write_json
+
+POLICIES = ("warn", "block", "allow")
+
+HASH_BITS = 64
+
+# The hash is split into this many bands; two hashes within BANDS - 1 bits
+# of each other agree exactly on at least one band (pigeonhole)
+BANDS = 8
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Hashing that takes longer than this is logged (seconds). It is a target,
+# not a limit: JPEGs are decoded at 1/8 scale and stay well below it, but
+# other formats are decoded in full and a large PNG can exceed it
+SLOW_HASH_SECONDS = 0.25
+
+FILE_VERSION = 1
+
+
+class DuplicateImageError(Exception):
+    """A picture was not printed because it was already printed today."""
+
+    def __init__(self, image_path: Union[str, Path], match_path: str):
+        super().__init__(f"{image_path} was already printed today as {match_path}")
+        self.image_path = str(image_path)
+        self.match_path = match_path
+
+
+def dhash(path: Union[str, Path], hash_size: int = 8) -> int:
+    """
+    Perceptual difference hash of an image.
+
+    The image is shrunk to (hash_size + 1) x hash_size gray pixels and
+    each bit records whether a pixel is brighter than its right
+    neighbour. Re-encoded, resized or slightly edited copies of a picture
+    get hashes only a few bits apart. JPEGs are decoded at 1/8 scale, so
+    even camera photos hash quickly.
+
+    Args:
+        path: Image file
+        hash_size: Bits per row and column (8 gives a 64-bit hash)
+
+    Returns:
+        Hash as an unsigned integer
+    """
+    with Image.open(path) as image:
+        image.draft("L", (hash_size * 16, hash_size * 16))
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+            background.alpha_composite(image)
+            image = background
+        # A single exact box average; JPEG draft scaling is an 8x8 box
+        # average too, so a JPEG and a PNG of one picture hash alike
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+def _day(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+class DuplicateMatch(NamedTuple):
+    """An earlier print that looks like the new image."""
+
+    path: str
+    distance: int
+    printed_at: float
+
+
+class DedupResult(NamedTuple):
+    """Outcome of checking an image before printing it."""
+
+    image_hash: Optional[int]
+    match: Optional[DuplicateMatch]
+    allowed: bool
+
+
+class _Entry(NamedTuple):
+    path: str
+    printed_at: float
+
+
+class ImageDeduplicator:
+    """
+    Remembers perceptual hashes of printed images to catch reprints.
+
+    Hashes are kept in a bounded index (oldest dropped first) that is
+    saved to disk after every print. Lookups go through a hash table per
+    band of the hash, so finding a near-duplicate only compares against
+    the few entries sharing a band instead of every print of the day.
+
+    Hashes are also memoized per file (path, size and modification time),
+    so a picture printed again does not have to be decoded again.
+
+    Policies: "warn" prints and logs the reprint, "block" refuses it and
+    "allow" prints without comment.
+    """
+
+    def __init__(self, hash_image: Callable[[Union[str, Path]], int],
+                 index_file: Optional[Union[str, Path]] = None, policy: str = "warn",
+                 max_entries: int = 1000, max_distance: int = 6,
+                 clock: Callable[[], float] = time.time):
+        self.logger = logging.getLogger(__name__)
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {policy}")
+        if not 0 <= max_distance < BANDS:
+            raise ValueError(f"max_distance must be between 0 and {BANDS - 1}")
+        self.hash_image = hash_image
+        self.index_file = Path(index_file) if index_file else None
+        self.policy = policy
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.clock = clock
+
+        # hash -> entry, least recently printed first
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        # per band: band value -> hashes having it
+        self._bands: List[Dict[int, Set[int]]] = [{} for _ in range(BANDS)]
+        # (path, size, mtime) -> hash of files hashed before
+        self._file_hashes: "OrderedDict[Tuple[str, int, int], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.duplicates = 0
+        self._load()
+
+    @staticmethod
+    def _band_values(image_hash: int) -> Iterator[Tuple[int, int]]:
+        for band in range(BANDS):
+            yield band, (image_hash >> (band * BAND_BITS)) & BAND_MASK
+
+    def _insert(self, image_hash: int, entry: _Entry) -> None:
+        if image_hash in self._entries:
+            self._entries.move_to_end(image_hash)
+        else:
+            for band, value in self._band_values(image_hash):
+                self._bands[band].setdefault(value, set()).add(image_hash)
+        self._entries[image_hash] = entry
+
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            self._unlink(oldest)
+
+    def _unlink(self, image_hash: int) -> None:
+        for band, value in self._band_values(image_hash):
+            bucket = self._bands[band].get(value)
+            if bucket is not None:
+                bucket.discard(image_hash)
+                if not bucket:
+                    del self._bands[band][value]
+
+    def _load(self) -> None:
+        if self.index_file is None or not self.index_file.exists():
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != FILE_VERSION:
+                raise ValueError(f"unsupported version {data.get('version')}")
+            today = _day(self.clock())
+            for hash_hex, path, printed_at in data["entries"]:
+                if _day(printed_at) == today:
+                    self._insert(int(hash_hex, 16), _Entry(path, printed_at))
+            self.logger.info(f"Loaded {len(self._entries)} image hashes from today")
+        except Exception as e:
+            self.logger.error(f"Error loading image hash index: {e}")
+
+    def _save(self) -> None:
+        if self.index_file is None:
+            return
+        entries = [[f"{image_hash:016x}", entry.path, entry.printed_at]
+                   for image_hash, entry in self._entries.items()]
+        try:
+            atomic_write_json(self.index_file, {"version": FILE_VERSION, "entries": entries})
+        except Exception as e:
+            self.logger.error(f"Error saving image hash index: {e}")
+
+    def find(self, image_hash: int) -> Optional[DuplicateMatch]:
+        """
+        Find the closest image printed today within ``max_distance`` bits.
+
+        Args:
+            image_hash: Perceptual hash of the new image
+
+        Returns:
+            The closest earlier print, or None
+        """
+        today = _day(self.clock())
+        with self._lock:
+            candidates: Set[int] = set()
+            for band, value in self._band_values(image_hash):
+                candidates.update(self._bands[band].get(value, ()))
+
+            best: Optional[DuplicateMatch] = None
+            for candidate in candidates:
+                distance = hamming_distance(image_hash, candidate)
+                if distance > self.max_distance:
+                    continue
+                entry = self._entries[candidate]
+                if _day(entry.printed_at) != today:
+                    continue
+                if best is None or distance < best.distance:
+                    best = DuplicateMatch(entry.path, distance, entry.printed_at)
+            return best
+
+    def image_hash(self, image_path: Union[str, Path]) -> int:
+        """
+        Perceptual hash of an image file, memoized while the file is unchanged.
+
+        Args:
+            image_path: Image file
+
+        Returns:
+            Hash from ``hash_image``
+        """
+        stat = os.stat(image_path)
+        key = (str(image_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            image_hash = self._file_hashes.get(key)
+            if image_hash is not None:
+                self._file_hashes.move_to_end(key)
+                return image_hash
+
+        start = time.perf_counter()
+        image_hash = self.hash_image(image_path)
+        elapsed = time.perf_counter() - start
+        if elapsed > SLOW_HASH_SECONDS:
+            self.logger.warning(f"Hashing {image_path} took {elapsed * 1000:.0f} ms")
+
+        with self._lock:
+            self._file_hashes[key] = image_hash
+            while len(self._file_hashes) > self.max_entries:
+                self._file_hashes.popitem(last=False)
+        return image_hash
+
+    def check(self, image_path: Union[str, Path]) -> DedupResult:
+        """
+        Check an image against today's prints and apply the policy.
+
+        Args:
+            image_path: Image about to be printed
+
+        Returns:
+            Hash, matching earlier print (if any) and whether to print
+        """
+        try:
+            image_hash = self.image_hash(image_path)
+        except Exception as e:
+            self.logger.warning(f"Could not hash image {image_path}: {e}")
+            return DedupResult(None, None, True)
+
+        match = self.find(image_hash)
+        if match is None:
+            return DedupResult(image_hash, None, True)
+
+        self.duplicates += 1
+        if self.policy == "block":
+            self.logger.warning(f"Not reprinting {image_path}, already printed today "
+                                f"as {match.path}")
+            return DedupResult(image_hash, match, False)
+        if self.policy == "warn":
+            self.logger.warning(f"Reprinting {image_path}, already printed today "
+                                f"as {match.path}")
+        return DedupResult(image_hash, match, True)
+
+    def record(self, image_hash: int, image_path: Union[str, Path]) -> None:
+        """
+        Remember a printed image.
+
+        Args:
+            image_hash: Hash from ``check``
+            image_path: Printed image
+        """
+        with self._lock:
+            self._insert(image_hash, _Entry(str(image_path), self.clock()))
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
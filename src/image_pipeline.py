@@ -0,0 +1,260 @@
+"""
+Image Pipeline Module
+
+Resamples images to the printer's resolution and paper size before spooling.
+"""
+
+import hashlib
+import io
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from disk_cache import DiskCache, make_key
+
+# Printer attributes needed to build a PrinterProfile
+PROFILE_ATTRIBUTES = [
+    "printer-resolution-default",
+    "media-default",
+    "color-supported",
+]
+
+# IPP resolution units
+UNITS_DPI = 3
+UNITS_DPCM = 4
+
+# Used when the printer does not report its capabilities
+DEFAULT_DPI = 300
+DEFAULT_PAGE_INCHES = (8.27, 11.69)  # A4
+
+# Printable margin on each side, in inches
+PAGE_MARGIN_INCHES = 0.25
+
+# Bump when the output changes so stale cache entries are not reused
+PIPELINE_VERSION = 1
+
+_MEDIA_SIZE = re.compile(r"_(\d+(?:\.\d+)?)x(\d+(?:\.\d+)?)(mm|in)$")
+
+
+class PrinterProfile(NamedTuple):
+    """What the target printer can put on paper."""
+
+    dpi: int
+    page_inches: Tuple[float, float]
+    color: bool
+
+    @property
+    def pixel_size(self) -> Tuple[int, int]:
+        """Printable area in device pixels (width, height)."""
+        width, height = self.page_inches
+        return (max(1, round((width - 2 * PAGE_MARGIN_INCHES) * self.dpi)),
+                max(1, round((height - 2 * PAGE_MARGIN_INCHES) * self.dpi)))
+
+
+class PreparedImage(NamedTuple):
+    """An image encoded for one printer profile."""
+
+    data: bytes
+    doc_format: str
+    size: Tuple[int, int]
+
+
+DEFAULT_PROFILE = PrinterProfile(DEFAULT_DPI, DEFAULT_PAGE_INCHES, True)
+
+
+def profile_from_attributes(attributes: Dict[str, Any]) -> PrinterProfile:
+    """
+    Build a printer profile from IPP printer attributes.
+
+    Args:
+        attributes: Result of getPrinterAttributes
+
+    Returns:
+        Profile, with defaults for anything the printer did not report
+    """
+    dpi = DEFAULT_DPI
+    resolution = attributes.get("printer-resolution-default")
+    if isinstance(resolution, (tuple, list)) and len(resolution) == 3:
+        xres, yres, units = resolution
+        value = min(xres, yres)
+        dpi = round(value * 2.54) if units == UNITS_DPCM else value
+
+    page_inches = DEFAULT_PAGE_INCHES
+    match = _MEDIA_SIZE.search(str(attributes.get("media-default", "")))
+    if match:
+        width, height, unit = float(match.group(1)), float(match.group(2)), match.group(3)
+        if unit == "mm":
+            width, height = width / 25.4, height / 25.4
+        page_inches = (width, height)
+
+    color = bool(attributes.get("color-supported", True))
+    return PrinterProfile(int(dpi), page_inches, color)
+
+
+def bayer_matrix(order: int = 3) -> np.ndarray:
+    """
+    Ordered-dither threshold matrix of size 2**order.
+
+    Returns:
+        Thresholds in [0, 1), as float32
+    """
+    matrix = np.zeros((1, 1), dtype=np.int32)
+    for _ in range(order):
+        matrix = np.block([[4 * matrix, 4 * matrix + 2],
+                           [4 * matrix + 3, 4 * matrix + 1]])
+    return ((matrix + 0.5) / matrix.size).astype(np.float32)
+
+
+def dither_to_1bit(image: Image.Image, order: int = 3) -> Image.Image:
+    """
+    Convert a grayscale image to 1-bit with ordered (Bayer) dithering.
+
+    The whole image is thresholded in one vectorized comparison against a
+    tiled threshold matrix.
+
+    Args:
+        image: Mode "L" image
+
+    Returns:
+        Mode "1" image
+    """
+    pixels = np.asarray(image, dtype=np.float32) / 255.0
+    thresholds = bayer_matrix(order)
+    tile = thresholds.shape[0]
+    height, width = pixels.shape
+    tiled = np.tile(thresholds, (-(-height // tile), -(-width // tile)))[:height, :width]
+    return Image.fromarray(pixels > tiled)
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImagePipeline:
+    """
+    Prepares images for a specific printer before they are spooled.
+
+    Images are decoded at reduced size where the format allows it (JPEG
+    draft mode), fitted to the printable area at the printer's resolution,
+    converted to 1-bit (or grayscale) for mono printers and re-encoded:
+    1-bit and grayscale as PNG, color as JPEG. With a cache, an image
+    already prepared for the same profile is not processed again.
+    """
+
+    def __init__(self, cache: Optional[DiskCache] = None, mono_mode: str = "1bit",
+                 jpeg_quality: int = 88):
+        self.logger = logging.getLogger(__name__)
+        if mono_mode not in ("1bit", "gray"):
+            raise ValueError(f"Unknown mono mode: {mono_mode}")
+        self.cache = cache
+        self.mono_mode = mono_mode
+        self.jpeg_quality = jpeg_quality
+        self._profiles: Dict[str, PrinterProfile] = {}
+
+    def printer_profile(self, connection, printer: str) -> PrinterProfile:
+        """
+        Look up (once) what a printer can print.
+
+        Args:
+            connection: CupsConnection to query
+            printer: Printer name
+
+        Returns:
+            The printer's profile, or DEFAULT_PROFILE if it cannot be read
+        """
+        profile = self._profiles.get(printer)
+        if profile is None:
+            try:
+                attributes = connection.call("getPrinterAttributes", printer,
+                                             requested_attributes=PROFILE_ATTRIBUTES)
+                profile = profile_from_attributes(attributes)
+            except Exception as e:
+                self.logger.warning(f"Could not read attributes of {printer}: {e}")
+                return DEFAULT_PROFILE
+            self._profiles[printer] = profile
+            self.logger.info(
+                f"Printer {printer}: {profile.dpi} dpi, "
+                f"{'color' if profile.color else 'mono'}"
+            )
+        return profile
+
+    def prepare(self, image_path: Union[str, Path],
+                profile: PrinterProfile = DEFAULT_PROFILE) -> PreparedImage:
+        """
+        Prepare an image file for a printer.
+
+        Args:
+            image_path: Source image
+            profile: Target printer
+
+        Returns:
+            Encoded image and its MIME type
+        """
+        doc_format = self._doc_format(profile)
+        if self.cache is None:
+            return self._prepare(image_path, profile)
+
+        key = make_key("image", PIPELINE_VERSION, file_digest(image_path), profile,
+                       self.mono_mode, self.jpeg_quality)
+        cached = self.cache.get(key)
+        if cached is not None:
+            with Image.open(cached) as image:
+                size = image.size
+            return PreparedImage(cached.read_bytes(), doc_format, size)
+
+        prepared = self._prepare(image_path, profile)
+        self.cache.put(key, prepared.data)
+        return prepared
+
+    def _doc_format(self, profile: PrinterProfile) -> str:
+        return "image/jpeg" if profile.color else "image/png"
+
+    def _prepare(self, image_path: Union[str, Path], profile: PrinterProfile) -> PreparedImage:
+        target_width, target_height = profile.pixel_size
+
+        with Image.open(image_path) as image:
+            source_size = image.size
+            mode = "RGB" if profile.color else "L"
+            # JPEG can decode at 1/2, 1/4 or 1/8 scale directly
+            image.draft(mode, (target_width, target_height))
+            image = ImageOps.exif_transpose(image)
+
+            if image.mode in ("RGBA", "LA", "P"):
+                # Transparent areas print as white paper
+                background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+                background.alpha_composite(image.convert("RGBA"))
+                image = background
+            image = image.convert(mode)
+
+        # Rotate landscape pictures onto portrait paper (and vice versa)
+        if (image.width > image.height) != (target_width > target_height):
+            image = image.transpose(Image.Transpose.ROTATE_90)
+
+        scale = min(target_width / image.width, target_height / image.height)
+        if scale < 1.0:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        output = io.BytesIO()
+        dpi = (profile.dpi, profile.dpi)
+        if profile.color:
+            image.save(output, "JPEG", quality=self.jpeg_quality, optimize=True, dpi=dpi)
+        elif self.mono_mode == "1bit":
+            dither_to_1bit(image).save(output, "PNG", optimize=True, dpi=dpi)
+        else:
+            image.save(output, "PNG", optimize=True, dpi=dpi)
+
+        self.logger.debug(
+            f"Prepared image {source_size} -> {image.size} at {profile.dpi} dpi "
+            f"({output.tell() / 1024:.0f} KiB)"
+        )
+        return PreparedImage(output.getvalue(), self._doc_format(profile), image.size)
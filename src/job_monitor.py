@@ -0,0 +1,210 @@
+"""
+Job Monitor Module
+
+Tracks submitted CUPS jobs until they finish, with one shared poller.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Final job outcomes
+COMPLETED = "completed"
+ABORTED = "aborted"
+TIMED_OUT = "timed_out"
+
+# IPP job-state values (RFC 8011)
+JOB_PENDING = 3
+JOB_HELD = 4
+JOB_PROCESSING = 5
+JOB_STOPPED = 6
+JOB_CANCELED = 7
+JOB_ABORTED = 8
+JOB_COMPLETED = 9
+
+FINAL_STATES = {
+    JOB_CANCELED: ABORTED,
+    JOB_ABORTED: ABORTED,
+    JOB_COMPLETED: COMPLETED,
+}
+
+
+class _WatchedJob:
+    """Bookkeeping for one outstanding job."""
+
+    __slots__ = ("watched_at", "started_at", "future", "state")
+
+    def __init__(self, watched_at: float):
+        self.watched_at = watched_at
+        # When the job was first seen processing
+        self.started_at: Optional[float] = None
+        self.future: Future = Future()
+        self.state: Optional[int] = None
+
+
+class JobMonitor:
+    """
+    Resolves print jobs to completed, aborted or timed out.
+
+    A single background thread polls CUPS for all outstanding jobs with one
+    ``getJobs`` request per round, however many jobs are in flight. It polls
+    every ``min_interval`` seconds while job states are changing and backs
+    off towards ``max_interval`` while nothing happens; with no jobs it
+    sleeps until the next ``watch``. Jobs still unfinished ``timeout``
+    seconds after they started processing, or that waited in CUPS for
+    ``pending_timeout`` seconds without starting, are cancelled and
+    reported as timed out.
+    """
+
+    def __init__(self, connection, timeout: float = 30.0, pending_timeout: float = 300.0,
+                 min_interval: float = 0.5, max_interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.connection = connection
+        self.timeout = timeout
+        self.pending_timeout = pending_timeout
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.clock = clock
+
+        self._jobs: Dict[int, _WatchedJob] = {}
+        self._cond = threading.Condition()
+        self._new_jobs = False
+        self._stopped = False
+        self.polls = 0
+
+        self._thread = threading.Thread(target=self._run, name="job-monitor", daemon=True)
+        self._thread.start()
+
+    @property
+    def outstanding(self) -> int:
+        """Number of jobs not resolved yet."""
+        with self._cond:
+            return len(self._jobs)
+
+    def watch(self, job_id: int,
+              callback: Optional[Callable[[int, str], None]] = None) -> Future:
+        """
+        Start tracking a submitted job.
+
+        Args:
+            job_id: CUPS job id
+            callback: Called as ``callback(job_id, outcome)`` when the job
+                finishes, on the monitor thread
+
+        Returns:
+            Future resolving to COMPLETED, ABORTED or TIMED_OUT
+        """
+        with self._cond:
+            watched = self._jobs.get(job_id)
+            if watched is None:
+                watched = self._jobs[job_id] = _WatchedJob(self.clock())
+                self._new_jobs = True
+                self._cond.notify()
+
+        if callback is not None:
+            watched.future.add_done_callback(lambda done: callback(job_id, done.result()))
+        return watched.future
+
+    def poll(self) -> int:
+        """
+        Check every outstanding job once.
+
+        Returns:
+            Number of jobs whose state changed or that were resolved
+        """
+        with self._cond:
+            if not self._jobs:
+                return 0
+            first_job_id = min(self._jobs)
+
+        self.polls += 1
+        try:
+            states = self.connection.call(
+                "getJobs", which_jobs="all", first_job_id=first_job_id,
+                requested_attributes=["job-id", "job-state"]
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not poll job states: {e}")
+            states = None
+
+        now = self.clock()
+        changed = 0
+        resolved: List[Tuple[int, _WatchedJob, str]] = []
+        with self._cond:
+            for job_id, watched in list(self._jobs.items()):
+                outcome = None
+                if states is not None:
+                    if job_id in states:
+                        state = states[job_id].get("job-state")
+                    else:
+                        # Purged from the history, so it is long finished
+                        state = JOB_COMPLETED
+                    if state != watched.state:
+                        watched.state = state
+                        changed += 1
+                    if state in (JOB_PROCESSING, JOB_STOPPED) and watched.started_at is None:
+                        watched.started_at = now
+                    outcome = FINAL_STATES.get(state)
+
+                if outcome is None and self._expired(watched, now):
+                    outcome = TIMED_OUT
+                if outcome is not None:
+                    del self._jobs[job_id]
+                    resolved.append((job_id, watched, outcome))
+
+        for job_id, watched, outcome in resolved:
+            if outcome == TIMED_OUT:
+                self.logger.warning(f"Print job {job_id} timed out, cancelling it")
+                try:
+                    self.connection.call("cancelJob", job_id)
+                except Exception as e:
+                    self.logger.warning(f"Could not cancel job {job_id}: {e}")
+            elif outcome == ABORTED:
+                self.logger.warning(f"Print job {job_id} was aborted")
+            else:
+                self.logger.info(f"Print job {job_id} completed")
+            watched.future.set_result(outcome)
+
+        return changed + len(resolved)
+
+    def _expired(self, watched: _WatchedJob, now: float) -> bool:
+        """Whether a job has printed, or waited to print, for too long."""
+        if watched.started_at is not None:
+            return now >= watched.started_at + self.timeout
+        return now >= watched.watched_at + self.pending_timeout
+
+    def _run(self) -> None:
+        """Poller loop with adaptive interval."""
+        interval = self.min_interval
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stopped:
+                    self._cond.wait()
+                    interval = self.min_interval
+                if self._stopped:
+                    return
+                self._cond.wait(interval)
+                if self._stopped:
+                    return
+                if self._new_jobs:
+                    self._new_jobs = False
+                    interval = self.min_interval
+
+            try:
+                changed = self.poll()
+            except Exception as e:
+                self.logger.error(f"Error in job monitor: {e}")
+                changed = 0
+            interval = self.min_interval if changed else min(interval * 2, self.max_interval)
+
+    def close(self) -> None:
+        """Stop the poller; jobs still outstanding stay unresolved."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        if self._jobs:
+            self.logger.info(f"Job monitor stopped with {len(self._jobs)} jobs outstanding")
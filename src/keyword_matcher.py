@@ -0,0 +1,167 @@
+"""
+Keyword Matcher Module
+
+Multi-pattern substring matching (Aho-Corasick) for content filtering.
+"""
+
+import logging
+from collections import deque
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """A single keyword hit inside a text."""
+
+    keyword: str
+    kind: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a set of tagged keywords.
+
+    Every keyword carries a ``kind`` tag (for example ``"blocked"`` or
+    ``"safe"``) so that several word lists can share one automaton and be
+    matched in a single pass over the text. Scanning cost depends on the
+    length of the text, not on the number of keywords.
+
+    Keywords are inserted into the trie incrementally; failure links are
+    recomputed lazily on the next scan after the keyword set changed.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[Tuple[Tuple[str, str], ...]] = [()]
+        self._outputs: List[Tuple[Tuple[str, str], ...]] = [()]
+        self._keywords: Set[Tuple[str, str]] = set()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        return item in self._keywords
+
+    def add(self, keyword: str, kind: str) -> bool:
+        """
+        Insert a keyword into the automaton.
+
+        Args:
+            keyword: Lowercase keyword to match as a substring
+            kind: Tag reported with every match of this keyword
+
+        Returns:
+            True if the keyword was new
+        """
+        if not keyword or (keyword, kind) in self._keywords:
+            return False
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(())
+                self._outputs.append(())
+            state = next_state
+
+        self._terminal[state] += ((keyword, kind),)
+        self._keywords.add((keyword, kind))
+        self._dirty = True
+        return True
+
+    def add_many(self, keywords, kind: str) -> int:
+        """Insert several keywords with the same kind; returns how many were new."""
+        return sum(1 for keyword in keywords if self.add(keyword, kind))
+
+    def _build(self) -> None:
+        """Compute failure links and merged outputs breadth-first."""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        terminal = self._terminal
+
+        outputs[0] = terminal[0]
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            outputs[child] = terminal[child]
+            queue.append(child)
+
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[child] = target if target != child else 0
+                outputs[child] = terminal[child] + outputs[fail[child]]
+                queue.append(child)
+
+        self._dirty = False
+        self.logger.debug(f"Keyword automaton rebuilt ({len(goto)} states)")
+
+    def scan(self, text: str, fold_case: bool = False) -> Tuple[List[KeywordMatch], int]:
+        """
+        Find every keyword occurrence in ``text`` in a single pass.
+
+        The same pass also measures the longest run of one repeated
+        character (line breaks excluded), which the content filter uses to
+        detect spam such as "aaaaaaa". Runs are measured on ``text`` as
+        given, even when keywords are matched case-insensitively.
+
+        Args:
+            text: Text to scan; lowercase unless ``fold_case`` is set
+            fold_case: Match keywords against the lowercased text
+
+        Returns:
+            Tuple of (matches ordered by end position in the lowercased
+            text, longest run length)
+        """
+        if self._dirty:
+            self._build()
+
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        matches: List[KeywordMatch] = []
+        state = 0
+        index = 0
+        previous = None
+        run = longest_run = 0
+
+        for char in text:
+            if char == previous and char != "\n":
+                run += 1
+                if run > longest_run:
+                    longest_run = run
+            else:
+                previous = char
+                run = 1
+                if not longest_run and char != "\n":
+                    longest_run = 1
+
+            # Lowercasing may turn one character into several
+            for folded in (char.lower() if fold_case else char):
+                index += 1
+                next_state = goto[state].get(folded)
+                while next_state is None and state:
+                    state = fail[state]
+                    next_state = goto[state].get(folded)
+                state = next_state or 0
+                for keyword, kind in outputs[state]:
+                    matches.append(KeywordMatch(keyword, kind, index - len(keyword), index))
+
+        return matches, longest_run
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Return every keyword occurrence in ``text``."""
+        return self.scan(text)[0]
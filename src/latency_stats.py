@@ -0,0 +1,18 @@
+"""
+Latency Statistics Module
+
+Helpers for the latency reports kept by the print queue and the speech
+recognizer.
+"""
+
+import math
+from typing import List
+
+# Latency samples kept per series
+LATENCY_HISTORY = 1000
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
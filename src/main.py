@@ -5,18 +5,37 @@ Child's Automatic Printer - Main Application
 A Finnish voice-controlled printing system for children.
 """
 
+import asyncio
 import logging
+import socket
 import sys
 from pathlib import Path
 
-# Add src to path for imports
+# Add src and project root to path for imports
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent))
 
+from config import settings
 from voice_recognition import FinnishVoiceRecognizer
+from speech_backends import VoskBackend
+from wake_word import WakeWordSpotter
 from printer_controller import PrinterController
+from print_queue import PrintQueue
+from job_monitor import JobMonitor
+from cups_connection import CupsConnection
+from printer_scheduler import PrinterScheduler
+from disk_cache import DiskCache
+from page_renderer import PageRenderer
+from image_pipeline import ImagePipeline
+from image_dedup import ImageDeduplicator, dhash
+from image_catalog import ImageCatalog
+from coloring_pages import ColoringPageGenerator
 from content_filter import ContentFilter
 from daily_limits import DailyLimitManager
+from rate_limiter import RateLimiter
+from pipeline import CommandPipeline, CommandProcessor, run_serial
 from audio_feedback import AudioFeedback
+from tts_server import SpeechServer
 
 
 def setup_logging():
@@ -40,50 +59,152 @@ def main():
     
     try:
         # Initialize components
-        voice_recognizer = FinnishVoiceRecognizer()
-        printer_controller = PrinterController()
+        speech_backend = None
+        if settings.SPEECH_BACKEND == "vosk":
+            try:
+                speech_backend = VoskBackend(settings.VOSK_MODEL_PATH)
+            except Exception as e:
+                logger.error(f"Offline speech recognition unavailable, using Google: {e}")
+        wake_word_spotter = None
+        if settings.WAKE_WORD_GATE:
+            wake_word_spotter = WakeWordSpotter(settings.WAKE_WORDS,
+                                                window=settings.WAKE_WORD_WINDOW,
+                                                default_threshold=settings.WAKE_WORD_THRESHOLD)
+            if not wake_word_spotter.load_templates(settings.WAKE_WORD_DIR):
+                logger.warning("No wake word recordings found, every utterance is recognized")
+                wake_word_spotter = None
+        voice_recognizer = FinnishVoiceRecognizer(
+            continuous=settings.CONTINUOUS_CAPTURE,
+            phrase_time_limit=settings.VOICE_PHRASE_TIME_LIMIT,
+            backend=speech_backend,
+            language=settings.VOICE_LANGUAGE,
+            wake_word_spotter=wake_word_spotter
+        )
+        connection = CupsConnection(cache_ttl=settings.PRINTER_CACHE_TTL)
+        job_monitor = JobMonitor(connection, timeout=settings.PRINT_TIMEOUT,
+                                 pending_timeout=settings.PRINT_PENDING_TIMEOUT)
+        scheduler = None
+        if settings.LOAD_BALANCE_PRINTERS:
+            scheduler = PrinterScheduler(connection, printers=settings.PRINTER_POOL,
+                                         job_monitor=job_monitor)
+        renderer = None
+        if settings.RENDER_PAGES:
+            page_cache = DiskCache(settings.RENDER_CACHE_DIR,
+                                   max_bytes=settings.RENDER_CACHE_MAX_MB * 1024 * 1024,
+                                   suffix=".pdf")
+            renderer = PageRenderer(page_cache, page_size=settings.PAGE_SIZE,
+                                    font_size=settings.PAGE_FONT_SIZE)
+        image_pipeline = None
+        if settings.PREPARE_IMAGES:
+            image_cache = DiskCache(settings.IMAGE_CACHE_DIR,
+                                    max_bytes=settings.IMAGE_CACHE_MAX_MB * 1024 * 1024)
+            image_pipeline = ImagePipeline(image_cache, mono_mode=settings.MONO_IMAGE_MODE)
+        deduplicator = ImageDeduplicator(
+            dhash,
+            index_file=settings.DUPLICATE_IMAGE_INDEX,
+            policy=settings.DUPLICATE_IMAGE_POLICY,
+            max_distance=settings.DUPLICATE_MAX_DISTANCE
+        )
+        catalog = ImageCatalog(settings.IMAGE_DIR, settings.IMAGE_INDEX_FILE)
+        catalog.start_watching(settings.IMAGE_INDEX_REFRESH_SECONDS)
+        coloring_pages = None
+        if settings.COLORING_PAGES:
+            coloring_pages = ColoringPageGenerator(
+                warm_per_template=settings.COLORING_WARM_PAGES,
+                workers=settings.COLORING_WORKERS,
+                page_size=settings.PAGE_SIZE
+            )
+            coloring_pages.start()
+        printer_controller = PrinterController(
+            default_printer=settings.DEFAULT_PRINTER,
+            connection=connection,
+            scheduler=scheduler,
+            renderer=renderer,
+            image_pipeline=image_pipeline,
+            catalog=catalog,
+            coloring_pages=coloring_pages,
+            deduplicator=deduplicator,
+            job_monitor=job_monitor
+        )
         content_filter = ContentFilter()
-        limit_manager = DailyLimitManager()
-        audio_feedback = AudioFeedback()
+        limit_manager = DailyLimitManager(
+            max_daily_prints=settings.DAILY_PRINT_LIMIT,
+            backend=settings.USAGE_STORAGE,
+            child_limits=settings.CHILD_PRINT_LIMITS
+        )
+        device_id = settings.DEVICE_ID or socket.gethostname()
+        rate_limiter = RateLimiter(
+            burst=settings.RATE_LIMIT_BURST,
+            refill_seconds=settings.RATE_LIMIT_REFILL_SECONDS,
+            state_file=Path("config") / "rate_limits.json"
+        )
+        speech_cache = DiskCache(settings.SPEECH_CACHE_DIR,
+                                 max_bytes=settings.SPEECH_CACHE_MAX_MB * 1024 * 1024,
+                                 suffix=".wav")
+        speech_server = None
+        if settings.TTS_SERVER:
+            try:
+                speech_server = SpeechServer(engine_args=(settings.TTS_RATE, settings.TTS_VOLUME))
+            except Exception as e:
+                logger.warning(f"Speech server failed to start, speaking in-process: {e}")
+        audio_feedback = AudioFeedback(speech_cache=speech_cache, tts_rate=settings.TTS_RATE,
+                                       tts_volume=settings.TTS_VOLUME,
+                                       speech_server=speech_server)
+        audio_feedback.warm_up_speech()
+        if settings.TTS_BARGE_IN and voice_recognizer.audio_capture is not None:
+            voice_recognizer.audio_capture.on_speech_start = audio_feedback.barge_in
+        print_queue = PrintQueue(
+            printer_controller,
+            max_pending=settings.PRINT_QUEUE_SIZE,
+            coalesce_window=settings.PRINT_COALESCE_SECONDS,
+            max_wait=settings.PRINT_QUEUE_MAX_WAIT,
+            job_monitor=job_monitor,
+            max_outstanding=settings.PRINT_MAX_OUTSTANDING
+        )
+        
+        processor = CommandProcessor(
+            content_filter, limit_manager, rate_limiter,
+            device_id=device_id,
+            max_rate_delay=settings.RATE_LIMIT_MAX_DELAY,
+            educational_boost=settings.ENABLE_EDUCATIONAL_BOOST,
+            parent_phrase=settings.PARENT_PHRASE
+        )
         
         logger.info("All components initialized successfully")
         
         # Main application loop
         audio_feedback.play_welcome_message()
         
-        while True:
-            try:
-                # Listen for voice commands
-                command = voice_recognizer.listen()
-                
-                if command:
-                    logger.info(f"Voice command received: {command}")
-                    
-                    # Check daily limits
-                    if not limit_manager.can_print():
-                        audio_feedback.play_limit_reached_message()
-                        continue
-                    
-                    # Filter content for kid-friendliness
-                    if not content_filter.is_safe(command):
-                        audio_feedback.play_content_warning()
-                        continue
-                    
-                    # Process print request
-                    success = printer_controller.print_content(command)
-                    
-                    if success:
-                        limit_manager.record_print()
-                        audio_feedback.play_success_message()
-                    else:
-                        audio_feedback.play_error_message()
-                
-            except KeyboardInterrupt:
-                logger.info("Shutting down gracefully...")
-                break
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                audio_feedback.play_error_message()
+        try:
+            if settings.MAIN_LOOP == "pipeline":
+                pipeline = CommandPipeline(
+                    voice_recognizer, processor, printer_controller, audio_feedback,
+                    queue_size=settings.PIPELINE_QUEUE_SIZE,
+                    print_queue=print_queue
+                )
+                try:
+                    asyncio.run(pipeline.run())
+                finally:
+                    pipeline.shutdown()
+            else:
+                run_serial(voice_recognizer, processor, printer_controller, audio_feedback,
+                           print_queue=print_queue)
+        except KeyboardInterrupt:
+            logger.info("Shutting down gracefully...")
+        
+        voice_recognizer.close()
+        if speech_server is not None:
+            speech_server.close()
+        print_queue.close()
+        print_queue.log_latency_report()
+        if renderer is not None:
+            logger.info(f"Render cache: {renderer.cache.stats()}")
+        job_monitor.close()
+        catalog.close()
+        if coloring_pages is not None:
+            coloring_pages.close()
+        rate_limiter.close()
+        limit_manager.close()
     
     except Exception as e:
         logger.error(f"Failed to initialize application: {e}")
@@ -0,0 +1,216 @@
+"""
+Number Announcer Module
+
+Builds "prints remaining" announcements for any count by joining short
+pre-rendered Finnish clips in memory.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from tts_cache import SpeechCache
+from wake_word import read_wav
+
+CROSSFADE_MS = 12
+# Clip edges quieter than this relative to the peak are trimmed
+TRIM_DB = -40
+# Kept around the trimmed speech so consonants are not cut
+TRIM_MARGIN_MS = 10
+
+UNITS = ["nolla", "yksi", "kaksi", "kolme", "neljä", "viisi", "kuusi", "seitsemän",
+         "kahdeksan", "yhdeksän"]
+NUMERAL_WORDS = UNITS[1:] + ["kymmenen", "toista", "kymmentä", "sata", "sataa"]
+
+# Clip name -> text it is synthesized from when there is no recording
+CLIPS: Dict[str, str] = {
+    "intro": "Sinulla on vielä",
+    "tulostus": "tulostus jäljellä tänään.",
+    "tulostusta": "tulostusta jäljellä tänään.",
+    "none_left": "Sinulla ei ole enää tulostuksia jäljellä tänään.",
+    **{word: word for word in NUMERAL_WORDS},
+}
+
+
+def finnish_numeral(number: int) -> List[str]:
+    """
+    Spell 1-999 as the numeral clips it is made of.
+
+    Finnish numerals are compounds of the units and "toista", "kymmentä",
+    "sata" and "sataa", e.g. 23 is kaksi-kymmentä-kolme.
+
+    Args:
+        number: 1-999
+
+    Returns:
+        Clip names in order
+    """
+    if not 1 <= number <= 999:
+        raise ValueError(f"Cannot spell {number}")
+    hundreds, rest = divmod(number, 100)
+    tens, units = divmod(rest, 10)
+
+    words: List[str] = []
+    if hundreds == 1:
+        words.append("sata")
+    elif hundreds > 1:
+        words += [UNITS[hundreds], "sataa"]
+
+    if rest == 10:
+        words.append("kymmenen")
+    elif tens == 1:
+        words += [UNITS[units], "toista"]
+    else:
+        if tens > 1:
+            words += [UNITS[tens], "kymmentä"]
+        if units:
+            words.append(UNITS[units])
+    return words
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Linear-interpolation resampling of mono float samples."""
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    length = int(round(len(samples) * to_rate / from_rate))
+    positions = np.arange(length) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Cut the quiet lead-in and tail a TTS engine or recorder leaves."""
+    if len(samples) == 0:
+        return samples
+    level = np.abs(samples)
+    loud = np.flatnonzero(level >= level.max() * 10 ** (TRIM_DB / 20))
+    margin = sample_rate * TRIM_MARGIN_MS // 1000
+    return samples[max(0, loud[0] - margin):loud[-1] + 1 + margin]
+
+
+def crossfade_concat(pieces: List[np.ndarray], fade: int) -> np.ndarray:
+    """
+    Join clips, overlapping each boundary by ``fade`` samples.
+
+    The end of one clip fades out while the start of the next fades in,
+    so the joins do not click.
+    """
+    fade = min([fade] + [len(piece) // 2 for piece in pieces])
+    total = sum(len(piece) for piece in pieces) - fade * (len(pieces) - 1)
+    out = np.zeros(total, dtype=np.float32)
+    ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+
+    position = 0
+    for index, piece in enumerate(pieces):
+        piece = piece.copy()
+        if fade and index > 0:
+            piece[:fade] *= ramp
+        if fade and index < len(pieces) - 1:
+            piece[-fade:] *= ramp[::-1]
+        out[position:position + len(piece)] += piece
+        position += len(piece) - fade
+    return out
+
+
+class NumberAnnouncer:
+    """
+    Remaining-prints announcements stitched from clips held in memory.
+
+    Every clip is kept as float samples at the playback rate, so an
+    announcement is only a few array copies away for any count.
+    """
+
+    def __init__(self, sample_rate: int = 22050, crossfade_ms: int = CROSSFADE_MS):
+        """
+        Args:
+            sample_rate: Rate the announcements are played at; clips
+                are resampled to it when added
+            crossfade_ms: Overlap between consecutive clips
+        """
+        self.logger = logging.getLogger(__name__)
+        self.sample_rate = sample_rate
+        self.crossfade = sample_rate * crossfade_ms // 1000
+        self.clips: Dict[str, np.ndarray] = {}
+
+    def add_clip(self, name: str, samples: np.ndarray, sample_rate: int) -> None:
+        """
+        Keep a clip in memory.
+
+        Args:
+            name: One of CLIPS
+            samples: int16 mono audio
+            sample_rate: Rate of the samples
+        """
+        audio = samples.astype(np.float32) / 32768.0
+        audio = resample(trim_silence(audio, sample_rate), sample_rate, self.sample_rate)
+        self.clips[name] = audio
+
+    @property
+    def missing(self) -> List[str]:
+        """Clips not loaded yet."""
+        return [name for name in CLIPS if name not in self.clips]
+
+    def load_recordings(self, directory: Union[str, Path]) -> int:
+        """
+        Load recorded clips from ``<directory>/<clip name>.wav``.
+
+        Returns:
+            Number of clips loaded
+        """
+        count = 0
+        for name in self.missing:
+            path = Path(directory) / f"{name}.wav"
+            if not path.exists():
+                continue
+            try:
+                samples, rate = read_wav(path)
+                self.add_clip(name, samples, rate)
+                count += 1
+            except Exception as e:
+                self.logger.error(f"Could not load clip {path}: {e}")
+        return count
+
+    def load_speech(self, speech_cache: SpeechCache) -> int:
+        """
+        Fill in missing clips with synthesized speech.
+
+        Returns:
+            Number of clips loaded
+        """
+        count = 0
+        for name in self.missing:
+            path = speech_cache.get_or_synthesize(CLIPS[name])
+            if path is None:
+                continue
+            try:
+                samples, rate = read_wav(path)
+                self.add_clip(name, samples, rate)
+                count += 1
+            except Exception as e:
+                self.logger.error(f"Could not load synthesized clip {name}: {e}")
+        return count
+
+    def compose(self, count: int) -> Optional[np.ndarray]:
+        """
+        Build the announcement for a number of remaining prints.
+
+        Args:
+            count: Prints left today (0-999)
+
+        Returns:
+            int16 mono samples at ``sample_rate``, or None if a clip it
+            needs is missing
+        """
+        if count <= 0:
+            names = ["none_left"]
+        elif count > 999:
+            return None
+        else:
+            names = (["intro"] + finnish_numeral(count)
+                     + ["tulostus" if count == 1 else "tulostusta"])
+        if any(name not in self.clips for name in names):
+            return None
+
+        audio = crossfade_concat([self.clips[name] for name in names], self.crossfade)
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
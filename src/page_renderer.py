@@ -0,0 +1,174 @@
+"""
+Page Renderer Module
+
+Turns print requests into printer-ready PDF pages, cached on disk.
+"""
+
+import logging
+import textwrap
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from disk_cache import DiskCache, make_key
+
+# Bump when the page layout changes so stale renders are not reused
+RENDER_VERSION = 1
+
+PDF_FORMAT = "application/pdf"
+
+# Page sizes in PDF points (1/72 inch)
+PAGE_SIZES: Dict[str, Tuple[int, int]] = {
+    "A4": (595, 842),
+    "letter": (612, 792),
+}
+
+# Average Helvetica glyph width relative to the font size, for wrapping
+AVERAGE_CHAR_WIDTH = 0.55
+
+
+def _pdf_string(text: str) -> bytes:
+    """Encode text as a PDF literal string in WinAnsiEncoding."""
+    encoded = text.encode("cp1252", errors="replace")
+    escaped = encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + escaped + b")"
+
+
+def text_operators(lines: List[str], x: float, y: float, font_size: int) -> bytes:
+    """
+    PDF content operators drawing lines of Helvetica text.
+
+    Args:
+        lines: Text lines, top to bottom
+        x: Left edge in points
+        y: Baseline of the first line in points
+        font_size: Font size in points
+
+    Returns:
+        Content stream fragment
+    """
+    leading = round(font_size * 1.25)
+    content = [b"BT", f"/F1 {font_size} Tf {leading} TL".encode("ascii"),
+               f"{x:g} {y:g} Td".encode("ascii")]
+    for index, line in enumerate(lines):
+        if index:
+            content.append(b"T*")
+        content.append(_pdf_string(line) + b" Tj")
+    content.append(b"ET")
+    return b"\n".join(content)
+
+
+def build_pdf(content: bytes, page_size: Tuple[int, int]) -> bytes:
+    """
+    Build a one-page PDF from a content stream.
+
+    Helvetica is available as font /F1. The output is deterministic (no
+    timestamps or ids), so equal input always yields equal bytes.
+
+    Args:
+        content: Page content stream (PDF drawing operators)
+        page_size: Width and height in points
+
+    Returns:
+        PDF file content
+    """
+    width, height = page_size
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+         f"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>").encode("ascii"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        f"<< /Length {len(content)} >>\nstream\n".encode("ascii") + content + b"\nendstream",
+    ]
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        pdf += f"{offset:010d} 00000 n \n".encode("ascii")
+    pdf += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n").encode("ascii")
+    return bytes(pdf)
+
+
+def build_text_pdf(lines: List[str], page_size: Tuple[int, int], font_size: int,
+                   margin: int) -> bytes:
+    """
+    Build a one-page PDF showing lines of Helvetica text.
+
+    Args:
+        lines: Text lines, top to bottom
+        page_size: Width and height in points
+        font_size: Font size in points
+        margin: Page margin in points
+
+    Returns:
+        PDF file content
+    """
+    height = page_size[1]
+    content = text_operators(lines, margin, height - margin - font_size, font_size)
+    return build_pdf(content, page_size)
+
+
+class PageRenderer:
+    """
+    Renders print requests to PDF pages through a content-addressed cache.
+
+    The cache key covers the text and every render setting, so a repeated
+    request is served from disk and goes straight to spooling.
+    """
+
+    def __init__(self, cache: DiskCache, page_size: str = "A4",
+                 font_size: int = 36, margin: int = 56):
+        self.logger = logging.getLogger(__name__)
+        if page_size not in PAGE_SIZES:
+            raise ValueError(f"Unknown page size: {page_size}")
+        self.cache = cache
+        self.page_size = page_size
+        self.font_size = font_size
+        self.margin = margin
+
+    def layout(self, text: str) -> List[str]:
+        """Wrap text into lines that fit the page width."""
+        width, height = PAGE_SIZES[self.page_size]
+        chars_per_line = max(1, int((width - 2 * self.margin)
+                                    / (self.font_size * AVERAGE_CHAR_WIDTH)))
+        max_lines = max(1, int((height - 2 * self.margin) / (self.font_size * 1.25)))
+
+        lines: List[str] = []
+        for paragraph in text.splitlines() or [""]:
+            lines.extend(textwrap.wrap(paragraph, chars_per_line) or [""])
+        return lines[:max_lines]
+
+    def render_bytes(self, text: str) -> bytes:
+        """Render text to PDF bytes without touching the cache."""
+        return build_text_pdf(self.layout(text), PAGE_SIZES[self.page_size],
+                              self.font_size, self.margin)
+
+    def cache_key(self, text: str) -> str:
+        """Cache key of a text under the current render settings."""
+        return make_key("text", RENDER_VERSION, text, self.page_size,
+                        self.font_size, self.margin)
+
+    def render(self, text: str) -> Path:
+        """
+        Render text to a cached PDF page.
+
+        Args:
+            text: Text to put on the page
+
+        Returns:
+            Path of the PDF
+        """
+        key = self.cache_key(text)
+        path = self.cache.get(key)
+        if path is not None:
+            self.logger.debug(f"Render cache hit for: {text[:50]}")
+            return path
+
+        return self.cache.put(key, self.render_bytes(text))
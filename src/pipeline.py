@@ -0,0 +1,426 @@
+"""
+Command Pipeline Module
+
+Runs voice commands through listen, recognize, moderate, print and
+feedback stages, either one command at a time or as an asyncio pipeline.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from image_dedup import DuplicateImageError
+from print_queue import EDUCATIONAL, NORMAL, PARENT
+
+# Feedback events, mapped to AudioFeedback methods
+SUCCESS = "success"
+ERROR = "error"
+LIMIT_REACHED = "limit_reached"
+CONTENT_WARNING = "content_warning"
+RATE_LIMITED = "rate_limited"
+DUPLICATE_IMAGE = "duplicate_image"
+
+# Pause after a failed capture, so a broken microphone does not spin
+LISTEN_RETRY_DELAY = 1.0
+
+FEEDBACK_METHODS = {
+    SUCCESS: "play_success_message",
+    ERROR: "play_error_message",
+    LIMIT_REACHED: "play_limit_reached_message",
+    CONTENT_WARNING: "play_content_warning",
+    RATE_LIMITED: "play_rate_limited_message",
+    DUPLICATE_IMAGE: "play_duplicate_image_message",
+}
+
+
+def play_feedback(audio_feedback, event: str) -> None:
+    """Play the audio message for a feedback event."""
+    getattr(audio_feedback, FEEDBACK_METHODS[event])()
+
+
+class CommandProcessor:
+    """Decides whether a recognized command may be printed."""
+
+    def __init__(self, content_filter, limit_manager, rate_limiter=None,
+                 device_id: str = "default", max_rate_delay: float = 0.0,
+                 educational_boost: bool = False, parent_phrase: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.content_filter = content_filter
+        self.limit_manager = limit_manager
+        self.rate_limiter = rate_limiter
+        self.device_id = device_id
+        self.max_rate_delay = max_rate_delay
+        self.educational_boost = educational_boost
+        # Words a parent starts a command with to print ahead of the children
+        self.parent_phrase = (parent_phrase or "").lower().split()
+
+    def admit(self, command: str) -> Optional[str]:
+        """
+        Run limit, content and rate checks and reserve a print.
+
+        Args:
+            command: Recognized voice command
+
+        Returns:
+            None if a print was reserved, otherwise the feedback event
+            explaining the rejection
+        """
+        # Check daily limits
+        if not self.limit_manager.can_print():
+            return LIMIT_REACHED
+
+        # Filter content for kid-friendliness
+        if not self.content_filter.is_safe(command):
+            return CONTENT_WARNING
+
+        # Reserve a print atomically; other processes share the budget
+        if not self.limit_manager.try_record_print(device=self.device_id):
+            return LIMIT_REACHED
+
+        # Spread prints out so the printer queue is not flooded; the token
+        # is only taken once the print is reserved, so a refusal above
+        # does not use one up
+        if self.rate_limiter and not self.rate_limiter.acquire(max_wait=self.max_rate_delay):
+            self.refund()
+            return RATE_LIMITED
+
+        return None
+
+    def preview(self, partial: str) -> bool:
+        """
+        Check a partial transcript while the child is still speaking.
+
+        Args:
+            partial: Text recognized so far
+
+        Returns:
+            True if the command will be rejected whatever follows (it
+            already contains a blocked word), so recognition can stop
+        """
+        return self.content_filter.classify(partial).reason == "blocked"
+
+    def complete(self, success: bool) -> str:
+        """
+        Settle a reserved print after the print attempt.
+
+        Args:
+            success: Whether the print job was submitted
+
+        Returns:
+            Feedback event to play
+        """
+        if success:
+            return SUCCESS
+        self.refund()
+        return ERROR
+
+    def refund(self) -> None:
+        """Give back a reserved print that was not printed."""
+        self.limit_manager.refund_print(device=self.device_id)
+
+    def _parent_request(self, command: str) -> Optional[str]:
+        """The request following the parent phrase, or None if there is none."""
+        if not self.parent_phrase:
+            return None
+        words = command.split()
+        count = len(self.parent_phrase)
+        if len(words) <= count:
+            return None
+        if [word.lower().strip(",.!") for word in words[:count]] != self.parent_phrase:
+            return None
+        return " ".join(words[count:])
+
+    def printable(self, command: str) -> str:
+        """Content to print for an admitted command, without the parent phrase."""
+        request = self._parent_request(command)
+        return command if request is None else request
+
+    def priority(self, command: str) -> str:
+        """Print queue priority class of an admitted command."""
+        if self._parent_request(command) is not None:
+            return PARENT
+        if self.educational_boost and self.content_filter.is_educational_content(command):
+            return EDUCATIONAL
+        return NORMAL
+
+
+def print_inline(printer_controller, processor: CommandProcessor, command: str) -> str:
+    """
+    Print a reserved command right away and settle the reservation.
+
+    A picture refused as a reprint is refunded like a failed print but
+    gets its own feedback event.
+
+    Returns:
+        Feedback event to play
+    """
+    try:
+        success = printer_controller.print_content(processor.printable(command))
+    except DuplicateImageError:
+        processor.refund()
+        return DUPLICATE_IMAGE
+    return processor.complete(success)
+
+
+def queue_print(print_queue, processor: CommandProcessor, command: str,
+                on_duplicate: Optional[Callable[[], None]] = None) -> str:
+    """
+    Hand a reserved print to the print queue without waiting for it.
+
+    A request merged into an identical recent one is refunded, as is a
+    queued job that later fails.
+
+    Args:
+        print_queue: PrintQueue running the jobs
+        processor: Admission logic holding the reservation
+        command: Recognized voice command
+        on_duplicate: Called (on the print worker) if the job turns out
+            to be a picture already printed today and is refused
+
+    Returns:
+        Feedback event to play right away
+    """
+    job = print_queue.submit(processor.printable(command),
+                             priority=processor.priority(command))
+    if job is None:
+        # The printer is saturated; ask the child to wait a moment
+        processor.refund()
+        return RATE_LIMITED
+
+    if job.coalesced:
+        processor.refund()
+        return SUCCESS
+
+    def settle(done) -> None:
+        if not done.cancelled() and isinstance(done.exception(), DuplicateImageError):
+            processor.refund()
+            if on_duplicate is not None:
+                on_duplicate()
+            return
+        if done.cancelled() or done.exception() is not None or not done.result():
+            logging.getLogger(__name__).error(f"Queued print failed: {command[:50]}")
+            processor.refund()
+
+    job.add_done_callback(settle)
+    return SUCCESS
+
+
+def run_serial(voice_recognizer, processor: CommandProcessor, printer_controller,
+               audio_feedback, max_commands: Optional[int] = None,
+               print_queue=None) -> None:
+    """
+    Handle commands strictly one after another.
+
+    Args:
+        voice_recognizer: Provides listen()
+        processor: Admission logic
+        printer_controller: Provides print_content()
+        audio_feedback: Plays feedback messages
+        max_commands: Stop after this many commands (None runs forever)
+        print_queue: PrintQueue to hand prints to instead of printing inline
+    """
+    logger = logging.getLogger(__name__)
+    handled = 0
+
+    while max_commands is None or handled < max_commands:
+        try:
+            # Listen for voice commands
+            command = voice_recognizer.listen(on_partial=processor.preview)
+            if not command:
+                continue
+
+            logger.info(f"Voice command received: {command}")
+            handled += 1
+
+            event = processor.admit(command)
+            if event is None and print_queue is not None:
+                event = queue_print(
+                    print_queue, processor, command,
+                    on_duplicate=lambda: play_feedback(audio_feedback, DUPLICATE_IMAGE)
+                )
+            elif event is None:
+                # Process print request
+                event = print_inline(printer_controller, processor, command)
+            play_feedback(audio_feedback, event)
+
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            logger.error(f"Error in main loop: {e}")
+            play_feedback(audio_feedback, ERROR)
+
+
+class _Command(NamedTuple):
+    """A command moving through the pipeline."""
+
+    captured_at: float
+    audio: Any = None
+    text: Optional[str] = None
+    event: Optional[str] = None
+
+
+class CommandPipeline:
+    """
+    Asyncio pipeline with one task per stage, joined by bounded queues.
+
+    Every blocking call runs on a dedicated single-thread executor per
+    stage, so each component is always used from the same thread. The
+    microphone keeps capturing the next command while the previous one
+    is recognized, spooled and announced; the bounded queues stop the
+    listener from running ahead of a stalled printer.
+    """
+
+    def __init__(self, voice_recognizer, processor: CommandProcessor,
+                 printer_controller, audio_feedback, queue_size: int = 2,
+                 listen_timeout: int = 5, print_queue=None):
+        self.logger = logging.getLogger(__name__)
+        self.voice_recognizer = voice_recognizer
+        self.processor = processor
+        self.printer_controller = printer_controller
+        self.audio_feedback = audio_feedback
+        self.queue_size = queue_size
+        self.listen_timeout = listen_timeout
+        self.print_queue = print_queue
+
+        self._executors: Dict[str, ThreadPoolExecutor] = {
+            stage: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"pipeline-{stage}")
+            for stage in ("listen", "recognize", "moderate", "print", "feedback")
+        }
+        self._max_commands: Optional[int] = None
+        self._handled = 0
+        self._done: Optional[asyncio.Event] = None
+
+        # (captured_at, finished_at) per handled command
+        self.timings: List[tuple] = []
+
+    async def _call(self, stage: str, func: Callable, *args):
+        """Run a blocking call on the stage's executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executors[stage], func, *args)
+
+    def _duplicate_refused(self) -> None:
+        """Tell the child a queued picture was refused as a reprint."""
+        self._executors["feedback"].submit(play_feedback, self.audio_feedback, DUPLICATE_IMAGE)
+
+    async def _listen(self, output: asyncio.Queue) -> None:
+        while True:
+            captured_at = time.monotonic()
+            try:
+                audio = await self._call("listen", self.voice_recognizer.capture,
+                                         self.listen_timeout)
+            except Exception as e:
+                self.logger.error(f"Error capturing audio: {e}")
+                await asyncio.sleep(LISTEN_RETRY_DELAY)
+                continue
+            if audio is not None:
+                await output.put(_Command(captured_at, audio=audio))
+
+    async def _recognize(self, source: asyncio.Queue, output: asyncio.Queue) -> None:
+        while True:
+            command = await source.get()
+            try:
+                text = await self._call("recognize", self.voice_recognizer.recognize,
+                                        command.audio, self.processor.preview)
+            except Exception as e:
+                self.logger.error(f"Error recognizing command: {e}")
+                continue
+            if text:
+                self.logger.info(f"Voice command received: {text}")
+                await output.put(command._replace(audio=None, text=text))
+
+    async def _moderate(self, source: asyncio.Queue, print_queue: asyncio.Queue,
+                        feedback_queue: asyncio.Queue) -> None:
+        while True:
+            command = await source.get()
+            try:
+                event = await self._call("moderate", self.processor.admit, command.text)
+            except Exception as e:
+                self.logger.error(f"Error checking command: {e}")
+                event = ERROR
+            if event is None:
+                await print_queue.put(command)
+            else:
+                await feedback_queue.put(command._replace(event=event))
+
+    async def _print(self, source: asyncio.Queue, output: asyncio.Queue) -> None:
+        while True:
+            command = await source.get()
+            if self.print_queue is not None:
+                try:
+                    event = await self._call(
+                        "print", queue_print, self.print_queue, self.processor, command.text,
+                        self._duplicate_refused
+                    )
+                except Exception as e:
+                    self.logger.error(f"Error queueing command: {e}")
+                    event = await self._call("moderate", self.processor.complete, False)
+                await output.put(command._replace(event=event))
+                continue
+
+            try:
+                event = await self._call("print", print_inline, self.printer_controller,
+                                         self.processor, command.text)
+            except Exception as e:
+                self.logger.error(f"Error printing command: {e}")
+                event = await self._call("moderate", self.processor.complete, False)
+            await output.put(command._replace(event=event))
+
+    async def _feedback(self, source: asyncio.Queue) -> None:
+        while True:
+            command = await source.get()
+            try:
+                await self._call("feedback", play_feedback, self.audio_feedback,
+                                 command.event)
+            except Exception as e:
+                self.logger.error(f"Error playing feedback: {e}")
+
+            self.timings.append((command.captured_at, time.monotonic()))
+            self._handled += 1
+            if self._max_commands is not None and self._handled >= self._max_commands:
+                self._done.set()
+
+    async def run(self, max_commands: Optional[int] = None) -> None:
+        """
+        Run the pipeline.
+
+        Args:
+            max_commands: Stop after this many commands got feedback
+                (None runs until cancelled)
+        """
+        self._max_commands = max_commands
+        self._handled = 0
+        self._done = asyncio.Event()
+
+        audio_queue = asyncio.Queue(self.queue_size)
+        text_queue = asyncio.Queue(self.queue_size)
+        print_queue = asyncio.Queue(self.queue_size)
+        feedback_queue = asyncio.Queue(self.queue_size)
+
+        tasks = [
+            asyncio.ensure_future(self._listen(audio_queue)),
+            asyncio.ensure_future(self._recognize(audio_queue, text_queue)),
+            asyncio.ensure_future(self._moderate(text_queue, print_queue, feedback_queue)),
+            asyncio.ensure_future(self._print(print_queue, feedback_queue)),
+            asyncio.ensure_future(self._feedback(feedback_queue)),
+        ]
+        self.logger.info("Command pipeline started")
+
+        done_waiter = asyncio.ensure_future(self._done.wait())
+        try:
+            finished, _ = await asyncio.wait(tasks + [done_waiter],
+                                             return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                if task is not done_waiter and task.exception():
+                    raise task.exception()
+        finally:
+            for task in tasks + [done_waiter]:
+                task.cancel()
+            await asyncio.gather(*tasks, done_waiter, return_exceptions=True)
+            self.logger.info("Command pipeline stopped")
+
+    def shutdown(self) -> None:
+        """Release the stage threads (waits for running calls to return)."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
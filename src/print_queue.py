@@ -0,0 +1,290 @@
+"""
+Print Queue Module
+
+Background print worker with request coalescing, backpressure and
+priority scheduling.
+"""
+
+import itertools
+import logging
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from job_monitor import COMPLETED
+from latency_stats import LATENCY_HISTORY, percentile
+
+# Priority classes
+PARENT = "parent"
+EDUCATIONAL = "educational"
+NORMAL = "normal"
+
+# Seconds a job of each class is treated as having waited less than it did;
+# a normal job is overtaken by a later parent job only within this margin
+DEFAULT_PRIORITY_DELAYS = {
+    PARENT: 0.0,
+    EDUCATIONAL: 20.0,
+    NORMAL: 60.0,
+}
+
+
+class PrintFuture(Future):
+    """Handle for a queued print; resolves to True if the job printed."""
+
+    def __init__(self, content: str, coalesced: bool = False, priority: str = NORMAL):
+        super().__init__()
+        self.content = content
+        self.priority = priority
+        self.job_id: Optional[int] = None
+        # True if this request was merged into an identical earlier one
+        self.coalesced = coalesced
+
+
+def _coalesce_key(content: str) -> str:
+    """Normalize a request so repeats of the same words compare equal."""
+    return " ".join(content.lower().split())
+
+
+class PrintQueue:
+    """
+    Runs print jobs on worker threads behind a bounded queue.
+
+    ``submit`` returns immediately with a PrintFuture, so the caller never
+    waits for IPP. A request identical to one submitted less than
+    ``coalesce_window`` seconds earlier is not printed again; its handle
+    follows the earlier job. When ``max_pending`` jobs are already waiting,
+    ``submit`` blocks for at most ``max_wait`` seconds and then rejects the
+    request.
+
+    With a ``job_monitor`` the workers only submit jobs; a handle resolves
+    once the monitor reports the job finished, True only if it completed.
+    At most ``max_outstanding`` jobs are in CUPS at a time; the rest stay
+    in the queue, where they keep their priority and count towards
+    ``max_pending``.
+
+    Waiting jobs are kept in a heap ordered by submission time plus the
+    delay of their priority class, so parent and educational requests
+    overtake casual ones, but only by a bounded margin: every job's key is
+    fixed when it is queued, so a normal job eventually outranks anything
+    submitted later and cannot starve.
+    """
+
+    def __init__(self, printer_controller, max_pending: int = 4,
+                 coalesce_window: float = 10.0, max_wait: float = 0.0,
+                 workers: int = 1, job_monitor=None, max_outstanding: int = 1,
+                 priority_delays: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.printer_controller = printer_controller
+        self.job_monitor = job_monitor
+        self.coalesce_window = coalesce_window
+        self.max_wait = max_wait
+        self.clock = clock
+
+        self.priority_delays = dict(priority_delays or DEFAULT_PRIORITY_DELAYS)
+
+        # Entries are (key, sequence, job); job None stops a worker
+        self._queue: queue.PriorityQueue = queue.PriorityQueue(max(1, max_pending))
+        self._sequence = itertools.count()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._recent: Dict[str, Tuple[float, PrintFuture]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        # Free places for jobs in CUPS; only used with a job monitor
+        self._slots: Optional[threading.Semaphore] = None
+        if job_monitor is not None:
+            self._slots = threading.Semaphore(max(1, max_outstanding))
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+        self._workers: List[threading.Thread] = [
+            threading.Thread(target=self._work, name=f"print-queue-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self.logger.info(
+            f"Print queue started (max pending: {max_pending}, "
+            f"coalesce window: {coalesce_window:g} s)"
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def submit(self, content: str, max_wait: Optional[float] = None,
+               priority: str = NORMAL) -> Optional[PrintFuture]:
+        """
+        Queue content for printing.
+
+        Args:
+            content: Recognized voice command to print
+            max_wait: Longest time to wait for queue space
+                (None uses the queue's default)
+            priority: PARENT, EDUCATIONAL or NORMAL
+
+        Returns:
+            Handle for the job, or None if the queue stayed full
+        """
+        if self._closed:
+            raise RuntimeError("Print queue is closed")
+        if priority not in self.priority_delays:
+            raise ValueError(f"Unknown print priority: {priority}")
+
+        key = _coalesce_key(content)
+        now = self.clock()
+
+        with self._lock:
+            self._recent = {k: entry for k, entry in self._recent.items()
+                            if now - entry[0] < self.coalesce_window}
+            previous = self._recent.get(key)
+            if previous is not None:
+                self.coalesced += 1
+                self.logger.info(f"Coalesced duplicate print request: {content[:50]}")
+                return self._follow(previous[1], content)
+
+            job = PrintFuture(content, priority=priority)
+            self._recent[key] = (now, job)
+
+        entry = (now + self.priority_delays[priority], next(self._sequence), job)
+        wait = self.max_wait if max_wait is None else max_wait
+        try:
+            if wait > 0:
+                self._queue.put(entry, timeout=wait)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                if self._recent.get(key, (None, None))[1] is job:
+                    del self._recent[key]
+                self.rejected += 1
+            self.logger.warning("Print queue full, rejecting request")
+            return None
+
+        self.submitted += 1
+        job.add_done_callback(lambda done: self._record_latency(done, priority, now))
+        return job
+
+    def _record_latency(self, job: Future, priority: str, submitted_at: float) -> None:
+        """Store how long a job took from submission to its outcome."""
+        if job.cancelled():
+            return
+        with self._lock:
+            samples = self._latencies.get(priority)
+            if samples is None:
+                samples = self._latencies[priority] = deque(maxlen=LATENCY_HISTORY)
+            samples.append(self.clock() - submitted_at)
+
+    def latency_percentiles(self, percentiles: Iterable[float] = (50, 90, 99)
+                            ) -> Dict[str, Dict[float, float]]:
+        """
+        Latency from submission to outcome for recent jobs.
+
+        Args:
+            percentiles: Percentiles to report
+
+        Returns:
+            Seconds by percentile, per priority class that has samples
+        """
+        with self._lock:
+            samples = {priority: sorted(values)
+                       for priority, values in self._latencies.items() if values}
+        return {priority: {pct: percentile(values, pct) for pct in percentiles}
+                for priority, values in samples.items()}
+
+    def log_latency_report(self) -> None:
+        """Log latency percentiles per priority class."""
+        for priority, values in self.latency_percentiles().items():
+            report = ", ".join(f"p{pct:g} {seconds:.1f} s" for pct, seconds in values.items())
+            self.logger.info(f"Print latency ({priority}): {report}")
+
+    @staticmethod
+    def _follow(original: PrintFuture, content: str) -> PrintFuture:
+        """Create a coalesced handle that resolves together with ``original``."""
+        follower = PrintFuture(content, coalesced=True)
+
+        def copy_result(done: Future) -> None:
+            if done.cancelled():
+                follower.cancel()
+            elif done.exception() is not None:
+                follower.set_exception(done.exception())
+            else:
+                follower.set_result(done.result())
+
+        original.add_done_callback(copy_result)
+        return follower
+
+    def _work(self) -> None:
+        """Worker loop: print queued jobs until a stop marker arrives."""
+        while True:
+            if self._slots is not None:
+                # Take a job only when CUPS has room for it, so waiting
+                # jobs stay in the heap and are still ordered by priority
+                self._slots.acquire()
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            watched = False
+            try:
+                if not job.set_running_or_notify_cancel():
+                    continue
+                if self.job_monitor is None:
+                    job.set_result(self.printer_controller.print_content(job.content))
+                    continue
+
+                job_id = self.printer_controller.submit_content(job.content)
+                if job_id is None:
+                    job.set_result(False)
+                else:
+                    job.job_id = job_id
+                    self.job_monitor.watch(
+                        job_id, lambda _, outcome, job=job: self._finished(job, outcome)
+                    )
+                    watched = True
+            except Exception as e:
+                self.logger.error(f"Error printing queued job: {e}")
+                job.set_exception(e)
+            finally:
+                if self._slots is not None and not watched:
+                    self._slots.release()
+
+    def _finished(self, job: PrintFuture, outcome: str) -> None:
+        """Resolve a monitored job and let the next one go to CUPS."""
+        self._slots.release()
+        job.set_result(outcome == COMPLETED)
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs and shut the workers down.
+
+        Args:
+            wait: Finish the queued jobs first; otherwise cancel them
+        """
+        self._closed = True
+        if not wait:
+            while True:
+                try:
+                    _, _, job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job.cancel()
+            if self._slots is not None:
+                # Workers waiting for CUPS to finish a job go straight to
+                # their stop markers
+                for _ in self._workers:
+                    self._slots.release()
+
+        # Stop markers sort after every queued job
+        for _ in self._workers:
+            self._queue.put((math.inf, next(self._sequence), None))
+        for worker in self._workers:
+            worker.join(timeout=30)
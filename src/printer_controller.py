@@ -5,78 +5,272 @@ Handles communication with printers for the child's automatic printer system.
 """
 
 import logging
-import cups
-from typing import Optional, List
+import os
+import tempfile
+from typing import Callable, Iterator, List, Optional, Sequence
 from pathlib import Path
 
+from cups_connection import CupsConnection
+from image_dedup import DuplicateImageError
+from job_monitor import COMPLETED
+from page_renderer import PDF_FORMAT
+
+# Size of the pieces documents are streamed to CUPS in
+CHUNK_SIZE = 64 * 1024
+
+# RAM-backed directory for fallback spool files (avoids SD-card writes)
+TMPFS_DIR = "/dev/shm"
+
+TEXT_FORMAT = "text/plain"
+AUTO_FORMAT = "application/octet-stream"
+
 
 class PrinterController:
     """Controls printer operations for kid-friendly content."""
     
-    def __init__(self):
+    def __init__(self, default_printer: Optional[str] = None, cache_ttl: float = 30.0,
+                 connection: Optional[CupsConnection] = None, scheduler=None,
+                 renderer=None, image_pipeline=None, catalog=None, coloring_pages=None,
+                 deduplicator=None, job_monitor=None):
         self.logger = logging.getLogger(__name__)
-        try:
-            self.conn = cups.Connection()
-            self.logger.info("Connected to CUPS printing system")
-        except Exception as e:
-            self.logger.error(f"Failed to connect to printer system: {e}")
-            self.conn = None
+        self.default_printer = default_printer
+        self.connection = connection or CupsConnection(cache_ttl=cache_ttl)
+        self.connection.connect()
+        # Optional PrinterScheduler spreading jobs over several printers
+        self.scheduler = scheduler
+        # Optional PageRenderer turning requests into cached PDF pages
+        self.renderer = renderer
+        # Optional ImagePipeline resampling images for the target printer
+        self.image_pipeline = image_pipeline
+        # Optional ImageCatalog resolving picture requests to image files
+        self.catalog = catalog
+        # Optional ColoringPageGenerator drawing coloring pages on request
+        self.coloring_pages = coloring_pages
+        # Optional ImageDeduplicator catching pictures reprinted the same day
+        self.deduplicator = deduplicator
+        # Optional JobMonitor; pictures then count as printed once completed
+        self.job_monitor = job_monitor
     
     def get_available_printers(self) -> List[str]:
         """Get list of available printers."""
-        if not self.conn:
+        try:
+            return self.connection.get_printer_names()
+        except Exception as e:
+            self.logger.error(f"Error getting printers: {e}")
             return []
+    
+    def _resolve_printer(self, printer_name: Optional[str],
+                         exclude: Sequence[str] = ()) -> Optional[str]:
+        """
+        Pick the printer for a job.
+        
+        Args:
+            printer_name: Explicitly requested printer, if any
+            exclude: Printers that already failed this job
+            
+        Returns:
+            Printer name, or None if no printer is available
+        """
+        if printer_name:
+            return printer_name
         
         try:
-            printers = self.conn.getPrinters()
-            printer_names = list(printers.keys())
-            self.logger.info(f"Available printers: {printer_names}")
-            return printer_names
+            if self.scheduler is not None:
+                return self.scheduler.choose(exclude)
+            if self.default_printer:
+                return self.default_printer
+            return self.connection.get_default_printer()
         except Exception as e:
             self.logger.error(f"Error getting printers: {e}")
-            return []
+            return None
     
-    def print_text(self, text: str, printer_name: Optional[str] = None) -> bool:
+    def _submit(self, send: Callable[[str], int], printer_name: Optional[str],
+                kind: str) -> Optional[int]:
         """
-        Print text content.
+        Submit a job, failing over to another printer if the scheduler has one.
+        
+        Args:
+            send: Submits the job to the given printer and returns its id
+            printer_name: Specific printer to use (None lets the scheduler pick)
+            kind: Kind of document, for log messages
+            
+        Returns:
+            CUPS job id, or None if the job could not be submitted
+        """
+        failed: List[str] = []
+        while True:
+            printer = self._resolve_printer(printer_name, failed)
+            if not printer:
+                self.logger.error("No printers available")
+                return None
+            
+            try:
+                job_id = send(printer)
+            except Exception as e:
+                self.logger.error(f"Error printing {kind} on {printer}: {e}")
+                if self.scheduler is None:
+                    return None
+                self.scheduler.record_result(printer, False)
+                if printer_name:
+                    return None
+                failed.append(printer)
+                continue
+            
+            if self.scheduler is not None:
+                self.scheduler.job_submitted(printer, job_id)
+            self.logger.info(f"Print job ({kind}) submitted to {printer} with ID: {job_id}")
+            return job_id
+    
+    def submit_text(self, text: str, printer_name: Optional[str] = None) -> Optional[int]:
+        """
+        Submit text content straight from memory.
         
         Args:
             text: Text to print
             printer_name: Specific printer to use (None for default)
             
         Returns:
-            True if print job was submitted successfully
+            CUPS job id, or None if the job could not be submitted
+        """
+        return self.submit_data(text.encode("utf-8"), "Kid Printer Text", TEXT_FORMAT,
+                                printer_name, kind="text", suffix=".txt")
+    
+    def submit_data(self, data: bytes, title: str, doc_format: str = AUTO_FORMAT,
+                    printer_name: Optional[str] = None, kind: str = "document",
+                    suffix: str = "") -> Optional[int]:
         """
-        if not self.conn:
-            self.logger.error("No printer connection available")
-            return False
+        Submit a document held in memory, streamed in chunks.
         
-        try:
-            # Create temporary text file
-            temp_file = Path("/tmp/kidprinter_text.txt")
-            temp_file.write_text(text, encoding="utf-8")
+        Args:
+            data: Document bytes
+            title: Job title
+            doc_format: MIME type of the document
+            printer_name: Specific printer to use (None for default)
+            kind: Kind of document, for log messages
+            suffix: Extension of the fallback spool file
             
-            # Submit print job
-            if printer_name:
-                job_id = self.conn.printFile(printer_name, str(temp_file), "Kid Printer Text", {})
-            else:
-                # Use default printer
-                printers = self.get_available_printers()
-                if not printers:
-                    self.logger.error("No printers available")
-                    return False
-                job_id = self.conn.printFile(printers[0], str(temp_file), "Kid Printer Text", {})
+        Returns:
+            CUPS job id, or None if the job could not be submitted
+        """
+        def send(printer: str) -> int:
+            chunks = (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+            try:
+                return self.connection.submit_stream(printer, title, chunks, doc_format)
+            except Exception as e:
+                self.logger.warning(f"Streaming {kind} job failed ({e}), using spool file")
+                return self._print_spooled(printer, data, title, suffix)
+        
+        return self._submit(send, printer_name, kind)
+    
+    def submit_image(self, image_path: str, printer_name: Optional[str] = None) -> Optional[int]:
+        """
+        Submit an image file, streamed in chunks.
+        
+        With an image pipeline the image is first resampled to the chosen
+        printer's resolution and paper size. With a deduplicator, a picture
+        already printed today may be refused, depending on its policy. A
+        picture is remembered as printed when its job is submitted, or with
+        a job monitor only once the job completed, so an aborted or timed
+        out job can be retried.
+        
+        Args:
+            image_path: Path to image file
+            printer_name: Specific printer to use (None for default)
             
-            self.logger.info(f"Print job submitted with ID: {job_id}")
+        Returns:
+            CUPS job id, or None if the job could not be submitted
             
-            # Clean up temp file
-            temp_file.unlink(missing_ok=True)
+        Raises:
+            DuplicateImageError: if the deduplicator refused a reprint
+        """
+        if not Path(image_path).exists():
+            self.logger.error(f"Image file not found: {image_path}")
+            return None
+        
+        dedup = None
+        if self.deduplicator is not None:
+            dedup = self.deduplicator.check(image_path)
+            if not dedup.allowed:
+                raise DuplicateImageError(image_path, dedup.match.path)
+        
+        job_id = self._submit_image(image_path, printer_name)
+        if job_id is None or dedup is None or dedup.image_hash is None:
+            return job_id
+        
+        if self.job_monitor is None:
+            self.deduplicator.record(dedup.image_hash, image_path)
+            return job_id
+        
+        def remember(_, outcome: str) -> None:
+            if outcome == COMPLETED:
+                self.deduplicator.record(dedup.image_hash, image_path)
+        
+        self.job_monitor.watch(job_id, remember)
+        return job_id
+    
+    def _submit_image(self, image_path: str, printer_name: Optional[str]) -> Optional[int]:
+        """Submit an existing image file, prepared for the printer if possible."""
+        if self.image_pipeline is None:
+            return self.submit_file(image_path, "Kid Printer Image", AUTO_FORMAT,
+                                    printer_name, kind="image")
+        
+        def send(printer: str) -> int:
+            try:
+                profile = self.image_pipeline.printer_profile(self.connection, printer)
+                prepared = self.image_pipeline.prepare(image_path, profile)
+            except Exception as e:
+                self.logger.warning(f"Could not prepare image ({e}), sending original")
+                return self.connection.submit_stream(printer, "Kid Printer Image",
+                                                     self._read_chunks(image_path),
+                                                     AUTO_FORMAT)
             
-            return True
+            data = prepared.data
+            chunks = (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+            return self.connection.submit_stream(printer, "Kid Printer Image", chunks,
+                                                 prepared.doc_format)
+        
+        return self._submit(send, printer_name, "image")
+    
+    def submit_file(self, path: str, title: str, doc_format: str = AUTO_FORMAT,
+                    printer_name: Optional[str] = None, kind: str = "document") -> Optional[int]:
+        """
+        Submit a printer-ready file, streamed in chunks.
+        
+        Args:
+            path: File to print
+            title: Job title
+            doc_format: MIME type of the file
+            printer_name: Specific printer to use (None for default)
+            kind: Kind of document, for log messages
             
-        except Exception as e:
-            self.logger.error(f"Error printing text: {e}")
-            return False
+        Returns:
+            CUPS job id, or None if the job could not be submitted
+        """
+        path = str(path)
+        
+        def send(printer: str) -> int:
+            try:
+                return self.connection.submit_stream(printer, title, self._read_chunks(path),
+                                                     doc_format)
+            except Exception as e:
+                self.logger.warning(f"Streaming {kind} job failed ({e}), submitting file")
+                return self.connection.call("printFile", printer, path, title, {},
+                                            idempotent=False)
+        
+        return self._submit(send, printer_name, kind)
+    
+    def print_text(self, text: str, printer_name: Optional[str] = None) -> bool:
+        """
+        Print text content.
+        
+        Args:
+            text: Text to print
+            printer_name: Specific printer to use (None for default)
+            
+        Returns:
+            True if print job was submitted successfully
+        """
+        return self.submit_text(text, printer_name) is not None
     
     def print_image(self, image_path: str, printer_name: Optional[str] = None) -> bool:
         """
@@ -89,30 +283,84 @@ class PrinterController:
         Returns:
             True if print job was submitted successfully
         """
-        if not self.conn:
-            self.logger.error("No printer connection available")
-            return False
+        return self.submit_image(image_path, printer_name) is not None
+    
+    @staticmethod
+    def _read_chunks(path: str) -> Iterator[bytes]:
+        """Read a file lazily in CHUNK_SIZE pieces."""
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    
+    def _print_spooled(self, printer: str, data: bytes, title: str,
+                       suffix: str = ".txt") -> int:
+        """
+        Submit data through a private temporary file.
         
-        if not Path(image_path).exists():
-            self.logger.error(f"Image file not found: {image_path}")
-            return False
+        Each job gets its own file, on tmpfs when available, so overlapping
+        jobs never share a path.
         
+        Args:
+            printer: Destination printer
+            data: Document bytes
+            title: Job title
+            suffix: File name extension, which CUPS uses to detect the format
+            
+        Returns:
+            CUPS job id
+        """
+        spool_dir = TMPFS_DIR if os.path.isdir(TMPFS_DIR) else None
+        fd, temp_path = tempfile.mkstemp(prefix="kidprinter_", suffix=suffix, dir=spool_dir)
         try:
-            if printer_name:
-                job_id = self.conn.printFile(printer_name, image_path, "Kid Printer Image", {})
-            else:
-                printers = self.get_available_printers()
-                if not printers:
-                    self.logger.error("No printers available")
-                    return False
-                job_id = self.conn.printFile(printers[0], image_path, "Kid Printer Image", {})
-            
-            self.logger.info(f"Image print job submitted with ID: {job_id}")
-            return True
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return self.connection.call("printFile", printer, temp_path, title, {},
+                                        idempotent=False)
+        finally:
+            os.unlink(temp_path)
+    
+    def submit_content(self, content: str) -> Optional[int]:
+        """
+        Submit content based on voice command.
+        
+        Args:
+            content: Recognized voice command
             
-        except Exception as e:
-            self.logger.error(f"Error printing image: {e}")
-            return False
+        Returns:
+            CUPS job id, or None if the job could not be submitted
+        """
+        # Simple logic - can be expanded based on command parsing
+        if "väritys" in content and self.coloring_pages is not None:
+            try:
+                page = self.coloring_pages.get_page(content)
+                return self.submit_data(page, "Kid Printer Coloring Page", PDF_FORMAT,
+                                        kind="coloring page", suffix=".pdf")
+            except Exception as e:
+                self.logger.error(f"Error generating coloring page: {e}")
+                return None
+        
+        if "kuva" in content or "piirros" in content:
+            image = self.catalog.find(content) if self.catalog is not None else None
+            if image is not None:
+                self.logger.info(f"Printing catalog image {image.name}")
+                return self.submit_image(str(image))
+            
+            # No matching picture; print the text request instead
+            text = f"Kuva-pyyntö: {content}"
+        else:
+            text = content
+        
+        if self.renderer is not None:
+            try:
+                page = self.renderer.render(text)
+                return self.submit_file(page, "Kid Printer Page", PDF_FORMAT, kind="page")
+            except Exception as e:
+                self.logger.error(f"Error rendering page, printing plain text: {e}")
+        
+        return self.submit_text(text)
     
     def print_content(self, content: str) -> bool:
         """
@@ -124,10 +372,4 @@ class PrinterController:
         Returns:
             True if content was printed successfully
         """
-        # Simple logic - can be expanded based on command parsing
-        if "kuva" in content or "piirros" in content:
-            # For now, just print the text request
-            # TODO: Implement image generation/selection
-            return self.print_text(f"Kuva-pyyntö: {content}")
-        else:
-            return self.print_text(content)
+        return self.submit_content(content) is not None
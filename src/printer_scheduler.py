@@ -0,0 +1,210 @@
+"""
+Printer Scheduler Module
+
+Picks the printer for each job from live CUPS state.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from job_monitor import COMPLETED
+
+# IPP printer-state values (RFC 8011)
+PRINTER_IDLE = 3
+PRINTER_PROCESSING = 4
+PRINTER_STOPPED = 5
+
+
+def printer_is_healthy(attributes: Dict[str, Any]) -> bool:
+    """
+    Check whether a printer can take jobs right now.
+
+    Args:
+        attributes: Printer attributes as returned by getPrinters
+
+    Returns:
+        False if the printer is stopped, rejecting jobs or reports an error
+    """
+    if attributes.get("printer-state") == PRINTER_STOPPED:
+        return False
+    if attributes.get("printer-is-accepting-jobs") is False:
+        return False
+
+    reasons = attributes.get("printer-state-reasons") or []
+    if isinstance(reasons, str):
+        reasons = [reasons]
+    return not any(reason.endswith("-error") for reason in reasons)
+
+
+class PrinterScheduler:
+    """
+    Spreads jobs over all healthy printers.
+
+    Each printer gets a load score: jobs waiting in its CUPS queue, half a
+    job if it is printing right now, and ``error_weight`` times its recent
+    error count, which halves every ``error_half_life`` seconds. Stopped
+    printers, printers rejecting jobs and printers reporting an error are
+    skipped, so jobs fail over to the rest. Equal scores go to the printer
+    that was picked least recently.
+
+    Printer states are read from CUPS directly, at most every
+    ``state_ttl`` seconds, not from the connection's longer-lived printer
+    list cache, so a printer that stops is avoided almost at once.
+    """
+
+    def __init__(self, connection, printers: Optional[Iterable[str]] = None,
+                 job_monitor=None, queue_ttl: float = 2.0, state_ttl: float = 1.0,
+                 error_half_life: float = 300.0, error_weight: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.connection = connection
+        self.printers = list(printers) if printers else None
+        self.job_monitor = job_monitor
+        self.queue_ttl = queue_ttl
+        self.state_ttl = state_ttl
+        self.error_half_life = error_half_life
+        self.error_weight = error_weight
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        # printer -> (decayed error count, clock time of last update)
+        self._errors: Dict[str, Tuple[float, float]] = {}
+        self._queued: Dict[str, int] = {}
+        self._queued_expires = 0.0
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._states_expires = 0.0
+        self._submitted_since_refresh: Dict[str, int] = {}
+        self._last_chosen: Dict[str, int] = {}
+        self._choices = 0
+        self._unhealthy: Set[str] = set()
+
+    def _error_level(self, printer: str, now: float) -> float:
+        """Decayed error count of a printer."""
+        value, updated = self._errors.get(printer, (0.0, now))
+        return value * math.pow(0.5, (now - updated) / self.error_half_life)
+
+    def _printer_states(self) -> Dict[str, Dict[str, Any]]:
+        """Printer attributes, refreshed every state_ttl seconds."""
+        now = self.clock()
+        if now >= self._states_expires:
+            self._states = self.connection.call("getPrinters")
+            self._states_expires = now + self.state_ttl
+        return self._states
+
+    def _queued_jobs(self) -> Dict[str, int]:
+        """Jobs not completed yet per printer, refreshed every queue_ttl seconds."""
+        now = self.clock()
+        if now >= self._queued_expires:
+            jobs = self.connection.call("getJobs", which_jobs="not-completed",
+                                        requested_attributes=["job-id", "job-printer-uri"])
+            queued: Dict[str, int] = {}
+            for attributes in jobs.values():
+                name = attributes.get("job-printer-uri", "").rsplit("/", 1)[-1]
+                queued[name] = queued.get(name, 0) + 1
+            self._queued = queued
+            self._submitted_since_refresh = {}
+            self._queued_expires = now + self.queue_ttl
+
+        queued = dict(self._queued)
+        for name, count in self._submitted_since_refresh.items():
+            queued[name] = queued.get(name, 0) + count
+        return queued
+
+    def scores(self) -> Dict[str, float]:
+        """
+        Load score of every healthy printer (lower is better).
+
+        Returns:
+            Score by printer name
+        """
+        with self._lock:
+            printers = self._printer_states()
+            queued = self._queued_jobs()
+            now = self.clock()
+
+            scores: Dict[str, float] = {}
+            unhealthy = set()
+            for name, attributes in printers.items():
+                if self.printers is not None and name not in self.printers:
+                    continue
+                if not printer_is_healthy(attributes):
+                    unhealthy.add(name)
+                    continue
+                score = float(queued.get(name, 0))
+                if attributes.get("printer-state") == PRINTER_PROCESSING:
+                    score += 0.5
+                score += self.error_weight * self._error_level(name, now)
+                scores[name] = score
+
+            for name in unhealthy - self._unhealthy:
+                self.logger.warning(f"Printer {name} is unavailable, failing over")
+            for name in self._unhealthy - unhealthy:
+                if name in printers:
+                    self.logger.info(f"Printer {name} is available again")
+            self._unhealthy = unhealthy
+
+        return scores
+
+    def choose(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Pick the printer for the next job.
+
+        Args:
+            exclude: Printers not to use (e.g. one that just failed)
+
+        Returns:
+            Printer name, or None if no healthy printer is left
+        """
+        excluded = set(exclude)
+        candidates = {name: score for name, score in self.scores().items()
+                      if name not in excluded}
+        if not candidates:
+            self.logger.warning("No healthy printers available")
+            return None
+
+        with self._lock:
+            printer = min(candidates, key=lambda name: (candidates[name],
+                                                        self._last_chosen.get(name, -1)))
+            self._choices += 1
+            self._last_chosen[printer] = self._choices
+        return printer
+
+    def job_submitted(self, printer: str, job_id: int) -> None:
+        """
+        Count a new job against its printer until the next queue refresh.
+
+        With a job monitor, the job's outcome later feeds the error rate.
+        """
+        with self._lock:
+            self._submitted_since_refresh[printer] = \
+                self._submitted_since_refresh.get(printer, 0) + 1
+
+        if self.job_monitor is not None:
+            self.job_monitor.watch(
+                job_id, lambda _, outcome: self.record_result(printer, outcome == COMPLETED)
+            )
+
+    def record_result(self, printer: str, success: bool) -> None:
+        """
+        Record how a job on a printer ended.
+
+        Args:
+            printer: Printer name
+            success: Whether the job printed
+        """
+        if success:
+            return
+        with self._lock:
+            now = self.clock()
+            self._errors[printer] = (self._error_level(printer, now) + 1.0, now)
+        self.logger.info(f"Recorded print error on {printer}")
+
+    def error_rates(self) -> Dict[str, float]:
+        """Current decayed error count per printer."""
+        with self._lock:
+            now = self.clock()
+            return {name: self._error_level(name, now) for name in self._errors}
+
@@ -0,0 +1,165 @@
+"""
+Rate Limiter Module
+
+Token-bucket rate limiting so prints are spread out over the day.
+"""
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+from file_utils import atomic_write_json
+
+
+class RateLimiter:
+    """
+    Per-child token buckets in front of the daily print limit.
+
+    Each child starts with ``burst`` tokens and regains one token every
+    ``refill_seconds``. A print takes one token. Checks only touch memory;
+    when a ``state_file`` is given, a background thread writes the buckets
+    to disk every ``persist_interval`` seconds (and on close) so a restart
+    does not hand out a fresh burst.
+    """
+
+    def __init__(self, burst: int = 3, refill_seconds: float = 60.0,
+                 state_file: Union[str, Path, None] = None,
+                 persist_interval: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.burst = max(1, burst)
+        self.refill_seconds = max(0.001, refill_seconds)
+        self.state_file = Path(state_file) if state_file else None
+        self.persist_interval = persist_interval
+        self.clock = clock
+
+        # key -> [tokens, clock time of last update]
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._persist_thread: Optional[threading.Thread] = None
+
+        if self.state_file:
+            self._load_state()
+            self._persist_thread = threading.Thread(
+                target=self._persist_loop, name="rate-limiter-persist", daemon=True
+            )
+            self._persist_thread.start()
+
+        self.logger.info(
+            f"Rate limiter initialized (burst: {self.burst}, "
+            f"1 print per {self.refill_seconds:g} s)"
+        )
+
+    def _refill(self, key: str) -> List[float]:
+        """Return the bucket of ``key`` with tokens added for elapsed time."""
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            return bucket
+
+        tokens, updated = bucket
+        if tokens < self.burst:
+            bucket[0] = min(float(self.burst),
+                            tokens + (now - updated) / self.refill_seconds)
+        bucket[1] = now
+        return bucket
+
+    def try_acquire(self, key: str = "default") -> bool:
+        """
+        Take one token if available.
+
+        Args:
+            key: Child profile
+
+        Returns:
+            True if the print may proceed now
+        """
+        with self._lock:
+            bucket = self._refill(key)
+            if bucket[0] < 1.0:
+                return False
+            bucket[0] -= 1.0
+            self._dirty = True
+            return True
+
+    def time_until_available(self, key: str = "default") -> float:
+        """Seconds until ``key`` has a token again (0 if one is available)."""
+        with self._lock:
+            tokens = self._refill(key)[0]
+            return max(0.0, (1.0 - tokens) * self.refill_seconds)
+
+    def acquire(self, key: str = "default", max_wait: float = 0.0,
+                sleep: Callable[[float], None] = time.sleep) -> bool:
+        """
+        Take one token, waiting up to ``max_wait`` seconds for it.
+
+        Args:
+            key: Child profile
+            max_wait: Longest acceptable delay (0 rejects immediately)
+            sleep: Sleep function, replaceable in tests
+
+        Returns:
+            True if a token was taken, False if the request is rejected
+        """
+        while True:
+            if self.try_acquire(key):
+                return True
+            wait = self.time_until_available(key)
+            if wait > max_wait:
+                self.logger.info(f"Rate limited ({key}), next print in {wait:.0f} s")
+                return False
+            self.logger.debug(f"Rate limited ({key}), delaying {wait:.1f} s")
+            sleep(wait)
+            max_wait -= wait
+
+    def _load_state(self) -> None:
+        """Restore buckets saved by a previous run."""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading rate limiter state: {e}")
+            return
+
+        now = self.clock()
+        wall_now = time.time()
+        for key, (tokens, saved_at) in data.items():
+            elapsed = max(0.0, wall_now - saved_at)
+            self._buckets[key] = [min(float(self.burst), tokens), now - elapsed]
+
+    def persist(self) -> None:
+        """Write the buckets to the state file if they changed."""
+        if not self.state_file:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = self.clock()
+            wall_now = time.time()
+            data = {key: [tokens, wall_now - (now - updated)]
+                    for key, (tokens, updated) in self._buckets.items()}
+            self._dirty = False
+        try:
+            atomic_write_json(self.state_file, data)
+        except Exception as e:
+            self.logger.error(f"Error saving rate limiter state: {e}")
+
+    def _persist_loop(self) -> None:
+        """Periodically persist state until closed."""
+        while not self._stop.wait(self.persist_interval):
+            self.persist()
+
+    def close(self) -> None:
+        """Stop the persistence thread and save the final state."""
+        self._stop.set()
+        if self._persist_thread:
+            self._persist_thread.join(timeout=5)
+        self.persist()
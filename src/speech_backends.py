@@ -0,0 +1,238 @@
+"""
+Speech Backends Module
+
+Recognizer backends behind one streaming interface, plus end-of-speech
+to text latency tracking.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+from latency_stats import LATENCY_HISTORY, percentile
+
+try:
+    import vosk
+except ImportError:  # Only needed for the offline backend
+    vosk = None
+
+# Callback for partial hypotheses; returning True stops recognition early
+PartialCallback = Callable[[str], bool]
+
+
+class RecognitionError(Exception):
+    """The backend could not be reached or failed."""
+
+
+class BackendStream:
+    """Recognition of one utterance, fed audio as it is spoken."""
+
+    def accept(self, pcm: bytes) -> Optional[str]:
+        """
+        Add audio.
+
+        Args:
+            pcm: 16-bit mono PCM
+
+        Returns:
+            Current partial hypothesis, or None if there is none (yet)
+        """
+        raise NotImplementedError
+
+    def finish(self) -> str:
+        """
+        End the utterance.
+
+        Returns:
+            Final text ("" if nothing was understood)
+
+        Raises:
+            RecognitionError: if the backend failed
+        """
+        raise NotImplementedError
+
+
+class SpeechBackend:
+    """A speech-to-text engine."""
+
+    name = "backend"
+    # Whether partial hypotheses are produced while audio arrives
+    streaming = False
+
+    def open(self, sample_rate: int) -> BackendStream:
+        """Start recognizing a new utterance."""
+        raise NotImplementedError
+
+
+class _VoskStream(BackendStream):
+
+    def __init__(self, recognizer):
+        self._recognizer = recognizer
+        self._segments: List[str] = []
+
+    def accept(self, pcm: bytes) -> Optional[str]:
+        if self._recognizer.AcceptWaveform(pcm):
+            # Kaldi closed a segment at a pause; keep it and start the next
+            text = json.loads(self._recognizer.Result()).get("text", "")
+            if text:
+                self._segments.append(text)
+            partial = ""
+        else:
+            partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+        hypothesis = " ".join(self._segments + ([partial] if partial else []))
+        return hypothesis or None
+
+    def finish(self) -> str:
+        text = json.loads(self._recognizer.FinalResult()).get("text", "")
+        return " ".join(self._segments + ([text] if text else []))
+
+
+class VoskBackend(SpeechBackend):
+    """
+    Offline recognition with Vosk (Kaldi).
+
+    Runs entirely on the device, so commands work without a network and
+    cost no round trip. Needs the ``vosk`` package and a Finnish model
+    directory (e.g. vosk-model-small-fi).
+    """
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path: str):
+        self.logger = logging.getLogger(__name__)
+        if vosk is None:
+            raise RecognitionError("The vosk package is not installed")
+        vosk.SetLogLevel(-1)
+        start = time.monotonic()
+        self.model = vosk.Model(model_path)
+        self.logger.info(
+            f"Vosk model {model_path} loaded in {time.monotonic() - start:.1f} s"
+        )
+
+    def open(self, sample_rate: int) -> BackendStream:
+        return _VoskStream(vosk.KaldiRecognizer(self.model, sample_rate))
+
+
+class _ScriptedStream(BackendStream):
+
+    def __init__(self, transcript: str, bytes_per_word: int):
+        self._words = transcript.split()
+        self._bytes_per_word = bytes_per_word
+        self._received = 0
+
+    def accept(self, pcm: bytes) -> Optional[str]:
+        self._received += len(pcm)
+        heard = min(len(self._words), self._received // self._bytes_per_word)
+        return " ".join(self._words[:heard]) or None
+
+    def finish(self) -> str:
+        return " ".join(self._words)
+
+
+class ScriptedBackend(SpeechBackend):
+    """
+    Deterministic stand-in that "recognizes" prepared transcripts.
+
+    Each utterance gets the next transcript; its words are revealed as
+    partial hypotheses in proportion to the audio received, one word per
+    ``seconds_per_word``. For tests and benchmarks.
+    """
+
+    name = "scripted"
+    streaming = True
+
+    def __init__(self, transcripts: Iterable[str], seconds_per_word: float = 0.3):
+        self._transcripts: Deque[str] = deque(transcripts)
+        self.seconds_per_word = seconds_per_word
+
+    def open(self, sample_rate: int) -> BackendStream:
+        transcript = self._transcripts.popleft() if self._transcripts else ""
+        bytes_per_word = max(2, int(self.seconds_per_word * sample_rate) * 2)
+        return _ScriptedStream(transcript, bytes_per_word)
+
+
+class StreamingTranscriber:
+    """
+    Runs utterances through a backend and measures its latency.
+
+    Audio is handed to the backend chunk by chunk as it arrives, and
+    every new partial hypothesis is passed to ``on_partial``. Latency is
+    measured from the detected end of speech to the final text.
+    """
+
+    def __init__(self, backend: SpeechBackend, clock: Callable[[], float] = time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.backend = backend
+        self.clock = clock
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_HISTORY)
+        self._lock = threading.Lock()
+
+    def transcribe(self, chunks: Iterable[bytes], sample_rate: int,
+                   ended_at: Callable[[], Optional[float]] = lambda: None,
+                   on_partial: Optional[PartialCallback] = None) -> Optional[str]:
+        """
+        Recognize one utterance.
+
+        Args:
+            chunks: 16-bit mono PCM, ending with the utterance
+            sample_rate: Sample rate of the audio
+            ended_at: Returns the clock time speech ended, once known
+                (None means when the last chunk arrived)
+            on_partial: Called with each new partial hypothesis; when it
+                returns True the rest of the utterance is not waited for
+
+        Returns:
+            Final text (the partial if stopped early), or None if nothing
+            was understood
+
+        Raises:
+            RecognitionError: if the backend failed
+        """
+        stream = self.backend.open(sample_rate)
+        last_partial = None
+        for chunk in chunks:
+            partial = stream.accept(chunk)
+            if partial and partial != last_partial:
+                last_partial = partial
+                self.logger.debug(f"Partial: {partial}")
+                if on_partial is not None and on_partial(partial):
+                    return partial
+
+        end_of_speech = ended_at()
+        if end_of_speech is None:
+            end_of_speech = self.clock()
+        text = stream.finish()
+        latency = self.clock() - end_of_speech
+        with self._lock:
+            self._latencies.append(latency)
+        self.logger.debug(f"{self.backend.name}: text {latency * 1000:.0f} ms after speech")
+        return text or None
+
+    def latency_percentiles(self, percentiles: Iterable[float] = (50, 90, 99)
+                            ) -> Dict[float, float]:
+        """
+        End-of-speech to text latency of recent utterances.
+
+        Args:
+            percentiles: Percentiles to report
+
+        Returns:
+            Seconds by percentile (empty before the first utterance)
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return {}
+        return {pct: percentile(latencies, pct) for pct in percentiles}
+
+    def log_latency_report(self) -> None:
+        """Log recognition latency percentiles."""
+        values = self.latency_percentiles()
+        if values:
+            report = ", ".join(f"p{pct:g} {seconds * 1000:.0f} ms"
+                               for pct, seconds in values.items())
+            self.logger.info(f"Recognition latency ({self.backend.name}): {report}")
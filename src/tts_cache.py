@@ -0,0 +1,156 @@
+"""
+TTS Cache Module
+
+Synthesizes fixed phrases once to WAV files so they can be played back
+instead of being spoken live by the text-to-speech engine.
+"""
+
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from disk_cache import DiskCache, make_key
+
+# Bump when synthesis changes in a way the key does not capture
+TTS_CACHE_VERSION = 1
+
+# Writes the speech for a text to a WAV file at the given path
+Synthesizer = Callable[[str, Path], None]
+
+
+class SpeechCache:
+    """
+    Synthesized speech stored in a DiskCache, keyed by text and voice.
+
+    The key covers the text, voice, rate and volume, so changing any of
+    them synthesizes fresh audio while the old files age out of the
+    cache's LRU budget.
+    """
+
+    def __init__(self, cache: DiskCache, synthesize: Synthesizer,
+                 voice: Optional[str] = None, rate: int = 150, volume: float = 0.8):
+        """
+        Args:
+            cache: Where the WAV files are kept (suffix ".wav")
+            synthesize: Writes speech for a text to a file; the caller
+                serializes access to the engine
+            voice: Voice id the engine is set to
+            rate: Speech rate the engine is set to
+            volume: Volume the engine is set to
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cache = cache
+        self._synthesize = synthesize
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def key(self, text: str) -> str:
+        """Cache key of a phrase with the current voice settings."""
+        return make_key("tts", TTS_CACHE_VERSION, text, self.voice, self.rate, self.volume)
+
+    def get(self, text: str) -> Optional[Path]:
+        """
+        Look up already synthesized speech.
+
+        Returns:
+            Path of the WAV file, or None if the phrase is not cached
+        """
+        return self.cache.get(self.key(text))
+
+    def put(self, text: str, source: Path) -> Optional[Path]:
+        """
+        Store speech synthesized elsewhere, e.g. by a speech server.
+
+        Args:
+            text: Phrase the file says
+            source: WAV file; it is copied, not moved
+
+        Returns:
+            Path of the cached file, or None if it could not be stored
+        """
+        try:
+            data = Path(source).read_bytes()
+            if not data:
+                raise ValueError("engine wrote no audio")
+            return self.cache.put(self.key(text), data)
+        except Exception as e:
+            self.logger.error(f"Could not cache speech for \"{text}\": {e}")
+            return None
+
+    def get_or_synthesize(self, text: str) -> Optional[Path]:
+        """
+        Return speech for a phrase, synthesizing it on a miss.
+
+        Returns:
+            Path of the WAV file, or None if synthesis failed
+        """
+        key = self.key(text)
+        path = self.cache.get(key)
+        if path is not None:
+            return path
+        return self._synthesize_into_cache(key, text)
+
+    def _synthesize_into_cache(self, key: str, text: str) -> Optional[Path]:
+        try:
+            start = time.monotonic()
+            with tempfile.TemporaryDirectory() as temp:
+                target = Path(temp) / "speech.wav"
+                self._synthesize(text, target)
+                data = target.read_bytes()
+            if not data:
+                raise ValueError("engine wrote no audio")
+            path = self.cache.put(key, data)
+            self.logger.debug(
+                f"Synthesized \"{text}\" in {time.monotonic() - start:.2f} s"
+            )
+            return path
+        except Exception as e:
+            self.logger.error(f"Could not synthesize \"{text}\": {e}")
+            return None
+
+    def warm_up(self, texts: Iterable[str],
+                then: Optional[Callable[[], object]] = None) -> threading.Thread:
+        """
+        Synthesize phrases in a background thread.
+
+        Args:
+            texts: Phrases to have ready; cached ones are skipped
+            then: Called in the same thread once they are ready
+
+        Returns:
+            The (daemon) thread doing the work
+        """
+        phrases: List[str] = list(dict.fromkeys(texts))
+
+        def run():
+            start = time.monotonic()
+            missing = [text for text in phrases if self.get(text) is None]
+            ready = sum(self._synthesize_into_cache(self.key(text), text) is not None
+                        for text in missing)
+            self.logger.info(
+                f"Speech cache warm: {len(phrases) - len(missing)} cached, "
+                f"{ready}/{len(missing)} synthesized in {time.monotonic() - start:.1f} s"
+            )
+            if then is not None:
+                then()
+
+        self._warm_thread = threading.Thread(target=run, name="speech-warm-up", daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+    def wait_warm(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a warm-up started with warm_up().
+
+        Returns:
+            True if no warm-up is running any more
+        """
+        if self._warm_thread is None:
+            return True
+        self._warm_thread.join(timeout)
+        return not self._warm_thread.is_alive()
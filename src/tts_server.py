@@ -0,0 +1,301 @@
+"""
+TTS Server Module
+
+Runs the text-to-speech engine in a worker process, so a slow or
+wedged engine cannot hold up or take down the main program.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Deque, Optional, Tuple, Union
+
+try:
+    import pyttsx3
+except ImportError:  # Only needed inside the worker process
+    pyttsx3 = None
+
+# Longest one phrase may take before the worker is considered wedged
+SYNTHESIS_TIMEOUT = 20.0
+# Longest the worker may take to start its engine
+START_TIMEOUT = 30.0
+# Pause before restarting a worker that keeps failing, doubled per failure
+RESTART_DELAY = 0.5
+MAX_RESTART_DELAY = 30.0
+
+# Id of the first answer from a worker, sent once its engine is up
+_READY = -1
+
+
+class SpeechError(Exception):
+    """The speech worker failed, crashed or stopped responding."""
+
+
+def configure_engine(engine: Any, rate: int = 150, volume: float = 0.8) -> Optional[str]:
+    """
+    Set a pyttsx3 engine up for Finnish.
+
+    Args:
+        engine: pyttsx3 engine
+        rate: Speech rate in words per minute
+        volume: Volume (0.0-1.0)
+
+    Returns:
+        Id of the voice in use
+    """
+    logger = logging.getLogger(__name__)
+    for voice in engine.getProperty('voices'):
+        if 'fi' in voice.id.lower() or 'finnish' in voice.name.lower():
+            engine.setProperty('voice', voice.id)
+            logger.info(f"Set Finnish voice: {voice.id}")
+            break
+    else:
+        logger.warning("No Finnish voice found, using default")
+
+    engine.setProperty('rate', rate)
+    engine.setProperty('volume', volume)
+    return engine.getProperty('voice')
+
+
+def pyttsx3_engine(rate: int = 150, volume: float = 0.8) -> Any:
+    """Create and configure a pyttsx3 engine (runs in the worker)."""
+    engine = pyttsx3.init()
+    configure_engine(engine, rate, volume)
+    return engine
+
+
+def _serve(requests: Any, results: Any, make_engine: Callable[..., Any],
+           engine_args: Tuple) -> None:
+    """Worker process: synthesize requested phrases to WAV files until told to stop."""
+    engine = make_engine(*engine_args)
+    try:
+        voice = engine.getProperty('voice')
+    except Exception:
+        voice = None
+    results.put((_READY, voice))
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        request_id, text, path = request
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            results.put((request_id, None))
+        except Exception as e:
+            results.put((request_id, f"{type(e).__name__}: {e}"))
+
+
+class SpeechServer:
+    """
+    Speech synthesis in a separate process.
+
+    Phrases are synthesized to WAV files one at a time, in request order,
+    and played by the caller, so the next phrase is synthesized while
+    the previous one plays. A worker that crashes or takes longer than
+    ``timeout`` for a phrase is killed and restarted; only the phrase in
+    progress fails. Phrases that have not started can be cancelled, e.g.
+    when the child starts talking.
+
+    The first worker is started by the constructor, which raises
+    SpeechError if its engine cannot be started.
+    """
+
+    def __init__(self, make_engine: Callable[..., Any] = pyttsx3_engine,
+                 engine_args: Tuple = (), timeout: float = SYNTHESIS_TIMEOUT,
+                 start_timeout: float = START_TIMEOUT):
+        """
+        Args:
+            make_engine: Creates the engine inside the worker; must be a
+                module-level function so it can be sent to the process
+            engine_args: Arguments for make_engine, e.g. (rate, volume)
+            timeout: Longest one phrase may take
+            start_timeout: Longest the engine may take to start
+        """
+        self.logger = logging.getLogger(__name__)
+        self.make_engine = make_engine
+        self.engine_args = tuple(engine_args)
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._requests = None
+        self._results = None
+
+        self._pending: Deque[Tuple[int, str, str, Future]] = deque()
+        self._ids = itertools.count()
+        self._closed = False
+        self._lock = threading.Condition()
+        self._failures = 0
+
+        self.voice: Optional[str] = None
+        self.synthesized = 0
+        self.restarts = 0
+
+        self._ensure_worker()
+        self._thread = threading.Thread(target=self._dispatch, name="speech-server", daemon=True)
+        self._thread.start()
+
+    def synthesize(self, text: str, path: Union[str, Path]) -> Future:
+        """
+        Queue a phrase.
+
+        Args:
+            text: Finnish text
+            path: WAV file to write
+
+        Returns:
+            Future resolving to the path, or failing with SpeechError
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Speech server is closed")
+            self._pending.append((next(self._ids), text, str(path), future))
+            self._lock.notify()
+        return future
+
+    def synthesize_to(self, text: str, path: Path) -> None:
+        """Synthesize a phrase and wait for it (a SpeechCache synthesizer)."""
+        self.synthesize(text, path).result(timeout=self.timeout + self.start_timeout)
+
+    def cancel_pending(self) -> int:
+        """
+        Cancel every phrase that has not started.
+
+        Returns:
+            Number of phrases cancelled
+        """
+        with self._lock:
+            dropped = list(self._pending)
+            self._pending.clear()
+        for *_, future in dropped:
+            future.cancel()
+        if dropped:
+            self.logger.debug(f"Cancelled {len(dropped)} pending phrases")
+        return len(dropped)
+
+    @property
+    def alive(self) -> bool:
+        """Whether a worker process is running."""
+        return self._process is not None and self._process.is_alive()
+
+    def _dispatch(self) -> None:
+        """Send phrases to the worker one at a time and collect the results."""
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._lock.wait()
+                if not self._pending:
+                    return
+                request_id, text, path, future = self._pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                self._ensure_worker()
+                self._requests.put((request_id, text, path))
+                error = self._wait_result(request_id, self.timeout)
+                if error is not None:
+                    raise SpeechError(error)
+                self._failures = 0
+                self.synthesized += 1
+                future.set_result(path)
+            except SpeechError as e:
+                self.logger.error(f"Speech synthesis failed for \"{text[:40]}\": {e}")
+                future.set_exception(e)
+            except Exception as e:
+                # E.g. no file descriptors left to start a worker; fail
+                # this phrase and try again with the next one
+                self.logger.error(f"Speech server error for \"{text[:40]}\": {e}")
+                future.set_exception(SpeechError(f"{type(e).__name__}: {e}"))
+
+    def _ensure_worker(self) -> None:
+        """Start the worker, after a growing pause if it keeps failing."""
+        if self.alive:
+            return
+        if self._process is not None:
+            self._stop_worker()
+            self.restarts += 1
+            delay = min(MAX_RESTART_DELAY, RESTART_DELAY * 2 ** (self._failures - 1))
+            self.logger.warning(f"Restarting speech worker in {delay:.1f} s")
+            time.sleep(delay)
+
+        self._requests = self._context.Queue()
+        self._results = self._context.Queue()
+        process = self._context.Process(
+            target=_serve, args=(self._requests, self._results, self.make_engine,
+                                 self.engine_args),
+            name="speech-worker", daemon=True
+        )
+        process.start()
+        # Only a started worker is kept, so a failed start is retried
+        self._process = process
+        self.voice = self._wait_result(_READY, self.start_timeout)
+        self.logger.info(f"Speech worker started (pid {self._process.pid})")
+
+    def _wait_result(self, request_id: int, timeout: float) -> Optional[str]:
+        """
+        Wait for the worker's answer to a request.
+
+        Returns:
+            The worker's error message, or None on success (the voice
+            id for _READY)
+
+        Raises:
+            SpeechError: if the worker died or timed out; it is killed
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                answer_id, error = self._results.get(timeout=0.2)
+                if answer_id == request_id:
+                    return error
+                continue
+            except queue.Empty:
+                pass
+            if not self._process.is_alive():
+                reason = f"worker exited with code {self._process.exitcode}"
+            elif time.monotonic() > deadline:
+                reason = f"worker did not answer in {timeout:.0f} s"
+            else:
+                continue
+            self._failures += 1
+            self._process.kill()
+            # Reap it, so the next phrase sees it dead and restarts it
+            self._process.join(timeout=5)
+            raise SpeechError(reason)
+
+    def _stop_worker(self) -> None:
+        """Ask the worker to exit, killing it if it does not."""
+        process = self._process
+        if process is None:
+            return
+        if process.is_alive():
+            try:
+                self._requests.put(None)
+            except Exception:
+                pass
+            process.join(timeout=2)
+            if process.is_alive():
+                process.kill()
+        process.join(timeout=2)
+        self._process = None
+
+    def close(self) -> None:
+        """Cancel pending phrases and stop the worker."""
+        self.cancel_pending()
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        self._thread.join(timeout=self.timeout + self.start_timeout)
+        self._stop_worker()
+        self.logger.info(
+            f"Speech server stopped: {self.synthesized} phrases, {self.restarts} restarts"
+        )
@@ -0,0 +1,659 @@
+"""
+Usage Storage Module
+
+Persistence backends for the daily print limit counters.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from file_utils import atomic_write_json
+
+
+# Key used when the child or device is not known
+DEFAULT_CHILD = "default"
+DEFAULT_DEVICE = "default"
+
+# Print counts are kept per (day, child, device)
+UsageKey = Tuple[str, str, str]
+
+
+class UsageStorage:
+    """
+    Base class for print usage backends.
+
+    A backend owns the print counters, keyed by (day, child, device). The
+    file backends keep an in-memory index of the current day only, keyed
+    by (day, child): the per-device counts and the child's total. Every
+    lookup and limit check is O(1) however many profiles exist. Subclasses
+    decide how changes reach the disk.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._devices: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._child_totals: Dict[Tuple[str, str], int] = {}
+        self._last_reset = str(date.today())
+        self._load()
+
+    def _load(self) -> None:
+        """Load usage data from disk into the index."""
+        raise NotImplementedError
+
+    def _append(self, key: UsageKey, delta: int) -> None:
+        """Persist a count change after it was applied to the index."""
+        raise NotImplementedError
+
+    def _write_snapshot(self) -> None:
+        """Persist the complete usage data."""
+        raise NotImplementedError
+
+    def _load_data(self, data: Dict[str, Any]) -> None:
+        """
+        Fill the index from a usage data dict.
+
+        Understands both the per-child ``quotas`` rows and the older layout
+        with only global ``daily_counts``, which is assigned to the default
+        child and device. Days before ``last_reset`` are not loaded.
+        """
+        self._last_reset = data.get("last_reset") or self._last_reset
+        rows = data.get("quotas")
+        if rows is None:
+            rows = [(day, DEFAULT_CHILD, DEFAULT_DEVICE, count)
+                    for day, count in data.get("daily_counts", {}).items()]
+        for day, child, device, count in rows:
+            if day >= self._last_reset:
+                self._apply((day, child, device), count)
+
+    def _apply(self, key: UsageKey, delta: int) -> int:
+        """
+        Change one counter in the index.
+
+        Returns:
+            The applied change (a decrement never goes below zero)
+        """
+        child_key = key[:2]
+        devices = self._devices.get(child_key, {})
+        count = devices.get(key[2], 0)
+        delta = max(delta, -count)
+        if not delta:
+            return 0
+
+        if count + delta:
+            devices[key[2]] = count + delta
+            self._devices[child_key] = devices
+            self._child_totals[child_key] = self._child_totals.get(child_key, 0) + delta
+        else:
+            del devices[key[2]]
+            if devices:
+                self._child_totals[child_key] += delta
+            else:
+                del self._devices[child_key]
+                del self._child_totals[child_key]
+        return delta
+
+    @property
+    def usage_data(self) -> Dict[str, Any]:
+        """
+        Usage data as stored in ``daily_usage.json``.
+
+        ``daily_counts`` keeps the per-day totals of the original layout;
+        ``quotas`` holds one ``[day, child, device, count]`` row per counter.
+        """
+        with self._lock:
+            daily_counts: Dict[str, int] = {}
+            for (day, _child), total in self._child_totals.items():
+                daily_counts[day] = daily_counts.get(day, 0) + total
+            return {
+                "daily_counts": daily_counts,
+                "last_reset": self._last_reset,
+                "quotas": [[day, child, device, count]
+                           for (day, child), devices in self._devices.items()
+                           for device, count in devices.items()],
+            }
+
+    @property
+    def last_reset(self) -> str:
+        """Day the counters were last reset."""
+        return self._last_reset
+
+    def get_count(self, day: str, child: str = DEFAULT_CHILD,
+                  device: Optional[str] = None) -> int:
+        """
+        Get a print count.
+
+        Args:
+            day: Day key (ISO date)
+            child: Child profile
+            device: Device to count, or None for the child's total
+
+        Returns:
+            Number of prints
+        """
+        with self._lock:
+            if device is None:
+                return self._child_totals.get((day, child), 0)
+            return self._devices.get((day, child), {}).get(device, 0)
+
+    def get_day_counts(self, day: str) -> Dict[str, Dict[str, int]]:
+        """
+        Get every counter of a day in one call.
+
+        Args:
+            day: Day key (ISO date)
+
+        Returns:
+            Mapping of child to a mapping of device to print count
+        """
+        with self._lock:
+            return {child: dict(devices)
+                    for (count_day, child), devices in self._devices.items()
+                    if count_day == day}
+
+    def get_device_counts(self, day: str, child: str = DEFAULT_CHILD) -> Dict[str, int]:
+        """Get the per-device print counts of one child."""
+        with self._lock:
+            return dict(self._devices.get((day, child), {}))
+
+    def increment(self, day: str, child: str = DEFAULT_CHILD,
+                  device: str = DEFAULT_DEVICE) -> int:
+        """
+        Count one print.
+
+        Args:
+            day: Day key (ISO date)
+            child: Child profile
+            device: Device the print came from
+
+        Returns:
+            New print total of the child for the day
+        """
+        with self._lock:
+            key = (day, child, device)
+            self._apply(key, 1)
+            self._append(key, 1)
+            return self._child_totals[(day, child)]
+
+    def try_increment(self, day: str, limit: int, child: str = DEFAULT_CHILD,
+                      device: str = DEFAULT_DEVICE) -> Optional[int]:
+        """
+        Count one print only if the child is still below ``limit``.
+
+        The check and the increment happen atomically, so concurrent
+        callers can never exceed the limit together. The limit applies to
+        the child's total over all devices.
+
+        Args:
+            day: Day key (ISO date)
+            limit: Maximum prints for the child and day
+            child: Child profile
+            device: Device the print came from
+
+        Returns:
+            New print total, or None if the limit was already reached
+        """
+        with self._lock:
+            if self.get_count(day, child) >= limit:
+                return None
+            return self.increment(day, child, device)
+
+    def decrement(self, day: str, child: str = DEFAULT_CHILD,
+                  device: str = DEFAULT_DEVICE) -> int:
+        """
+        Give back one print, e.g. when a reserved print failed.
+
+        Args:
+            day: Day key (ISO date)
+            child: Child profile
+            device: Device the print came from
+
+        Returns:
+            New print total of the child for the day
+        """
+        with self._lock:
+            key = (day, child, device)
+            if self._apply(key, -1):
+                self._append(key, -1)
+            return self.get_count(day, child)
+
+    def reset(self, day: str) -> None:
+        """Drop counters of other days and start counting ``day``."""
+        with self._lock:
+            for child_key in [key for key in self._devices if key[0] != day]:
+                del self._devices[child_key]
+                del self._child_totals[child_key]
+            self._last_reset = day
+            self._write_snapshot()
+
+    def total_days(self) -> int:
+        """Number of days with stored counters."""
+        with self._lock:
+            return len({day for day, _child in self._child_totals})
+
+    def flush(self) -> None:
+        """Force buffered changes to disk."""
+
+    def close(self) -> None:
+        """Flush and release file handles."""
+        self.flush()
+
+
+class JsonFileStorage(UsageStorage):
+    """Stores usage data as a single JSON file, rewritten on every change."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        super().__init__()
+
+    def _load(self) -> None:
+        """Load usage data from file."""
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._load_data(json.load(f))
+                self.logger.debug("Loaded existing usage data")
+            except Exception as e:
+                self.logger.error(f"Error loading usage data: {e}")
+
+    def _append(self, key: UsageKey, delta: int) -> None:
+        self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        """Save usage data to file atomically."""
+        try:
+            atomic_write_json(self.path, self.usage_data, indent=2)
+            self.logger.debug("Saved usage data")
+        except Exception as e:
+            self.logger.error(f"Error saving usage data: {e}")
+
+
+class JournalStorage(UsageStorage):
+    """
+    Append-only journal of print events with snapshot compaction.
+
+    Each print appends one short JSON line to the journal, so a record
+    costs a constant number of bytes regardless of history size. The
+    journal is fsynced in batches of ``fsync_every`` records. Once it holds
+    ``compact_after`` records (or the day changes) the state is written to
+    a snapshot by atomic rename and the journal is truncated.
+
+    Every record carries a sequence number and the snapshot stores the
+    last sequence it includes, so a crash between snapshot and truncation
+    never counts a print twice. A torn final line is cut off on load, so
+    new records start on a line of their own.
+    """
+
+    def __init__(self, snapshot_path: Union[str, Path],
+                 journal_path: Union[str, Path, None] = None,
+                 fsync_every: int = 8, compact_after: int = 1000):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(journal_path or self.snapshot_path.with_suffix(".journal"))
+        self.fsync_every = max(1, fsync_every)
+        self.compact_after = max(1, compact_after)
+        self._seq = 0
+        self._journal_records = 0
+        self._unsynced = 0
+        self._journal = None
+        super().__init__()
+
+    def _load(self) -> None:
+        """Load the snapshot and replay journal records written after it."""
+        if self.snapshot_path.exists():
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._load_data(data)
+                self._seq = data.get("journal_seq", 0)
+            except Exception as e:
+                self.logger.error(f"Error loading usage snapshot: {e}")
+
+        replayed = 0
+        if self.journal_path.exists():
+            self._truncate_torn_tail()
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        seq = record["seq"]
+                        key = (record["day"],
+                               record.get("child", DEFAULT_CHILD),
+                               record.get("device", DEFAULT_DEVICE))
+                        delta = record.get("n", 1)
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        self.logger.warning("Skipping damaged usage journal record")
+                        continue
+                    self._journal_records += 1
+                    if seq <= self._seq:
+                        continue  # Already part of the snapshot
+                    self._seq = seq
+                    if key[0] >= self._last_reset:
+                        self._apply(key, delta)
+                        replayed += 1
+
+        self.logger.debug(f"Loaded usage snapshot and replayed {replayed} journal records")
+
+    def _truncate_torn_tail(self) -> None:
+        """Cut a half-written last record off the journal."""
+        try:
+            with open(self.journal_path, 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size == 0:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b"\n":
+                    return
+                f.seek(0)
+                end = f.read().rfind(b"\n") + 1
+                f.truncate(end)
+                os.fsync(f.fileno())
+            self.logger.warning(f"Removed {size - end} bytes of a torn usage journal record")
+        except Exception as e:
+            self.logger.error(f"Error repairing usage journal: {e}")
+
+    def _open_journal(self):
+        """Open the journal for appending on first use."""
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        return self._journal
+
+    def _append(self, key: UsageKey, delta: int) -> None:
+        """Append one count change record to the journal."""
+        day, child, device = key
+        record = {"seq": self._seq + 1, "day": day}
+        if child != DEFAULT_CHILD:
+            record["child"] = child
+        if device != DEFAULT_DEVICE:
+            record["device"] = device
+        if delta != 1:
+            record["n"] = delta
+        try:
+            self._seq += 1
+            journal = self._open_journal()
+            journal.write(json.dumps(record) + "\n")
+            journal.flush()
+            self._journal_records += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self.flush()
+        except Exception as e:
+            self.logger.error(f"Error writing usage journal: {e}")
+            return
+
+        if self._journal_records >= self.compact_after:
+            self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        """Compact: write a snapshot atomically, then truncate the journal."""
+        try:
+            snapshot = dict(self.usage_data, journal_seq=self._seq)
+            atomic_write_json(self.snapshot_path, snapshot)
+
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            with open(self.journal_path, 'w', encoding='utf-8') as f:
+                os.fsync(f.fileno())
+
+            self._journal_records = 0
+            self._unsynced = 0
+            self.logger.debug(f"Compacted usage journal at sequence {self._seq}")
+        except Exception as e:
+            self.logger.error(f"Error compacting usage journal: {e}")
+
+    def flush(self) -> None:
+        """Fsync journal records that are only in the OS page cache."""
+        with self._lock:
+            if self._journal is not None and self._unsynced:
+                try:
+                    os.fsync(self._journal.fileno())
+                    self._unsynced = 0
+                except Exception as e:
+                    self.logger.error(f"Error syncing usage journal: {e}")
+
+    def close(self) -> None:
+        """Flush and close the journal."""
+        with self._lock:
+            self.flush()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+class SqliteUsageStorage(UsageStorage):
+    """
+    SQLite database shared by several processes.
+
+    Unlike the file backends, nothing is cached in memory: every call reads
+    or updates the database, so a CLI loop and a print service running in
+    separate processes enforce one common budget. The database runs in WAL
+    mode and ``try_increment`` is a single ``BEGIN IMMEDIATE`` transaction.
+    Each thread uses its own connection. Counters live in one row per
+    (day, child, device); the primary key prefix keeps child totals cheap.
+    """
+
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path: Union[str, Path], busy_timeout: float = 10.0):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        with self._transaction() as conn:
+            self._create_schema(conn)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the tables, migrating a version 1 database if needed."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS print_counts ("
+            "day TEXT NOT NULL, child TEXT NOT NULL, device TEXT NOT NULL, "
+            "count INTEGER NOT NULL, PRIMARY KEY (day, child, device))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('last_reset', ?)",
+            (str(date.today()),)
+        )
+
+        # Version 1 kept a single global counter per day
+        legacy = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'daily_counts'"
+        ).fetchone()
+        if legacy:
+            conn.execute(
+                "INSERT OR IGNORE INTO print_counts (day, child, device, count) "
+                "SELECT day, ?, ?, count FROM daily_counts",
+                (DEFAULT_CHILD, DEFAULT_DEVICE)
+            )
+            conn.execute("DROP TABLE daily_counts")
+            self.logger.info("Migrated usage database to per-child counters")
+
+        conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction holding the database write lock."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, day: str, child: str,
+               device: Optional[str] = None) -> int:
+        if device is None:
+            row = conn.execute(
+                "SELECT SUM(count) FROM print_counts WHERE day = ? AND child = ?",
+                (day, child)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT count FROM print_counts WHERE day = ? AND child = ? AND device = ?",
+                (day, child, device)
+            ).fetchone()
+        return (row[0] or 0) if row else 0
+
+    @staticmethod
+    def _add(conn: sqlite3.Connection, day: str, child: str, device: str) -> None:
+        conn.execute(
+            "INSERT OR IGNORE INTO print_counts (day, child, device, count) "
+            "VALUES (?, ?, ?, 0)", (day, child, device)
+        )
+        conn.execute(
+            "UPDATE print_counts SET count = count + 1 "
+            "WHERE day = ? AND child = ? AND device = ?", (day, child, device)
+        )
+
+    @property
+    def usage_data(self) -> Dict[str, Any]:
+        """Usage data in the layout of the file backends (read-only copy)."""
+        conn = self._connection()
+        rows = conn.execute("SELECT day, child, device, count FROM print_counts")
+        quotas = [list(row) for row in rows]
+        daily_counts: Dict[str, int] = {}
+        for day, _child, _device, count in quotas:
+            daily_counts[day] = daily_counts.get(day, 0) + count
+        return {"daily_counts": daily_counts, "last_reset": self.last_reset,
+                "quotas": quotas}
+
+    @property
+    def last_reset(self) -> str:
+        """Day the counters were last reset."""
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'last_reset'"
+        ).fetchone()
+        return row[0] if row else ""
+
+    def get_count(self, day: str, child: str = DEFAULT_CHILD,
+                  device: Optional[str] = None) -> int:
+        """Get a print count; ``device=None`` gives the child's total."""
+        return self._count(self._connection(), day, child, device)
+
+    def get_day_counts(self, day: str) -> Dict[str, Dict[str, int]]:
+        """Get every counter of a day with one query."""
+        result: Dict[str, Dict[str, int]] = {}
+        rows = self._connection().execute(
+            "SELECT child, device, count FROM print_counts WHERE day = ? AND count > 0",
+            (day,)
+        )
+        for child, device, count in rows:
+            result.setdefault(child, {})[device] = count
+        return result
+
+    def get_device_counts(self, day: str, child: str = DEFAULT_CHILD) -> Dict[str, int]:
+        """Get the per-device print counts of one child."""
+        rows = self._connection().execute(
+            "SELECT device, count FROM print_counts "
+            "WHERE day = ? AND child = ? AND count > 0", (day, child)
+        )
+        return dict(rows)
+
+    def increment(self, day: str, child: str = DEFAULT_CHILD,
+                  device: str = DEFAULT_DEVICE) -> int:
+        """Count one print."""
+        with self._transaction() as conn:
+            self._add(conn, day, child, device)
+            return self._count(conn, day, child)
+
+    def try_increment(self, day: str, limit: int, child: str = DEFAULT_CHILD,
+                      device: str = DEFAULT_DEVICE) -> Optional[int]:
+        """Atomically count one print if the child is below ``limit``."""
+        with self._transaction() as conn:
+            count = self._count(conn, day, child)
+            if count >= limit:
+                return None
+            self._add(conn, day, child, device)
+            return count + 1
+
+    def decrement(self, day: str, child: str = DEFAULT_CHILD,
+                  device: str = DEFAULT_DEVICE) -> int:
+        """Give back one print."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE print_counts SET count = count - 1 "
+                "WHERE day = ? AND child = ? AND device = ? AND count > 0",
+                (day, child, device)
+            )
+            return self._count(conn, day, child)
+
+    def reset(self, day: str) -> None:
+        """Drop counters of other days and start counting ``day``."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM print_counts WHERE day != ?", (day,))
+            conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'last_reset'", (day,)
+            )
+
+    def total_days(self) -> int:
+        """Number of days with stored counters."""
+        row = self._connection().execute(
+            "SELECT COUNT(DISTINCT day) FROM print_counts"
+        ).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        """Close all connections opened by this storage."""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception as e:
+                    self.logger.error(f"Error closing usage database: {e}")
+            self._connections = []
+        self._local = threading.local()
+
+
+def create_storage(backend: str, config_dir: Union[str, Path]) -> UsageStorage:
+    """
+    Create a usage storage backend by name.
+
+    Args:
+        backend: "json", "journal" or "sqlite"
+        config_dir: Directory holding the usage files
+
+    Returns:
+        Storage backend instance
+    """
+    config_dir = Path(config_dir)
+    if backend == "journal":
+        return JournalStorage(config_dir / "daily_usage.json",
+                              config_dir / "daily_usage.journal")
+    if backend == "sqlite":
+        return SqliteUsageStorage(config_dir / "daily_usage.db")
+    if backend == "json":
+        return JsonFileStorage(config_dir / "daily_usage.json")
+    raise ValueError(f"Unknown usage storage backend: {backend}")
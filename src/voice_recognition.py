@@ -5,58 +5,211 @@ Handles voice recognition specifically for Finnish language using local LLM.
 """
 
 import logging
+import time
 import speech_recognition as sr
 import pyaudio
-from typing import Optional
+from typing import Any, List, Optional
+
+from audio_capture import SAMPLE_RATE, SAMPLE_WIDTH, AudioCapture, UtteranceStream
+from speech_backends import (BackendStream, PartialCallback, RecognitionError,
+                             SpeechBackend, StreamingTranscriber)
+from wake_word import WakeWordSpotter
+
+
+class MicrophoneStream:
+    """PyAudio input stream in the form AudioCapture reads from."""
+    
+    def __init__(self, sample_rate: int, frames_per_buffer: int):
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16, channels=1, rate=sample_rate,
+                                        input=True, frames_per_buffer=frames_per_buffer)
+    
+    def read(self, frames: int) -> bytes:
+        # A late read loses the overflowed audio instead of failing
+        return self._stream.read(frames, exception_on_overflow=False)
+    
+    def stop_stream(self) -> None:
+        self._stream.stop_stream()
+    
+    def close(self) -> None:
+        self._stream.close()
+        self._audio.terminate()
+
+
+class _GoogleStream(BackendStream):
+    
+    def __init__(self, backend: "GoogleBackend", sample_rate: int):
+        self._backend = backend
+        self._sample_rate = sample_rate
+        self._chunks: List[bytes] = []
+    
+    def accept(self, pcm: bytes) -> Optional[str]:
+        self._chunks.append(pcm)
+        return None
+    
+    def finish(self) -> str:
+        audio = sr.AudioData(b"".join(self._chunks), self._sample_rate, SAMPLE_WIDTH)
+        try:
+            return self._backend.recognizer.recognize_google(audio,
+                                                            language=self._backend.language)
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise RecognitionError(str(e))
+
+
+class GoogleBackend(SpeechBackend):
+    """Google Web Speech API; needs a network round trip per utterance."""
+    
+    name = "google"
+    
+    def __init__(self, recognizer: sr.Recognizer, language: str = "fi-FI"):
+        self.recognizer = recognizer
+        self.language = language
+    
+    def open(self, sample_rate: int) -> BackendStream:
+        return _GoogleStream(self, sample_rate)
 
 
 class FinnishVoiceRecognizer:
     """Finnish voice recognition handler optimized for Raspberry Pi."""
     
-    def __init__(self):
+    def __init__(self, continuous: bool = False, phrase_time_limit: float = 10,
+                 backend: Optional[SpeechBackend] = None, language: str = "fi-FI",
+                 wake_word_spotter: Optional[WakeWordSpotter] = None):
+        """
+        Args:
+            continuous: Keep the microphone open and detect utterances in
+                the background instead of opening it for every listen()
+            phrase_time_limit: Longest utterance in seconds
+            backend: Speech-to-text engine (None uses Google)
+            language: Language of the Google backend
+            wake_word_spotter: When given, only utterances that start with
+                a wake word are sent to the backend
+        """
         self.logger = logging.getLogger(__name__)
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        self.phrase_time_limit = phrase_time_limit
+        self.transcriber = StreamingTranscriber(backend or GoogleBackend(self.recognizer,
+                                                                         language))
+        self.wake_word_spotter = wake_word_spotter
+        self.audio_capture: Optional[AudioCapture] = None
         
-        # Adjust for ambient noise
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
+        if continuous:
+            # Background noise is measured by the capture's own detector
+            self.microphone = None
+            self.audio_capture = AudioCapture(MicrophoneStream,
+                                              max_utterance=phrase_time_limit)
+            self.audio_capture.start()
+        else:
+            self.microphone = sr.Microphone()
+            # Adjust for ambient noise
+            with self.microphone as source:
+                self.recognizer.adjust_for_ambient_noise(source, duration=1)
         
         self.logger.info("Finnish voice recognizer initialized")
     
-    def listen(self, timeout: int = 5) -> Optional[str]:
+    def listen(self, timeout: int = 5,
+               on_partial: Optional[PartialCallback] = None) -> Optional[str]:
         """
         Listen for voice input and return recognized Finnish text.
         
         Args:
             timeout: Maximum time to wait for input
+            on_partial: Called with partial text while the child speaks
             
         Returns:
             Recognized text or None if no speech detected
         """
+        audio = self.capture(timeout)
+        if audio is None:
+            return None
+        return self.recognize(audio, on_partial)
+    
+    def capture(self, timeout: int = 5) -> Optional[Any]:
+        """
+        Record one utterance from the microphone.
+        
+        With continuous capture this returns as soon as speech starts; the
+        utterance keeps growing until the child stops talking.
+        
+        Args:
+            timeout: Maximum time to wait for speech to start
+            
+        Returns:
+            Audio for recognize() (an UtteranceStream or sr.AudioData), or
+            None if no speech detected
+        """
+        if self.audio_capture is not None:
+            stream = self.audio_capture.get_stream(timeout)
+            if stream is None:
+                self.logger.debug("No speech detected within timeout")
+            return stream
+        
         try:
             with self.microphone as source:
                 self.logger.debug("Listening for voice input...")
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=10)
-            
-            # Use Google's speech recognition with Finnish language
-            text = self.recognizer.recognize_google(audio, language="fi-FI")
-            self.logger.info(f"Recognized: {text}")
-            return text.lower()
+                return self.recognizer.listen(source, timeout=timeout,
+                                              phrase_time_limit=self.phrase_time_limit)
             
         except sr.WaitTimeoutError:
             self.logger.debug("No speech detected within timeout")
             return None
-        except sr.UnknownValueError:
-            self.logger.warning("Could not understand audio")
+        except Exception as e:
+            self.logger.error(f"Unexpected error in voice capture: {e}")
             return None
-        except sr.RequestError as e:
+    
+    def recognize(self, audio: Any,
+                  on_partial: Optional[PartialCallback] = None) -> Optional[str]:
+        """
+        Convert a recorded utterance to Finnish text.
+        
+        Args:
+            audio: Audio returned by capture()
+            on_partial: Called with each new partial text (streaming
+                backends only); returning True stops recognition early
+            
+        Returns:
+            Recognized lowercase text or None if it could not be understood
+        """
+        try:
+            if isinstance(audio, UtteranceStream):
+                chunks, sample_rate = audio.chunks(), audio.sample_rate
+                ended_at = lambda: audio.ended_at
+            else:
+                end = time.monotonic()
+                chunks = [audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)]
+                sample_rate = SAMPLE_RATE
+                ended_at = lambda: end
+            
+            if self.wake_word_spotter is not None:
+                match, chunks = self.wake_word_spotter.gate(chunks)
+                if match is None:
+                    self.logger.debug("No wake word, utterance ignored")
+                    return None
+                self.logger.debug(f"Wake word: {match.word} ({match.distance:.3f})")
+            
+            text = self.transcriber.transcribe(chunks, sample_rate, ended_at, on_partial)
+            
+            if text is None:
+                self.logger.warning("Could not understand audio")
+                return None
+            self.logger.info(f"Recognized: {text}")
+            return text.lower()
+            
+        except RecognitionError as e:
             self.logger.error(f"Speech recognition error: {e}")
             return None
         except Exception as e:
             self.logger.error(f"Unexpected error in voice recognition: {e}")
             return None
     
+    def close(self) -> None:
+        """Release the microphone."""
+        if self.audio_capture is not None:
+            self.audio_capture.close()
+        self.transcriber.log_latency_report()
+    
     def is_wake_word(self, text: str) -> bool:
         """Check if the recognized text contains Finnish wake words."""
         wake_words = ["tulosta", "kirjoita", "piirtää", "kuva"]
@@ -0,0 +1,284 @@
+"""
+Wake Word Module
+
+Spots the wake words at the start of an utterance with MFCC features and
+template matching, before any full speech recognition is done.
+"""
+
+import functools
+import itertools
+import logging
+import time
+import wave
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SAMPLE_RATE = 16000
+
+# MFCC analysis
+FRAME_MS = 25
+HOP_MS = 10
+N_FFT = 512
+N_MELS = 26
+N_CEPS = 13
+PRE_EMPHASIS = 0.97
+# Frames within this much (natural log of power, 20 dB) of the loudest
+# one count as speech for the mean normalization
+SPEECH_RANGE = 4.6
+
+# Words whose own recordings are further apart than the default threshold
+# accept matches this far above that spread
+THRESHOLD_MARGIN = 1.25
+
+
+class WakeWordMatch(NamedTuple):
+    """A wake word found in an utterance."""
+
+    word: str
+    distance: float
+
+
+@functools.lru_cache(maxsize=4)
+def mel_filterbank(sample_rate: int, n_fft: int = N_FFT, n_mels: int = N_MELS,
+                   fmin: float = 20.0) -> np.ndarray:
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)."""
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    edges = to_hz(np.linspace(to_mel(fmin), to_mel(sample_rate / 2), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=4)
+def dct_matrix(n_ceps: int = N_CEPS, n_mels: int = N_MELS) -> np.ndarray:
+    """Orthonormal DCT-II rows 0..n_ceps-1, shape (n_ceps, n_mels)."""
+    n = np.arange(n_mels)
+    k = np.arange(n_ceps)[:, None]
+    matrix = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+def mfcc(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Mel-frequency cepstral coefficients of 16-bit audio.
+
+    All frames are windowed, transformed and projected in single array
+    operations. The energy coefficient c0 is dropped and the rest are
+    normalized by their mean over the speech, so loudness and microphone
+    coloring do not matter.
+    Their frame-to-frame slopes are appended; they carry most of the
+    difference between words that share vowels.
+
+    Args:
+        samples: int16 samples
+        sample_rate: Sample rate of the samples
+
+    Returns:
+        Array of shape (frames, 2 * (N_CEPS - 1))
+    """
+    frame_length = sample_rate * FRAME_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    signal = samples.astype(np.float32) / 32768.0
+    if len(signal) < frame_length:
+        signal = np.pad(signal, (0, frame_length - len(signal)))
+    signal = np.append(signal[:1], signal[1:] - PRE_EMPHASIS * signal[:-1])
+
+    frames = sliding_window_view(signal, frame_length)[::hop] * np.hamming(frame_length)
+    power = np.abs(np.fft.rfft(frames, N_FFT)) ** 2 / N_FFT
+    mel_energy = np.log(power @ mel_filterbank(sample_rate).T + 1e-10)
+    ceps = (mel_energy @ dct_matrix().T)[:, 1:]
+    # Mean over the louder frames only, so silence around the speech does
+    # not shift it
+    loudness = np.log(power.sum(axis=1) + 1e-10)
+    ceps -= ceps[loudness >= loudness.max() - SPEECH_RANGE].mean(axis=0)
+    return np.hstack([ceps, np.gradient(ceps, axis=0)])
+
+
+def subsequence_distance(template: np.ndarray, query: np.ndarray) -> float:
+    """
+    Best match of a template anywhere inside a longer feature sequence.
+
+    Dynamic time warping where the match may start and end at any query
+    frame. Each template frame advances the query by 0, 1 or 2 frames,
+    but never by 0 twice in a row, which allows speech from twice as
+    fast to twice as slow as the template. Every row depends only on the
+    previous one, so rows are computed as whole vectors.
+
+    Args:
+        template: Features of the wake word, shape (n, d)
+        query: Features of the utterance, shape (m, d)
+
+    Returns:
+        Mean cosine distance along the best path (0 is identical)
+    """
+    t = template / (np.linalg.norm(template, axis=1, keepdims=True) + 1e-9)
+    q = query / (np.linalg.norm(query, axis=1, keepdims=True) + 1e-9)
+    cost = 1.0 - t @ q.T
+
+    # Best paths ending at each query frame, by whether the last step moved
+    moved = cost[0]
+    stayed = np.full_like(moved, np.inf)
+    padded = np.full(len(moved) + 2, np.inf, dtype=cost.dtype)
+    for next_cost in cost[1:]:
+        padded[2:] = np.minimum(moved, stayed)
+        stayed = next_cost + moved
+        moved = next_cost + np.minimum(padded[1:-1], padded[:-2])
+    return float(np.minimum(moved, stayed).min() / len(cost))
+
+
+def read_wav(path: Union[str, Path]) -> Tuple[np.ndarray, int]:
+    """Read a 16-bit WAV file as mono samples and its sample rate."""
+    with wave.open(str(path), "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV is supported")
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        channels = f.getnchannels()
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return samples, f.getframerate()
+
+
+class WakeWordSpotter:
+    """
+    Keyword spotter that decides whether an utterance is meant for us.
+
+    Each wake word is enrolled from a few recordings of it. The first
+    ``window`` seconds of an utterance are compared against every
+    recording; a wake word is found when the closest match is within the
+    word's threshold. The threshold is ``default_threshold`` unless the
+    word's own recordings differ more than that, e.g. when they come
+    from several speakers.
+    """
+
+    def __init__(self, wake_words: Iterable[str], sample_rate: int = SAMPLE_RATE,
+                 window: float = 2.0, default_threshold: float = 0.18):
+        self.logger = logging.getLogger(__name__)
+        self.wake_words = list(wake_words)
+        self.sample_rate = sample_rate
+        self.window = window
+        self.default_threshold = default_threshold
+        self.templates: Dict[str, List[np.ndarray]] = {word: [] for word in self.wake_words}
+        self.thresholds: Dict[str, float] = {}
+
+        self.detections = 0
+        self.rejections = 0
+        self.cpu_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        """Whether any wake word has templates."""
+        return any(self.templates.values())
+
+    def enroll(self, word: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> None:
+        """
+        Add a recording of a wake word.
+
+        Args:
+            word: One of the wake words
+            samples: int16 recording of just the word
+            sample_rate: Must match the spotter's
+        """
+        if word not in self.templates:
+            raise ValueError(f"Not a wake word: {word}")
+        if sample_rate != self.sample_rate:
+            raise ValueError(f"Recording is {sample_rate} Hz, expected {self.sample_rate} Hz")
+        self.templates[word].append(mfcc(samples, self.sample_rate))
+        self._update_threshold(word)
+
+    def _update_threshold(self, word: str) -> None:
+        templates = self.templates[word]
+        if len(templates) < 2:
+            self.thresholds[word] = self.default_threshold
+            return
+        spread = max(subsequence_distance(a, b) for a, b in itertools.permutations(templates, 2))
+        self.thresholds[word] = max(self.default_threshold, spread * THRESHOLD_MARGIN)
+
+    def load_templates(self, directory: Union[str, Path]) -> int:
+        """
+        Enroll recordings from ``<directory>/<wake word>/*.wav``.
+
+        Returns:
+            Number of recordings enrolled
+        """
+        directory = Path(directory)
+        count = 0
+        for word in self.wake_words:
+            for path in sorted((directory / word).glob("*.wav")):
+                try:
+                    samples, rate = read_wav(path)
+                    self.enroll(word, samples, rate)
+                    count += 1
+                except Exception as e:
+                    self.logger.error(f"Could not enroll {path}: {e}")
+
+        missing = [word for word in self.wake_words if not self.templates[word]]
+        if missing:
+            self.logger.warning(f"No recordings for wake words: {', '.join(missing)}")
+        self.logger.info(f"Enrolled {count} wake word recordings from {directory}")
+        return count
+
+    def detect(self, samples: np.ndarray) -> Optional[WakeWordMatch]:
+        """
+        Look for a wake word in the first ``window`` seconds of audio.
+
+        Args:
+            samples: int16 audio from the start of an utterance
+
+        Returns:
+            The best matching wake word within its threshold, or None
+        """
+        start = time.thread_time()
+        features = mfcc(samples[:int(self.window * self.sample_rate)], self.sample_rate)
+
+        best: Optional[WakeWordMatch] = None
+        for word, templates in self.templates.items():
+            for template in templates:
+                distance = subsequence_distance(template, features)
+                if distance <= self.thresholds[word] and (best is None
+                                                          or distance < best.distance):
+                    best = WakeWordMatch(word, distance)
+
+        self.cpu_seconds += time.thread_time() - start
+        if best is None:
+            self.rejections += 1
+        else:
+            self.detections += 1
+        return best
+
+    def gate(self, chunks: Iterable[bytes]) -> Tuple[Optional[WakeWordMatch], Iterator[bytes]]:
+        """
+        Check the start of a streamed utterance for a wake word.
+
+        Reads chunks until ``window`` seconds (or the whole utterance) are
+        available.
+
+        Args:
+            chunks: 16-bit PCM of the utterance
+
+        Returns:
+            The match (or None) and the complete utterance audio, starting
+            with the chunks already read
+        """
+        chunks = iter(chunks)
+        needed = int(self.window * self.sample_rate) * 2
+        head: List[bytes] = []
+        size = 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= needed:
+                break
+
+        match = self.detect(np.frombuffer(b"".join(head), dtype=np.int16))
+        return match, itertools.chain(head, chunks)
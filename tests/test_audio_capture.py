@@ -0,0 +1,169 @@
+import unittest
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from audio_capture import (AudioCapture, RingBuffer, UtteranceSegmenter,
+                           VoiceActivityDetector, frame_features)
+
+RATE = 16000
+FRAME = 480  # 30 ms
+
+
+def noise(seconds, level, seed=0):
+    """Quiet background noise."""
+    rng = np.random.default_rng(seed)
+    return (rng.normal(0, level, int(seconds * RATE))).astype(np.int16)
+
+
+def voiced(seconds, level=6000):
+    """Loud harmonic sound standing in for a vowel."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    wave = np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t)
+    return (level * wave / 1.5).astype(np.int16)
+
+
+class FakeStream:
+    """Plays back samples, then silence."""
+
+    def __init__(self, samples):
+        self.data = samples.tobytes()
+        self.position = 0
+        self.closed = False
+
+    def read(self, frames):
+        size = frames * 2
+        chunk = self.data[self.position:self.position + size]
+        self.position += size
+        if len(chunk) < size:
+            time.sleep(0.001)
+            chunk += bytes(size - len(chunk))
+        return chunk
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class TestRingBuffer(unittest.TestCase):
+    """Test cases for the RingBuffer class."""
+
+    def test_read_by_stream_position(self):
+        """Test reading ranges that wrap around the end of the buffer."""
+        ring = RingBuffer(10)
+        ring.write(np.arange(7, dtype=np.int16))
+        ring.write(np.arange(7, 15, dtype=np.int16))
+        self.assertEqual(ring.written, 15)
+        self.assertEqual(ring.oldest, 5)
+        self.assertEqual(ring.read(8, 13).tolist(), [8, 9, 10, 11, 12])
+        # Overwritten samples are skipped
+        self.assertEqual(ring.read(0, 7).tolist(), [5, 6])
+
+    def test_write_longer_than_capacity(self):
+        """Test that only the newest samples of a long write are kept."""
+        ring = RingBuffer(4)
+        ring.write(np.arange(10, dtype=np.int16))
+        self.assertEqual(ring.read(0, 10).tolist(), [6, 7, 8, 9])
+
+
+class TestVoiceActivity(unittest.TestCase):
+    """Test cases for frame features, the detector and the segmenter."""
+
+    def test_frame_features(self):
+        """Test that loud frames have high energy and noise a high crossing rate."""
+        samples = np.concatenate([np.zeros(FRAME, dtype=np.int16), voiced(FRAME / RATE),
+                                  noise(FRAME / RATE, 3000)])
+        energy, zcr = frame_features(samples, FRAME)
+        self.assertEqual(len(energy), 3)
+        self.assertEqual(energy[0], -100.0)
+        self.assertGreater(energy[1], -25)
+        self.assertLess(zcr[1], 0.1)
+        self.assertGreater(zcr[2], 0.3)
+
+    def test_detector(self):
+        """Test that speech stands out from calibrated background noise."""
+        detector = VoiceActivityDetector()
+        background, _ = frame_features(noise(1, 30), FRAME)
+        detector.calibrate(background)
+
+        samples = np.concatenate([noise(0.3, 30, 1), voiced(0.3), noise(0.3, 30, 2)])
+        speech = detector.classify(*frame_features(samples, FRAME))
+        self.assertFalse(speech[:10].any())
+        self.assertTrue(speech[10:20].all())
+        self.assertFalse(speech[20:].any())
+
+    def test_segmenter(self):
+        """Test utterance boundaries with pre-roll, hangover and tail."""
+        segmenter = UtteranceSegmenter(start_frames=2, hangover_frames=3,
+                                       pre_roll_frames=2, tail_frames=1)
+        frames = [False] * 5 + [True] * 4 + [False, True] + [False] * 5
+        self.assertEqual(segmenter.feed(np.array(frames)), [(3, 12)])
+        self.assertFalse(segmenter.in_speech)
+
+    def test_segmenter_split_across_calls(self):
+        """Test that boundaries are stream frame numbers across feed calls."""
+        segmenter = UtteranceSegmenter(start_frames=1, hangover_frames=2,
+                                       pre_roll_frames=0, tail_frames=0)
+        self.assertEqual(segmenter.feed(np.array([False, False, True])), [])
+        self.assertEqual(segmenter.feed(np.array([True, False, False])), [(2, 4)])
+
+    def test_max_length(self):
+        """Test that continuous speech is cut at max_frames."""
+        segmenter = UtteranceSegmenter(start_frames=1, pre_roll_frames=0, max_frames=5)
+        self.assertEqual(segmenter.feed(np.ones(12, dtype=bool)), [(0, 5), (5, 10)])
+
+
+class TestAudioCapture(unittest.TestCase):
+    """Test cases for the AudioCapture class."""
+
+    def test_utterance_with_pre_roll(self):
+        """Test that an utterance is cut out of the stream with its pre-roll."""
+        samples = np.concatenate([noise(1.5, 30), voiced(0.6), noise(1.5, 30, 1)])
+        streams = []
+        started = []
+
+        def open_stream(rate, frames):
+            streams.append(FakeStream(samples))
+            return streams[-1]
+
+        capture = AudioCapture(open_stream, pre_roll=0.3, hangover=0.3,
+                               on_speech_start=lambda: started.append(time.monotonic()))
+        capture.start()
+        try:
+            utterance = capture.get_utterance(timeout=5)
+        finally:
+            capture.close()
+
+        self.assertIsNotNone(utterance)
+        self.assertEqual(utterance.sample_rate, RATE)
+        # 0.6 s of speech plus pre-roll and tail, in whole frames
+        self.assertAlmostEqual(utterance.duration, 1.11, delta=0.1)
+        pcm = np.frombuffer(utterance.pcm, dtype=np.int16)
+        self.assertLess(np.abs(pcm[:FRAME * 9]).max(), 1000)
+        self.assertTrue(streams[0].closed)
+        self.assertEqual(len(started), 1)
+
+    def test_timeout_without_speech(self):
+        """Test that silence yields no utterance."""
+        capture = AudioCapture(lambda rate, frames: FakeStream(noise(2, 30)))
+        capture.start()
+        try:
+            self.assertIsNone(capture.get_utterance(timeout=0.2))
+        finally:
+            capture.close()
+
+    def test_buffer_must_hold_an_utterance(self):
+        """Test that a ring buffer shorter than an utterance is rejected."""
+        with self.assertRaises(ValueError):
+            AudioCapture(FakeStream, buffer_seconds=5, max_utterance=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+import sys
+import os
+import types
+import tempfile
+import shutil
+from concurrent.futures import Future
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from audio_player import NORMAL, URGENT
+from disk_cache import DiskCache
+from tts_server import SpeechError
+
+# pygame and pyttsx3 are only installed on the printer host; the speech
+# server path does not use them beyond the mixer replaced below, so empty
+# modules stand in for them while audio_feedback is imported
+stubs = []
+for name in ("pygame", "pyttsx3"):
+    try:
+        __import__(name)
+    except ImportError:
+        sys.modules[name] = types.ModuleType(name)
+        stubs.append(name)
+
+import audio_feedback
+from audio_feedback import AudioFeedback
+
+for name in stubs:
+    del sys.modules[name]
+
+
+class FakeMixer:
+    """Mixer that cannot be opened; sounds remember their file."""
+
+    @staticmethod
+    def init():
+        raise RuntimeError("no audio device")
+
+    @staticmethod
+    def get_init():
+        return None
+
+    class Sound:
+        def __init__(self, path):
+            self.data = Path(path).read_bytes()
+
+
+class FakePlayer:
+    """Records what would have been played."""
+
+    def __init__(self):
+        self.played = []
+        self.stopped = 0
+
+    def play_file(self, path, priority=NORMAL):
+        self.played.append((Path(path).read_bytes(), priority))
+
+    def play_sound(self, sound, priority=NORMAL, name=None):
+        self.played.append((sound.data, priority))
+
+    def stop_all(self):
+        self.stopped += 1
+
+
+class FakeSpeechServer:
+    """Queues phrases; the test finishes them with ``finish``."""
+
+    voice = "fi-test"
+
+    def __init__(self):
+        self.requests = []
+        self.cancelled = 0
+        self.closed = False
+
+    def synthesize(self, text, path):
+        if self.closed:
+            raise RuntimeError("Speech server is closed")
+        future = Future()
+        self.requests.append((text, Path(path), future))
+        return future
+
+    def synthesize_to(self, text, path):
+        raise AssertionError("speak_text must not wait for the server")
+
+    def cancel_pending(self):
+        self.cancelled += 1
+        return 0
+
+    def finish(self, index=-1, error=None):
+        text, path, future = self.requests[index]
+        if error is not None:
+            future.set_exception(error)
+            return
+        path.write_bytes(f"RIFF {text}".encode("utf-8"))
+        future.set_result(str(path))
+
+
+class TestSpeechServerFeedback(unittest.TestCase):
+    """Test cases for speaking through the speech server."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self._pygame = audio_feedback.pygame
+        audio_feedback.pygame = types.SimpleNamespace(mixer=FakeMixer)
+        self.server = FakeSpeechServer()
+        self.player = FakePlayer()
+
+    def tearDown(self):
+        audio_feedback.pygame = self._pygame
+        shutil.rmtree(self.temp_dir)
+
+    def feedback(self, cache=True):
+        speech_cache = DiskCache(self.temp_dir / "speech", suffix=".wav") if cache else None
+        feedback = AudioFeedback(str(self.temp_dir / "audio"), speech_cache=speech_cache,
+                                 speech_server=self.server)
+        feedback.player = self.player
+        return feedback
+
+    def test_miss_is_synthesized_cached_and_played(self):
+        """Test that a new phrase is played once synthesized and then cached."""
+        feedback = self.feedback()
+        self.assertTrue(feedback.speak_text("Hienoa!", URGENT))
+        self.assertEqual(self.player.played, [])
+        temp_path = self.server.requests[0][1]
+
+        self.server.finish()
+        self.assertEqual(self.player.played, [(b"RIFF Hienoa!", URGENT)])
+        self.assertFalse(temp_path.exists())
+        self.assertIsNotNone(feedback.speech_cache.get("Hienoa!"))
+
+        # The second time it comes from the cache, without the server
+        self.assertTrue(feedback.speak_text("Hienoa!"))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.player.played[-1], (b"RIFF Hienoa!", NORMAL))
+
+    def test_barge_in_drops_speech_in_synthesis(self):
+        """Test that speech finished after a barge-in is cached but not played."""
+        feedback = self.feedback()
+        feedback.speak_text("Kuuntelen...")
+        feedback.barge_in()
+        self.assertEqual((self.player.stopped, self.server.cancelled), (1, 1))
+
+        self.server.finish()
+        self.assertEqual(self.player.played, [])
+        self.assertFalse(self.server.requests[0][1].exists())
+        self.assertIsNotNone(feedback.speech_cache.get("Kuuntelen..."))
+
+        # Speech requested after the barge-in plays again
+        feedback.speak_text("Hienoa!")
+        self.server.finish()
+        self.assertEqual(self.player.played, [(b"RIFF Hienoa!", NORMAL)])
+
+    def test_failed_synthesis_removes_temp_file(self):
+        """Test that failed or cancelled phrases play nothing and leave no file."""
+        feedback = self.feedback()
+        feedback.speak_text("yksi")
+        self.server.finish(error=SpeechError("worker exited with code -9"))
+
+        feedback.speak_text("kaksi")
+        # Cancelled by a barge-in before it started
+        self.assertTrue(self.server.requests[-1][2].cancel())
+
+        self.assertEqual(self.player.played, [])
+        for _, path, _ in self.server.requests:
+            self.assertFalse(path.exists())
+        self.assertIsNone(feedback.speech_cache.get("yksi"))
+
+    def test_server_refusal_removes_temp_file(self):
+        """Test that a phrase the server does not accept reports failure."""
+        feedback = self.feedback()
+        created = []
+        mkstemp = tempfile.mkstemp
+
+        def tracking_mkstemp(*args, **kwargs):
+            handle, path = mkstemp(*args, **kwargs)
+            created.append(path)
+            return handle, path
+
+        self.server.closed = True
+        audio_feedback.tempfile = types.SimpleNamespace(mkstemp=tracking_mkstemp)
+        try:
+            self.assertFalse(feedback.speak_text("hei"))
+        finally:
+            audio_feedback.tempfile = tempfile
+        self.assertEqual(len(created), 1)
+        self.assertFalse(os.path.exists(created[0]))
+
+    def test_without_cache_plays_synthesized_file(self):
+        """Test that without a speech cache the temporary file itself is played."""
+        feedback = self.feedback(cache=False)
+        feedback.speak_text("Hienoa!")
+        self.server.finish()
+        self.assertEqual(self.player.played, [(b"RIFF Hienoa!", NORMAL)])
+        self.assertFalse(self.server.requests[0][1].exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
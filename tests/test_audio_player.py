@@ -0,0 +1,161 @@
+import unittest
+import sys
+import asyncio
+import tempfile
+import shutil
+import threading
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from audio_player import LOW, NORMAL, URGENT, AudioPlayer
+
+
+class FakeSound:
+    """Sound of a fixed length."""
+
+    def __init__(self, name, length=0.05):
+        self.name = name
+        self.length = length
+
+    def get_length(self):
+        return self.length
+
+
+class FakeChannel:
+    """Mixer channel that is busy for the length of the sound it plays."""
+
+    def __init__(self):
+        self.played = []
+        self.stopped = []
+        self.sound = None
+        self.until = 0.0
+        self.fail = False
+
+    def play(self, sound):
+        if self.fail:
+            raise RuntimeError("mixer gone")
+        self.played.append(sound.name)
+        self.sound = sound
+        self.until = time.monotonic() + sound.length
+
+    def get_busy(self):
+        return self.sound is not None and time.monotonic() < self.until
+
+    def stop(self):
+        if self.get_busy():
+            self.stopped.append(self.sound.name)
+        self.sound = None
+
+
+class TestAudioPlayer(unittest.TestCase):
+    """Test cases for the AudioPlayer class."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.channel = FakeChannel()
+        self.loaded = []
+
+        def load_sound(path):
+            self.loaded.append(Path(path).name)
+            return FakeSound(Path(path).name)
+
+        self.player = AudioPlayer(self.channel, load_sound)
+
+    def tearDown(self):
+        self.player.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_preload_once(self):
+        """Test that clips are decoded at startup and not on every play."""
+        for name in ("success.wav", "error.wav", "notes.txt"):
+            (self.temp_dir / name).write_bytes(b"RIFF")
+        self.assertEqual(self.player.preload(self.temp_dir), 2)
+
+        for _ in range(3):
+            self.assertTrue(self.player.play("success.wav").result(timeout=2))
+        self.assertEqual(sorted(self.loaded), ["error.wav", "success.wav"])
+        self.assertIsNone(self.player.play("missing.wav"))
+
+    def test_play_does_not_block(self):
+        """Test that play returns before the sound has finished."""
+        self.player.sounds["long.wav"] = FakeSound("long.wav", length=0.3)
+        start = time.monotonic()
+        playback = self.player.play("long.wav")
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertFalse(playback.done())
+        self.assertTrue(self.player.busy)
+        self.assertTrue(playback.result(timeout=2))
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+
+    def test_queued_by_priority(self):
+        """Test that waiting sounds play highest priority first, then in order."""
+        self.player.sounds.update({name: FakeSound(name) for name in ("a", "b", "c", "d")})
+        first = self.player.play("a", URGENT)
+        self.player.play("b", LOW)
+        self.player.play("c", NORMAL)
+        last = self.player.play("d", NORMAL)
+
+        self.assertTrue(first.result(timeout=2))
+        last.result(timeout=2)
+        self.player.play("b", LOW).result(timeout=2)
+        self.assertEqual(self.channel.played[:4], ["a", "c", "d", "b"])
+
+    def test_urgent_interrupts(self):
+        """Test that a higher priority sound stops the one playing."""
+        self.player.sounds["welcome.wav"] = FakeSound("welcome.wav", length=5)
+        self.player.sounds["limit.wav"] = FakeSound("limit.wav")
+        welcome = self.player.play("welcome.wav", LOW)
+        while not self.channel.played:
+            time.sleep(0.005)
+
+        urgent = self.player.play("limit.wav", URGENT)
+        self.assertFalse(welcome.result(timeout=1))
+        self.assertTrue(welcome.interrupted)
+        self.assertTrue(urgent.result(timeout=1))
+        self.assertEqual(self.channel.stopped, ["welcome.wav"])
+
+    def test_equal_priority_waits(self):
+        """Test that a sound of the same priority does not interrupt."""
+        self.player.sounds.update({"a": FakeSound("a", 0.1), "b": FakeSound("b")})
+        first = self.player.play("a")
+        second = self.player.play("b")
+        self.assertTrue(first.result(timeout=2))
+        self.assertTrue(second.result(timeout=2))
+        self.assertEqual(self.channel.stopped, [])
+
+    def test_callbacks_and_awaitables(self):
+        """Test completion callbacks and awaiting from asyncio."""
+        self.player.sounds["success.wav"] = FakeSound("success.wav")
+        called = threading.Event()
+        self.player.play("success.wav").add_done_callback(lambda done: called.set())
+        self.assertTrue(called.wait(2))
+
+        async def main():
+            return await self.player.play_async("success.wav")
+
+        self.assertTrue(asyncio.run(main()))
+
+    def test_stop_all_and_failures(self):
+        """Test that queued sounds are cancelled and mixer errors resolve False."""
+        self.player.sounds.update({"a": FakeSound("a", 5), "b": FakeSound("b")})
+        playing = self.player.play("a")
+        queued = self.player.play("b")
+        while not self.channel.played:
+            time.sleep(0.005)
+        self.player.stop_all()
+        self.assertFalse(playing.result(timeout=1))
+        self.assertTrue(queued.cancelled())
+
+        self.channel.fail = True
+        self.assertFalse(self.player.play("b").result(timeout=1))
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            self.player.play_sound(FakeSound("a"), "loud")
+
+
+if __name__ == "__main__":
+    unittest.main()
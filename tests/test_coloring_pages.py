@@ -0,0 +1,79 @@
+import unittest
+import sys
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from coloring_pages import TEMPLATES, ColoringPageGenerator, generate_page
+
+
+class TestGeneratePage(unittest.TestCase):
+    """Test cases for drawing single pages."""
+
+    def test_every_template_is_a_pdf(self):
+        """Test that each template produces a complete PDF."""
+        for template in TEMPLATES:
+            with self.subTest(template=template):
+                page = generate_page(template, 1)
+                self.assertTrue(page.startswith(b"%PDF-"))
+                self.assertTrue(page.endswith(b"%%EOF\n"))
+                self.assertIn(b" S", page)
+
+    def test_deterministic_per_seed(self):
+        """Test that a seed always gives the same page and seeds differ."""
+        self.assertEqual(generate_page("kukka", 7), generate_page("kukka", 7))
+        self.assertNotEqual(generate_page("kukka", 7), generate_page("kukka", 8))
+
+    def test_page_size(self):
+        """Test that the page size is honored."""
+        self.assertIn(b"/MediaBox [0 0 612 792]", generate_page("talo", 1, "letter"))
+
+
+class TestColoringPageGenerator(unittest.TestCase):
+    """Test cases for the ColoringPageGenerator class."""
+
+    def setUp(self):
+        self.generator = ColoringPageGenerator(warm_per_template=1, workers=2, seed=1)
+
+    def tearDown(self):
+        self.generator.close()
+
+    def test_not_started(self):
+        """Test that pages are only served once the workers run."""
+        with self.assertRaises(RuntimeError):
+            self.generator.get_page("värityskuva")
+
+    def test_template_from_request(self):
+        """Test that inflected template names in a request are recognized."""
+        self.assertEqual(self.generator.match_template("värityskuva kalasta"), "kala")
+        self.assertEqual(self.generator.match_template("tulosta värityskuva perhosesta"),
+                         "perhonen")
+        self.assertIsNone(self.generator.match_template("tulosta värityskuva"))
+
+    def test_warm_pool_serves_ready_pages(self):
+        """Test that a request takes a pre-generated page and it is replaced."""
+        self.generator.start()
+        deadline = time.monotonic() + 30
+        while not all(pool and pool[0].done() for pool in self.generator._pool.values()):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+        page = self.generator.get_page("värityskuva talosta")
+        self.assertIn("talo".encode("ascii"), page)
+        self.assertEqual(self.generator.served_warm, 1)
+        self.assertEqual(self.generator.served_cold, 0)
+        self.assertEqual(len(self.generator._pool["talo"]), 1)
+
+    def test_cold_request_waits_for_page(self):
+        """Test that a page is drawn on demand when none is ready."""
+        self.generator.warm_per_template = 0
+        self.generator.start()
+        page = self.generator.get_page("värityskuva aurinko")
+        self.assertTrue(page.startswith(b"%PDF-"))
+        self.assertEqual(self.generator.served_cold, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
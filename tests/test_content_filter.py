@@ -2,8 +2,9 @@ import unittest
 import sys
 from pathlib import Path
 
-# Add src to path for imports
+# Add src and project root to path for imports
 sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent.parent))
 
 from content_filter import ContentFilter
 
@@ -54,6 +55,29 @@ class TestContentFilter(unittest.TestCase):
         spam_text = "aaaaaa tulosta"  # Repeated characters
         self.assertFalse(self.filter.is_safe(spam_text))
     
+    def test_added_blocked_word(self):
+        """Test that words added at runtime are blocked."""
+        self.assertTrue(self.filter.is_safe("tulosta kuva hirviöstä"))
+        self.filter.add_blocked_word("Hirviö")
+        self.assertFalse(self.filter.is_safe("tulosta kuva hirviöstä"))
+    
+    def test_safe_word_does_not_hide_blocked_word(self):
+        """Test that a blocked word inside an allowed word is still blocked."""
+        self.filter.add_blocked_word("ruma")
+        self.filter.add_safe_word("rumailija")
+        self.assertFalse(self.filter.is_safe("rumailija"))
+        self.assertEqual(self.filter.classify("rumailija").blocked_term, "ruma")
+    
+    def test_repeated_characters_limit(self):
+        """Test that five repeated characters pass and six are blocked."""
+        self.assertTrue(self.filter.is_safe("aaaaa tulosta"))
+        self.assertFalse(self.filter.is_safe("tulosta kuva!!!!!!"))
+    
+    def test_repeated_characters_are_case_sensitive(self):
+        """Test that runs are counted on the text as spoken, not lowercased."""
+        self.assertTrue(self.filter.is_safe("AAAaaa tulosta"))
+        self.assertFalse(self.filter.is_safe("PERKELE"))
+    
     def test_educational_content_detection(self):
         """Test educational content detection."""
         educational_texts = [
@@ -66,6 +90,37 @@ class TestContentFilter(unittest.TestCase):
             with self.subTest(text=text):
                 self.assertTrue(self.filter.is_educational_content(text))
 
+    
+    def test_is_safe_many(self):
+        """Test batch classification returns all verdicts in order."""
+        results = self.filter.is_safe_many([
+            "laske numerot",
+            "perkele",
+            "",
+            "tulosta kuva kissasta",
+        ])
+        
+        self.assertEqual([r.is_safe for r in results], [True, False, False, True])
+        self.assertEqual([r.is_educational for r in results], [True, False, False, False])
+        self.assertEqual(results[1].blocked_term, "perkele")
+        self.assertEqual(results[1].reason, "blocked")
+        self.assertEqual(results[2].reason, "empty")
+    
+    def test_filter_stream_is_lazy(self):
+        """Test that the stream classifies texts as they are consumed."""
+        consumed = []
+        
+        def texts():
+            for text in ["kissa", "saatana", "koira"]:
+                consumed.append(text)
+                yield text
+        
+        stream = self.filter.filter_stream(texts())
+        first = next(stream)
+        self.assertTrue(first.is_safe)
+        self.assertEqual(consumed, ["kissa"])
+        self.assertEqual([r.blocked_term for r in stream], ["saatana", None])
+
 
 if __name__ == "__main__":
     unittest.main()
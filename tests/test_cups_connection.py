@@ -0,0 +1,272 @@
+import unittest
+import sys
+import types
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+try:
+    import cups
+except ImportError:
+    # pycups is only installed on the printer host; the tests need its
+    # exception type and status codes only
+    cups = types.ModuleType("cups")
+    cups.IPPError = type("IPPError", (Exception,), {})
+    cups.HTTP_CONTINUE = 100
+    cups.Connection = None
+    sys.modules["cups"] = cups
+
+from cups_connection import CupsConnection
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCupsServer:
+    """Stands in for cups.Connection; failures are queued per method."""
+
+    def __init__(self):
+        self.printers = {"olohuone": {"printer-state": 3}, "luokka": {"printer-state": 3}}
+        self.default = "luokka"
+        self.failures = {}
+        # Return values by method, for the streaming calls
+        self.statuses = {"startDocument": cups.HTTP_CONTINUE,
+                         "writeRequestData": cups.HTTP_CONTINUE,
+                         "finishDocument": 0}
+        self.calls = []
+        self.data = []
+        self.connections = 0
+        self.refuse_connections = 0
+
+    def connect(self):
+        if self.refuse_connections:
+            self.refuse_connections -= 1
+            raise RuntimeError("cupsd is not running")
+        self.connections += 1
+        return FakeCupsConnection(self)
+
+    def fail(self, method, *errors):
+        self.failures.setdefault(method, []).extend(errors)
+
+
+class FakeCupsConnection:
+    """Answers the calls CupsConnection makes."""
+
+    def __init__(self, server):
+        self.server = server
+
+    def __getattr__(self, method):
+        def call(*args, **kwargs):
+            self.server.calls.append(method)
+            errors = self.server.failures.get(method)
+            if errors:
+                raise errors.pop(0)
+            if method == "getPrinters":
+                return dict(self.server.printers)
+            if method == "getDefault":
+                return self.server.default
+            if method == "createJob":
+                return 42
+            if method == "writeRequestData":
+                self.server.data.append(args[0])
+            if method in self.server.statuses:
+                return self.server.statuses[method]
+            return len(self.server.calls)
+        return call
+
+
+class TestCupsConnection(unittest.TestCase):
+    """Test cases for the CupsConnection class."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.server = FakeCupsServer()
+        self.connection = CupsConnection(cache_ttl=30, min_backoff=1, max_backoff=4,
+                                         connect=self.server.connect, clock=self.clock)
+
+    def test_reconnect_backoff(self):
+        """Test that failed connects back off exponentially up to the maximum."""
+        self.server.refuse_connections = 4
+        attempts = []
+        for _ in range(14):
+            refused = self.server.refuse_connections
+            connected = self.connection.connect()
+            if connected or self.server.refuse_connections != refused:
+                attempts.append(self.clock.now - 1000)
+            if connected:
+                break
+            self.clock.now += 1
+
+        # Retries after 1, 2, 4 and (capped) 4 s
+        self.assertEqual(attempts, [0, 1, 3, 7, 11])
+        self.assertTrue(self.connection.is_connected)
+
+        # A successful connect resets the backoff
+        self.connection._drop()
+        self.server.refuse_connections = 1
+        self.assertFalse(self.connection.connect())
+        self.clock.now += 1
+        self.assertTrue(self.connection.connect())
+
+    def test_call_without_connection(self):
+        """Test that calls fail fast while the server is unreachable."""
+        self.server.refuse_connections = 1
+        with self.assertRaises(ConnectionError):
+            self.connection.call("getJobs")
+        with self.assertRaises(ConnectionError):
+            self.connection.call("getJobs")
+        self.assertEqual(self.server.refuse_connections, 0)
+        self.assertEqual(self.server.calls, [])
+
+    def test_connection_is_reused(self):
+        """Test that successful calls share one connection."""
+        for _ in range(3):
+            self.connection.call("getJobs")
+        self.assertEqual(self.server.connections, 1)
+
+    def test_idempotent_call_retried_once(self):
+        """Test that a query survives one dropped connection."""
+        self.server.fail("getJobs", RuntimeError("broken pipe"))
+        self.assertEqual(self.connection.call("getJobs"), 2)
+        self.assertEqual(self.server.calls, ["getJobs", "getJobs"])
+        self.assertEqual(self.server.connections, 2)
+
+        self.server.fail("getJobs", RuntimeError("broken pipe"), RuntimeError("broken pipe"))
+        with self.assertRaises(RuntimeError):
+            self.connection.call("getJobs")
+        self.assertEqual(self.server.calls.count("getJobs"), 4)
+
+    def test_submission_not_retried(self):
+        """Test that printFile and createJob are sent only once."""
+        self.server.fail("printFile", RuntimeError("broken pipe"))
+        with self.assertRaises(RuntimeError):
+            self.connection.call("printFile", "luokka", "/tmp/a.txt", "Testi", {},
+                                 idempotent=False)
+
+        self.server.fail("createJob", RuntimeError("broken pipe"))
+        with self.assertRaises(RuntimeError):
+            self.connection.submit_stream("luokka", "Testi", [b"hei"])
+
+        self.assertEqual(self.server.calls, ["printFile", "createJob"])
+        self.assertFalse(self.connection.is_connected)
+
+    def test_ipp_error_keeps_connection(self):
+        """Test that a server-side refusal is not retried or reconnected."""
+        self.server.fail("cancelJob", cups.IPPError("not found"))
+        with self.assertRaises(cups.IPPError):
+            self.connection.call("cancelJob", 7)
+        self.assertEqual(self.server.calls, ["cancelJob"])
+        self.assertTrue(self.connection.is_connected)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_printer_cache(self):
+        """Test that the printer list and default are cached for the TTL."""
+        self.assertEqual(self.connection.get_printer_names(), ["olohuone", "luokka"])
+        self.assertEqual(self.connection.get_default_printer(), "luokka")
+        self.assertEqual(self.server.calls, ["getPrinters", "getDefault"])
+
+        self.clock.now += 29
+        self.connection.get_printers()
+        self.assertEqual(len(self.server.calls), 2)
+
+        self.clock.now += 2
+        self.server.printers["keittiö"] = {"printer-state": 3}
+        self.assertIn("keittiö", self.connection.get_printer_names())
+        self.assertEqual(self.server.calls, ["getPrinters", "getDefault"] * 2)
+
+    def test_default_printer_fallbacks(self):
+        """Test the first printer is used when the default is missing."""
+        self.server.fail("getDefault", cups.IPPError("no default"))
+        self.assertEqual(self.connection.get_default_printer(), "olohuone")
+
+        self.connection.invalidate()
+        self.server.printers = {}
+        self.assertIsNone(self.connection.get_default_printer())
+
+    def test_cache_cleared_on_ipp_error(self):
+        """Test that an IPP error makes the next lookup ask the server again."""
+        self.connection.get_printers()
+        self.server.fail("printFile", cups.IPPError("printer stopped"))
+        with self.assertRaises(cups.IPPError):
+            self.connection.call("printFile", "luokka", "/tmp/a.txt", "Testi", {},
+                                 idempotent=False)
+        self.connection.get_printers()
+        self.assertEqual(self.server.calls.count("getPrinters"), 2)
+
+    def test_cache_cleared_on_transport_error(self):
+        """Test that a dropped connection also discards the cached printers."""
+        self.connection.get_printers()
+        self.server.fail("printFile", RuntimeError("connection reset"))
+        with self.assertRaises(RuntimeError):
+            self.connection.call("printFile", "luokka", "/tmp/a.txt", "Testi", {},
+                                 idempotent=False)
+        self.connection.get_printers()
+        self.assertEqual(self.server.calls.count("getPrinters"), 2)
+        self.assertEqual(self.server.connections, 2)
+
+
+
+class TestSubmitStream(unittest.TestCase):
+    """Test cases for CupsConnection.submit_stream."""
+
+    def setUp(self):
+        self.server = FakeCupsServer()
+        self.connection = CupsConnection(connect=self.server.connect)
+
+    def test_call_order(self):
+        """Test that the document is streamed between createJob and finishDocument."""
+        job_id = self.connection.submit_stream("luokka", "Testi", iter([b"hei ", b"maailma"]),
+                                               "text/plain")
+        self.assertEqual(job_id, 42)
+        self.assertEqual(self.server.calls, ["createJob", "startDocument", "writeRequestData",
+                                             "writeRequestData", "finishDocument"])
+        self.assertEqual(self.server.data, [b"hei ", b"maailma"])
+
+    def test_cancel_on_bad_status(self):
+        """Test that a refused document cancels the created job."""
+        for method, status in [("startDocument", 500), ("writeRequestData", 413),
+                               ("finishDocument", 0x0400)]:
+            with self.subTest(method=method):
+                self.server.calls.clear()
+                ok_status = self.server.statuses[method]
+                self.server.statuses[method] = status
+                with self.assertRaises(IOError):
+                    self.connection.submit_stream("luokka", "Testi", [b"hei"])
+                self.server.statuses[method] = ok_status
+                self.assertEqual(self.server.calls[-2:], [method, "cancelJob"])
+
+    def test_cancel_on_exception(self):
+        """Test that the job is cancelled when the data source or the server fails."""
+        def chunks():
+            yield b"hei"
+            raise OSError("image file vanished")
+
+        with self.assertRaises(OSError):
+            self.connection.submit_stream("luokka", "Testi", chunks())
+        self.assertEqual(self.server.calls[-1], "cancelJob")
+
+        self.server.calls.clear()
+        self.server.fail("writeRequestData", cups.IPPError("client-error"))
+        with self.assertRaises(cups.IPPError):
+            self.connection.submit_stream("luokka", "Testi", [b"hei"])
+        self.assertEqual(self.server.calls, ["createJob", "startDocument",
+                                             "writeRequestData", "cancelJob"])
+
+    def test_failed_cancel_keeps_original_error(self):
+        """Test that the submission error is raised even if cancelling fails."""
+        self.server.statuses["startDocument"] = 500
+        self.server.fail("cancelJob", cups.IPPError("not found"))
+        with self.assertRaises(IOError):
+            self.connection.submit_stream("luokka", "Testi", [b"hei"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -70,6 +70,50 @@ class TestDailyLimitManager(unittest.TestCase):
         self.assertEqual(stats["daily_limit"], 5)
         self.assertEqual(stats["remaining"], 4)
         self.assertTrue(stats["can_print"])
+    
+    def test_per_child_quotas(self):
+        """Test that each child has an own budget shared by all devices."""
+        self.limit_manager.record_print("aino", "kiosk-1")
+        self.limit_manager.record_print("aino", "kiosk-2")
+        self.limit_manager.record_print("eino", "kiosk-1")
+        
+        self.assertEqual(self.limit_manager.get_today_count("aino"), 2)
+        self.assertEqual(self.limit_manager.get_today_count("aino", "kiosk-2"), 1)
+        self.assertEqual(self.limit_manager.get_today_count("eino"), 1)
+        self.assertEqual(self.limit_manager.get_today_count(), 0)
+        self.assertEqual(self.limit_manager.get_remaining_prints("aino"), 3)
+    
+    def test_child_limit_override(self):
+        """Test per-child overrides of the daily limit."""
+        self.limit_manager.set_child_limit("eino", 1)
+        self.assertTrue(self.limit_manager.try_record_print("eino", "kiosk-1"))
+        self.assertFalse(self.limit_manager.try_record_print("eino", "kiosk-2"))
+        self.assertTrue(self.limit_manager.can_print("aino"))
+        
+        self.limit_manager.set_child_limit("eino", None)
+        self.assertEqual(self.limit_manager.get_limit("eino"), 5)
+    
+    def test_all_usage_stats(self):
+        """Test bulk statistics for every child."""
+        self.limit_manager.set_child_limit("eino", 2)
+        self.limit_manager.record_print("aino", "kiosk-1")
+        self.limit_manager.record_print("aino", "kiosk-2")
+        
+        stats = self.limit_manager.get_all_usage_stats()
+        self.assertEqual(sorted(stats), ["aino", "eino"])
+        self.assertEqual(stats["aino"]["devices"], {"kiosk-1": 1, "kiosk-2": 1})
+        self.assertEqual(stats["aino"]["remaining"], 3)
+        self.assertEqual(stats["eino"]["today_count"], 0)
+        self.assertEqual(stats["eino"]["daily_limit"], 2)
+    
+    def test_per_child_counts_persist(self):
+        """Test that per-child counters survive a restart."""
+        self.limit_manager.record_print("aino", "kiosk-1")
+        self.limit_manager.close()
+        
+        reopened = DailyLimitManager(max_daily_prints=5, config_dir=self.temp_dir)
+        self.assertEqual(reopened.get_today_count("aino", "kiosk-1"), 1)
+        self.assertEqual(reopened.get_today_count(), 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from disk_cache import DiskCache, make_key
+from page_renderer import PageRenderer
+
+
+class TestDiskCache(unittest.TestCase):
+    """Test cases for the DiskCache class."""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def test_make_key(self):
+        """Test that keys depend on every part and its boundaries."""
+        self.assertEqual(make_key("kissa", 36), make_key("kissa", 36))
+        self.assertNotEqual(make_key("kissa", 36), make_key("kissa", 48))
+        self.assertNotEqual(make_key("ab", "c"), make_key("a", "bc"))
+    
+    def test_hits_and_misses(self):
+        """Test lookups, creation on miss and the hit counters."""
+        cache = DiskCache(self.temp_dir, suffix=".pdf")
+        created = []
+        
+        def create():
+            created.append(1)
+            return b"%PDF kissa"
+        
+        key = make_key("kissa")
+        first = cache.get_or_create(key, create)
+        second = cache.get_or_create(key, create)
+        
+        self.assertEqual(first, second)
+        self.assertEqual(first.read_bytes(), b"%PDF kissa")
+        self.assertEqual(len(created), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertAlmostEqual(cache.hit_rate, 0.5)
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entries go first."""
+        cache = DiskCache(self.temp_dir, max_bytes=30)
+        for name in ("a", "b", "c"):
+            cache.put(name, b"x" * 10)
+        cache.get("a")
+        cache.put("d", b"x" * 10)
+        
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.size, 30)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir()), ["a", "c", "d"])
+    
+    def test_reopen_keeps_lru_order(self):
+        """Test that entries and their recency survive a restart."""
+        cache = DiskCache(self.temp_dir, max_bytes=30)
+        cache.put("old", b"x" * 10)
+        cache.put("new", b"x" * 10)
+        os.utime(self.temp_dir / "old", (1, 1))
+        
+        reopened = DiskCache(self.temp_dir, max_bytes=20)
+        reopened.put("newest", b"x" * 10)
+        self.assertEqual(len(reopened), 2)
+        self.assertIsNone(reopened.get("old"))
+        self.assertIsNotNone(reopened.get("new"))
+
+
+class TestPageRenderer(unittest.TestCase):
+    """Test cases for the PageRenderer class."""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache = DiskCache(self.temp_dir, suffix=".pdf")
+        self.renderer = PageRenderer(self.cache)
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def test_renders_pdf(self):
+        """Test that a page is a well-formed PDF containing the text."""
+        data = self.renderer.render_bytes("Kuva-pyyntö: kissa (iso)")
+        self.assertTrue(data.startswith(b"%PDF-1.4"))
+        self.assertTrue(data.endswith(b"%%EOF\n"))
+        self.assertIn("Kuva-pyyntö: kissa \\(iso\\)".encode("cp1252"), data)
+        
+        xref = int(data.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+        self.assertTrue(data[xref:].startswith(b"xref"))
+    
+    def test_wraps_long_text(self):
+        """Test that long requests are wrapped to the page width."""
+        lines = self.renderer.layout("kissa " * 40)
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(all(len(line) <= 24 for line in lines))
+    
+    def test_repeat_requests_hit_cache(self):
+        """Test that the same request under the same settings is rendered once."""
+        first = self.renderer.render("tulosta kissa")
+        second = self.renderer.render("tulosta kissa")
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        
+        bigger = PageRenderer(self.cache, font_size=48)
+        self.assertNotEqual(bigger.render("tulosta kissa"), first)
+        self.assertEqual(len(self.cache), 2)
+        
+        with self.assertRaises(ValueError):
+            PageRenderer(self.cache, page_size="A0")
+
+
+if __name__ == "__main__":
+    unittest.main()
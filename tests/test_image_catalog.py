@@ -0,0 +1,161 @@
+import unittest
+import sys
+import os
+import time
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from image_catalog import ImageCatalog, match_score, tokenize
+
+
+class TestMatching(unittest.TestCase):
+    """Test cases for matching inflected Finnish words."""
+    
+    def test_inflected_forms(self):
+        """Test that case endings still match the base word."""
+        self.assertTrue(match_score("perhosesta", "perhonen"))
+        self.assertTrue(match_score("kissasta", "kissa"))
+        self.assertTrue(match_score("hevosen", "hevonen"))
+        self.assertTrue(match_score("kuusta", "kuu"))
+        self.assertGreater(match_score("kissa", "kissa"), match_score("kissan", "kissa"))
+    
+    def test_unrelated_words(self):
+        """Test that a shared beginning alone is not a match."""
+        self.assertFalse(match_score("perhe", "perhonen"))
+        self.assertFalse(match_score("kisko", "kissa"))
+        self.assertFalse(match_score("ku", "kuu"))
+    
+    def test_tokenize(self):
+        """Test that requests and file names split into lowercase words."""
+        self.assertEqual(tokenize("Tulosta KUVA perhosesta!"),
+                         ["tulosta", "kuva", "perhosesta"])
+        self.assertEqual(tokenize("sininen_perhonen-2"), ["sininen", "perhonen"])
+
+
+class ReleaseHookLock:
+    """Lock that runs a callback once, right after it is next released."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.on_release = None
+    
+    def __enter__(self):
+        self._lock.acquire()
+    
+    def __exit__(self, *exc):
+        self._lock.release()
+        hook, self.on_release = self.on_release, None
+        if hook is not None:
+            hook()
+
+
+class TestImageCatalog(unittest.TestCase):
+    """Test cases for the ImageCatalog class."""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.images = self.temp_dir / "images"
+        (self.images / "eläimet").mkdir(parents=True)
+        self.index = self.temp_dir / "image_index.bin"
+        
+        self.add("eläimet/perhonen.png")
+        self.add("eläimet/kissa_ja_pallo.jpg")
+        self.add("aurinko.png", tags="kesä, keltainen")
+        (self.images / "README.txt").write_text("ei kuva")
+        
+        self.catalog = ImageCatalog(self.images, self.index)
+        self.catalog.refresh()
+    
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def add(self, relative, tags=None):
+        path = self.images / relative
+        path.write_bytes(b"image")
+        if tags is not None:
+            path.with_suffix(".txt").write_text(tags, encoding="utf-8")
+        return path
+    
+    def test_find(self):
+        """Test resolving spoken requests to files."""
+        self.assertEqual(self.catalog.find("tulosta kuva perhosesta"),
+                         self.images / "eläimet" / "perhonen.png")
+        self.assertEqual(self.catalog.find("kuva kissasta"),
+                         self.images / "eläimet" / "kissa_ja_pallo.jpg")
+        self.assertEqual(self.catalog.find("jotain keltaista"),
+                         self.images / "aurinko.png")
+        self.assertIsNone(self.catalog.find("tulosta kuva"))
+        self.assertIsNone(self.catalog.find("kuva dinosauruksesta"))
+        self.assertEqual(len(self.catalog), 3)
+    
+    def test_ranking(self):
+        """Test that matching more words ranks higher."""
+        self.add("eläimet/kissa.png")
+        self.catalog.refresh()
+        results = self.catalog.search("kissa ja pallo")
+        self.assertEqual(results[0][0].name, "kissa_ja_pallo.jpg")
+        self.assertEqual({path.name for path, _ in results},
+                         {"kissa.png", "kissa_ja_pallo.jpg"})
+    
+    def test_reopen_without_scanning(self):
+        """Test that a reopened catalog answers from the stored index."""
+        reopened = ImageCatalog(self.images, self.index)
+        try:
+            self.assertEqual(len(reopened), 3)
+            self.assertEqual(reopened.search("kesä")[0][0], self.images / "aurinko.png")
+        finally:
+            reopened.close()
+    
+    def test_incremental_refresh(self):
+        """Test that only added, changed and removed images count as changes."""
+        self.assertEqual(self.catalog.refresh(), 0)
+        
+        self.add("koira.png")
+        (self.images / "eläimet" / "perhonen.png").unlink()
+        tags = self.images / "aurinko.txt"
+        tags.write_text("ilta", encoding="utf-8")
+        later = time.time() + 10
+        os.utime(tags, (later, later))
+        
+        self.assertEqual(self.catalog.refresh(), 3)
+        self.assertIsNotNone(self.catalog.find("kuva koirasta"))
+        self.assertIsNone(self.catalog.find("perhonen"))
+        self.assertIsNotNone(self.catalog.find("ilta"))
+        self.assertIsNone(self.catalog.find("keltainen"))
+    
+    def test_refresh_right_after_search(self):
+        """Test that a search leaves no view that keeps the old index mapped."""
+        self.catalog._lock = ReleaseHookLock()
+        old_index = self.catalog._index
+        self.add("eläimet/koira.png")
+        refreshed = []
+        
+        def refresh():
+            refreshed.append(self.catalog.refresh())
+        
+        # The refresh runs while search() is still returning
+        self.catalog._lock.on_release = refresh
+        self.assertEqual(self.catalog.find("kuva kissasta"),
+                         self.images / "eläimet" / "kissa_ja_pallo.jpg")
+        self.assertEqual(refreshed, [1])
+        self.assertTrue(old_index._map.closed)
+        self.assertEqual(self.catalog.find("koira"), self.images / "eläimet" / "koira.png")
+    
+    def test_corrupt_index_is_rebuilt(self):
+        """Test that an unreadable index file is ignored and replaced."""
+        self.catalog.close()
+        self.index.write_bytes(b"garbage")
+        self.catalog = ImageCatalog(self.images, self.index)
+        self.assertEqual(len(self.catalog), 0)
+        self.catalog.refresh()
+        self.assertEqual(len(self.catalog), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
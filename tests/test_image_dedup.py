@@ -0,0 +1,146 @@
+import unittest
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from image_dedup import ImageDeduplicator, hamming_distance
+
+DAY = 24 * 3600
+
+
+class FakeClock:
+    """Manually advanced clock, starting at noon."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+        self.now -= self.now % DAY
+        self.now += 12 * 3600
+
+    def __call__(self):
+        return self.now
+
+
+class TestImageDeduplicator(unittest.TestCase):
+    """Test cases for the ImageDeduplicator class."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.index_file = self.temp_dir / "printed_images.json"
+        self.clock = FakeClock()
+        # Perceptual hash of each test image, by file name
+        self.hashes = {"cat.png": 0x0F0F_0F0F_0F0F_0F0F,
+                       "cat_copy.jpg": 0x0F0F_0F0F_0F0F_0F0F ^ 0b10110,
+                       "dog.png": 0xF0F0_F0F0_F0F0_F0F0}
+        self.hash_calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def hash_image(self, path):
+        self.hash_calls += 1
+        return self.hashes[Path(path).name]
+
+    def image(self, name):
+        path = self.temp_dir / name
+        if not path.exists():
+            path.write_bytes(name.encode("ascii"))
+        return path
+
+    def make(self, **kwargs):
+        return ImageDeduplicator(self.hash_image, index_file=self.index_file,
+                                 clock=self.clock, **kwargs)
+
+    def print_image(self, dedup, name):
+        result = dedup.check(self.image(name))
+        if result.allowed:
+            dedup.record(result.image_hash, self.image(name))
+        return result
+
+    def test_hamming_distance(self):
+        """Test counting differing bits."""
+        self.assertEqual(hamming_distance(0b1011, 0b0010), 2)
+        self.assertEqual(hamming_distance(5, 5), 0)
+
+    def test_near_duplicate_found(self):
+        """Test that a copy a few bits off matches and a different image does not."""
+        dedup = self.make()
+        self.print_image(dedup, "cat.png")
+
+        result = dedup.check(self.image("cat_copy.jpg"))
+        self.assertEqual(result.match.path, str(self.image("cat.png")))
+        self.assertEqual(result.match.distance, 3)
+        self.assertTrue(result.allowed)
+        self.assertIsNone(dedup.check(self.image("dog.png")).match)
+
+    def test_distance_limit(self):
+        """Test that hashes further apart than max_distance are not duplicates."""
+        dedup = self.make(max_distance=2)
+        self.print_image(dedup, "cat.png")
+        self.assertIsNone(dedup.check(self.image("cat_copy.jpg")).match)
+
+    def test_block_policy(self):
+        """Test that the block policy refuses a reprint."""
+        dedup = self.make(policy="block")
+        self.assertTrue(self.print_image(dedup, "cat.png").allowed)
+        self.assertFalse(self.print_image(dedup, "cat_copy.jpg").allowed)
+        self.assertTrue(self.print_image(dedup, "dog.png").allowed)
+        self.assertEqual(dedup.duplicates, 1)
+
+    def test_only_today_counts(self):
+        """Test that prints from earlier days are not duplicates."""
+        dedup = self.make(policy="block")
+        self.print_image(dedup, "cat.png")
+        self.clock.now += DAY
+        self.assertTrue(self.print_image(dedup, "cat.png").allowed)
+
+    def test_persistence(self):
+        """Test that today's prints survive a restart, yesterday's do not."""
+        self.print_image(self.make(), "cat.png")
+        self.assertIsNotNone(self.make().check(self.image("cat_copy.jpg")).match)
+
+        self.clock.now += DAY
+        self.assertEqual(len(self.make()), 0)
+
+    def test_bounded(self):
+        """Test that the oldest hashes are dropped beyond max_entries."""
+        dedup = self.make(max_entries=2)
+        for name in ("cat.png", "dog.png"):
+            self.print_image(dedup, name)
+        self.hashes["bird.png"] = 0x1234_5678_9ABC_DEF0
+        self.print_image(dedup, "bird.png")
+
+        self.assertEqual(len(dedup), 2)
+        self.assertIsNone(dedup.check(self.image("cat_copy.jpg")).match)
+        self.assertIsNotNone(dedup.check(self.image("dog.png")).match)
+
+    def test_hash_memoized_per_file(self):
+        """Test that an unchanged file is hashed once and a changed one again."""
+        dedup = self.make()
+        for _ in range(3):
+            self.print_image(dedup, "cat.png")
+        self.assertEqual(self.hash_calls, 1)
+
+        self.image("cat.png").write_bytes(b"redrawn cat")
+        self.print_image(dedup, "cat.png")
+        self.assertEqual(self.hash_calls, 2)
+
+    def test_unhashable_image_is_allowed(self):
+        """Test that an image that cannot be hashed still prints."""
+        result = self.make(policy="block").check("missing.png")
+        self.assertTrue(result.allowed)
+        self.assertIsNone(result.image_hash)
+
+    def test_invalid_settings(self):
+        """Test that unknown policies and unreachable distances are rejected."""
+        with self.assertRaises(ValueError):
+            self.make(policy="ignore")
+        with self.assertRaises(ValueError):
+            self.make(max_distance=8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import unittest
+import sys
+import io
+import tempfile
+import shutil
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from disk_cache import DiskCache
+from image_pipeline import (DEFAULT_PROFILE, ImagePipeline, PrinterProfile, bayer_matrix,
+                            dither_to_1bit, profile_from_attributes)
+
+# Printable area of 200 x 300 pixels (quarter-inch margins at 100 dpi)
+SMALL_MONO = PrinterProfile(100, (2.5, 3.5), False)
+SMALL_COLOR = PrinterProfile(100, (2.5, 3.5), True)
+
+
+class TestPrinterProfile(unittest.TestCase):
+    """Test cases for reading printer profiles from IPP attributes."""
+
+    def test_resolution_units(self):
+        """Test dots per inch and dots per centimetre resolutions."""
+        dpi = profile_from_attributes({"printer-resolution-default": (600, 600, 3)})
+        self.assertEqual(dpi.dpi, 600)
+        dpcm = profile_from_attributes({"printer-resolution-default": (118, 118, 4)})
+        self.assertEqual(dpcm.dpi, 300)
+        uneven = profile_from_attributes({"printer-resolution-default": (1200, 600, 3)})
+        self.assertEqual(uneven.dpi, 600)
+
+    def test_media_size(self):
+        """Test paper sizes given in millimetres and inches."""
+        a5 = profile_from_attributes({"media-default": "iso_a5_148x210mm"})
+        self.assertAlmostEqual(a5.page_inches[0], 148 / 25.4)
+        self.assertAlmostEqual(a5.page_inches[1], 210 / 25.4)
+        letter = profile_from_attributes({"media-default": "na_letter_8.5x11in"})
+        self.assertEqual(letter.page_inches, (8.5, 11.0))
+
+    def test_defaults(self):
+        """Test that missing or unreadable attributes fall back to A4 at 300 dpi."""
+        self.assertEqual(profile_from_attributes({}), DEFAULT_PROFILE)
+        odd = profile_from_attributes({"printer-resolution-default": 300,
+                                       "media-default": "custom_roll",
+                                       "color-supported": False})
+        self.assertEqual(odd, PrinterProfile(300, (8.27, 11.69), False))
+
+    def test_pixel_size(self):
+        """Test the printable area excludes the margins."""
+        self.assertEqual(SMALL_MONO.pixel_size, (200, 300))
+
+
+class TestDithering(unittest.TestCase):
+    """Test cases for ordered dithering."""
+
+    def test_bayer_matrix(self):
+        """Test the thresholds of the 2x2 and 8x8 matrices."""
+        np.testing.assert_allclose(bayer_matrix(1), [[0.125, 0.625], [0.875, 0.375]])
+        matrix = bayer_matrix(3)
+        self.assertEqual(matrix.shape, (8, 8))
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(np.sort(matrix.ravel()), (np.arange(64) + 0.5) / 64)
+
+    def test_dither_to_1bit(self):
+        """Test that gray levels become matching shares of white pixels."""
+        for level, share in [(0, 0.0), (64, 0.25), (128, 0.5), (255, 1.0)]:
+            with self.subTest(level=level):
+                image = dither_to_1bit(Image.new("L", (13, 7), level))
+                self.assertEqual(image.mode, "1")
+                self.assertEqual(image.size, (13, 7))
+                tile = np.asarray(dither_to_1bit(Image.new("L", (8, 8), level)))
+                self.assertAlmostEqual(tile.mean(), share, delta=1 / 64)
+
+
+class TestImagePipeline(unittest.TestCase):
+    """Test cases for the ImagePipeline class."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def save(self, image, name="kuva.png"):
+        path = self.temp_dir / name
+        image.save(path)
+        return path
+
+    @staticmethod
+    def decode(prepared):
+        return Image.open(io.BytesIO(prepared.data))
+
+    def test_downscale_to_printable_area(self):
+        """Test that a large image is fitted to exactly the printable pixels."""
+        path = self.save(Image.new("RGB", (800, 1200), (200, 30, 30)))
+        prepared = ImagePipeline(mono_mode="gray").prepare(path, SMALL_MONO)
+        self.assertEqual(prepared.size, (200, 300))
+        self.assertEqual(self.decode(prepared).size, (200, 300))
+
+        wide = self.save(Image.new("RGB", (1000, 1000)), "nelio.png")
+        self.assertEqual(ImagePipeline().prepare(wide, SMALL_MONO).size, (200, 200))
+
+    def test_small_image_not_enlarged(self):
+        """Test that images smaller than the page keep their size."""
+        path = self.save(Image.new("RGB", (40, 60)))
+        self.assertEqual(ImagePipeline().prepare(path, SMALL_MONO).size, (40, 60))
+
+    def test_landscape_rotated_to_portrait(self):
+        """Test that a landscape picture is turned to fill portrait paper."""
+        image = Image.new("L", (600, 400), 255)
+        image.paste(0, (0, 0, 60, 400))  # Black stripe along the left edge
+        prepared = ImagePipeline(mono_mode="gray").prepare(self.save(image), SMALL_MONO)
+        self.assertEqual(prepared.size, (200, 300))
+
+        pixels = np.asarray(self.decode(prepared))
+        # Rotated 90 degrees counter-clockwise the stripe runs along the bottom
+        self.assertLess(pixels[-10:].mean(), 10)
+        self.assertGreater(pixels[:10].mean(), 245)
+
+    def test_transparency_prints_white(self):
+        """Test that transparent areas are flattened onto white paper."""
+        image = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+        image.paste((0, 0, 0, 255), (0, 0, 50, 100))
+        prepared = ImagePipeline(mono_mode="gray").prepare(self.save(image), SMALL_MONO)
+
+        pixels = np.asarray(self.decode(prepared))
+        self.assertEqual(pixels[:, :50].max(), 0)
+        self.assertEqual(pixels[:, 50:].min(), 255)
+
+    def test_doc_format_by_color(self):
+        """Test JPEG for color printers and PNG (1-bit or gray) for mono ones."""
+        path = self.save(Image.new("RGB", (100, 100), (0, 128, 255)))
+
+        color = ImagePipeline().prepare(path, SMALL_COLOR)
+        self.assertEqual(color.doc_format, "image/jpeg")
+        self.assertEqual(self.decode(color).format, "JPEG")
+
+        mono = ImagePipeline().prepare(path, SMALL_MONO)
+        self.assertEqual(mono.doc_format, "image/png")
+        self.assertEqual(self.decode(mono).mode, "1")
+
+        gray = ImagePipeline(mono_mode="gray").prepare(path, SMALL_MONO)
+        self.assertEqual(gray.doc_format, "image/png")
+        self.assertEqual(self.decode(gray).mode, "L")
+
+        with self.assertRaises(ValueError):
+            ImagePipeline(mono_mode="sepia")
+
+    def test_cache(self):
+        """Test that a prepared image is reused only for the same file and settings."""
+        cache = DiskCache(self.temp_dir / "cache")
+        pipeline = ImagePipeline(cache)
+        path = self.save(Image.new("RGB", (800, 1200), (10, 200, 10)))
+
+        first = pipeline.prepare(path, SMALL_MONO)
+        second = pipeline.prepare(path, SMALL_MONO)
+        self.assertEqual(second, first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Another profile, another mono mode or new file content is a miss
+        pipeline.prepare(path, SMALL_COLOR)
+        ImagePipeline(cache, mono_mode="gray").prepare(path, SMALL_MONO)
+        self.save(Image.new("RGB", (800, 1200), (10, 10, 200)))
+        pipeline.prepare(path, SMALL_MONO)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        self.assertEqual(len(cache), 4)
+
+    def test_printer_profile_lookup(self):
+        """Test that attributes are read once per printer, with a fallback."""
+        class Connection:
+            calls = 0
+
+            def call(self, method, printer, requested_attributes=None):
+                Connection.calls += 1
+                if printer == "rikki":
+                    raise RuntimeError("printer unreachable")
+                return {"printer-resolution-default": (600, 600, 3),
+                        "color-supported": False}
+
+        pipeline = ImagePipeline()
+        connection = Connection()
+        for _ in range(2):
+            profile = pipeline.printer_profile(connection, "luokka")
+        self.assertEqual((profile.dpi, profile.color), (600, False))
+        self.assertEqual(Connection.calls, 1)
+        self.assertEqual(pipeline.printer_profile(connection, "rikki"), DEFAULT_PROFILE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+import unittest
+import sys
+import threading
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from job_monitor import (JobMonitor, COMPLETED, ABORTED, TIMED_OUT, JOB_PENDING,
+                         JOB_PROCESSING, JOB_COMPLETED, JOB_ABORTED, JOB_CANCELED)
+from print_queue import PrintQueue, EDUCATIONAL
+
+
+class FakeConnection:
+    """Answers getJobs from a dict of job states."""
+    
+    def __init__(self):
+        self.states = {}
+        self.requests = []
+        self.cancelled = []
+        self.lock = threading.Lock()
+    
+    def call(self, method, *args, **kwargs):
+        with self.lock:
+            self.requests.append(method)
+            if method == "getJobs":
+                first = kwargs.get("first_job_id", 0)
+                return {job_id: {"job-id": job_id, "job-state": state}
+                        for job_id, state in self.states.items() if job_id >= first}
+            if method == "cancelJob":
+                self.cancelled.append(args[0])
+                self.states[args[0]] = JOB_CANCELED
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestJobMonitor(unittest.TestCase):
+    """Test cases for the JobMonitor class."""
+    
+    def setUp(self):
+        self.connection = FakeConnection()
+        self.clock = FakeClock()
+        # Long intervals: the tests drive poll() themselves
+        self.monitor = JobMonitor(self.connection, timeout=30, pending_timeout=300,
+                                  min_interval=60, max_interval=60, clock=self.clock)
+    
+    def tearDown(self):
+        self.monitor.close()
+    
+    def test_resolves_final_states(self):
+        """Test completed, aborted, cancelled and purged jobs."""
+        for job_id in (1, 2, 3, 5):
+            self.connection.states[job_id] = JOB_PROCESSING
+        futures = {job_id: self.monitor.watch(job_id) for job_id in (1, 2, 3, 4, 5)}
+        
+        self.connection.states.update({1: JOB_COMPLETED, 2: JOB_ABORTED, 3: JOB_CANCELED})
+        self.monitor.poll()
+        
+        self.assertEqual(futures[1].result(0), COMPLETED)
+        self.assertEqual(futures[2].result(0), ABORTED)
+        self.assertEqual(futures[3].result(0), ABORTED)
+        self.assertEqual(futures[4].result(0), COMPLETED)
+        self.assertFalse(futures[5].done())
+        self.assertEqual(self.monitor.outstanding, 1)
+    
+    def test_many_jobs_one_request(self):
+        """Test that one poll checks every outstanding job with one request."""
+        for job_id in range(1, 301):
+            self.connection.states[job_id] = JOB_PROCESSING
+            self.monitor.watch(job_id)
+        self.monitor.poll()
+        
+        self.assertEqual(self.connection.requests, ["getJobs"])
+        self.assertEqual(self.monitor.outstanding, 300)
+    
+    def test_timeout_cancels_job(self):
+        """Test that jobs stuck past the timeout are cancelled."""
+        self.connection.states[7] = JOB_PENDING
+        outcomes = []
+        future = self.monitor.watch(7, lambda job_id, outcome: outcomes.append((job_id, outcome)))
+        
+        # Waiting behind other jobs does not count towards the timeout
+        self.clock.now += 100
+        self.monitor.poll()
+        self.connection.states[7] = JOB_PROCESSING
+        self.monitor.poll()
+        
+        self.clock.now += 29
+        self.monitor.poll()
+        self.assertFalse(future.done())
+        
+        self.clock.now += 1
+        self.monitor.poll()
+        self.assertEqual(future.result(0), TIMED_OUT)
+        self.assertEqual(outcomes, [(7, TIMED_OUT)])
+        self.assertEqual(self.connection.cancelled, [7])
+    
+    def test_pending_timeout(self):
+        """Test that a job that never starts is cancelled eventually."""
+        self.connection.states[3] = JOB_PENDING
+        future = self.monitor.watch(3)
+        self.clock.now += 299
+        self.monitor.poll()
+        self.assertFalse(future.done())
+        
+        self.clock.now += 1
+        self.monitor.poll()
+        self.assertEqual(future.result(0), TIMED_OUT)
+        self.assertEqual(self.connection.cancelled, [3])
+    
+    def test_background_polling(self):
+        """Test that the poller thread resolves jobs on its own."""
+        monitor = JobMonitor(self.connection, min_interval=0.01, max_interval=0.05)
+        try:
+            self.connection.states[1] = JOB_PROCESSING
+            future = monitor.watch(1)
+            self.connection.states[1] = JOB_COMPLETED
+            self.assertEqual(future.result(timeout=5), COMPLETED)
+        finally:
+            monitor.close()
+
+
+class SubmittingPrinter:
+    """Hands out job ids instead of printing."""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.next_id = 1
+        self.submitted = []
+    
+    def submit_content(self, content):
+        job_id = self.next_id
+        self.next_id += 1
+        self.submitted.append(content)
+        self.connection.states[job_id] = JOB_PROCESSING
+        return job_id
+
+
+def wait_for_job_id(job):
+    """Wait until the queue has handed a job to CUPS."""
+    for _ in range(500):
+        if job.job_id is not None:
+            return job.job_id
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{job.content} was never submitted")
+
+
+class TestQueueWithMonitor(unittest.TestCase):
+    """Test that queued jobs resolve only when CUPS reports them done."""
+    
+    def setUp(self):
+        self.connection = FakeConnection()
+        self.printer = SubmittingPrinter(self.connection)
+        self.monitor = JobMonitor(self.connection, min_interval=0.01, max_interval=0.05)
+    
+    def tearDown(self):
+        self.monitor.close()
+    
+    def test_handles_follow_job_state(self):
+        """Test that a handle is True only for a completed job."""
+        print_queue = PrintQueue(self.printer, job_monitor=self.monitor, max_outstanding=2)
+        try:
+            ok = print_queue.submit("tulosta kissa")
+            jam = print_queue.submit("tulosta koira")
+            wait_for_job_id(ok)
+            wait_for_job_id(jam)
+            self.assertFalse(ok.done())
+            
+            self.connection.states.update({ok.job_id: JOB_COMPLETED, jam.job_id: JOB_ABORTED})
+            self.assertTrue(ok.result(timeout=5))
+            self.assertFalse(jam.result(timeout=5))
+        finally:
+            print_queue.close(wait=False)
+    
+    def test_priority_applies_while_printer_busy(self):
+        """Test that jobs wait in the queue, not in CUPS, so priority still counts."""
+        print_queue = PrintQueue(self.printer, max_pending=8, job_monitor=self.monitor)
+        try:
+            casual = [print_queue.submit(f"tulosta kissa {i}") for i in range(5)]
+            wait_for_job_id(casual[0])
+            educational = print_queue.submit("laske numerot", priority=EDUCATIONAL)
+            
+            threading.Event().wait(0.2)
+            self.assertEqual(self.printer.submitted, ["tulosta kissa 0"])
+            self.assertEqual(self.monitor.outstanding, 1)
+            
+            self.connection.states[casual[0].job_id] = JOB_COMPLETED
+            self.assertTrue(casual[0].result(timeout=5))
+            wait_for_job_id(educational)
+            self.assertEqual(self.printer.submitted, ["tulosta kissa 0", "laske numerot"])
+        finally:
+            print_queue.close(wait=False)
+        self.assertTrue(all(job.cancelled() for job in casual[1:]))
+    
+    def test_backpressure_while_printer_busy(self):
+        """Test that max_pending still limits requests when CUPS is slow."""
+        print_queue = PrintQueue(self.printer, max_pending=2, job_monitor=self.monitor)
+        try:
+            first = print_queue.submit("tulosta kissa 0")
+            wait_for_job_id(first)
+            accepted = [print_queue.submit(f"tulosta kissa {i}") for i in range(1, 7)]
+            
+            self.assertEqual(sum(job is not None for job in accepted), 2)
+            self.assertEqual(print_queue.rejected, 4)
+            self.assertEqual(self.monitor.outstanding, 1)
+        finally:
+            print_queue.close(wait=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
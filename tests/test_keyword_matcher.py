@@ -0,0 +1,55 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from keyword_matcher import KeywordMatcher
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Test cases for the KeywordMatcher class."""
+    
+    def setUp(self):
+        self.matcher = KeywordMatcher()
+        self.matcher.add_many(["he", "she", "his", "hers"], "blocked")
+    
+    def test_overlapping_matches(self):
+        """Test that overlapping and nested keywords are all found."""
+        found = {(m.keyword, m.start, m.end) for m in self.matcher.find_all("ushers")}
+        self.assertEqual(found, {("she", 1, 4), ("he", 2, 4), ("hers", 2, 6)})
+    
+    def test_incremental_add(self):
+        """Test that keywords added after a scan are matched."""
+        self.assertEqual(self.matcher.find_all("kissa"), [])
+        self.assertTrue(self.matcher.add("kissa", "safe"))
+        self.assertFalse(self.matcher.add("kissa", "safe"))
+        
+        matches = self.matcher.find_all("iso kissa")
+        self.assertEqual([(m.keyword, m.kind) for m in matches], [("kissa", "safe")])
+    
+    def test_same_keyword_different_kinds(self):
+        """Test that one keyword can carry several kinds."""
+        self.matcher.add("he", "safe")
+        kinds = sorted(m.kind for m in self.matcher.find_all("he"))
+        self.assertEqual(kinds, ["blocked", "safe"])
+    
+    def test_longest_run(self):
+        """Test repeated character run measurement."""
+        self.assertEqual(self.matcher.scan("")[1], 0)
+        self.assertEqual(self.matcher.scan("abc")[1], 1)
+        self.assertEqual(self.matcher.scan("abbbbc")[1], 4)
+        self.assertEqual(self.matcher.scan("a\n\n\n\nb")[1], 1)
+    
+    def test_fold_case(self):
+        """Test case-insensitive matching with runs measured on the original."""
+        matches, longest_run = self.matcher.scan("uSHErs", fold_case=True)
+        found = {(m.keyword, m.start, m.end) for m in matches}
+        self.assertEqual(found, {("she", 1, 4), ("he", 2, 4), ("hers", 2, 6)})
+        self.assertEqual(longest_run, 1)
+        self.assertEqual(self.matcher.scan("HHhh", fold_case=True)[1], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
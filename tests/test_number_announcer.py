@@ -0,0 +1,170 @@
+import unittest
+import sys
+import tempfile
+import shutil
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from disk_cache import DiskCache
+from number_announcer import (CLIPS, NumberAnnouncer, crossfade_concat, finnish_numeral,
+                              resample, trim_silence)
+from tts_cache import SpeechCache
+
+
+def tone(seconds, rate, frequency=440.0, level=10000, silence=0.0):
+    """A steady tone with optional silence before and after."""
+    t = np.arange(int(seconds * rate)) / rate
+    sound = (level * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+    pad = np.zeros(int(silence * rate), dtype=np.int16)
+    return np.concatenate([pad, sound, pad])
+
+
+def write_wav(path, samples, rate):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+
+class TestFinnishNumeral(unittest.TestCase):
+    """Test cases for spelling numbers as clips."""
+
+    def test_spelling(self):
+        """Test units, teens, tens and hundreds."""
+        cases = {
+            1: ["yksi"],
+            7: ["seitsemän"],
+            10: ["kymmenen"],
+            11: ["yksi", "toista"],
+            19: ["yhdeksän", "toista"],
+            20: ["kaksi", "kymmentä"],
+            23: ["kaksi", "kymmentä", "kolme"],
+            100: ["sata"],
+            110: ["sata", "kymmenen"],
+            315: ["kolme", "sataa", "viisi", "toista"],
+            999: ["yhdeksän", "sataa", "yhdeksän", "kymmentä", "yhdeksän"],
+        }
+        for number, words in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(finnish_numeral(number), words)
+
+    def test_every_word_has_a_clip(self):
+        """Test that every count up to 999 can be built from CLIPS."""
+        for number in range(1, 1000):
+            self.assertTrue(set(finnish_numeral(number)) <= set(CLIPS))
+
+    def test_out_of_range(self):
+        with self.assertRaises(ValueError):
+            finnish_numeral(0)
+        with self.assertRaises(ValueError):
+            finnish_numeral(1000)
+
+
+class TestSignalHelpers(unittest.TestCase):
+    """Test cases for resampling, trimming and crossfading."""
+
+    def test_resample_length_and_pitch(self):
+        """Test that resampling keeps the duration and the tone."""
+        samples = tone(0.5, 16000).astype(np.float32)
+        resampled = resample(samples, 16000, 44100)
+        self.assertEqual(len(resampled), 22050)
+        spectrum = np.abs(np.fft.rfft(resampled))
+        self.assertAlmostEqual(np.argmax(spectrum) * 44100 / len(resampled), 440, delta=3)
+
+    def test_trim_silence(self):
+        """Test that the lead-in and tail are cut to a short margin."""
+        samples = tone(0.2, 16000, silence=0.3).astype(np.float32)
+        trimmed = trim_silence(samples, 16000)
+        self.assertAlmostEqual(len(trimmed) / 16000, 0.2 + 0.02, delta=0.002)
+
+    def test_crossfade(self):
+        """Test the overlap length and that the join has no step."""
+        a = np.ones(100, dtype=np.float32)
+        b = np.ones(50, dtype=np.float32)
+        joined = crossfade_concat([a, b], 10)
+        self.assertEqual(len(joined), 140)
+        # Linear fades of equal level sum to the same level
+        np.testing.assert_allclose(joined, 1.0, atol=1e-6)
+        # A fade longer than half a clip is shortened
+        self.assertEqual(len(crossfade_concat([a, np.ones(4, dtype=np.float32)], 10)), 102)
+
+
+class TestNumberAnnouncer(unittest.TestCase):
+    """Test cases for the NumberAnnouncer class."""
+
+    def setUp(self):
+        self.announcer = NumberAnnouncer(sample_rate=22050, crossfade_ms=10)
+        self.lengths = {}
+        for index, name in enumerate(CLIPS):
+            seconds = 0.1 + 0.01 * index
+            self.announcer.add_clip(name, tone(seconds, 16000, 200 + 20 * index,
+                                               silence=0.2), 16000)
+            self.lengths[name] = len(self.announcer.clips[name])
+
+    def test_compose_any_count(self):
+        """Test that the announcement is the clips joined with crossfades."""
+        fade = 220
+        for count, names in [(1, ["intro", "yksi", "tulostus"]),
+                             (23, ["intro", "kaksi", "kymmentä", "kolme", "tulostusta"]),
+                             (0, ["none_left"])]:
+            with self.subTest(count=count):
+                samples = self.announcer.compose(count)
+                self.assertEqual(samples.dtype, np.int16)
+                expected = sum(self.lengths[name] for name in names) - fade * (len(names) - 1)
+                self.assertEqual(len(samples), expected)
+
+    def test_clips_resampled_and_in_memory(self):
+        """Test that clips are trimmed float arrays at the playback rate."""
+        clip = self.announcer.clips["intro"]
+        self.assertEqual(clip.dtype, np.float32)
+        self.assertAlmostEqual(len(clip) / 22050, 0.1 + 0.02, delta=0.002)
+
+    def test_missing_clip(self):
+        """Test that a count needing a missing clip gives None."""
+        del self.announcer.clips["kolme"]
+        self.assertIsNone(self.announcer.compose(3))
+        self.assertIsNotNone(self.announcer.compose(2))
+        self.assertIsNone(self.announcer.compose(1000))
+        self.assertEqual(self.announcer.missing, ["kolme"])
+
+
+class TestLoadingClips(unittest.TestCase):
+    """Test cases for loading recordings and synthesized clips."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_recordings_then_speech(self):
+        """Test that recordings win and synthesis fills in the rest."""
+        (self.temp_dir / "numbers").mkdir()
+        write_wav(self.temp_dir / "numbers" / "intro.wav", tone(0.3, 44100), 44100)
+        write_wav(self.temp_dir / "numbers" / "kaksi.wav", tone(0.2, 44100), 44100)
+
+        synthesized = []
+
+        def synthesize(text, path):
+            synthesized.append(text)
+            write_wav(path, tone(0.1, 22050), 22050)
+
+        announcer = NumberAnnouncer(sample_rate=22050)
+        self.assertEqual(announcer.load_recordings(self.temp_dir / "numbers"), 2)
+        speech = SpeechCache(DiskCache(self.temp_dir / "speech", suffix=".wav"), synthesize)
+        self.assertEqual(announcer.load_speech(speech), len(CLIPS) - 2)
+
+        self.assertEqual(announcer.missing, [])
+        self.assertNotIn("Sinulla on vielä", synthesized)
+        self.assertIn("tulostusta jäljellä tänään.", synthesized)
+        self.assertAlmostEqual(len(announcer.clips["intro"]) / 22050, 0.3, delta=0.002)
+
+
+if __name__ == "__main__":
+    unittest.main()
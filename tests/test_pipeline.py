@@ -0,0 +1,288 @@
+import unittest
+import sys
+import asyncio
+import threading
+import tempfile
+import shutil
+from pathlib import Path
+
+# Add src and project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from content_filter import ContentFilter
+from daily_limits import DailyLimitManager
+from image_dedup import DuplicateImageError
+import pipeline as pipeline_module
+from pipeline import CommandPipeline, CommandProcessor, queue_print, run_serial
+from print_queue import PrintQueue
+from rate_limiter import RateLimiter
+
+
+class FakeRecognizer:
+    """Returns scripted commands; capture blocks once the script runs out."""
+    
+    def __init__(self, commands):
+        self.commands = list(commands)
+        self.captured = threading.Event()
+        self.captures = 0
+        self.idle = threading.Event()
+    
+    def capture(self, timeout=5):
+        if not self.commands:
+            self.idle.wait(0.05)
+            return None
+        self.captures += 1
+        if self.captures >= 2:
+            self.captured.set()
+        return self.commands.pop(0)
+    
+    def recognize(self, audio, on_partial=None):
+        return audio
+    
+    def listen(self, timeout=5, on_partial=None):
+        audio = self.capture(timeout)
+        return self.recognize(audio, on_partial) if audio else None
+
+
+class FlakyRecognizer(FakeRecognizer):
+    """Fails the first capture and the recognition of "kohinaa"."""
+    
+    def __init__(self, commands):
+        super().__init__(commands)
+        self.capture_failed = False
+    
+    def capture(self, timeout=5):
+        if not self.capture_failed:
+            self.capture_failed = True
+            raise OSError("microphone read failed")
+        return super().capture(timeout)
+    
+    def recognize(self, audio, on_partial=None):
+        if audio == "kohinaa":
+            raise RuntimeError("recognizer error")
+        return audio
+
+
+class FakePrinter:
+    """Records printed commands; can wait for the next capture first."""
+    
+    def __init__(self, recognizer=None, fail_on=(), reprints=()):
+        self.recognizer = recognizer
+        self.fail_on = set(fail_on)
+        self.reprints = set(reprints)
+        self.printed = []
+        self.overlapped = False
+    
+    def print_content(self, content):
+        if content in self.reprints:
+            raise DuplicateImageError("kissa.png", "kissa.png")
+        if self.recognizer is not None and not self.printed:
+            # The first job is still spooling when the next command arrives
+            self.overlapped = self.recognizer.captured.wait(2)
+        self.printed.append(content)
+        return content not in self.fail_on
+
+
+class FakeFeedback:
+    """Records which feedback messages were played."""
+    
+    def __init__(self):
+        self.played = []
+    
+    def __getattr__(self, name):
+        if name.startswith("play_"):
+            return lambda: self.played.append(name)
+        raise AttributeError(name)
+
+
+class TestCommandPipeline(unittest.TestCase):
+    """Test cases for the serial loop and the asyncio pipeline."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.limit_manager = DailyLimitManager(max_daily_prints=2, config_dir=self.temp_dir)
+        self.processor = CommandProcessor(ContentFilter(), self.limit_manager)
+        self.feedback = FakeFeedback()
+    
+    def tearDown(self):
+        self.limit_manager.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_serial_loop(self):
+        """Test the one-command-at-a-time loop."""
+        recognizer = FakeRecognizer(["tulosta kissa", "perkele", "tulosta koira",
+                                     "tulosta lintu"])
+        printer = FakePrinter()
+        run_serial(recognizer, self.processor, printer, self.feedback, max_commands=4)
+        
+        self.assertEqual(printer.printed, ["tulosta kissa", "tulosta koira"])
+        self.assertEqual(self.feedback.played, [
+            "play_success_message", "play_content_warning",
+            "play_success_message", "play_limit_reached_message",
+        ])
+    
+    def test_pipeline_overlaps_capture_and_printing(self):
+        """Test that the next command is captured while a job is spooling."""
+        recognizer = FakeRecognizer(["tulosta kissa", "tulosta koira"])
+        printer = FakePrinter(recognizer)
+        pipeline = CommandPipeline(recognizer, self.processor, printer, self.feedback)
+        try:
+            asyncio.run(asyncio.wait_for(pipeline.run(max_commands=2), timeout=10))
+        finally:
+            pipeline.shutdown()
+        
+        self.assertTrue(printer.overlapped)
+        self.assertEqual(printer.printed, ["tulosta kissa", "tulosta koira"])
+        self.assertEqual(self.feedback.played, ["play_success_message"] * 2)
+        self.assertEqual(len(pipeline.timings), 2)
+    
+    def test_pipeline_refunds_failed_print(self):
+        """Test that a failed print gives the reserved print back."""
+        recognizer = FakeRecognizer(["tulosta kissa", "perkele"])
+        printer = FakePrinter(fail_on={"tulosta kissa"})
+        pipeline = CommandPipeline(recognizer, self.processor, printer, self.feedback)
+        try:
+            asyncio.run(asyncio.wait_for(pipeline.run(max_commands=2), timeout=10))
+        finally:
+            pipeline.shutdown()
+        
+        self.assertEqual(sorted(self.feedback.played),
+                         ["play_content_warning", "play_error_message"])
+        self.assertEqual(self.limit_manager.get_today_count(), 0)
+    
+    def test_pipeline_survives_capture_and_recognition_errors(self):
+        """Test that one failed capture or recognition does not stop the pipeline."""
+        recognizer = FlakyRecognizer(["kohinaa", "tulosta kissa", "tulosta koira"])
+        printer = FakePrinter()
+        pipeline = CommandPipeline(recognizer, self.processor, printer, self.feedback)
+        retry_delay = pipeline_module.LISTEN_RETRY_DELAY
+        pipeline_module.LISTEN_RETRY_DELAY = 0.01
+        try:
+            asyncio.run(asyncio.wait_for(pipeline.run(max_commands=2), timeout=10))
+        finally:
+            pipeline_module.LISTEN_RETRY_DELAY = retry_delay
+            pipeline.shutdown()
+        
+        self.assertEqual(printer.printed, ["tulosta kissa", "tulosta koira"])
+        self.assertEqual(self.feedback.played, ["play_success_message"] * 2)
+    
+    def test_serial_loop_with_print_queue(self):
+        """Test queued printing: duplicates and failures are refunded."""
+        recognizer = FakeRecognizer(["tulosta kissa", "tulosta kissa", "tulosta koira"])
+        printer = FakePrinter(fail_on={"tulosta koira"})
+        print_queue = PrintQueue(printer, coalesce_window=60)
+        try:
+            run_serial(recognizer, self.processor, printer, self.feedback,
+                       max_commands=3, print_queue=print_queue)
+        finally:
+            print_queue.close()
+        
+        self.assertEqual(printer.printed, ["tulosta kissa", "tulosta koira"])
+        self.assertEqual(self.feedback.played, ["play_success_message"] * 3)
+        self.assertEqual(self.limit_manager.get_today_count(), 1)
+    
+    def test_refused_reprint(self):
+        """Test that a blocked reprint is refunded with its own message."""
+        recognizer = FakeRecognizer(["tulosta kuva kissasta", "tulosta koira"])
+        printer = FakePrinter(reprints={"tulosta kuva kissasta"})
+        run_serial(recognizer, self.processor, printer, self.feedback, max_commands=2)
+        
+        self.assertEqual(self.feedback.played, ["play_duplicate_image_message",
+                                                "play_success_message"])
+        self.assertEqual(self.limit_manager.get_today_count(), 1)
+    
+    def test_refused_reprint_in_print_queue(self):
+        """Test that a queued reprint is refunded and announced when refused."""
+        recognizer = FakeRecognizer(["tulosta kuva kissasta"])
+        printer = FakePrinter(reprints={"tulosta kuva kissasta"})
+        print_queue = PrintQueue(printer)
+        try:
+            run_serial(recognizer, self.processor, printer, self.feedback,
+                       max_commands=1, print_queue=print_queue)
+        finally:
+            print_queue.close()
+        
+        self.assertEqual(sorted(self.feedback.played), ["play_duplicate_image_message",
+                                                        "play_success_message"])
+        self.assertEqual(self.limit_manager.get_today_count(), 0)
+    
+    def test_rate_limit_refunds_reserved_print(self):
+        """Test that a rate-limited command does not use up a daily print."""
+        processor = CommandProcessor(ContentFilter(), self.limit_manager,
+                                     RateLimiter(burst=1, refill_seconds=3600))
+        self.assertIsNone(processor.admit("tulosta kissa"))
+        self.assertEqual(processor.admit("tulosta koira"), "rate_limited")
+        self.assertEqual(self.limit_manager.get_today_count(), 1)
+    
+    def test_limit_refusal_keeps_rate_token(self):
+        """Test that a print refused by the daily limit keeps its rate token."""
+        processor = CommandProcessor(ContentFilter(), self.limit_manager,
+                                     RateLimiter(burst=1, refill_seconds=3600))
+        # Another device takes the last prints between the check and the reservation
+        self.limit_manager.can_print = lambda: True
+        self.limit_manager.record_print(device="keittiö")
+        self.limit_manager.record_print(device="keittiö")
+        self.assertEqual(processor.admit("tulosta kissa"), "limit_reached")
+        
+        self.limit_manager.set_daily_limit(3)
+        self.assertIsNone(processor.admit("tulosta kissa"))
+    
+    def test_educational_priority(self):
+        """Test that educational commands are boosted only when enabled."""
+        self.assertEqual(self.processor.priority("laske numerot"), "normal")
+        
+        boosted = CommandProcessor(ContentFilter(), self.limit_manager,
+                                   educational_boost=True)
+        self.assertEqual(boosted.priority("laske numerot"), "educational")
+        self.assertEqual(boosted.priority("tulosta kissa"), "normal")
+    
+    def test_parent_priority(self):
+        """Test that the parent phrase gives a command parent priority."""
+        processor = CommandProcessor(ContentFilter(), self.limit_manager,
+                                     parent_phrase="Aikuinen pyytää")
+        self.assertEqual(processor.priority("aikuinen pyytää, tulosta kalenteri"), "parent")
+        self.assertEqual(processor.printable("aikuinen pyytää, tulosta kalenteri"),
+                         "tulosta kalenteri")
+        self.assertEqual(processor.priority("tulosta kalenteri"), "normal")
+        self.assertEqual(processor.priority("aikuinen pyytää"), "normal")
+        self.assertEqual(self.processor.priority("aikuinen pyytää tulosta"), "normal")
+    
+    def test_parent_command_in_print_queue(self):
+        """Test that a parent's command overtakes waiting jobs, without the phrase."""
+        processor = CommandProcessor(ContentFilter(), self.limit_manager,
+                                     parent_phrase="aikuinen pyytää")
+        printer = FakePrinter()
+        started = threading.Event()
+        release = threading.Event()
+        
+        def print_content(content):
+            started.set()
+            release.wait(5)
+            return FakePrinter.print_content(printer, content)
+        
+        printer.print_content = print_content
+        print_queue = PrintQueue(printer)
+        try:
+            queue_print(print_queue, processor, "tulosta kissa")
+            self.assertTrue(started.wait(5))
+            queue_print(print_queue, processor, "tulosta koira")
+            queue_print(print_queue, processor, "aikuinen pyytää tulosta kalenteri")
+        finally:
+            release.set()
+            print_queue.close()
+        
+        self.assertEqual(printer.printed, ["tulosta kissa", "tulosta kalenteri",
+                                           "tulosta koira"])
+    
+    def test_preview_partial_transcripts(self):
+        """Test that only a blocked word in a partial ends recognition early."""
+        self.assertFalse(self.processor.preview("tulosta"))
+        self.assertFalse(self.processor.preview("tulosta kissa"))
+        self.assertTrue(self.processor.preview("tulosta perkele"))
+        # Nothing was reserved
+        self.assertEqual(self.limit_manager.get_today_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+import sys
+import threading
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from latency_stats import percentile
+from print_queue import PrintQueue, PARENT, EDUCATIONAL
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class BlockingPrinter:
+    """Records printed content; holds every job until released."""
+    
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.printed = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+    
+    def print_content(self, content):
+        self.started.set()
+        self.release.wait(5)
+        if content == "boom":
+            raise IOError("printer on fire")
+        self.printed.append(content)
+        return content not in self.fail_on
+
+
+class TestPrintQueue(unittest.TestCase):
+    """Test cases for the PrintQueue class."""
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.printer = BlockingPrinter(fail_on={"tulosta koira"})
+        self.queue = PrintQueue(self.printer, max_pending=2, coalesce_window=10,
+                                clock=self.clock)
+    
+    def tearDown(self):
+        self.printer.release.set()
+        self.queue.close()
+    
+    def test_submit_does_not_block(self):
+        """Test that submit returns before the job is printed."""
+        job = self.queue.submit("tulosta kissa")
+        self.assertFalse(job.done())
+        
+        self.printer.release.set()
+        self.assertTrue(job.result(timeout=5))
+        self.assertEqual(self.printer.printed, ["tulosta kissa"])
+    
+    def test_failures_resolve_handle(self):
+        """Test that failed and crashed jobs are reported through the handle."""
+        self.printer.release.set()
+        self.assertFalse(self.queue.submit("tulosta koira").result(timeout=5))
+        with self.assertRaises(IOError):
+            self.queue.submit("boom").result(timeout=5)
+    
+    def test_coalesces_identical_requests(self):
+        """Test that repeats within the window are printed once."""
+        first = self.queue.submit("tulosta kissa")
+        second = self.queue.submit("  Tulosta   KISSA ")
+        self.assertFalse(first.coalesced)
+        self.assertTrue(second.coalesced)
+        
+        self.printer.release.set()
+        self.assertTrue(second.result(timeout=5))
+        self.assertEqual(self.printer.printed, ["tulosta kissa"])
+        self.assertEqual(self.queue.coalesced, 1)
+        
+        # After the window the same request prints again
+        self.clock.now += 10
+        self.assertTrue(self.queue.submit("tulosta kissa").result(timeout=5))
+        self.assertEqual(self.printer.printed, ["tulosta kissa"] * 2)
+    
+    def test_rejects_when_full(self):
+        """Test backpressure once max_pending jobs are waiting."""
+        self.queue.submit("tulosta kissa")
+        self.assertTrue(self.printer.started.wait(5))
+        
+        self.assertIsNotNone(self.queue.submit("tulosta koira"))
+        self.assertIsNotNone(self.queue.submit("tulosta lintu"))
+        self.assertIsNone(self.queue.submit("tulosta kala", max_wait=0.05))
+        self.assertEqual(self.queue.rejected, 1)
+        self.assertEqual(self.queue.pending, 2)
+        
+        # A rejected request is not remembered for coalescing
+        self.printer.release.set()
+        job = self.queue.submit("tulosta kala", max_wait=5)
+        self.assertFalse(job.coalesced)
+        self.assertTrue(job.result(timeout=5))
+    
+    def test_close_cancels_waiting_jobs(self):
+        """Test that close(wait=False) cancels jobs still in the queue."""
+        self.queue.submit("tulosta kissa")
+        self.assertTrue(self.printer.started.wait(5))
+        waiting = self.queue.submit("tulosta lintu")
+        
+        self.printer.release.set()
+        self.queue.close(wait=False)
+        self.assertTrue(waiting.cancelled())
+        with self.assertRaises(RuntimeError):
+            self.queue.submit("tulosta kala")
+    
+    def test_priority_order(self):
+        """Test that parent and educational jobs jump ahead while busy."""
+        queue = PrintQueue(self.printer, max_pending=8, clock=self.clock)
+        try:
+            queue.submit("tulosta kissa")
+            self.assertTrue(self.printer.started.wait(5))
+            queue.submit("tulosta lintu")
+            queue.submit("laske numero", priority=EDUCATIONAL)
+            last = queue.submit("tulosta kala", priority=PARENT)
+            
+            self.printer.release.set()
+            last.result(timeout=5)
+        finally:
+            queue.close()
+        self.assertEqual(self.printer.printed, ["tulosta kissa", "tulosta kala",
+                                                "laske numero", "tulosta lintu"])
+        with self.assertRaises(ValueError):
+            self.queue.submit("tulosta kissa", priority="vip")
+    
+    def test_aging_prevents_starvation(self):
+        """Test that an old normal job beats a much later educational one."""
+        queue = PrintQueue(self.printer, max_pending=8, clock=self.clock)
+        try:
+            queue.submit("tulosta kissa")
+            self.assertTrue(self.printer.started.wait(5))
+            queue.submit("tulosta lintu")
+            self.clock.now += 50
+            last = queue.submit("laske numero", priority=EDUCATIONAL)
+            
+            self.printer.release.set()
+            last.result(timeout=5)
+        finally:
+            queue.close()
+        self.assertEqual(self.printer.printed, ["tulosta kissa", "tulosta lintu",
+                                                "laske numero"])
+    
+    def test_latency_percentiles(self):
+        """Test latency reporting per priority class."""
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 50), 2.0)
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 99), 4.0)
+        
+        job = self.queue.submit("laske numero", priority=EDUCATIONAL)
+        self.clock.now += 3
+        self.printer.release.set()
+        job.result(timeout=5)
+        
+        report = self.queue.latency_percentiles((50, 90))
+        self.assertEqual(report, {EDUCATIONAL: {50: 3.0, 90: 3.0}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+import unittest
+import sys
+import os
+import types
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+try:
+    import cups
+except ImportError:
+    # pycups is only installed on the printer host; the tests need its
+    # exception type and status codes only
+    cups = types.ModuleType("cups")
+    cups.IPPError = type("IPPError", (Exception,), {})
+    cups.HTTP_CONTINUE = 100
+    cups.Connection = None
+    sys.modules["cups"] = cups
+
+import printer_controller
+from image_dedup import DuplicateImageError, ImageDeduplicator
+from job_monitor import ABORTED, COMPLETED, TIMED_OUT
+from printer_controller import CHUNK_SIZE, PrinterController
+
+
+class FakeConnection:
+    """Records streamed and spooled jobs; streaming can be made to fail."""
+
+    def __init__(self, stream_error=None, print_file_error=None):
+        self.stream_error = stream_error
+        self.print_file_error = print_file_error
+        self.streamed = []
+        self.spooled = []
+        # Called with the spool path while printFile runs
+        self.on_print_file = None
+
+    def connect(self):
+        return True
+
+    def get_default_printer(self):
+        return "luokka"
+
+    def submit_stream(self, printer, title, chunks, doc_format="application/octet-stream",
+                      options=None):
+        if self.stream_error is not None:
+            raise self.stream_error
+        self.streamed.append((printer, title, [len(chunk) for chunk in chunks], doc_format))
+        return len(self.streamed)
+
+    def call(self, method, *args, idempotent=True, **kwargs):
+        assert method == "printFile" and not idempotent
+        printer, path, title, options = args
+        self.spooled.append((printer, path, Path(path).read_bytes()))
+        job_id = 100 + len(self.spooled)
+        if self.on_print_file is not None:
+            self.on_print_file(path)
+        if self.print_file_error is not None:
+            raise self.print_file_error
+        return job_id
+
+
+class FakeMonitor:
+    """Collects watch callbacks so tests can finish jobs by hand."""
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def watch(self, job_id, callback=None):
+        self.callbacks.setdefault(job_id, []).append(callback)
+
+    def finish(self, job_id, outcome):
+        for callback in self.callbacks.pop(job_id):
+            callback(job_id, outcome)
+
+
+class TestPrinterController(unittest.TestCase):
+    """Test cases for submitting jobs from memory."""
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self._tmpfs_dir = printer_controller.TMPFS_DIR
+        printer_controller.TMPFS_DIR = self.spool_dir
+
+    def tearDown(self):
+        printer_controller.TMPFS_DIR = self._tmpfs_dir
+        shutil.rmtree(self.spool_dir)
+
+    def test_streams_in_chunks(self):
+        """Test that data is streamed in CHUNK_SIZE pieces without a file."""
+        connection = FakeConnection()
+        controller = PrinterController(connection=connection)
+        data = b"x" * (2 * CHUNK_SIZE + 10)
+        self.assertEqual(controller.submit_data(data, "Testi", "application/pdf"), 1)
+        self.assertEqual(connection.streamed, [
+            ("luokka", "Testi", [CHUNK_SIZE, CHUNK_SIZE, 10], "application/pdf")
+        ])
+        self.assertEqual(connection.spooled, [])
+
+        self.assertTrue(controller.print_text("hei"))
+        self.assertEqual(connection.streamed[-1][2:], ([3], "text/plain"))
+
+    def test_spool_fallback(self):
+        """Test that a failed stream is printed from a tmpfs file that is removed."""
+        connection = FakeConnection(stream_error=IOError("startDocument failed"))
+        controller = PrinterController(connection=connection)
+        self.assertEqual(controller.submit_text("hyvää huomenta"), 101)
+
+        printer, path, data = connection.spooled[0]
+        self.assertEqual(printer, "luokka")
+        self.assertEqual(data, "hyvää huomenta".encode("utf-8"))
+        self.assertEqual(os.path.dirname(path), self.spool_dir)
+        self.assertTrue(os.path.basename(path).startswith("kidprinter_"))
+        self.assertTrue(path.endswith(".txt"))
+        self.assertFalse(os.path.exists(path))
+
+    def test_spool_file_removed_when_print_fails(self):
+        """Test that the spool file is deleted even if printFile fails."""
+        connection = FakeConnection(stream_error=IOError("startDocument failed"),
+                                    print_file_error=cups.IPPError("printer stopped"))
+        controller = PrinterController(connection=connection)
+        self.assertIsNone(controller.submit_data(b"%PDF", "Testi", suffix=".pdf"))
+
+        path = connection.spooled[0][1]
+        self.assertTrue(path.endswith(".pdf"))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_spool_without_tmpfs(self):
+        """Test that the default temporary directory is used without tmpfs."""
+        printer_controller.TMPFS_DIR = os.path.join(self.spool_dir, "missing")
+        connection = FakeConnection(stream_error=IOError("startDocument failed"))
+        controller = PrinterController(connection=connection)
+        self.assertEqual(controller.submit_text("hei"), 101)
+
+        path = connection.spooled[0][1]
+        self.assertEqual(os.path.dirname(path), os.path.realpath(tempfile.gettempdir()))
+        self.assertFalse(os.path.exists(path))
+
+    def test_overlapping_jobs_use_separate_files(self):
+        """Test that concurrent spooled jobs never share a path."""
+        connection = FakeConnection(stream_error=IOError("startDocument failed"))
+        # Both jobs are inside printFile at the same time
+        both_spooling = threading.Barrier(2, timeout=5)
+        connection.on_print_file = lambda path: both_spooling.wait()
+        controller = PrinterController(connection=connection)
+
+        job_ids = []
+        threads = [threading.Thread(target=lambda i=i: job_ids.append(
+                       controller.submit_text(f"lause {i}")))
+                   for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        self.assertEqual(sorted(job_ids), [101, 102])
+        paths = {path: data for _, path, data in connection.spooled}
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(sorted(paths.values()), [b"lause 0", b"lause 1"])
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+
+
+class TestImageReprints(unittest.TestCase):
+    """Test cases for remembering printed pictures."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.image = self.temp_dir / "kissa.png"
+        self.image.write_bytes(b"kissa")
+        self.deduplicator = ImageDeduplicator(lambda path: 0x1234, policy="block")
+        self.connection = FakeConnection()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_recorded_on_submission_without_monitor(self):
+        """Test that without a job monitor a submitted picture counts as printed."""
+        controller = PrinterController(connection=self.connection,
+                                       deduplicator=self.deduplicator)
+        self.assertEqual(controller.submit_image(str(self.image)), 1)
+        with self.assertRaises(DuplicateImageError):
+            controller.submit_image(str(self.image))
+
+    def test_recorded_only_when_completed(self):
+        """Test that an aborted or timed out picture may be printed again."""
+        monitor = FakeMonitor()
+        controller = PrinterController(connection=self.connection,
+                                       deduplicator=self.deduplicator,
+                                       job_monitor=monitor)
+        for job_id, outcome in [(1, ABORTED), (2, TIMED_OUT)]:
+            self.assertEqual(controller.submit_image(str(self.image)), job_id)
+            self.assertEqual(len(self.deduplicator), 0)
+            monitor.finish(job_id, outcome)
+            self.assertEqual(len(self.deduplicator), 0)
+
+        self.assertEqual(controller.submit_image(str(self.image)), 3)
+        monitor.finish(3, COMPLETED)
+        self.assertEqual(len(self.deduplicator), 1)
+        with self.assertRaises(DuplicateImageError):
+            controller.submit_image(str(self.image))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from printer_scheduler import (PrinterScheduler, printer_is_healthy,
+                               PRINTER_IDLE, PRINTER_PROCESSING, PRINTER_STOPPED)
+from job_monitor import ABORTED, COMPLETED
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class FakeConnection:
+    """Serves printer attributes and a job list."""
+    
+    def __init__(self, printers):
+        self.printers = printers
+        self.jobs = {}
+        self.job_requests = 0
+        self.printer_requests = 0
+    
+    def get_printers(self):
+        raise AssertionError("the cached printer list is too old for scheduling")
+    
+    def call(self, method, *args, **kwargs):
+        if method == "getPrinters":
+            self.printer_requests += 1
+            return dict(self.printers)
+        assert method == "getJobs"
+        self.job_requests += 1
+        return {job_id: {"job-printer-uri": f"ipp://localhost/printers/{name}"}
+                for job_id, name in self.jobs.items()}
+
+
+class FakeMonitor:
+    """Collects watch callbacks so tests can finish jobs by hand."""
+    
+    def __init__(self):
+        self.callbacks = {}
+    
+    def watch(self, job_id, callback=None):
+        self.callbacks[job_id] = callback
+
+
+class TestPrinterScheduler(unittest.TestCase):
+    """Test cases for the PrinterScheduler class."""
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.connection = FakeConnection({
+            "luokka1": {"printer-state": PRINTER_IDLE},
+            "luokka2": {"printer-state": PRINTER_IDLE},
+            "luokka3": {"printer-state": PRINTER_IDLE},
+        })
+        self.monitor = FakeMonitor()
+        self.scheduler = PrinterScheduler(self.connection, job_monitor=self.monitor,
+                                          queue_ttl=2, error_half_life=60,
+                                          clock=self.clock)
+    
+    def test_health(self):
+        """Test which printer states count as usable."""
+        self.assertTrue(printer_is_healthy({"printer-state": PRINTER_PROCESSING,
+                                            "printer-state-reasons": ["none"]}))
+        self.assertFalse(printer_is_healthy({"printer-state": PRINTER_STOPPED}))
+        self.assertFalse(printer_is_healthy({"printer-is-accepting-jobs": False}))
+        self.assertFalse(printer_is_healthy({"printer-state-reasons": "media-empty-error"}))
+    
+    def test_spreads_jobs(self):
+        """Test that consecutive jobs go to different idle printers."""
+        chosen = []
+        for job_id in range(6):
+            printer = self.scheduler.choose()
+            self.scheduler.job_submitted(printer, job_id)
+            chosen.append(printer)
+        
+        self.assertEqual(sorted(chosen), ["luokka1", "luokka1", "luokka2",
+                                          "luokka2", "luokka3", "luokka3"])
+        self.assertEqual(self.connection.job_requests, 1)
+    
+    def test_prefers_short_queue(self):
+        """Test that queued CUPS jobs and active printing raise the score."""
+        self.connection.jobs = {1: "luokka1", 2: "luokka1", 3: "luokka2"}
+        self.connection.printers["luokka3"] = {"printer-state": PRINTER_PROCESSING}
+        
+        scores = self.scheduler.scores()
+        self.assertEqual(scores, {"luokka1": 2.0, "luokka2": 1.0, "luokka3": 0.5})
+        self.assertEqual(self.scheduler.choose(), "luokka3")
+    
+    def test_fails_over_from_stopped_printer(self):
+        """Test that stopped printers and excluded printers are skipped."""
+        self.connection.printers["luokka1"] = {"printer-state": PRINTER_STOPPED}
+        self.connection.printers["luokka2"] = {"printer-state": PRINTER_STOPPED}
+        self.assertEqual(self.scheduler.choose(), "luokka3")
+        self.assertIsNone(self.scheduler.choose(exclude=["luokka3"]))
+    
+    def test_sees_printer_stop_within_state_ttl(self):
+        """Test that a printer that stops is skipped after a second at most."""
+        self.assertEqual(set(self.scheduler.scores()), {"luokka1", "luokka2", "luokka3"})
+        self.connection.printers["luokka1"] = {"printer-state": PRINTER_STOPPED}
+        self.scheduler.scores()
+        self.assertEqual(self.connection.printer_requests, 1)
+        
+        self.clock.now += 1
+        self.assertEqual(set(self.scheduler.scores()), {"luokka2", "luokka3"})
+        self.assertEqual(self.connection.printer_requests, 2)
+    
+    def test_error_rate_decays(self):
+        """Test that failed jobs push a printer down until errors age out."""
+        self.scheduler.job_submitted("luokka1", 7)
+        self.monitor.callbacks[7](7, ABORTED)
+        self.scheduler.job_submitted("luokka2", 8)
+        self.monitor.callbacks[8](8, COMPLETED)
+        self.assertAlmostEqual(self.scheduler.error_rates()["luokka1"], 1.0)
+        self.assertNotIn("luokka2", self.scheduler.error_rates())
+        
+        self.clock.now += 2
+        self.assertNotEqual(self.scheduler.choose(), "luokka1")
+        
+        self.clock.now += 600
+        self.assertLess(self.scheduler.error_rates()["luokka1"], 0.01)
+    
+    def test_printer_pool(self):
+        """Test that only pooled printers are used."""
+        scheduler = PrinterScheduler(self.connection, printers=["luokka2"],
+                                     clock=self.clock)
+        self.assertEqual(set(scheduler.scores()), {"luokka2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the RateLimiter class."""
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(burst=3, refill_seconds=60, clock=self.clock)
+    
+    def test_burst_then_blocked(self):
+        """Test that only the burst is allowed back to back."""
+        results = [self.limiter.try_acquire() for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+        self.assertAlmostEqual(self.limiter.time_until_available(), 60)
+    
+    def test_refill(self):
+        """Test that tokens come back over time, up to the burst size."""
+        for _ in range(3):
+            self.limiter.try_acquire()
+        
+        self.clock.now += 30
+        self.assertFalse(self.limiter.try_acquire())
+        self.clock.now += 30
+        self.assertTrue(self.limiter.try_acquire())
+        
+        self.clock.now += 3600
+        results = [self.limiter.try_acquire() for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+    
+    def test_children_have_own_buckets(self):
+        """Test that one child's burst does not block another child."""
+        for _ in range(3):
+            self.limiter.try_acquire("aino")
+        self.assertFalse(self.limiter.try_acquire("aino"))
+        self.assertTrue(self.limiter.try_acquire("eino"))
+    
+    def test_acquire_delays_or_rejects(self):
+        """Test waiting for a token up to the allowed delay."""
+        for _ in range(3):
+            self.limiter.try_acquire()
+        
+        self.assertFalse(self.limiter.acquire(max_wait=10, sleep=self.clock.sleep))
+        self.clock.now += 55
+        self.assertTrue(self.limiter.acquire(max_wait=10, sleep=self.clock.sleep))
+        self.assertEqual(self.clock.now, 1060)
+    
+    def test_state_survives_restart(self):
+        """Test that an exhausted bucket stays exhausted after a restart."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            state_file = Path(temp_dir) / "rate_limits.json"
+            limiter = RateLimiter(burst=2, refill_seconds=3600, state_file=state_file)
+            limiter.try_acquire()
+            limiter.try_acquire()
+            limiter.close()
+            
+            restarted = RateLimiter(burst=2, refill_seconds=3600, state_file=state_file)
+            self.assertFalse(restarted.try_acquire())
+            restarted.close()
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
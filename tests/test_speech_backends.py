@@ -0,0 +1,210 @@
+import unittest
+import sys
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from audio_capture import AudioCapture
+from speech_backends import (RecognitionError, ScriptedBackend, SpeechBackend,
+                             StreamingTranscriber, _VoskStream)
+
+RATE = 16000
+# 0.1 s of audio
+CHUNK = bytes(RATE // 10 * 2)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class SlowBackend(SpeechBackend):
+    """Backend whose final result takes a fixed (fake) time."""
+
+    name = "slow"
+
+    def __init__(self, clock, delay, error=False):
+        self.clock = clock
+        self.delay = delay
+        self.error = error
+
+    def open(self, sample_rate):
+        backend = self
+
+        class Stream:
+            def accept(self, pcm):
+                return None
+
+            def finish(self):
+                backend.clock.now += backend.delay
+                if backend.error:
+                    raise RecognitionError("offline")
+                return "tulosta kissa"
+
+        return Stream()
+
+
+class FakeKaldi:
+    """Plays back scripted Vosk results, one per AcceptWaveform call."""
+
+    def __init__(self, steps, final):
+        self.steps = list(steps)
+        self.final = final
+        self.current = None
+
+    def AcceptWaveform(self, pcm):
+        self.current = self.steps.pop(0)
+        return "text" in self.current
+
+    def Result(self):
+        return json.dumps(self.current)
+
+    def PartialResult(self):
+        return json.dumps(self.current)
+
+    def FinalResult(self):
+        return json.dumps({"text": self.final})
+
+
+class TestScriptedBackend(unittest.TestCase):
+    """Test cases for the deterministic stand-in backend."""
+
+    def test_partials_follow_audio(self):
+        """Test that words are revealed as audio arrives."""
+        stream = ScriptedBackend(["tulosta iso kissa"], seconds_per_word=0.2).open(RATE)
+        partials = [stream.accept(CHUNK) for _ in range(5)]
+        self.assertEqual(partials, [None, "tulosta", "tulosta", "tulosta iso",
+                                    "tulosta iso"])
+        self.assertEqual(stream.finish(), "tulosta iso kissa")
+
+    def test_transcripts_in_order(self):
+        """Test that each utterance gets the next transcript."""
+        backend = ScriptedBackend(["yksi", "kaksi"])
+        self.assertEqual(backend.open(RATE).finish(), "yksi")
+        self.assertEqual(backend.open(RATE).finish(), "kaksi")
+        self.assertEqual(backend.open(RATE).finish(), "")
+
+
+class TestVoskStream(unittest.TestCase):
+    """Test cases for parsing Vosk results."""
+
+    def test_segments_and_partials(self):
+        """Test that closed segments are kept in later hypotheses."""
+        kaldi = FakeKaldi([{"partial": "tulosta"}, {"text": "tulosta kuva"},
+                           {"partial": "kissasta"}], final="kissasta")
+        stream = _VoskStream(kaldi)
+        self.assertEqual(stream.accept(CHUNK), "tulosta")
+        self.assertEqual(stream.accept(CHUNK), "tulosta kuva")
+        self.assertEqual(stream.accept(CHUNK), "tulosta kuva kissasta")
+        self.assertEqual(stream.finish(), "tulosta kuva kissasta")
+
+
+class TestStreamingTranscriber(unittest.TestCase):
+    """Test cases for the StreamingTranscriber class."""
+
+    def test_partial_callbacks(self):
+        """Test that each new partial is reported once."""
+        transcriber = StreamingTranscriber(ScriptedBackend(["piirrä iso aurinko"], 0.2))
+        partials = []
+        text = transcriber.transcribe([CHUNK] * 6, RATE,
+                                      on_partial=lambda p: partials.append(p) and False)
+        self.assertEqual(text, "piirrä iso aurinko")
+        self.assertEqual(partials, ["piirrä", "piirrä iso", "piirrä iso aurinko"])
+
+    def test_stop_early(self):
+        """Test that a callback returning True ends recognition with the partial."""
+        transcriber = StreamingTranscriber(ScriptedBackend(["tulosta perkele nyt heti"], 0.1))
+        fed = []
+
+        def chunks():
+            for _ in range(10):
+                fed.append(1)
+                yield CHUNK
+
+        text = transcriber.transcribe(chunks(), RATE,
+                                      on_partial=lambda partial: "perkele" in partial)
+        self.assertEqual(text, "tulosta perkele")
+        self.assertEqual(len(fed), 2)
+        self.assertEqual(transcriber.latency_percentiles(), {})
+
+    def test_latency_from_end_of_speech(self):
+        """Test that latency counts from the reported end of speech."""
+        clock = FakeClock()
+        transcriber = StreamingTranscriber(SlowBackend(clock, 0.4), clock=clock)
+        for _ in range(3):
+            ended = clock.now - 0.1
+            self.assertEqual(transcriber.transcribe([CHUNK], RATE, lambda: ended),
+                             "tulosta kissa")
+        self.assertAlmostEqual(transcriber.latency_percentiles()[50], 0.5)
+
+    def test_backend_error(self):
+        """Test that backend failures reach the caller."""
+        transcriber = StreamingTranscriber(SlowBackend(FakeClock(), 0, error=True))
+        with self.assertRaises(RecognitionError):
+            transcriber.transcribe([CHUNK], RATE)
+
+    def test_partials_before_utterance_ends(self):
+        """Test that recognition starts while the utterance is still captured."""
+        t = np.arange(RATE) / RATE
+        speech = (6000 * np.sin(2 * np.pi * 180 * t)).astype(np.int16).tobytes()
+        release = threading.Event()
+
+        class GatedStream:
+            """Silence, one second of speech, then blocks until released."""
+
+            def __init__(self, rate, frames):
+                self.data = bytes(RATE * 3) + speech
+                self.position = 0
+
+            def read(self, frames):
+                size = frames * 2
+                if self.position >= len(self.data):
+                    release.wait(1)
+                    return bytes(size)
+                chunk = self.data[self.position:self.position + size]
+                self.position += size
+                return chunk.ljust(size, b"\0")
+
+            def stop_stream(self):
+                pass
+
+            def close(self):
+                pass
+
+        capture = AudioCapture(GatedStream, hangover=0.3)
+        capture.start()
+        try:
+            stream = capture.get_stream(timeout=5)
+            self.assertIsNotNone(stream)
+            heard_before_end = []
+
+            def on_partial(partial):
+                heard_before_end.append(not stream.ended)
+                if len(heard_before_end) == 1:
+                    release.set()
+                return False
+
+            transcriber = StreamingTranscriber(ScriptedBackend(["tulosta kissa"], 0.25))
+            text = transcriber.transcribe(stream.chunks(), stream.sample_rate,
+                                          lambda: stream.ended_at, on_partial)
+        finally:
+            release.set()
+            capture.close()
+
+        self.assertEqual(text, "tulosta kissa")
+        self.assertTrue(heard_before_end[0])
+        self.assertEqual(len(transcriber.latency_percentiles()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import sys
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from disk_cache import DiskCache
+from tts_cache import SpeechCache
+
+
+class FakeEngine:
+    """Writes the text as the "audio" and counts syntheses."""
+
+    def __init__(self, fail_on=()):
+        self.spoken = []
+        self.fail_on = set(fail_on)
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, text, path):
+        self.release.wait(5)
+        if text in self.fail_on:
+            raise RuntimeError("engine wedged")
+        self.spoken.append(text)
+        path.write_bytes(b"RIFF" + text.encode("utf-8"))
+
+
+class TestSpeechCache(unittest.TestCase):
+    """Test cases for the SpeechCache class."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.disk = DiskCache(self.temp_dir, suffix=".wav")
+        self.engine = FakeEngine()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_synthesized_once(self):
+        """Test that a phrase is synthesized on the first request only."""
+        cache = SpeechCache(self.disk, self.engine)
+        self.assertIsNone(cache.get("Kuuntelen..."))
+        first = cache.get_or_synthesize("Kuuntelen...")
+        second = cache.get_or_synthesize("Kuuntelen...")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first.suffix, ".wav")
+        self.assertEqual(first.read_bytes(), "RIFFKuuntelen...".encode("utf-8"))
+        self.assertEqual(self.engine.spoken, ["Kuuntelen..."])
+
+    def test_key_covers_voice_settings(self):
+        """Test that another voice, rate or volume is synthesized anew."""
+        base = SpeechCache(self.disk, self.engine, voice="fi", rate=150, volume=0.8)
+        variants = [SpeechCache(self.disk, self.engine, voice="en", rate=150, volume=0.8),
+                    SpeechCache(self.disk, self.engine, voice="fi", rate=120, volume=0.8),
+                    SpeechCache(self.disk, self.engine, voice="fi", rate=150, volume=1.0)]
+        keys = {base.key("Hienoa!")} | {cache.key("Hienoa!") for cache in variants}
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(base.key("Hienoa!"),
+                         SpeechCache(self.disk, self.engine, voice="fi").key("Hienoa!"))
+
+    def test_put_synthesized_elsewhere(self):
+        """Test storing a file written outside the cache."""
+        cache = SpeechCache(self.disk, self.engine)
+        source = self.temp_dir / "speech.wav"
+        source.write_bytes(b"RIFFHienoa!")
+        path = cache.put("Hienoa!", source)
+
+        self.assertEqual(cache.get("Hienoa!"), path)
+        self.assertEqual(path.read_bytes(), b"RIFFHienoa!")
+        self.assertTrue(source.exists())
+        source.write_bytes(b"")
+        self.assertIsNone(cache.put("Odota hetki.", source))
+        self.assertEqual(self.engine.spoken, [])
+
+    def test_synthesis_failure(self):
+        """Test that a failing engine gives None and caches nothing."""
+        cache = SpeechCache(self.disk, FakeEngine(fail_on={"Hienoa!"}))
+        self.assertIsNone(cache.get_or_synthesize("Hienoa!"))
+        self.assertEqual(len(self.disk), 0)
+
+    def test_warm_up_in_background(self):
+        """Test that warm-up runs off the calling thread and skips cached phrases."""
+        cache = SpeechCache(self.disk, self.engine)
+        cache.get_or_synthesize("Kuuntelen...")
+        self.engine.release.clear()
+
+        done = []
+        cache.warm_up(["Hienoa!", "Kuuntelen...", "Hienoa!", "Odota hetki."],
+                      then=lambda: done.append(threading.current_thread()))
+        self.assertFalse(cache.wait_warm(timeout=0.05))
+        self.engine.release.set()
+        self.assertTrue(cache.wait_warm(timeout=5))
+        self.assertEqual(len(done), 1)
+        self.assertIsNot(done[0], threading.current_thread())
+
+        self.assertEqual(self.engine.spoken, ["Kuuntelen...", "Hienoa!", "Odota hetki."])
+        self.assertIsNotNone(cache.get("Odota hetki."))
+
+    def test_budget_evicts_least_recent(self):
+        """Test that the disk budget drops the phrases not used lately."""
+        disk = DiskCache(self.temp_dir / "small", max_bytes=40, suffix=".wav")
+        cache = SpeechCache(disk, self.engine)
+        for text in ("yksi ....", "kaksi ...", "kolme ..."):
+            cache.get_or_synthesize(text)
+        cache.get_or_synthesize("yksi ....")
+        cache.get_or_synthesize("neljä ...")
+
+        self.assertIsNone(cache.get("kaksi ..."))
+        self.assertIsNotNone(cache.get("yksi ...."))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import time
+from concurrent.futures import CancelledError
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+import tts_server
+from tts_server import SpeechError, SpeechServer
+
+
+class FakeEngine:
+    """
+    Writes the text as the "audio", after an optional delay.
+
+    Texts starting with "crash" kill the worker, "hang" never finish and
+    "fail" raise.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queued = None
+
+    def getProperty(self, name):
+        return "fi-test"
+
+    def save_to_file(self, text, path):
+        self.queued = (text, path)
+
+    def runAndWait(self):
+        text, path = self.queued
+        time.sleep(self.delay)
+        if text.startswith("crash"):
+            os._exit(3)
+        if text.startswith("hang"):
+            time.sleep(60)
+        if text.startswith("fail"):
+            raise RuntimeError("engine wedged")
+        Path(path).write_text(f"{text} {os.getpid()}", encoding="utf-8")
+
+
+def fake_engine(delay=0.0):
+    return FakeEngine(delay)
+
+
+def broken_engine():
+    raise RuntimeError("no audio driver")
+
+
+class TestSpeechServer(unittest.TestCase):
+    """Test cases for the SpeechServer class."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.server = None
+        self._restart_delay = tts_server.RESTART_DELAY
+        tts_server.RESTART_DELAY = 0.01
+
+    def tearDown(self):
+        tts_server.RESTART_DELAY = self._restart_delay
+        if self.server is not None:
+            self.server.close()
+        shutil.rmtree(self.temp_dir)
+
+    def start(self, delay=0.0, timeout=5.0):
+        self.server = SpeechServer(fake_engine, (delay,), timeout=timeout, start_timeout=30)
+        return self.server
+
+    def read(self, name):
+        text, pid = (self.temp_dir / name).read_text(encoding="utf-8").rsplit(" ", 1)
+        return text, int(pid)
+
+    def test_synthesize_in_worker(self):
+        """Test that phrases are written by another process, in order."""
+        server = self.start()
+        self.assertEqual(server.voice, "fi-test")
+        futures = [server.synthesize(f"lause {i}", self.temp_dir / f"{i}.wav")
+                   for i in range(3)]
+        for i, future in enumerate(futures):
+            self.assertEqual(future.result(timeout=10), str(self.temp_dir / f"{i}.wav"))
+            text, pid = self.read(f"{i}.wav")
+            self.assertEqual(text, f"lause {i}")
+            self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(server.synthesized, 3)
+
+        server.synthesize_to("hei", self.temp_dir / "hei.wav")
+        self.assertEqual(self.read("hei.wav")[0], "hei")
+
+    def test_engine_errors_keep_worker(self):
+        """Test that an engine exception fails one phrase only."""
+        server = self.start()
+        with self.assertRaises(SpeechError):
+            server.synthesize("fail", self.temp_dir / "a.wav").result(timeout=10)
+        server.synthesize("hei", self.temp_dir / "b.wav").result(timeout=10)
+        self.assertEqual(server.restarts, 0)
+
+    def test_restart_after_crash(self):
+        """Test that a crashed worker is replaced and later phrases succeed."""
+        server = self.start()
+        server.synthesize("hei", self.temp_dir / "a.wav").result(timeout=10)
+        first_pid = self.read("a.wav")[1]
+
+        crashed = server.synthesize("crash", self.temp_dir / "b.wav")
+        after = server.synthesize("moi", self.temp_dir / "c.wav")
+        with self.assertRaises(SpeechError):
+            crashed.result(timeout=10)
+        after.result(timeout=30)
+        self.assertNotEqual(self.read("c.wav")[1], first_pid)
+        self.assertEqual(server.restarts, 1)
+        self.assertTrue(server.alive)
+
+    def test_restart_after_hang(self):
+        """Test that a wedged worker is killed after the timeout."""
+        server = self.start(timeout=0.5)
+        start = time.monotonic()
+        with self.assertRaises(SpeechError):
+            server.synthesize("hang", self.temp_dir / "a.wav").result(timeout=10)
+        self.assertLess(time.monotonic() - start, 5)
+        server.synthesize("hei", self.temp_dir / "b.wav").result(timeout=30)
+        self.assertEqual(server.restarts, 1)
+
+    def test_worker_start_error_fails_one_phrase(self):
+        """Test that a worker that cannot be started fails only the phrase at hand."""
+        server = self.start()
+        server.synthesize("hei", self.temp_dir / "a.wav").result(timeout=10)
+        server._process.kill()
+        server._process.join(timeout=5)
+
+        # A local function cannot be sent to a spawned process
+        server.make_engine = lambda delay: FakeEngine(delay)
+        with self.assertRaises(SpeechError):
+            server.synthesize("moi", self.temp_dir / "b.wav").result(timeout=10)
+
+        server.make_engine = fake_engine
+        server.synthesize("terve", self.temp_dir / "c.wav").result(timeout=30)
+        self.assertEqual(self.read("c.wav")[0], "terve")
+
+    def test_cancel_pending(self):
+        """Test that barge-in drops phrases that have not started."""
+        server = self.start(delay=0.3)
+        current = server.synthesize("eka", self.temp_dir / "a.wav")
+        while not current.running():
+            time.sleep(0.005)
+        queued = [server.synthesize(f"lause {i}", self.temp_dir / f"{i}.wav")
+                  for i in range(3)]
+        self.assertEqual(server.cancel_pending(), 3)
+        current.result(timeout=10)
+        for future in queued:
+            with self.assertRaises(CancelledError):
+                future.result(timeout=1)
+        self.assertFalse((self.temp_dir / "0.wav").exists())
+
+    def test_engine_that_cannot_start(self):
+        with self.assertRaises(SpeechError):
+            SpeechServer(broken_engine, timeout=1, start_timeout=30)
+
+    def test_closed(self):
+        server = self.start()
+        server.close()
+        self.assertFalse(server.alive)
+        with self.assertRaises(RuntimeError):
+            server.synthesize("hei", self.temp_dir / "a.wav")
+        self.server = None
+
+
+if __name__ == "__main__":
+    unittest.main()
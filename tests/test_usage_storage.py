@@ -0,0 +1,336 @@
+import unittest
+import sys
+import json
+import tempfile
+import shutil
+import sqlite3
+import threading
+import multiprocessing
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from usage_storage import (
+    JournalStorage, JsonFileStorage, SqliteUsageStorage, create_storage
+)
+from daily_limits import DailyLimitManager
+
+
+def _reserve_prints(path, attempts, limit, results):
+    """Worker process: try to reserve prints in a shared database."""
+    storage = SqliteUsageStorage(path)
+    granted = sum(
+        1 for _ in range(attempts)
+        if storage.try_increment("2024-05-01", limit) is not None
+    )
+    storage.close()
+    results.put(granted)
+
+
+class TestJsonFileStorage(unittest.TestCase):
+    """Test cases for the JsonFileStorage backend."""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "daily_usage.json"
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def test_roundtrip(self):
+        """Test that counts survive reopening the file."""
+        storage = JsonFileStorage(self.path)
+        storage.reset("2024-05-01")
+        storage.increment("2024-05-01")
+        storage.increment("2024-05-01")
+        
+        reopened = JsonFileStorage(self.path)
+        self.assertEqual(reopened.get_count("2024-05-01"), 2)
+        self.assertEqual(reopened.last_reset, "2024-05-01")
+        self.assertEqual(list(self.temp_dir.iterdir()), [self.path])
+
+
+class TestJournalStorage(unittest.TestCase):
+    """Test cases for the JournalStorage backend."""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.snapshot = self.temp_dir / "daily_usage.json"
+        self.journal = self.temp_dir / "daily_usage.journal"
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def open_storage(self, **kwargs):
+        return JournalStorage(self.snapshot, self.journal, **kwargs)
+    
+    def test_replay_after_restart(self):
+        """Test that journal records are replayed on startup."""
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        for _ in range(3):
+            storage.increment("2024-05-01")
+        storage.close()
+        
+        self.assertEqual(len(self.journal.read_text().splitlines()), 3)
+        self.assertEqual(self.open_storage().get_count("2024-05-01"), 3)
+    
+    def test_record_size_is_constant(self):
+        """Test that each print appends a small record instead of rewriting."""
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        snapshot_mtime = self.snapshot.stat().st_mtime_ns
+        for _ in range(50):
+            before = self.journal.stat().st_size if self.journal.exists() else 0
+            storage.increment("2024-05-01")
+            self.assertLess(self.journal.stat().st_size - before, 48)
+        
+        self.assertEqual(self.snapshot.stat().st_mtime_ns, snapshot_mtime)
+    
+    def test_torn_last_record_ignored(self):
+        """Test that a half-written record from a power cut is skipped."""
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        storage.increment("2024-05-01")
+        storage.close()
+        with open(self.journal, "a", encoding="utf-8") as f:
+            f.write('{"seq": 2, "da')
+        
+        self.assertEqual(self.open_storage().get_count("2024-05-01"), 1)
+    
+    def test_append_after_torn_record(self):
+        """Test that records written after a torn one survive a restart."""
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        for _ in range(2):
+            storage.increment("2024-05-01")
+        storage.close()
+        with open(self.journal, "a", encoding="utf-8") as f:
+            f.write('{"seq": 3, "da')
+        
+        storage = self.open_storage()
+        for _ in range(2):
+            storage.increment("2024-05-01")
+        self.assertEqual(storage.get_count("2024-05-01"), 4)
+        storage.close()
+        
+        self.assertEqual(self.open_storage().get_count("2024-05-01"), 4)
+        seqs = [json.loads(line)["seq"] for line in self.journal.read_text().splitlines()]
+        self.assertEqual(seqs, [1, 2, 3, 4])
+    
+    def test_compaction(self):
+        """Test that the journal is folded into the snapshot."""
+        storage = self.open_storage(compact_after=4)
+        storage.reset("2024-05-01")
+        for _ in range(5):
+            storage.increment("2024-05-01")
+        storage.close()
+        
+        self.assertEqual(len(self.journal.read_text().splitlines()), 1)
+        snapshot = json.loads(self.snapshot.read_text())
+        self.assertEqual(snapshot["daily_counts"]["2024-05-01"], 4)
+        self.assertEqual(self.open_storage().get_count("2024-05-01"), 5)
+    
+    def test_crash_before_truncation_not_double_counted(self):
+        """Test that records already in the snapshot are not replayed."""
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        for _ in range(3):
+            storage.increment("2024-05-01")
+        storage.close()
+        journal = self.journal.read_text()
+        
+        # Compact, then restore the journal as if truncation never happened
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        storage.usage_data["daily_counts"]["2024-05-01"] = 3
+        storage._write_snapshot()
+        storage.close()
+        self.journal.write_text(journal)
+        
+        self.assertEqual(self.open_storage().get_count("2024-05-01"), 3)
+    
+    def test_child_and_device_records(self):
+        """Test that per-child records replay into the right counters."""
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        storage.increment("2024-05-01", "aino", "kiosk-1")
+        storage.increment("2024-05-01", "aino", "kiosk-2")
+        storage.increment("2024-05-01")
+        storage.close()
+        
+        reopened = self.open_storage()
+        self.assertEqual(reopened.get_count("2024-05-01", "aino"), 2)
+        self.assertEqual(reopened.get_count("2024-05-01", "aino", "kiosk-2"), 1)
+        self.assertEqual(reopened.get_day_counts("2024-05-01"),
+                         {"aino": {"kiosk-1": 1, "kiosk-2": 1}, "default": {"default": 1}})
+    
+    def test_old_days_not_loaded(self):
+        """Test that counters of days before the last reset stay on disk only."""
+        self.snapshot.write_text(json.dumps({
+            "last_reset": "2024-05-02",
+            "quotas": [["2024-05-01", "aino", "kiosk-1", 4],
+                       ["2024-05-02", "aino", "kiosk-1", 1]]
+        }))
+        storage = self.open_storage()
+        
+        self.assertEqual(storage.total_days(), 1)
+        self.assertEqual(storage.get_count("2024-05-01", "aino"), 0)
+        self.assertEqual(storage.get_count("2024-05-02", "aino"), 1)
+    
+    def test_reads_legacy_json(self):
+        """Test that an existing daily_usage.json is used as the snapshot."""
+        self.snapshot.write_text(json.dumps(
+            {"daily_counts": {"2024-05-01": 7}, "last_reset": "2024-05-01"}))
+        storage = self.open_storage()
+        storage.increment("2024-05-01")
+        
+        self.assertEqual(storage.get_count("2024-05-01"), 8)
+    
+    def test_limit_manager_with_journal(self):
+        """Test DailyLimitManager persistence through the journal backend."""
+        manager = DailyLimitManager(max_daily_prints=3, config_dir=str(self.temp_dir),
+                                    backend="journal")
+        manager.record_print()
+        manager.record_print()
+        manager.close()
+        
+        reopened = DailyLimitManager(max_daily_prints=3, config_dir=str(self.temp_dir),
+                                     backend="journal")
+        self.assertEqual(reopened.get_today_count(), 2)
+        self.assertEqual(reopened.get_remaining_prints(), 1)
+        reopened.close()
+    
+    def test_refund_is_journaled(self):
+        """Test that refunds survive a restart."""
+        storage = self.open_storage()
+        storage.reset("2024-05-01")
+        storage.increment("2024-05-01")
+        storage.increment("2024-05-01")
+        storage.decrement("2024-05-01")
+        storage.close()
+        
+        self.assertEqual(self.open_storage().get_count("2024-05-01"), 1)
+    
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected."""
+        with self.assertRaises(ValueError):
+            create_storage("floppy", self.temp_dir)
+
+
+
+class TestSqliteUsageStorage(unittest.TestCase):
+    """Test cases for the SqliteUsageStorage backend."""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "daily_usage.db"
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def test_shared_between_instances(self):
+        """Test that two storages on one database see each other's prints."""
+        first = SqliteUsageStorage(self.path)
+        second = SqliteUsageStorage(self.path)
+        first.increment("2024-05-01")
+        second.increment("2024-05-01")
+        
+        self.assertEqual(first.get_count("2024-05-01"), 2)
+        self.assertIsNone(second.try_increment("2024-05-01", 2))
+        self.assertEqual(first.decrement("2024-05-01"), 1)
+        first.close()
+        second.close()
+    
+    def test_reset_keeps_current_day(self):
+        """Test that a late reset by another process keeps today's prints."""
+        storage = SqliteUsageStorage(self.path)
+        storage.increment("2024-04-30")
+        storage.increment("2024-05-01")
+        storage.reset("2024-05-01")
+        
+        self.assertEqual(storage.last_reset, "2024-05-01")
+        self.assertEqual(storage.usage_data["daily_counts"], {"2024-05-01": 1})
+        storage.close()
+    
+    def test_per_child_counters(self):
+        """Test per-child limits and bulk counts in the database."""
+        storage = SqliteUsageStorage(self.path)
+        storage.increment("2024-05-01", "aino", "kiosk-1")
+        storage.increment("2024-05-01", "aino", "kiosk-2")
+        
+        self.assertIsNone(storage.try_increment("2024-05-01", 2, "aino", "kiosk-1"))
+        self.assertEqual(storage.try_increment("2024-05-01", 2, "eino", "kiosk-1"), 1)
+        self.assertEqual(storage.get_device_counts("2024-05-01", "aino"),
+                         {"kiosk-1": 1, "kiosk-2": 1})
+        self.assertEqual(storage.get_day_counts("2024-05-01"),
+                         {"aino": {"kiosk-1": 1, "kiosk-2": 1}, "eino": {"kiosk-1": 1}})
+        storage.close()
+    
+    def test_migrates_global_counter_table(self):
+        """Test that a database with one global counter is migrated."""
+        conn = sqlite3.connect(str(self.path))
+        conn.execute("CREATE TABLE daily_counts (day TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+        conn.execute("INSERT INTO daily_counts VALUES ('2024-05-01', 3)")
+        conn.commit()
+        conn.close()
+        
+        storage = SqliteUsageStorage(self.path)
+        self.assertEqual(storage.get_count("2024-05-01"), 3)
+        storage.close()
+    
+    def test_concurrent_threads_respect_limit(self):
+        """Test that concurrent threads never exceed the limit."""
+        storage = SqliteUsageStorage(self.path)
+        granted = []
+        
+        def worker():
+            for _ in range(20):
+                if storage.try_increment("2024-05-01", 50) is not None:
+                    granted.append(1)
+        
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(granted), 50)
+        self.assertEqual(storage.get_count("2024-05-01"), 50)
+        storage.close()
+    
+    def test_concurrent_processes_respect_limit(self):
+        """Test that separate processes share one atomic budget."""
+        SqliteUsageStorage(self.path).close()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_reserve_prints,
+                                    args=(str(self.path), 15, 30, results))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        granted = sum(results.get(timeout=30) for _ in processes)
+        for process in processes:
+            process.join()
+        
+        self.assertEqual(granted, 30)
+        self.assertEqual(SqliteUsageStorage(self.path).get_count("2024-05-01"), 30)
+    
+    def test_limit_manager_try_record_print(self):
+        """Test the atomic reserve and refund API of DailyLimitManager."""
+        manager = DailyLimitManager(max_daily_prints=2, config_dir=str(self.temp_dir),
+                                    backend="sqlite")
+        self.assertTrue(manager.try_record_print())
+        self.assertTrue(manager.try_record_print())
+        self.assertFalse(manager.try_record_print())
+        
+        manager.refund_print()
+        self.assertEqual(manager.get_remaining_prints(), 1)
+        self.assertEqual(manager.get_usage_stats()["today_count"], 1)
+        manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import unittest
+import sys
+import tempfile
+import shutil
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from wake_word import WakeWordSpotter, mfcc, read_wav, subsequence_distance
+
+RATE = 16000
+
+# First two formants of the vowels, Hz
+FORMANTS = {"a": (800, 1200), "e": (500, 1800), "i": (300, 2300), "o": (500, 900),
+            "u": (320, 800), "y": (300, 1700), "ä": (700, 1700), "ö": (450, 1500)}
+
+
+def voiced(first, second, seconds, pitch, rng):
+    """Harmonics of the pitch shaped by two formants."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    sound = sum((1 / (1 + ((h * pitch - first) / 120) ** 2)
+                 + 0.6 / (1 + ((h * pitch - second) / 150) ** 2))
+                * np.sin(2 * np.pi * h * pitch * t + rng.uniform(0, 6))
+                for h in range(1, 4000 // pitch))
+    return sound * np.minimum(1, np.minimum(t, seconds - t) / 0.02)
+
+
+def hiss(seconds, center, rng):
+    """Band of noise around center Hz."""
+    n = int(seconds * RATE)
+    spectrum = np.fft.rfft(rng.normal(0, 1, n))
+    spectrum *= np.exp(-((np.fft.rfftfreq(n, 1 / RATE) - center) / 1500) ** 2)
+    return np.fft.irfft(spectrum, n) * 0.5
+
+
+def say(word, seed=0, speed=1.0, pitch=220):
+    """Crude synthetic speech standing in for a recording of a word."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for letter in word:
+        if letter in FORMANTS:
+            parts.append(voiced(*FORMANTS[letter], 0.12 / speed, pitch, rng))
+        elif letter in "sh":
+            parts.append(hiss(0.08 / speed, 5000 if letter == "s" else 2500, rng))
+        elif letter in "tkp":
+            parts += [np.zeros(int(0.04 / speed * RATE)), hiss(0.02 / speed, 3500, rng)]
+        else:
+            # Nasals and liquids: weak, low and slightly different per letter
+            parts.append(0.5 * voiced(300, 1000 + 100 * (ord(letter) % 7), 0.06 / speed,
+                                      pitch, rng))
+    signal = np.concatenate(parts)
+    signal = signal / np.abs(signal).max() * 8000 + rng.normal(0, 50, len(signal))
+    return signal.astype(np.int16)
+
+
+def silence(seconds, seed=0):
+    """Quiet background noise."""
+    return np.random.default_rng(seed).normal(0, 50, int(seconds * RATE)).astype(np.int16)
+
+
+def write_wav(path, samples):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(samples.tobytes())
+
+
+class TestFeatures(unittest.TestCase):
+    """Test cases for MFCC features and template matching."""
+
+    def test_mfcc_shape(self):
+        """Test one feature row per 10 ms."""
+        features = mfcc(say("tulosta"))
+        self.assertEqual(features.shape[1], 24)
+        self.assertAlmostEqual(features.shape[0], len(say("tulosta")) / 160, delta=3)
+
+    def test_loudness_does_not_matter(self):
+        """Test that a quieter recording gives the same features."""
+        loud = say("kuva")
+        quiet = (loud // 4).astype(np.int16)
+        self.assertLess(subsequence_distance(mfcc(loud), mfcc(quiet)), 0.02)
+
+    def test_template_found_inside_longer_audio(self):
+        """Test that the match may start and end anywhere in the query."""
+        template = mfcc(say("tulosta", seed=1))
+        query = mfcc(np.concatenate([silence(0.4), say("tulosta", seed=2, speed=1.2),
+                                     say("kissa", seed=3)]))
+        other = mfcc(np.concatenate([silence(0.4), say("kissa", seed=3)]))
+        self.assertLess(subsequence_distance(template, query),
+                        subsequence_distance(template, other) / 2)
+
+
+class TestWakeWordSpotter(unittest.TestCase):
+    """Test cases for the WakeWordSpotter class."""
+
+    def setUp(self):
+        self.spotter = WakeWordSpotter(["tulosta", "piirrä", "kuva"])
+        for word in self.spotter.wake_words:
+            for seed in range(3):
+                self.spotter.enroll(word, say(word, seed=seed, speed=0.9 + 0.1 * seed))
+
+    def test_detect_wake_word(self):
+        """Test that each word is found at the start of a longer utterance."""
+        for word in ["tulosta", "piirrä", "kuva"]:
+            with self.subTest(word=word):
+                utterance = np.concatenate([silence(0.3), say(word, seed=7, pitch=260),
+                                            say("kissa", seed=8)])
+                match = self.spotter.detect(utterance)
+                self.assertIsNotNone(match)
+                self.assertEqual(match.word, word)
+
+    def test_reject_other_speech(self):
+        """Test that speech without a wake word is rejected."""
+        for word in ["aamu", "heippa", "äiti"]:
+            with self.subTest(word=word):
+                self.assertIsNone(self.spotter.detect(np.concatenate([silence(0.3),
+                                                                      say(word, seed=9)])))
+        self.assertIsNone(self.spotter.detect(silence(1.0)))
+        self.assertEqual(self.spotter.rejections, 4)
+        self.assertGreater(self.spotter.cpu_seconds, 0)
+
+    def test_only_window_is_searched(self):
+        """Test that a wake word late in the utterance does not count."""
+        late = np.concatenate([say("aamu"), silence(2.0), say("kuva", seed=7)])
+        self.assertIsNone(self.spotter.detect(late))
+
+    def test_gate_keeps_all_audio(self):
+        """Test that the chunks read for detection are handed on."""
+        pcm = np.concatenate([say("kuva", seed=7), silence(3.0)]).tobytes()
+        chunks = [pcm[i:i + 3200] for i in range(0, len(pcm), 3200)]
+        consumed = []
+
+        def stream():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        match, audio = self.spotter.gate(stream())
+        self.assertEqual(match.word, "kuva")
+        # Only the two second window was read before deciding
+        self.assertEqual(len(consumed), 20)
+        self.assertEqual(b"".join(audio), pcm)
+
+    def test_enroll_errors(self):
+        """Test that unknown words and other sample rates are refused."""
+        with self.assertRaises(ValueError):
+            self.spotter.enroll("kissa", say("kissa"))
+        with self.assertRaises(ValueError):
+            self.spotter.enroll("kuva", say("kuva"), sample_rate=8000)
+
+    def test_threshold_from_spread(self):
+        """Test that far-apart recordings loosen a word's threshold."""
+        spotter = WakeWordSpotter(["kuva"], default_threshold=0.01)
+        self.assertFalse(spotter.ready)
+        spotter.enroll("kuva", say("kuva", seed=1))
+        self.assertEqual(spotter.thresholds["kuva"], 0.01)
+        spotter.enroll("kuva", say("kuva", seed=2, pitch=150))
+        self.assertTrue(spotter.ready)
+        self.assertGreater(spotter.thresholds["kuva"], 0.01)
+
+
+class TestLoadTemplates(unittest.TestCase):
+    """Test cases for enrolling from recordings on disk."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_templates(self):
+        """Test that WAV files are enrolled per word and bad files skipped."""
+        (self.temp_dir / "kuva").mkdir()
+        for seed in range(2):
+            write_wav(self.temp_dir / "kuva" / f"{seed}.wav", say("kuva", seed=seed))
+        (self.temp_dir / "kuva" / "broken.wav").write_bytes(b"not audio")
+
+        spotter = WakeWordSpotter(["kuva", "tulosta"])
+        self.assertEqual(spotter.load_templates(self.temp_dir), 2)
+        self.assertEqual(len(spotter.templates["kuva"]), 2)
+        self.assertEqual(spotter.templates["tulosta"], [])
+
+        samples, rate = read_wav(self.temp_dir / "kuva" / "0.wav")
+        self.assertEqual(rate, RATE)
+        np.testing.assert_array_equal(samples, say("kuva", seed=0))
+
+
+if __name__ == "__main__":
+    unittest.main()